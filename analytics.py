@@ -0,0 +1,343 @@
+# Retention analytics for the Analytics Insights page, computed from an HR
+# dataset (same columns as HR_Dataset.csv).
+#
+# The file is summarized in blocks of BLOCK_ROWS rows. Each block is reduced to
+# small additive tables (counts, leavers and column sums per department x
+# salary, and leaver counts per satisfaction/hours/project/tenure bucket),
+# and the page totals are the sum over blocks. Blocks are identified by a hash
+# of their bytes, so refreshing after rows are appended or edited re-parses
+# only the blocks that changed. The block summaries are saved next to the
+# dataset so they are reused across sessions and restarts.
+#
+# The source can also be an employee_store.py directory, read zero-copy.
+#
+# Usage:
+#   python analytics.py HR_Dataset.csv          # build/refresh the summary and print it
+#   python analytics.py hr_store
+import argparse
+import hashlib
+import io
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from employee_store import META_FILE, EmployeeStore
+from encoder import DEPARTMENT_ALIASES, DEPARTMENTS, SALARIES, factor_name
+
+DATASET_ENV = 'CHURN_HR_DATA'
+BLOCK_ROWS = 50_000
+SATISFACTION_BINS = 10
+HOURS_BIN_WIDTH = 25
+HOURS_BINS = 16
+MAX_PROJECTS = 10
+MAX_TENURE = 20
+# Sums kept per department x salary cell, after count and leavers
+SUM_COLUMNS = ['satisfaction_level', 'last_evaluation', 'average_montly_hours', 'time_spend_company']
+_STORE_COLUMNS = SUM_COLUMNS + ['number_project', 'promotion_last_5years', 'Work_accident', 'left']
+_TABLES = {
+    'groups': (len(DEPARTMENTS) * len(SALARIES), 2 + len(SUM_COLUMNS)),
+    'satisfaction': (SATISFACTION_BINS, 2),
+    'hours': (HOURS_BINS, 2),
+    'projects': (MAX_PROJECTS, 2),
+    'tenure': (MAX_TENURE, 2),
+    'promotion': (2, 2),
+    'accident': (2, 2),
+}
+
+
+def dataset_path():
+    return os.environ.get(DATASET_ENV, 'HR_Dataset.csv')
+
+
+def summary_path(path):
+    return f"{path}.summary.npz"
+
+
+# (count, leavers) per code
+def _count_left(codes, left, n):
+    return np.column_stack([np.bincount(codes, minlength=n), np.bincount(codes, weights=left, minlength=n)])
+
+
+# Additive tables for one block of rows
+def summarize_frame(df):
+    department = next(col for col in DEPARTMENT_ALIASES if col in df.columns)
+    return summarize_columns(df, pd.Index(DEPARTMENTS).get_indexer(df[department]),
+                             pd.Index(SALARIES).get_indexer(df['salary']))
+
+
+# Same, from {column: array} plus department/salary codes into DEPARTMENTS/SALARIES
+# (-1: other). Rows with another department or salary are left out of every
+# table, so the bucket tables always add up to the department x salary counts.
+def summarize_columns(df, dept, salary):
+    dept, salary = np.asarray(dept, dtype=np.int64), np.asarray(salary, dtype=np.int64)
+    valid = (dept >= 0) & (salary >= 0)
+
+    def column(name):
+        return np.asarray(df[name])[valid]
+
+    left = column('left').astype(np.float64)
+    cell = (dept * len(SALARIES) + salary)[valid]
+    n_cells = _TABLES['groups'][0]
+
+    groups = [np.bincount(cell, minlength=n_cells), np.bincount(cell, weights=left, minlength=n_cells)]
+    for col in SUM_COLUMNS:
+        groups.append(np.bincount(cell, weights=column(col).astype(np.float64), minlength=n_cells))
+
+    # The epsilon keeps exact bin edges such as 0.3 * 10 in the upper bin
+    satisfaction = np.clip((column('satisfaction_level') * SATISFACTION_BINS + 1e-9).astype(np.int64),
+                           0, SATISFACTION_BINS - 1)
+    hours = np.clip((column('average_montly_hours') // HOURS_BIN_WIDTH).astype(np.int64),
+                    0, HOURS_BINS - 1)
+    projects = np.clip(column('number_project').astype(np.int64), 1, MAX_PROJECTS) - 1
+    tenure = np.clip(column('time_spend_company').astype(np.int64), 1, MAX_TENURE) - 1
+    return {
+        'groups': np.column_stack(groups),
+        'satisfaction': _count_left(satisfaction, left, SATISFACTION_BINS),
+        'hours': _count_left(hours, left, HOURS_BINS),
+        'projects': _count_left(projects, left, MAX_PROJECTS),
+        'tenure': _count_left(tenure, left, MAX_TENURE),
+        'promotion': _count_left(column('promotion_last_5years').astype(np.int64), left, 2),
+        'accident': _count_left(column('Work_accident').astype(np.int64), left, 2),
+    }
+
+
+# Byte ranges of consecutive BLOCK_ROWS-row blocks after the header line
+def _block_ranges(data, block_rows=BLOCK_ROWS):
+    newlines = np.flatnonzero(np.frombuffer(data, dtype=np.uint8) == ord('\n'))
+    header_end = int(newlines[0]) + 1 if len(newlines) else len(data)
+    ends = newlines[1:] + 1
+    if len(data) > header_end and (not len(ends) or ends[-1] < len(data)):
+        ends = np.append(ends, len(data))   # last line without a trailing newline
+    ranges = []
+    start = header_end
+    for i in range(block_rows - 1, len(ends) + block_rows - 1, block_rows):
+        end = int(ends[min(i, len(ends) - 1)])
+        if end > start:
+            ranges.append((start, end))
+        start = end
+    return data[:header_end], ranges
+
+
+class SummaryStore:
+    def __init__(self, hashes=(), tables=None):
+        self.hashes = list(hashes)
+        self.tables = tables or {name: np.zeros((0,) + shape) for name, shape in _TABLES.items()}
+        self._totals = None
+        self.last_refresh = {}
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data['hashes'].tolist(), {name: data[name] for name in _TABLES})
+
+    def save(self, path):
+        tmp = f"{path}.tmp.npz"
+        np.savez(tmp, hashes=np.array(self.hashes, dtype='U32'), **self.tables)
+        os.replace(tmp, path)
+
+    # Replace the block list with `blocks` ([(key, summarize), ...]), calling
+    # summarize() only for keys that are not already summarized
+    def _update(self, blocks):
+        start = time.perf_counter()
+        old = {}
+        for i, key in enumerate(self.hashes):
+            old.setdefault(key, i)
+
+        keys, tables, parsed = [], {name: [] for name in _TABLES}, 0
+        for key, summarize in blocks:
+            if key in old:
+                block = {name: self.tables[name][old[key]] for name in _TABLES}
+            else:
+                block = summarize()
+                parsed += 1
+            keys.append(key)
+            for name in _TABLES:
+                tables[name].append(block[name])
+
+        changed = parsed or len(keys) != len(self.hashes)
+        self.hashes = keys
+        self.tables = {name: np.stack(blocks) if blocks else np.zeros((0,) + _TABLES[name])
+                       for name, blocks in tables.items()}
+        self._totals = None
+        self.last_refresh = {'blocks': len(keys), 'parsed': parsed, 'changed': bool(changed),
+                             'seconds': time.perf_counter() - start}
+        return self
+
+    # Re-summarize only the blocks of `data` (CSV bytes) whose content changed
+    def refresh(self, data, block_rows=BLOCK_ROWS):
+        header, ranges = _block_ranges(data, block_rows)
+        return self._update([
+            (hashlib.blake2b(data[lo:hi], digest_size=16).hexdigest(),
+             lambda lo=lo, hi=hi: summarize_frame(pd.read_csv(io.BytesIO(header + data[lo:hi]))))
+            for lo, hi in ranges])
+
+    # Same for an EmployeeStore, read zero-copy from its memory-mapped columns.
+    # Stores are append-only, so a block is identified by its row range.
+    def refresh_store(self, store, block_rows=BLOCK_ROWS):
+        department = store.find(DEPARTMENT_ALIASES)
+        dept_lookup = np.array([DEPARTMENTS.index(c) if c in DEPARTMENTS else -1
+                                for c in store.categories(department)] or [-1])
+        salary_lookup = np.array([SALARIES.index(c) if c in SALARIES else -1
+                                  for c in store.categories('salary')] or [-1])
+        columns = {name: store.column(name) for name in _STORE_COLUMNS + [department, 'salary']}
+
+        def summarize(lo, hi):
+            block = {name: values[lo:hi] for name, values in columns.items()}
+            return summarize_columns(block, dept_lookup[block[department]], salary_lookup[block['salary']])
+
+        return self._update([(f"rows:{lo}-{min(lo + block_rows, len(store))}",
+                              lambda lo=lo: summarize(lo, lo + block_rows))
+                             for lo in range(0, len(store), block_rows)])
+
+    @property
+    def totals(self):
+        if self._totals is None:
+            self._totals = {name: blocks.sum(axis=0) for name, blocks in self.tables.items()}
+        return self._totals
+
+    def overview(self):
+        groups = self.totals['groups']
+        count, left = groups[:, 0].sum(), groups[:, 1].sum()
+        sums = dict(zip(SUM_COLUMNS, groups[:, 2:].sum(axis=0)))
+        return {
+            'employees': int(count),
+            'left': int(left),
+            'retention_rate': 1 - left / count if count else float('nan'),
+            'avg_satisfaction': sums['satisfaction_level'] / count if count else float('nan'),
+            'avg_tenure': sums['time_spend_company'] / count if count else float('nan'),
+            'avg_hours': sums['average_montly_hours'] / count if count else float('nan'),
+        }
+
+    def _groups_frame(self):
+        groups = self.totals['groups']
+        index = pd.MultiIndex.from_product([DEPARTMENTS, SALARIES], names=['department', 'salary'])
+        return pd.DataFrame(groups, index=index, columns=['count', 'left'] + SUM_COLUMNS)
+
+    # Per-department counts, retention and averages
+    def by_department(self):
+        df = self._groups_frame().groupby(level='department').sum()
+        df = df[df['count'] > 0]
+        out = pd.DataFrame({'Employees': df['count'].astype(int),
+                            'Retention Rate': 1 - df['left'] / df['count']})
+        for col in SUM_COLUMNS:
+            out[f"Avg {col}"] = df[col] / df['count']
+        return out.sort_values('Employees', ascending=False)
+
+    # Attrition rate crosstab, department x salary (the notebook's heatmap)
+    def attrition_by_department_salary(self):
+        df = self._groups_frame()
+        rate = (df['left'] / df['count'].where(df['count'] > 0)).unstack('salary')
+        return rate[['low', 'medium', 'high']]
+
+    # (count, leavers, attrition rate) per bucket of a column
+    def attrition_by(self, table):
+        counts = self.totals[table]
+        if table == 'satisfaction':
+            index = [f"{i / SATISFACTION_BINS:.1f}-{(i + 1) / SATISFACTION_BINS:.1f}" for i in range(len(counts))]
+        elif table == 'hours':
+            index = [f"{i * HOURS_BIN_WIDTH}-{(i + 1) * HOURS_BIN_WIDTH}" for i in range(len(counts))]
+        elif table in ('projects', 'tenure'):
+            index = list(range(1, len(counts) + 1))
+        else:
+            index = ['No', 'Yes']
+        df = pd.DataFrame(counts, index=index, columns=['count', 'left'])
+        df = df[df['count'] > 0]
+        df['attrition_rate'] = df['left'] / df['count']
+        return df
+
+    # Attrition rate of employees matching a condition vs the rest
+    def _lift(self, table, mask):
+        counts = self.totals[table]
+        inside, outside = counts[mask].sum(axis=0), counts[~mask].sum(axis=0)
+        rate_in = inside[1] / inside[0] if inside[0] else float('nan')
+        rate_out = outside[1] / outside[0] if outside[0] else float('nan')
+        return rate_in, rate_out
+
+    def recommendations(self):
+        low_satisfaction = np.arange(SATISFACTION_BINS) < SATISFACTION_BINS // 2
+        long_hours = np.arange(HOURS_BINS) * HOURS_BIN_WIDTH >= 200
+        no_promotion = np.array([True, False])
+        salary_groups = self._groups_frame().groupby(level='salary').sum()
+        low = salary_groups.loc['low']
+        rest = salary_groups.drop('low').sum()
+        return {
+            'low_satisfaction': self._lift('satisfaction', low_satisfaction),
+            'long_hours': self._lift('hours', long_hours),
+            'low_salary': (low['left'] / low['count'] if low['count'] else float('nan'),
+                           rest['left'] / rest['count'] if rest['count'] else float('nan')),
+            'no_promotion': self._lift('promotion', no_promotion),
+        }
+
+
+_loaded = {}
+_load_lock = threading.Lock()
+
+
+# Summary of the CSV (or EmployeeStore directory) at `path`, refreshed from and
+# saved to <path>.summary.npz. Kept in memory per process; the source is only
+# re-read when its size or mtime changes.
+def load_summary(path=None, block_rows=BLOCK_ROWS):
+    path = (path or dataset_path()).rstrip('/')
+    is_store = os.path.isdir(path)
+    with _load_lock:
+        st = os.stat(os.path.join(path, META_FILE) if is_store else path)
+        stat = (st.st_size, st.st_mtime_ns)
+        cached = _loaded.get(path)
+        if cached is not None and cached[0] == stat:
+            return cached[1]
+
+        store_file = summary_path(path)
+        store = cached[1] if cached is not None else SummaryStore()
+        if cached is None and os.path.exists(store_file):
+            try:
+                store = SummaryStore.load(store_file)
+            except Exception:
+                store = SummaryStore()
+        if is_store:
+            store.refresh_store(EmployeeStore.open(path), block_rows)
+        else:
+            with open(path, 'rb') as f:
+                data = f.read()
+            store.refresh(data, block_rows)
+        if store.last_refresh['changed'] or not os.path.exists(store_file):
+            store.save(store_file)
+        _loaded[path] = (stat, store)
+        return store
+
+
+# Model feature importances summed back to the original input columns
+def feature_importances(ensemble):
+    frames = []
+    for name, model in ensemble.members.items():
+        importances = getattr(model, 'feature_importances_', None)
+        if importances is None:
+            continue
+        importances = np.asarray(importances, dtype=np.float64)
+        if importances.sum() > 0:
+            frames.append(importances / importances.sum())
+    if not frames:
+        return pd.Series(dtype=np.float64)
+    series = pd.Series(np.mean(frames, axis=0), index=getattr(ensemble, 'columns', None))
+    factors = series.groupby(factor_name).sum()
+    return factors.sort_values(ascending=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or refresh the analytics summary of an HR dataset.")
+    parser.add_argument('path', nargs='?', default=None, help=f"CSV file (default: ${DATASET_ENV} or HR_Dataset.csv)")
+    args = parser.parse_args()
+
+    store = load_summary(args.path)
+    info = store.last_refresh
+    print(f"{info['blocks']} blocks, {info['parsed']} re-parsed in {info['seconds'] * 1e3:.0f} ms")
+    overview = store.overview()
+    print(f"{overview['employees']:,} employees, retention {overview['retention_rate']:.1%}, "
+          f"avg satisfaction {overview['avg_satisfaction']:.2f}, avg tenure {overview['avg_tenure']:.1f} years")
+    print(store.by_department().round(3).to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,11 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
-import joblib
-from PIL import Image
-import requests
 import os
+import time
 # from dotenv import dotenv_values # Removed dotenv import
-import google.generativeai as genai # Import google.generativeai
+# Heavy libraries (pandas, sklearn, xgboost, google.generativeai) and model
+# artifacts are loaded on first use through resources.py
+import instrumentation
+import resources
 
 # MUST BE THE FIRST STREAMLIT COMMAND
 st.set_page_config(
@@ -16,39 +15,16 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# --- Configuration for API Key ---
-# Hardcoded API key as requested.
-# NOTE: For production environments, it is highly recommended to use environment variables
-# or a secure secrets management service instead of hardcoding API keys.
- # Your Gemini API Key here
+# One cached ensemble per selection and bundle version, so thread pools and latency
+# history survive reruns and a hot-reloaded bundle is picked up on the next rerun
+@st.cache_resource(max_entries=32)
+def _select_ensemble(members, voting, compiled, weights, version):
+    base = resources.get('compiled_ensemble' if compiled else 'ensemble')
+    return base.subset(list(members), voting, dict(weights))
 
-
-
-if not api_key:
-    st.error("Gemini API Key is not set. Please provide your API key in the script.")
-    st.stop()
-else:
-    # Configure genai for both chatbot and report generation
-    genai.configure(api_key=api_key)
-
-# Initialize the Generative Models
-# Model for the Employee Service Chatbot (conversational)
-chatbot_model = genai.GenerativeModel('gemini-2.0-flash')
-# Model for the Report Generator (as per original code, if different)
-# CORRECTED LINE: Removed the extra 'Generativeai'
-report_model = genai.GenerativeModel('gemini-1.5-flash')
-
-
-# Load models and data
-@st.cache_resource
-def load_model_and_columns():
-    # Replace with your actual model path
-    models = [joblib.load('XGB.pkl')]
-    # Replace with your actual columns path
-    dummy_columns = joblib.load('dummy_columns.pkl')
-    return models, dummy_columns
-
-models, dummy_columns = load_model_and_columns()
+# `weights` is a tuple of (member, weight) pairs, so the selection stays hashable
+def select_ensemble(members, voting, compiled, weights=()):
+    return _select_ensemble(members, voting, compiled, weights, resources.bundle_version())
 
 # Custom CSS with softer colors
 st.markdown("""
@@ -188,17 +164,18 @@ st.markdown("""
     </style>
     """, unsafe_allow_html=True)
 
-# Function to call Gemini API for Report Generation (using report_model)
-def call_gemini_api_for_report(prompt):
+# Stream the report model's response into the page as it arrives (repeated prompts
+# are served from the response cache); returns the full text, or None on failure.
+# `timing` (a dict) receives this request's timings
+def call_gemini_api_for_report(prompt, timing=None):
     try:
-        response = report_model.generate_content(prompt)
-        return response.text
+        return st.write_stream(resources.get('report_llm').stream(prompt, timing=timing))
     except Exception as e:
         st.error(f"Error with Gemini API request for report: {str(e)}")
         return None
 
-# Generate report using Gemini
-def generate_employee_report(employee_data, prediction_result, probability):
+# Prompt for the report model
+def build_report_prompt(employee_data, prediction_result, probability):
     prompt = f"""
     Generate a comprehensive employee retention report with the following details:
     
@@ -223,16 +200,18 @@ def generate_employee_report(employee_data, prediction_result, probability):
     
     Format the response in professional business language with clear sections.
     """
-    
-    report_text = call_gemini_api_for_report(prompt)
-    return report_text
+    return prompt
+
+# Generate report using Gemini
+def generate_employee_report(employee_data, prediction_result, probability, timing=None):
+    return call_gemini_api_for_report(build_report_prompt(employee_data, prediction_result, probability), timing)
 
 # App header
 def render_header():
     col1, col2 = st.columns([1, 2])
     with col1:
         # Replace with your image path
-        st.image(Image.open("churn.png"), width=400)
+        st.image("churn.png", width=400)
     with col2:
         st.markdown("""
         <div class="header-text">
@@ -243,10 +222,178 @@ def render_header():
         </div>
         """, unsafe_allow_html=True)
 
+# Ensemble configuration shared by single and batch scoring
+def model_settings():
+    ensemble = resources.get('ensemble')
+    with st.expander("Model Settings", expanded=False):
+        members = st.multiselect("Ensemble Members", ensemble.names, default=ensemble.names,
+                                 help="Models from the models/ directory, evaluated in parallel")
+        voting = st.radio("Voting", ["soft", "hard"], horizontal=True,
+                          help="Soft: average probabilities. Hard: majority of model labels")
+        latency_budget = st.number_input("Latency Budget (ms, 0 = off)", 0.0, 1000.0, 0.0, 0.5,
+                                         help="Drop members whose p99 latency exceeds the budget")
+        weights = {}
+        if st.checkbox("Custom Weights", help="Weight each member's vote (1 = equal say)"):
+            for name in members or ensemble.names:
+                weights[name] = st.number_input(f"{name} Weight", 0.1, 10.0, 1.0, 0.1)
+    if not members:
+        members = ensemble.names
+    return tuple(members), voting, latency_budget, tuple(weights.items())
+
+# Batch scoring: upload a CSV/Parquet file and score every row at once
+def batch_scoring_section(members, voting, weights):
+    import scoring
+
+    st.subheader("Batch Retention Risk Scoring")
+    st.markdown("Upload a CSV or Parquet file with one employee per row, using the "
+                "same columns as the training data (`satisfaction_level`, `last_evaluation`, "
+                "`number_project`, `average_montly_hours`, `time_spend_company`, "
+                "`Work_accident`, `promotion_last_5years`, `Departments`, `salary`).")
+
+    uploaded = st.file_uploader("Employee file", type=["csv", "parquet"])
+    explain = st.checkbox("Explain predictions",
+                          help="Add per-factor TreeSHAP attributions and the top risk factors of each employee")
+    if uploaded is None:
+        return
+
+    try:
+        df = scoring.read_table(uploaded, uploaded.name)
+        start = time.perf_counter()
+        explainer = resources.get('explainer').subset(members, dict(weights)) if explain else None
+        if explainer is not None and not explainer.names:
+            st.warning("None of the selected models can be explained; scoring without explanations.")
+            explainer = None
+        scored = scoring.score_frame(df, select_ensemble(members, voting, False, weights),
+                                     resources.get('encoder'), explainer)
+        elapsed = time.perf_counter() - start
+    except (ValueError, KeyError, ImportError) as e:
+        st.error(f"Could not score file: {e}")
+        return
+
+    high_risk = int(scored['churn_prediction'].sum())
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Employees Scored", f"{len(scored):,}")
+    with col2:
+        st.metric("High Risk", f"{high_risk:,}", f"{high_risk / max(len(scored), 1):.1%}")
+    with col3:
+        st.metric("Throughput", f"{len(scored) / max(elapsed, 1e-9):,.0f} rows/sec")
+
+    st.dataframe(scored.sort_values('churn_probability', ascending=False).head(100))
+
+    fmt = "parquet" if uploaded.name.lower().endswith(".parquet") else "csv"
+    st.download_button(
+        label="Download Scored File",
+        data=scoring.to_bytes(scored, fmt),
+        file_name=f"scored_{uploaded.name}",
+        mime="application/octet-stream" if fmt == "parquet" else "text/csv"
+    )
+
+# Per-factor TreeSHAP attributions of the tree members for one employee
+def risk_drivers_section(input_row, employee, names, weights):
+    import numpy as np
+    import pandas as pd
+
+    explainer = resources.get('explainer').subset(names, dict(weights))
+    if not explainer.names:
+        return
+    # Repeated inputs reuse the cached [base, attributions...] vector
+    cache = resources.get('explanation_cache')
+    with instrumentation.span('predict.explain'):
+        cached = cache.get_or_compute(
+            input_row, lambda row: np.concatenate(explainer.explain(row)[:2], axis=None),
+            context=','.join(explainer.names))
+    base = cached[0]
+    factors = explainer.by_factor(cached[1:]).iloc[0]
+    factors = factors[factors.abs().sort_values(ascending=False).index] * 100
+
+    st.subheader("Key Risk Drivers")
+    labels = [f"{name} = {employee[name]}" for name in factors.index]
+    st.bar_chart(pd.DataFrame({'Raises risk': factors.clip(lower=0).to_numpy(),
+                               'Lowers risk': factors.clip(upper=0).to_numpy()},
+                              index=pd.Index(labels, name='Factor')),
+                 horizontal=True, sort=False, color=['#d9534f', '#5cb85c'],
+                 x_label="Change in risk (percentage points)")
+    skipped = [name for name in names if name not in explainer.names]
+    st.caption(f"Baseline risk {base:.1%} → {base + factors.sum() / 100:.1%} for this employee "
+               f"(TreeSHAP over {', '.join(explainer.names)}"
+               + (f"; {', '.join(skipped)} not explained" if skipped else "") + ").")
+
+# Risk across one or two inputs' full grids, plus the smallest change that lowers it;
+# members in the risk table are looked up, the rest scored live
+def what_if_section(employee, model, prediction, table=None):
+    import altair as alt
+    import pandas as pd
+    import whatif
+
+    st.subheader("What-if Analysis")
+    names = list(whatif.INPUT_GRIDS)
+    col1, col2 = st.columns(2)
+    with col1:
+        x = st.selectbox("Vary", names, index=names.index('average_montly_hours'))
+    with col2:
+        others = ["(none)"] + [name for name in names if name != x]
+        y = st.selectbox("Against", others, index=others.index('satisfaction_level')
+                         if 'satisfaction_level' in others else 0)
+    inputs = [x] if y == "(none)" else [x, y]
+
+    encoder = resources.get('encoder')
+    start = time.perf_counter()
+    with instrumentation.span('predict.whatif'):
+        grid = whatif.sweep(employee, inputs, model, encoder, table)
+    grid['risk'] *= 100
+    elapsed = time.perf_counter() - start
+
+    def axis(name, channel):
+        values = list(whatif.INPUT_GRIDS[name])
+        # Numbers increase upwards on the vertical axis
+        sort = values[::-1] if channel is alt.Y and name not in ('department', 'salary') else values
+        return channel(f"{name}:O", sort=sort, axis=alt.Axis(labelOverlap=True))
+
+    # The assessed employee's own values, snapped to the grids
+    current = {name: [whatif.INPUT_GRIDS[name][whatif.grid_index(name, employee[name])]] for name in inputs}
+    if len(inputs) == 1:
+        chart = alt.Chart(grid).mark_line(point=True).encode(
+            axis(x, alt.X), alt.Y('risk:Q', title="Risk (%)", scale=alt.Scale(domain=[0, 100])))
+        marker = alt.Chart(grid[grid[x] == current[x][0]]).mark_point(size=150, color='black').encode(
+            axis(x, alt.X), alt.Y('risk:Q'))
+    else:
+        chart = alt.Chart(grid).mark_rect().encode(
+            axis(x, alt.X), axis(y, alt.Y),
+            alt.Color('risk:Q', title="Risk (%)",
+                      scale=alt.Scale(scheme='redyellowgreen', reverse=True, domain=[0, 100])),
+            tooltip=[x, y, alt.Tooltip('risk:Q', format='.1f')])
+        marker = alt.Chart(pd.DataFrame(current)).mark_point(size=150, color='black', filled=True).encode(
+            axis(x, alt.X), axis(y, alt.Y))
+    st.altair_chart(chart + marker)
+    st.caption(f"{len(grid):,} scenarios scored in {elapsed * 1e3:.0f} ms; "
+               "the marker is the assessed employee.")
+
+    if prediction == 0:
+        st.info("The employee is already predicted to stay; no change is needed.")
+        return
+    suggestion = whatif.suggest_change(employee, model, encoder, table=table)
+    if suggestion is None:
+        st.warning("No change of up to two actionable inputs (satisfaction, projects, hours, promotion, "
+                   "salary) brings this employee below the risk threshold.")
+        return
+    changes = ' and '.join(f"**{name}** {old} → {new}" for name, (old, new) in suggestion['changes'].items())
+    st.success(f"Smallest change predicted to retain this employee: {changes} "
+               f"(risk {suggestion['risk']:.1%}, from {suggestion['evaluated']:,} scenarios).")
+
 # Prediction page
 def prediction_page():
+    import pandas as pd
     render_header()
     
+    with st.sidebar:
+        mode = st.radio("Scoring Mode", ["Single Employee", "Batch Upload"], horizontal=True)
+        members, voting, latency_budget, weights = model_settings()
+
+    if mode == "Batch Upload":
+        batch_scoring_section(members, voting, weights)
+        return
+
     with st.sidebar:
         st.markdown("## Employee Details")
         st.markdown("Complete the form to assess retention risk")
@@ -259,7 +406,7 @@ def prediction_page():
             department = st.selectbox("Department", 
                                     ['sales', 'technical', 'support', 'hr', 
                                      'accounting', 'marketing', 'product_mng', 
-                                     'management', 'RandD'],
+                                     'management', 'RandD', 'IT'],
                                     help="Employee's department")
             
             salary = st.selectbox("Salary Level", ['low', 'medium', 'high'],
@@ -293,8 +440,8 @@ def prediction_page():
         work_accident = 1 if work_accident == "Yes" else 0
         promotion_last_5years = 1 if promotion_last_5years == "Yes" else 0
 
-        # Create input DataFrame
-        input_df = pd.DataFrame([{
+        # Kept across reruns, so the what-if controls can change without re-assessing
+        st.session_state.assessed_employee = {
             'satisfaction_level': satisfaction_level,
             'last_evaluation': last_evaluation,
             'number_project': number_project,
@@ -302,25 +449,41 @@ def prediction_page():
             'time_spend_company': time_spend_company,
             'Work_accident': work_accident,
             'promotion_last_5years': promotion_last_5years,
-            'Departments': department,
+            'department': department,
             'salary': salary,
-        }])
-
-        # Encode categorical variables
-        input_df = pd.get_dummies(input_df, columns=['Departments', 'salary'], drop_first=True)
-
-        # Ensure same columns as training set
-        for col in dummy_columns:
-            if col not in input_df.columns:
-                input_df[col] = 0
-
-        input_df = input_df[dummy_columns]  # Reorder columns
-
-        # Predict with all models
-        predictions = [model.predict(input_df)[0] for model in models]
-        prediction_probs = [model.predict_proba(input_df)[0][1] for model in models]
-        final_prediction = max(set(predictions), key=predictions.count)
-        avg_prob = np.mean(prediction_probs)
+        }
+
+    employee = st.session_state.get('assessed_employee')
+    if employee is not None:
+        # Encode straight into the scaled training layout
+        encoder = resources.get('encoder')
+        with instrumentation.span('predict.encode'):
+            input_row = encoder.encode_row(employee)
+
+        # Predict with all selected models in parallel, dropping any over the latency budget
+        selected = select_ensemble(members, voting, True, weights)
+        active = selected
+        if latency_budget:
+            if not selected.latency_summary():
+                selected.calibrate(input_row, repeat=5)
+            active = select_ensemble(tuple(selected.names_within_budget(latency_budget)), voting, True, weights)
+        # O(1) lookup when the precomputed risk table covers every active member;
+        # otherwise live inference, with repeated inputs served from the shared cache
+        cache = resources.get('prediction_cache')
+        table = resources.get('risk_table')
+        with instrumentation.span('predict.inference'):
+            member_probs = table.lookup(employee, active.names) if table is not None else None
+            from_table = member_probs is not None
+            if not from_table:
+                member_probs = cache.get_or_compute(input_row, lambda row: active.member_probabilities(row)[0],
+                                                    context=','.join(active.names))
+            member_probs = member_probs[None, :]
+            avg_probs, final_predictions = active.combine(member_probs)
+        avg_prob = avg_probs[0]
+        final_prediction = final_predictions[0]
+        # Each assessment (not each rerun) is logged for drift monitoring
+        if predict_clicked:
+            resources.get('drift_monitor').record(employee, avg_prob, final_prediction)
 
         # Show result
         st.subheader("Retention Risk Assessment")
@@ -339,6 +502,7 @@ def prediction_page():
             icon = "✅"
         
         # Risk card
+        render_start = time.perf_counter()
         st.markdown(f"""
         <div class="prediction-card {card_class}">
             <div style="display: flex; align-items: center; margin-bottom: 12px;">
@@ -357,52 +521,170 @@ def prediction_page():
             </div>
         </div>
         """, unsafe_allow_html=True)
+        instrumentation.observe('predict.render', time.perf_counter() - render_start)
+
+        risk_drivers_section(input_row, employee, active.names, weights)
+
+        # Per-member breakdown
+        with st.expander("Ensemble Details", expanded=False):
+            latency = {**selected.latency_summary(), **active.latency_summary()}
+            st.dataframe(pd.DataFrame({
+                'Model': active.names,
+                'Risk Probability': member_probs[0],
+                'Weight': active.weights,
+                'p50 Latency (ms)': [latency.get(name, {}).get('p50_ms') for name in active.names],
+                'p99 Latency (ms)': [latency.get(name, {}).get('p99_ms') for name in active.names],
+            }).set_index('Model'))
+            dropped = [name for name in selected.names if name not in active.names]
+            if dropped:
+                st.caption(f"Dropped to meet the {latency_budget:g} ms budget: {', '.join(dropped)}")
+            if from_table:
+                st.caption("Served from the precomputed risk table (models/risk_table).")
+            stats = cache.stats()
+            st.caption(f"Prediction cache: {stats['hits']:,} hits / {stats['misses']:,} misses "
+                       f"({stats['hit_rate']:.0%} hit rate), {stats['entries']:,} entries")
+
+        what_if_section(employee, select_ensemble(tuple(active.names), voting, False, weights), final_prediction, table)
 
 
 # Analytics page
 def analytics_page():
+    import pandas as pd
+    import analytics
     render_header()
     st.header("Retention Overview")
+
+    # Aggregates come from the summary store of the HR dataset (only changed rows are re-read)
+    path = analytics.dataset_path()
+    if os.path.exists(path):
+        summary = analytics.load_summary(path)
+        st.caption(f"Source: {path}")
+    else:
+        st.info(f"No HR dataset found at {path}. Upload one (same columns as HR_Dataset.csv), "
+                f"or set {analytics.DATASET_ENV} to its path.")
+        uploaded = st.file_uploader("HR dataset", type=['csv'])
+        if uploaded is None:
+            drift_section(path)
+            return
+        summary = summarize_upload(uploaded.getvalue())
+
+    overview = summary.overview()
     st.write("## Key Retention Metrics")
     
     # Metrics cards
-    col1, col2, col3 = st.columns(3)
+    col1, col2, col3, col4 = st.columns(4)
     with col1:
-        st.metric("Overall Retention Rate", "82%", "+2% from last quarter")
+        st.metric("Overall Retention Rate", f"{overview['retention_rate']:.0%}")
     with col2:
-        st.metric("Average Satisfaction", "6.8/10", "-0.3 from last quarter")
+        st.metric("Average Satisfaction", f"{overview['avg_satisfaction'] * 10:.1f}/10")
     with col3:
-        st.metric("Avg Company Tenure", "3.2 years", "stable")
+        st.metric("Avg Company Tenure", f"{overview['avg_tenure']:.1f} years")
+    with col4:
+        st.metric("Employees", f"{overview['employees']:,}")
     
     st.markdown("---")
     
     # Charts
     st.subheader("Top Retention Factors")
-    factors = pd.DataFrame({
-        'Factor': ['Satisfaction', 'Workload', 'Salary', 'Career Growth', 'Work Environment'],
-        'Impact': [85, 72, 68, 63, 58]
-    })
-    st.bar_chart(factors.set_index('Factor'))
+    factors = analytics.feature_importances(resources.get('ensemble'))
+    st.bar_chart(pd.DataFrame({'Impact': factors * 100}).rename_axis('Factor'))
+    st.caption("Share of the tree models' feature importance per employee attribute")
     
     st.markdown("---")
     st.subheader("Quick Recommendations")
-    st.write("""
-    - **Focus on satisfaction**: Employees with satisfaction below 5/10 are 3x more likely to leave
-    - **Monitor workload**: Those working >200 hours/month show higher turnover
-    - **Review compensation**: Low salary tier employees have 25% higher churn
-    - **Career development**: Employees without promotion in 3+ years are at risk
+    lifts = summary.recommendations()
+
+    def ratio(name):
+        inside, outside = lifts[name]
+        return inside / outside if outside else float('nan')
+
+    st.write(f"""
+    - **Focus on satisfaction**: Employees with satisfaction below 5/10 are {ratio('low_satisfaction'):.1f}x as likely to leave ({lifts['low_satisfaction'][0]:.0%} vs {lifts['low_satisfaction'][1]:.0%})
+    - **Monitor workload**: Those working 200+ hours/month leave at {lifts['long_hours'][0]:.0%} (vs {lifts['long_hours'][1]:.0%})
+    - **Review compensation**: Low salary tier employees leave at {lifts['low_salary'][0]:.0%} (vs {lifts['low_salary'][1]:.0%} for medium/high)
+    - **Career development**: Employees without a promotion in 5 years leave at {lifts['no_promotion'][0]:.0%} (vs {lifts['no_promotion'][1]:.0%})
     """)
     
     # Department comparison
     st.markdown("---")
     st.subheader("By Department")
+    by_department = summary.by_department()
     dept_data = pd.DataFrame({
-        'Department': ['Sales', 'Engineering', 'Technical', 'HR', 'Management'],
-        'Retention Rate': [75, 88, 82, 91, 89],
-        'Avg Satisfaction': [6.2, 7.1, 6.8, 7.4, 7.3]
-    })
+        'Employees': by_department['Employees'],
+        'Retention Rate': (by_department['Retention Rate'] * 100).round(1),
+        'Avg Satisfaction': (by_department['Avg satisfaction_level'] * 10).round(1),
+        'Avg Monthly Hours': by_department['Avg average_montly_hours'].round(0),
+    }).rename_axis('Department')
     st.dataframe(dept_data.style.highlight_max(axis=0, color='#5cb85c'))
 
+    col1, col2 = st.columns(2)
+    with col1:
+        st.subheader("Attrition Rate by Department and Salary")
+        st.dataframe((summary.attrition_by_department_salary() * 100).round(1))
+    with col2:
+        st.subheader("Attrition Rate by Project Count")
+        st.bar_chart(summary.attrition_by('projects')['attrition_rate'] * 100)
+
+    drift_section(path)
+
+DRIFT_WINDOWS = {"Last 7 days": 7, "Last 30 days": 30, "All time": None}
+DRIFT_STATUS = {'significant': '🔴', 'moderate': '🟠', 'stable': '🟢', 'insufficient data': '⚪', 'no baseline': '⚪'}
+
+# Drift of the assessments logged on the Prediction Dashboard against the training
+# baseline, computed from the monitor's sketches (see monitoring.py)
+def drift_section(dataset):
+    import monitoring
+    from dataset import read_hr_dataset
+    st.markdown("---")
+    st.subheader("Drift Monitoring")
+    monitor = resources.get('drift_monitor').refresh()
+
+    if monitor.baseline is None:
+        st.info("No training baseline yet. It is built from the HR dataset with the same bins as the live "
+                "sketches, plus the default ensemble's probabilities on it.")
+        if not os.path.exists(dataset):
+            st.caption(f"Run `python monitoring.py baseline HR_Dataset.csv` (monitor directory: {monitor.directory})")
+        elif st.button(f"Build training baseline from {dataset}"):
+            with st.spinner("Scoring the training data..."):
+                ensemble = resources.get('ensemble')
+                sketch = monitoring.build_baseline(read_hr_dataset(dataset), ensemble,
+                                                   resources.get('encoder'))
+                monitor.save_baseline(sketch, source=dataset, members=ensemble.names)
+    if not monitor.records:
+        st.caption("No assessments logged yet: every assessment on the Prediction Dashboard is recorded here.")
+        return
+
+    window = DRIFT_WINDOWS[st.radio("Window", list(DRIFT_WINDOWS), horizontal=True)]
+    report = monitor.report(window)
+    live = report.loc['probability']
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Assessments", f"{int(report['records'].iloc[0]):,}")
+    with col2:
+        compared = live['records'] and monitor.baseline is not None and monitor.baseline.count('probability')
+        st.metric("Avg Predicted Risk", f"{live['live_mean']:.0%}" if live['records'] else "–",
+                  f"{(live['live_mean'] - live['training_mean']) * 100:+.1f} pts vs training" if compared else None,
+                  delta_color='inverse')
+    with col3:
+        st.metric("Drifting Features", f"{(report['status'] == 'significant').sum()} significant",
+                  f"{(report['status'] == 'moderate').sum()} moderate", delta_color='off')
+
+    table = report[['status', 'psi', 'ks', 'ks_critical', 'training_mean', 'live_mean', 'records']].copy()
+    table['status'] = [f"{DRIFT_STATUS[status]} {status}" for status in table['status']]
+    st.dataframe(table.round(3))
+    feature = st.selectbox("Distribution", list(report.index))
+    st.bar_chart(monitor.distribution(feature, window))
+    info = monitor.last_refresh
+    st.caption(f"PSI ≥ {monitoring.PSI_MODERATE:g} moderate, ≥ {monitoring.PSI_SIGNIFICANT:g} significant; "
+               f"KS above ks_critical differs at the 5% level. {info['records']:,} logged assessments, "
+               f"{info['folded']:,} new folded into the sketches in {info['seconds'] * 1e3:.1f} ms.")
+
+# Summary of an uploaded dataset, shared by sessions uploading the same file
+@st.cache_resource(max_entries=4)
+def summarize_upload(data):
+    import analytics
+    return analytics.SummaryStore().refresh(data)
+
 # Home page
 def home_page():
     render_header()
@@ -424,7 +706,7 @@ def home_page():
     """)
     
     # Replace with your image path
-    st.image(Image.open("hr_analytics.jpg"), width=700)
+    st.image("hr_analytics.jpg", width=700)
 
 
 # Report Generator page
@@ -454,40 +736,45 @@ def report_generator_page():
         
         submitted = st.form_submit_button("Generate Comprehensive Report")
     
-    if submitted and api_key: # Use the unified api_key variable
-        with st.spinner("Generating detailed report..."):
-            employee_data = {
-                'age': age,
-                'monthly_income': monthly_income,
-                'years_at_company': years_at_company,
-                'distance_from_home': distance_from_home,
-                'department': department,
-                'salary': salary,
-                'satisfaction_level': satisfaction_level,
-                'last_evaluation': last_evaluation
-            }
-            
-            # For demo, we'll use a mock prediction
-            mock_prediction = 0 if satisfaction_level > 0.6 else 1
-            mock_probability = 0.85 if satisfaction_level < 0.5 else 0.25
-            
-            report = generate_employee_report(employee_data, mock_prediction, mock_probability)
-            
-            if report:
+    if submitted and resources.llm_enabled():
+        employee_data = {
+            'age': age,
+            'monthly_income': monthly_income,
+            'years_at_company': years_at_company,
+            'distance_from_home': distance_from_home,
+            'department': department,
+            'salary': salary,
+            'satisfaction_level': satisfaction_level,
+            'last_evaluation': last_evaluation
+        }
+        
+        # For demo, we'll use a mock prediction
+        mock_prediction = 0 if satisfaction_level > 0.6 else 1
+        mock_probability = 0.85 if satisfaction_level < 0.5 else 0.25
+        
+        st.markdown("---")
+        st.subheader("Employee Retention Analysis Report")
+        timing = {}
+        report = generate_employee_report(employee_data, mock_prediction, mock_probability, timing)
+        
+        if report:
+            if timing.get('cached'):
+                st.success("Report generated successfully! (cached)")
+            elif timing.get('ttft_s') is None:
                 st.success("Report generated successfully!")
-                st.markdown("---")
-                st.subheader("Employee Retention Analysis Report")
-                st.markdown(report)
-                
-                st.download_button(
-                    label="Download Full Report",
-                    data=report,
-                    file_name=f"retention_report_{department}_{age}.md",
-                    mime="text/markdown"
-                )
             else:
-                st.error("Failed to generate report. Please try again.")
-    elif submitted and not api_key:
+                st.success(f"Report generated successfully! First text after {timing['ttft_s']:.1f}s, "
+                           f"complete in {timing['total_s']:.1f}s")
+            
+            st.download_button(
+                label="Download Full Report",
+                data=report,
+                file_name=f"retention_report_{department}_{age}.md",
+                mime="text/markdown"
+            )
+        else:
+            st.error("Failed to generate report. Please try again.")
+    elif submitted:
         st.error("Gemini API key not configured. Report generation disabled.")
 
 # New: Employee Service Chatbot page
@@ -495,9 +782,18 @@ def employee_chatbot_page():
     st.title("🤖 Employee Service Chatbot")
     st.markdown("How can I assist you today?")
 
-    # Initialize chat history in Streamlit's session state
+    if not resources.llm_enabled():
+        st.error("Gemini API key not configured. Set GEMINI_API_KEY to enable the chatbot.")
+        return
+
+    # Chat transcript for display, and the bounded context sent to the model
+    # (recent turns plus a rolling summary of older ones, see chat_context.py)
     if "messages" not in st.session_state:
         st.session_state.messages = []
+    if "chat_context" not in st.session_state:
+        from chat_context import ChatContext
+        st.session_state.chat_context = ChatContext(resources.get('chat_llm'))
+    context = st.session_state.chat_context
 
     # Display previous chat messages
     for message in st.session_state.messages:
@@ -512,30 +808,25 @@ def employee_chatbot_page():
             st.markdown(prompt)
 
         with st.chat_message("assistant"):
-            with st.spinner("Thinking..."):
-                try:
-                    # Prepare the chat history for the Gemini model
-                    chat_history_for_gemini = []
-                    for msg in st.session_state.messages:
-                        if msg["role"] == "user":
-                            chat_history_for_gemini.append({"role": "user", "parts": [msg["content"]]})
-                        elif msg["role"] == "assistant":
-                            chat_history_for_gemini.append({"role": "model", "parts": [msg["content"]]})
-
-                    # Use the chatbot_model for conversational AI
-                    response = chatbot_model.generate_content(
-                        chat_history_for_gemini,
-                        # generation_config=genai.types.GenerationConfig(temperature=0.7)
-                    )
-
-                    full_response = response.text
-                    st.markdown(full_response)
-                except Exception as e:
-                    st.error(f"An error occurred: {e}")
-                    full_response = "I apologize, but I encountered an error while processing your request. Please try again."
-
-            # Add assistant response to chat history
-            st.session_state.messages.append({"role": "assistant", "content": full_response})
+            try:
+                # Stream the reply as it arrives
+                full_response = st.write_stream(context.stream_reply(prompt))
+                # Fold old turns into the summary once the reply is on screen
+                context.turns[-1]['summary_s'] = context.compact()
+            except Exception as e:
+                st.error(f"An error occurred: {e}")
+                full_response = "I apologize, but I encountered an error while processing your request. Please try again."
+
+        # Add assistant response to chat history
+        st.session_state.messages.append({"role": "assistant", "content": full_response})
+
+    if context.turns:
+        with st.expander("Conversation Context", expanded=False):
+            import pandas as pd
+            st.caption(f"Sending the last {len(context.window) // 2} turns"
+                       f"{f' plus a summary of {context.summarized_turns} earlier turns' if context.summary else ''}"
+                       f" (budget {context.token_budget:,} tokens)")
+            st.dataframe(pd.DataFrame(context.turns).set_index('turn'))
 
 
 # Footer
@@ -560,6 +851,33 @@ def render_footer():
     </div>
     """, unsafe_allow_html=True)
 
+# Span histograms and load times of this server process (CHURN_DEV_PANEL=1)
+def developer_panel():
+    import pandas as pd
+
+    with st.sidebar.expander("⏱️ Performance", expanded=False):
+        spans = instrumentation.snapshot()
+        if spans:
+            st.dataframe(pd.DataFrame(spans).T[['count', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms']].round(2))
+        else:
+            st.caption("No timings recorded yet.")
+        loads = resources.profile()
+        if loads:
+            st.caption("Resource loads (first load; reloads after a bundle change)")
+            st.dataframe(pd.DataFrame(loads).set_index('name')[['kind', 'seconds', 'reloads']].round(4))
+        if st.button("Reset timings"):
+            instrumentation.reset()
+
+# What each page needs loaded before it renders (see resources.py)
+PAGE_DEPENDENCIES = {
+    home_page: [],
+    prediction_page: ['lib:pandas', 'encoder', 'ensemble', 'compiled_ensemble', 'prediction_cache',
+                      'risk_table', 'explainer', 'explanation_cache', 'drift_monitor'],
+    analytics_page: ['lib:pandas', 'ensemble', 'drift_monitor'],
+    report_generator_page: ['report_llm'],
+    employee_chatbot_page: ['chat_llm'],
+}
+
 # Main app
 def main():
     # Navigation
@@ -575,10 +893,23 @@ def main():
         st.title("Navigation")
         selected = st.radio("Go to", list(pages.keys()))
     
+    # Load only what the selected page needs
+    page = pages[selected]
+    needed = resources.missing(PAGE_DEPENDENCIES[page])
+    if needed:
+        with st.spinner("Loading models..."):
+            resources.require(needed)
+
     # Display the selected page
-    pages[selected]()
+    with instrumentation.span(f"render.{page.__name__}"):
+        page()
     render_footer()
+    if resources.dev_panel_enabled():
+        developer_panel()
+
+    # After first paint, pre-load every other page's dependencies in the background
+    resources.warm_up(list(dict.fromkeys(
+        name for deps in PAGE_DEPENDENCIES.values() for name in deps)))
 
 if __name__ == "__main__":
     main()
-
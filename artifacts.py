@@ -0,0 +1,435 @@
+# Versioned, memory-mappable artifact bundles.
+#
+# The pickles in models/ and at the repo root are unpickled in full on every
+# load. `pack` writes the same artifacts as one versioned bundle:
+#   manifest.json        format, library versions, every model's kind and source,
+#                        and the size and SHA-256 of every file
+#   columns.json         encoded column order
+#   scaler.npy           the MinMax scaler's fitted arrays (one row each)
+#   <model>.ubj / .txt   XGBoost / LightGBM in their native formats (LightGBM is
+#                        served from its Booster, see LightGBMBooster)
+#   <model>.knn/         K-Nearest Neighbors as a knn_index.py index
+#   <model>.pkl/.arrays  other sklearn models: the object skeleton pickled, with
+#                        every array moved to one memory-mapped file
+# Versions live side by side under the root (models/packed/<version>) and
+# CURRENT names the served one; it is switched with an atomic rename, so
+# readers never see a half-written bundle and can hot-reload by watching it.
+# Checksums are verified on load.
+#
+# The app serves a bundle with CHURN_MODEL_BUNDLE=models/packed (and reloads it
+# when CURRENT changes); serve.py takes --bundle.
+#
+# Usage:
+#   python artifacts.py pack                                  # models/ + XGB.pkl -> models/packed
+#   python artifacts.py pack --source models/bundles/20250301-120000 --extra    # no standalone models
+#   python artifacts.py info
+#   python artifacts.py verify --samples 5000                 # checksums + predictions vs the pickles
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import sys
+import time
+
+import joblib
+import numpy as np
+
+from ensemble import MODEL_DIR, Ensemble, available_members, check_member, load_model
+from knn_index import KNNIndex
+
+PACKED_ROOT = os.path.join(MODEL_DIR, 'packed')
+FORMAT_VERSION = 1
+MANIFEST_FILE = 'manifest.json'
+CURRENT_FILE = 'CURRENT'
+# Standalone models packed next to the ensemble members (the scoring default)
+EXTRA_MODELS = ['XGB.pkl']
+# Fitted MinMaxScaler arrays, in scaler.npy row order
+SCALER_ROWS = ['scale_', 'min_', 'data_min_', 'data_max_', 'data_range_']
+ARRAY_ALIGNMENT = 64
+DEFAULT_KEEP = 3
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _slug(name):
+    return name.replace(' ', '_')
+
+
+# Pickler that writes every numeric array to `arrays` (one flat file) and keeps
+# only its offset, dtype and shape in the pickle
+class _ArrayPickler(pickle.Pickler):
+    def __init__(self, file, arrays):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.arrays = arrays
+
+    def persistent_id(self, obj):
+        if type(obj) is not np.ndarray or obj.dtype.hasobject or obj.size == 0:
+            return None
+        fortran = obj.flags.f_contiguous and not obj.flags.c_contiguous
+        data = obj.tobytes(order='F' if fortran else 'C')
+        offset = -self.arrays.tell() % ARRAY_ALIGNMENT + self.arrays.tell()
+        self.arrays.seek(offset)
+        self.arrays.write(data)
+        return ('array', offset, obj.dtype, obj.shape, fortran)
+
+
+class _ArrayUnpickler(pickle.Unpickler):
+    def __init__(self, file, buffer):
+        super().__init__(file)
+        self.buffer = buffer
+
+    def persistent_load(self, pid):
+        _, offset, dtype, shape, fortran = pid
+        return np.ndarray(shape, dtype, buffer=self.buffer, offset=offset, order='F' if fortran else 'C')
+
+
+def _dump_sklearn(model, path):
+    with open(f"{path}.pkl", 'wb') as f, open(f"{path}.arrays", 'wb') as arrays:
+        _ArrayPickler(f, arrays).dump(model)
+    return [f"{path}.pkl", f"{path}.arrays"]
+
+
+def _load_sklearn(path, entry):
+    arrays = f"{path}.arrays"
+    # Read-only views of the mapped file; sklearn trees copy their nodes out on load
+    buffer = np.memmap(arrays, dtype=np.uint8, mode='r') if os.path.getsize(arrays) else b''
+    with open(f"{path}.pkl", 'rb') as f:
+        return _ArrayUnpickler(f, buffer).load()
+
+
+def _dump_xgboost(model, path):
+    model.save_model(f"{path}.ubj")
+    return [f"{path}.ubj"]
+
+
+def _load_xgboost(path, entry):
+    from xgboost import XGBClassifier
+
+    model = XGBClassifier()
+    model.load_model(f"{path}.ubj")
+    return model
+
+
+def _dump_lightgbm(model, path):
+    model.booster_.save_model(f"{path}.txt")
+    return [f"{path}.txt"]
+
+
+# Binary classifier over a native lightgbm.Booster, with the parts of the
+# LGBMClassifier interface the app uses. LightGBM has no sklearn-level loader,
+# and rebuilding an LGBMClassifier means setting its private attributes, which
+# change between releases; the Booster text format does not.
+class LightGBMBooster:
+    def __init__(self, booster, classes, importance_type='split'):
+        self.booster_ = booster
+        self.classes_ = np.asarray(classes)
+        self.importance_type = importance_type
+        self.n_features_in_ = booster.num_feature()
+
+    @property
+    def feature_importances_(self):
+        return self.booster_.feature_importance(self.importance_type)
+
+    def predict_proba(self, X):
+        p = self.booster_.predict(X)
+        return np.column_stack([1.0 - p, p])
+
+    # pred_contrib=True returns per-feature contributions plus the bias column, as LGBMClassifier.predict does
+    def predict(self, X, pred_contrib=False):
+        if pred_contrib:
+            return self.booster_.predict(X, pred_contrib=True)
+        return self.classes_[(self.booster_.predict(X) > 0.5).astype(np.int64)]
+
+
+def _load_lightgbm(path, entry):
+    import lightgbm
+
+    if not entry['objective'].startswith('binary') or len(entry['classes']) != 2:
+        raise TypeError(f"Only binary LightGBM models can be served, got {entry['objective']}")
+    booster = lightgbm.Booster(model_file=f"{path}.txt")
+    return LightGBMBooster(booster, entry['classes'], entry['params'].get('importance_type') or 'split')
+
+
+def _dump_knn(model, path):
+    directory = f"{path}.knn"
+    KNNIndex.from_model(model).save(directory)
+    return [os.path.join(directory, name) for name in sorted(os.listdir(directory))]
+
+
+def _load_knn(path, entry):
+    return KNNIndex.load(f"{path}.knn")
+
+
+# kind -> (dump(model, path) -> written files, load(path, manifest entry) -> model)
+FORMATS = {
+    'xgboost': (_dump_xgboost, _load_xgboost),
+    'lightgbm': (_dump_lightgbm, _load_lightgbm),
+    'knn_index': (_dump_knn, _load_knn),
+    'sklearn': (_dump_sklearn, _load_sklearn),
+}
+
+
+def _kind(model):
+    name = type(model).__name__
+    if name == 'XGBClassifier':
+        return 'xgboost'
+    if name == 'LGBMClassifier':
+        return 'lightgbm'
+    if name == 'KNeighborsClassifier' and model.effective_metric_ == 'euclidean' and model.weights == 'uniform':
+        return 'knn_index'
+    return 'sklearn'
+
+
+# Versions of NumPy and of the libraries the given (already loaded) objects come
+# from, so a bundle without an XGBoost member does not need xgboost installed
+def _library_versions(objects):
+    versions = {'numpy': np.__version__}
+    for obj in objects:
+        library = type(obj).__module__.split('.')[0]
+        versions.setdefault(library, getattr(sys.modules[library], '__version__', None))
+    return versions
+
+
+def _source_encoder(source):
+    if os.path.exists(os.path.join(source, 'scaler.pkl')):
+        return os.path.join(source, 'scaler.pkl'), os.path.join(source, 'columns.pkl')
+    return 'scaler.pkl', os.path.join(source, 'columns.pkl')
+
+
+# Pack the members of `source` (models/ or a train.py bundle) and `extras` into
+# a new version under `root` and make it current; returns the version directory
+def pack(source=MODEL_DIR, root=PACKED_ROOT, extras=(), version=None, keep=DEFAULT_KEEP):
+    from risk_table import member_hash
+
+    version = version or time.strftime('%Y%m%d-%H%M%S')
+    directory = os.path.join(root, version)
+    if os.path.exists(directory):
+        raise FileExistsError(f"Bundle {directory} already exists")
+    tmp = f"{directory}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    scaler_path, columns_path = _source_encoder(source)
+    scaler, columns = joblib.load(scaler_path), list(joblib.load(columns_path))
+    if type(scaler).__name__ != 'MinMaxScaler':
+        raise TypeError(f"Only MinMaxScaler can be packed, got {type(scaler).__name__}")
+    with open(os.path.join(tmp, 'columns.json'), 'w') as f:
+        json.dump(columns, f)
+    np.save(os.path.join(tmp, 'scaler.npy'), np.stack([getattr(scaler, row) for row in SCALER_ROWS]))
+    manifest = {
+        'format': FORMAT_VERSION, 'version': version, 'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'source': source,
+        'scaler': {'rows': SCALER_ROWS, 'feature_range': list(scaler.feature_range), 'clip': scaler.clip,
+                   'n_samples_seen': int(scaler.n_samples_seen_)},
+        'models': {},
+    }
+
+    written = [os.path.join(tmp, 'columns.json'), os.path.join(tmp, 'scaler.npy')]
+    loaded = [scaler]
+    paths = [(name, path, True) for name, path in available_members(source).items()]
+    paths += [(os.path.splitext(os.path.basename(path))[0], path, False) for path in extras]
+    for name, path, member in paths:
+        model = load_model(path)
+        if model is None or not hasattr(model, 'predict_proba'):
+            continue
+        kind = _kind(model)
+        entry = {'kind': kind, 'member': member, 'file': _slug(name), 'source': path,
+                 'source_hash': member_hash(path)}
+        if kind == 'lightgbm':
+            entry.update(params=model.get_params(), classes=model.classes_.tolist(), objective=model.objective_)
+        written += FORMATS[kind][0](model, os.path.join(tmp, _slug(name)))
+        manifest['models'][name] = entry
+        loaded.append(model)
+    manifest['libraries'] = _library_versions(loaded)
+
+    manifest['files'] = {os.path.relpath(path, tmp): {'bytes': os.path.getsize(path), 'sha256': _file_sha256(path)}
+                         for path in written}
+    with open(os.path.join(tmp, MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, directory)
+    _set_current(root, version)
+    prune(root, keep)
+    return directory
+
+
+def _set_current(root, version):
+    tmp = os.path.join(root, f"{CURRENT_FILE}.tmp")
+    with open(tmp, 'w') as f:
+        f.write(version + '\n')
+    os.replace(tmp, os.path.join(root, CURRENT_FILE))
+
+
+# Served version under a bundle root, or None for a version directory or a missing root
+def current_version(root):
+    try:
+        with open(os.path.join(root, CURRENT_FILE)) as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return None
+
+
+def is_packed(path):
+    return bool(path) and (os.path.exists(os.path.join(path, CURRENT_FILE))
+                           or os.path.exists(os.path.join(path, MANIFEST_FILE)))
+
+
+def versions(root=PACKED_ROOT):
+    if not os.path.isdir(root):
+        return []
+    return sorted(entry for entry in os.listdir(root)
+                  if os.path.exists(os.path.join(root, entry, MANIFEST_FILE)))
+
+
+# Delete all but the newest `keep` versions (never the current one); readers
+# that still map an old version's files keep them until they let go
+def prune(root=PACKED_ROOT, keep=DEFAULT_KEEP):
+    current = current_version(root)
+    removed = []
+    for version in versions(root)[:-keep or None]:
+        if version != current:
+            shutil.rmtree(os.path.join(root, version))
+            removed.append(version)
+    return removed
+
+
+# Files whose checksum does not match the manifest
+def corrupted_files(directory, manifest):
+    bad = []
+    for name, info in manifest['files'].items():
+        path = os.path.join(directory, name)
+        if not os.path.exists(path) or os.path.getsize(path) != info['bytes'] or _file_sha256(path) != info['sha256']:
+            bad.append(name)
+    return bad
+
+
+class ArtifactBundle:
+    def __init__(self, directory, manifest):
+        self.directory = directory
+        self.manifest = manifest
+        self.version = manifest['version']
+        with open(os.path.join(directory, 'columns.json')) as f:
+            self.columns = json.load(f)
+        self._models = {}
+
+    # Bundle at `path`: a version directory, or a root whose CURRENT version is loaded
+    @classmethod
+    def load(cls, path=PACKED_ROOT, verify=True):
+        version = current_version(path)
+        directory = os.path.join(path, version) if version else path
+        with open(os.path.join(directory, MANIFEST_FILE)) as f:
+            manifest = json.load(f)
+        if manifest.get('format') != FORMAT_VERSION:
+            raise ValueError(f"{directory} has bundle format {manifest.get('format')}, expected {FORMAT_VERSION}")
+        if verify:
+            bad = corrupted_files(directory, manifest)
+            if bad:
+                raise ValueError(f"{directory}: checksum mismatch for {bad}")
+        return cls(directory, manifest)
+
+    @property
+    def member_names(self):
+        return [name for name, entry in self.manifest['models'].items() if entry['member']]
+
+    @property
+    def nbytes(self):
+        return sum(info['bytes'] for info in self.manifest['files'].values())
+
+    # Content hash of the pickle each model was packed from (as risk_table.member_hash)
+    def source_hashes(self):
+        return {name: entry['source_hash'] for name, entry in self.manifest['models'].items()}
+
+    def scaler(self):
+        from sklearn.preprocessing import MinMaxScaler
+
+        info = self.manifest['scaler']
+        scaler = MinMaxScaler(feature_range=tuple(info['feature_range']), clip=info['clip'])
+        for row, values in zip(info['rows'], np.load(os.path.join(self.directory, 'scaler.npy'))):
+            setattr(scaler, row, values)
+        scaler.n_samples_seen_ = info['n_samples_seen']
+        scaler.n_features_in_ = len(self.columns)
+        scaler.feature_names_in_ = np.array(self.columns, dtype=object)
+        return scaler
+
+    def encoder(self):
+        from encoder import FeatureEncoder
+        return FeatureEncoder(self.columns, self.scaler())
+
+    # Model by name, loaded once (members and extras such as 'XGB')
+    def model(self, name):
+        if name not in self._models:
+            entry = self.manifest['models'][name]
+            model = FORMATS[entry['kind']][1](os.path.join(self.directory, entry['file']), entry)
+            self._models[name] = check_member(model, self.columns, f"{self.directory}:{name}")
+        return self._models[name]
+
+    def ensemble(self, names=None, **kwargs):
+        names = self.member_names if names is None else names
+        missing = [name for name in names if name not in self.member_names]
+        if missing:
+            raise ValueError(f"Unknown ensemble members: {missing}")
+        ensemble = Ensemble({name: self.model(name) for name in names}, **kwargs)
+        ensemble.columns = self.columns
+        return ensemble
+
+
+# Predictions of the packed models against the pickles they were packed from
+def verify(bundle, samples):
+    from benchmarks.common import synthetic_employees
+    from encoder import FeatureEncoder
+
+    source = bundle.manifest['source']
+    scaler_path, columns_path = _source_encoder(source)
+    reference = FeatureEncoder(joblib.load(columns_path), joblib.load(scaler_path))
+    df = synthetic_employees(samples)
+    X = reference.encode_frame(df)
+    errors = {'encoder': float(np.abs(bundle.encoder().encode_frame(df) - X).max())}
+    for name, entry in bundle.manifest['models'].items():
+        native = check_member(joblib.load(entry['source']), bundle.columns, entry['source'])
+        expected = native.predict_proba(X)[:, 1]
+        errors[name] = float(np.abs(bundle.model(name).predict_proba(X)[:, 1] - expected).max())
+    return errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pack, inspect or verify versioned artifact bundles.")
+    sub = parser.add_subparsers(dest='command', required=True)
+    make = sub.add_parser('pack')
+    make.add_argument('--source', default=MODEL_DIR, help="models/ or a train.py bundle")
+    make.add_argument('--extra', nargs='*', default=EXTRA_MODELS, help="Standalone model pickles to include")
+    make.add_argument('--keep', type=int, default=DEFAULT_KEEP, help="Versions kept under the root")
+    show = sub.add_parser('info')
+    check = sub.add_parser('verify')
+    check.add_argument('--samples', type=int, default=5000)
+    for command in (make, show, check):
+        command.add_argument('--root', default=PACKED_ROOT, help="Bundle root (or, for info/verify, a version)")
+    args = parser.parse_args()
+
+    if args.command == 'pack':
+        start = time.perf_counter()
+        directory = pack(args.source, args.root, [path for path in args.extra if os.path.exists(path)],
+                         keep=args.keep)
+        print(f"Packed {args.source} into {directory} in {time.perf_counter() - start:.1f}s")
+    bundle = ArtifactBundle.load(args.root)
+    if args.command == 'verify':
+        for name, error in verify(bundle, args.samples).items():
+            print(f"  {name:<22} max |packed - pickle| {error:.1e}")
+        return
+    print(f"{bundle.directory}: format {bundle.manifest['format']}, {bundle.nbytes / 1024:.0f} KB, "
+          f"checksums OK ({', '.join(f'{k} {v}' for k, v in bundle.manifest['libraries'].items())})")
+    for name, entry in bundle.manifest['models'].items():
+        files = [info['bytes'] for path, info in bundle.manifest['files'].items()
+                 if path.startswith(entry['file'] + '.')]
+        role = 'member' if entry['member'] else 'extra'
+        print(f"  {name:<22} {entry['kind']:<10} {role:<7} {sum(files) / 1024:8.0f} KB  from {entry['source']}")
+
+
+if __name__ == "__main__":
+    main()
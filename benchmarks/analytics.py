@@ -0,0 +1,81 @@
+# Analytics page aggregates over a large synthetic workforce: recomputing the
+# notebook's group-bys from the CSV vs the incremental block summary store.
+#
+#   python -m benchmarks.analytics                  # 1,000,000 employees
+#   python -m benchmarks.analytics --employees 5000000
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import analytics
+from benchmarks.common import synthetic_employees
+
+
+def _full_recompute(path):
+    df = pd.read_csv(path)
+    department = 'Departments '
+    by_department = df.groupby(department).agg(employees=('left', 'size'), left=('left', 'mean'),
+                                               satisfaction=('satisfaction_level', 'mean'))
+    crosstab = pd.crosstab(df[department], df['salary'], values=df['left'], aggfunc='mean')
+    projects = pd.crosstab(df['number_project'], df['left'])
+    return by_department, crosstab, projects, df['left'].mean()
+
+
+def _timed(label, fn):
+    start = time.perf_counter()
+    result = fn()
+    print(f"{label:<46} {(time.perf_counter() - start) * 1e3:9.1f} ms")
+    return result
+
+
+def _fresh_store(path):
+    analytics._loaded.clear()
+    return analytics.load_summary(path)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--employees', type=int, default=1_000_000)
+    parser.add_argument('--append', type=int, default=10_000)
+    args = parser.parse_args()
+
+    df = synthetic_employees(args.employees)
+    df['left'] = np.random.default_rng(1).integers(0, 2, len(df))
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'workforce.csv')
+        df.to_csv(path, index=False)
+        print(f"{args.employees:,} employees, {os.path.getsize(path) / 2**20:.0f} MB CSV")
+
+        _, crosstab, _, _ = _timed("full recompute (read_csv + group-bys)", lambda: _full_recompute(path))
+        store = _timed("summary store, cold build", lambda: _fresh_store(path))
+        _timed("summary store, new process (file unchanged)", lambda: _fresh_store(path))
+        _timed("summary store, same process (stat check)", lambda: analytics.load_summary(path))
+
+        extra = synthetic_employees(args.append, seed=2)
+        extra['left'] = 1
+        extra.to_csv(path, mode='a', header=False, index=False)
+        store = _timed(f"summary store, {args.append:,} rows appended", lambda: analytics.load_summary(path))
+        print(f"  re-parsed {store.last_refresh['parsed']} of {store.last_refresh['blocks']} blocks")
+
+        with open(path, 'r+b') as f:
+            f.seek(os.path.getsize(path) // 2)
+            f.readline()
+            line = f.readline()
+            f.seek(-len(line), os.SEEK_CUR)
+            f.write(line[:-2] + (b'0' if line[-2:-1] == b'1' else b'1') + b'\n')
+        store = _timed("summary store, one row edited in place", lambda: analytics.load_summary(path))
+        print(f"  re-parsed {store.last_refresh['parsed']} of {store.last_refresh['blocks']} blocks")
+
+        _, crosstab, _, left = _full_recompute(path)
+        got = store.attrition_by_department_salary()
+        assert np.allclose(crosstab.loc[got.index, got.columns].to_numpy(), got.to_numpy())
+        assert np.isclose(1 - left, store.overview()['retention_rate'])
+        print("aggregates match the full recompute")
+
+
+if __name__ == "__main__":
+    main()
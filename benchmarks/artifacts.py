@@ -0,0 +1,124 @@
+# Artifact load time and memory: the joblib pickles (models/*.pkl, XGB.pkl,
+# scaler.pkl, dummy_columns.pkl) vs the same artifacts packed by artifacts.py,
+# each loaded in a fresh process after the libraries are imported. Also checks
+# that the packed models predict exactly what the pickles do.
+#
+#   python -m benchmarks.artifacts
+#   python -m benchmarks.artifacts --source models/bundles/20250301-120000 --repeat 5
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+
+import artifacts
+from ensemble import MODEL_DIR
+
+_CHILD = r'''
+import json, os, sys, time
+import joblib, lightgbm, numpy as np, xgboost
+import sklearn.ensemble, sklearn.linear_model, sklearn.neighbors, sklearn.preprocessing, sklearn.tree
+import artifacts
+from encoder import TRAINING_COLUMNS
+from ensemble import available_members
+
+def rss_mb():
+    with open('/proc/self/status') as f:
+        return next(int(line.split()[1]) for line in f if line.startswith('VmRSS')) / 1024
+
+task, source, bundle = sys.argv[1:4]
+rss, timings, models = rss_mb(), {}, {}
+start = time.perf_counter()
+if task == 'pickle':
+    paths = dict(available_members(source), XGB='XGB.pkl')
+    for name in ['scaler.pkl', 'dummy_columns.pkl']:
+        t = time.perf_counter()
+        joblib.load(os.path.join(source, name) if os.path.exists(os.path.join(source, name)) else name)
+        timings[name] = time.perf_counter() - t
+    for name, path in paths.items():
+        t = time.perf_counter()
+        try:
+            models[name] = joblib.load(path)
+        except Exception:
+            continue
+        timings[name] = time.perf_counter() - t
+    encoder = None
+else:
+    t = time.perf_counter()
+    packed = artifacts.ArtifactBundle.load(bundle, verify=task == 'packed')
+    timings['manifest'] = time.perf_counter() - t
+    t = time.perf_counter()
+    encoder = packed.encoder()
+    timings['encoder'] = time.perf_counter() - t
+    for name in packed.manifest['models']:
+        t = time.perf_counter()
+        models[name] = packed.model(name)
+        timings[name] = time.perf_counter() - t
+load = time.perf_counter() - start
+loaded_rss = rss_mb() - rss
+X = np.random.default_rng(0).random((1, len(TRAINING_COLUMNS)))
+t = time.perf_counter()
+for model in models.values():
+    model.predict_proba(X)
+first = time.perf_counter() - t
+print(json.dumps({'load': load, 'first_prediction': first, 'rss_mb': loaded_rss,
+                  'after_prediction_rss_mb': rss_mb() - rss, 'timings': timings}))
+'''
+
+
+def _run(task, source, bundle):
+    out = subprocess.run([sys.executable, '-W', 'ignore', '-c', _CHILD, task, source, bundle],
+                         capture_output=True, text=True, check=True, cwd=os.getcwd())
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+# Median of `repeat` fresh-process runs, per key
+def _median_run(task, source, bundle, repeat):
+    runs = [_run(task, source, bundle) for _ in range(repeat)]
+    result = {key: float(np.median([run[key] for run in runs])) for key in runs[0] if key != 'timings'}
+    result['timings'] = {key: float(np.median([run['timings'][key] for run in runs])) for key in runs[0]['timings']}
+    return result
+
+
+def _pickle_bytes(source):
+    paths = list(artifacts.available_members(source).values()) + ['XGB.pkl']
+    paths += [os.path.join(source, name) if os.path.exists(os.path.join(source, name)) else name
+              for name in ['scaler.pkl', 'dummy_columns.pkl']]
+    return sum(os.path.getsize(path) for path in paths)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--source', default=MODEL_DIR, help="models/ or a train.py bundle")
+    parser.add_argument('--repeat', type=int, default=3, help="Fresh processes per format (median)")
+    parser.add_argument('--samples', type=int, default=2000, help="Rows to compare predictions on")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = artifacts.pack(args.source, tmp, [path for path in artifacts.EXTRA_MODELS if os.path.exists(path)])
+        bundle = artifacts.ArtifactBundle.load(tmp)
+        errors = artifacts.verify(bundle, args.samples)
+        results = {task: _median_run(task, args.source, tmp, args.repeat)
+                   for task in ['pickle', 'packed', 'packed-unverified']}
+        packed_bytes = bundle.nbytes
+    print(f"Packed {args.source} into {os.path.basename(directory)}: {packed_bytes / 1024:.0f} KB "
+          f"vs {_pickle_bytes(args.source) / 1024:.0f} KB of pickles; "
+          f"max |packed - pickle| probability {max(errors.values()):.1e}")
+
+    print(f"{'format':<20}{'load':>10}{'first predict':>15}{'+RSS load':>12}{'+RSS predict':>14}")
+    for task, result in results.items():
+        print(f"{task:<20}{result['load'] * 1e3:>8.1f}ms{result['first_prediction'] * 1e3:>13.1f}ms"
+              f"{result['rss_mb']:>10.1f}MB{result['after_prediction_rss_mb']:>12.1f}MB")
+    print(f"{'model':<22}{'pickle':>10}{'packed':>10}")
+    pickled, packed = results['pickle']['timings'], results['packed-unverified']['timings']
+    for name in packed:
+        if name in pickled:
+            print(f"{name:<22}{pickled[name] * 1e3:>8.1f}ms{packed[name] * 1e3:>8.1f}ms")
+    print(f"Checksum verification adds {(results['packed']['load'] - results['packed-unverified']['load']) * 1e3:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+# Throughput of bulk report generation against the offline stub backend, at
+# different concurrency limits.
+#
+#   python -m benchmarks.bulk_reports
+#   python -m benchmarks.bulk_reports --employees 2000 --first-token-ms 500 --concurrency 1 8 32
+import argparse
+
+import numpy as np
+
+from benchmarks.common import synthetic_employees
+from bulk_reports import Checkpoint, generate_reports
+from llm import LLMClient, StubBackend
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--employees', type=int, default=400)
+    parser.add_argument('--first-token-ms', type=float, default=200.0)
+    parser.add_argument('--token-ms', type=float, default=1.0)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[4, 16, 64])
+    args = parser.parse_args()
+
+    df = synthetic_employees(args.employees)
+    # Every fifth employee repeats an earlier profile, as in real HR extracts
+    repeats = np.arange(0, len(df), 5)
+    df.iloc[repeats] = df.iloc[repeats // 2].to_numpy()
+    df['churn_probability'] = np.random.default_rng(0).random(len(df)).round(3)
+    df.loc[repeats, 'churn_probability'] = df['churn_probability'].to_numpy()[repeats // 2]
+
+    for concurrency in args.concurrency:
+        client = LLMClient(StubBackend(args.first_token_ms, args.token_ms))
+        _, _, stats = generate_reports(df, client, concurrency=concurrency, rate=0)
+        print(f"concurrency {concurrency:>3}: {stats['high_risk']:,} high-risk employees, "
+              f"{stats['unique_prompts']:,} LLM calls in {stats['elapsed_s']:6.2f}s "
+              f"({stats['high_risk'] / stats['elapsed_s']:7.1f} reports/s)")
+
+    # Resume: half the prompts are already in the checkpoint
+    checkpoint = Checkpoint(None)
+    client = LLMClient(StubBackend(args.first_token_ms, args.token_ms))
+    generate_reports(df.iloc[:len(df) // 2], client, concurrency=16, rate=0, checkpoint=checkpoint)
+    _, _, stats = generate_reports(df, client, concurrency=16, rate=0, checkpoint=checkpoint)
+    print(f"resumed run: {stats['resumed']:,} prompts from checkpoint, {stats['generated']:,} generated "
+          f"in {stats['elapsed_s']:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# Prompt size and latency per chatbot turn as a conversation grows: the full
+# transcript (previous behaviour) vs the bounded ChatContext, against the stub
+# backend with a per-prompt-token prefill cost.
+#
+#   python -m benchmarks.chat_context
+#   python -m benchmarks.chat_context --turns 60 --budget 1500 --prefill-ms 200
+import argparse
+import time
+
+from chat_context import ChatContext
+from llm import LLMClient, StubBackend, estimate_tokens
+
+
+def _questions(n):
+    topics = ['annual leave', 'remote work', 'my payslip', 'health insurance', 'training budget',
+              'performance review', 'parental leave', 'overtime pay', 'promotion criteria', 'relocation']
+    return [f"Question {i + 1}: can you explain the policy on {topics[i % len(topics)]} "
+            f"and what I need to do next in my case?" for i in range(n)]
+
+
+def _full_history(client, questions):
+    history = []
+    for question in questions:
+        history.append({'role': 'user', 'parts': [question]})
+        start = time.perf_counter()
+        reply = client.generate(list(history), use_cache=False)
+        yield estimate_tokens(history), time.perf_counter() - start
+        history.append({'role': 'model', 'parts': [reply]})
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--turns', type=int, default=40)
+    parser.add_argument('--budget', type=int, default=1000, help="ChatContext token budget")
+    parser.add_argument('--window', type=int, default=6, help="ChatContext turns kept verbatim")
+    parser.add_argument('--first-token-ms', type=float, default=20.0)
+    parser.add_argument('--prefill-ms', type=float, default=100.0, help="Stub latency per 1k prompt tokens")
+    parser.add_argument('--every', type=int, default=5, help="Print every Nth turn")
+    args = parser.parse_args()
+
+    questions = _questions(args.turns)
+
+    def client():
+        return LLMClient(StubBackend(args.first_token_ms, token_ms=0.0, words=60,
+                                     prefill_ms=args.prefill_ms))
+
+    full = list(_full_history(client(), questions))
+    context = ChatContext(client(), args.budget, args.window)
+    for question in questions:
+        context.reply(question)
+
+    print(f"{'turn':>5} {'full tokens':>12} {'full ms':>9} {'ctx tokens':>11} {'ctx ms':>8} {'summary ms':>11}")
+    for i, turn in enumerate(context.turns):
+        if (i + 1) % args.every and i + 1 != len(questions):
+            continue
+        tokens, seconds = full[i]
+        print(f"{turn['turn']:>5} {tokens:>12,} {seconds * 1e3:>9.1f} {turn['prompt_tokens']:>11,} "
+              f"{turn['total_s'] * 1e3:>8.1f} {turn.get('summary_s', 0) * 1e3:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+# Shared helpers for the benchmark scripts (run from the repo root,
+# e.g. `python -m benchmarks.encoder`).
+import time
+
+import numpy as np
+import pandas as pd
+
+from encoder import DEPARTMENTS, SALARIES
+
+
+# Synthetic workforce drawn from the ranges seen in HR_Dataset.csv
+def synthetic_employees(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'satisfaction_level': rng.integers(9, 101, n) / 100,
+        'last_evaluation': rng.integers(36, 101, n) / 100,
+        'number_project': rng.integers(2, 8, n),
+        'average_montly_hours': rng.integers(96, 311, n),
+        'time_spend_company': rng.integers(2, 11, n),
+        'Work_accident': rng.integers(0, 2, n),
+        'promotion_last_5years': rng.integers(0, 2, n),
+        'Departments ': rng.choice(DEPARTMENTS, n),
+        'salary': rng.choice(SALARIES, n),
+    })
+
+
+# Sidebar-style record (the dict the Prediction Dashboard builds)
+def sample_record():
+    return {
+        'satisfaction_level': 0.38,
+        'last_evaluation': 0.55,
+        'number_project': 2,
+        'average_montly_hours': 160,
+        'time_spend_company': 3,
+        'Work_accident': 0,
+        'promotion_last_5years': 0,
+        'department': 'sales',
+        'salary': 'low',
+    }
+
+
+# Per-call latencies in microseconds
+def measure(fn, repeat=1000, warmup=20):
+    for _ in range(warmup):
+        fn()
+    samples = np.empty(repeat)
+    for i in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples[i] = time.perf_counter() - start
+    return samples * 1e6
+
+
+def summarize(name, samples_us):
+    p50, p99 = np.percentile(samples_us, [50, 99])
+    print(f"{name:<44} p50 {p50:9.1f} us   p99 {p99:9.1f} us   mean {samples_us.mean():9.1f} us")
+    return {'p50_us': p50, 'p99_us': p99, 'mean_us': samples_us.mean()}
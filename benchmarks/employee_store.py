@@ -0,0 +1,93 @@
+# Load time and memory of the CSV path vs the columnar EmployeeStore, for
+# encoding a workforce for scoring and for the analytics aggregates. Each
+# measurement runs in a fresh process, so RSS is not shared between them.
+#
+#   python -m benchmarks.employee_store                  # 1,000,000 employees
+#   python -m benchmarks.employee_store --employees 5000000
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.common import synthetic_employees
+
+_CHILD = r'''
+import json, sys, time
+import numpy as np, pandas as pd
+import analytics
+from employee_store import EmployeeStore
+from encoder import DEPARTMENT_ALIASES, NUMERIC_COLUMNS, FeatureEncoder
+
+# Peak RSS of this process in MB (ru_maxrss would include the parent's peak)
+def peak_mb():
+    with open('/proc/self/status') as f:
+        return next(int(line.split()[1]) for line in f if line.startswith('VmHWM')) / 1024
+
+task, source = sys.argv[1], sys.argv[2]
+encoder = FeatureEncoder.load()
+base = peak_mb()
+start = time.perf_counter()
+if task == 'encode-csv':
+    X = encoder.encode_frame(pd.read_csv(source))
+elif task == 'encode-store':
+    store = EmployeeStore.open(source)
+    X = np.empty((len(store), encoder.n_features))
+    department = store.find(DEPARTMENT_ALIASES)
+    for first, cols in store.iter_chunks(NUMERIC_COLUMNS + [department, 'salary']):
+        n = len(cols['salary'])
+        encoder.encode_coded(cols, cols[department], store.categories(department),
+                             cols['salary'], store.categories('salary'), out=X[first:first + n])
+elif task == 'analytics-csv':
+    X = analytics.summarize_frame(pd.read_csv(source))
+elif task == 'analytics-store':
+    X = analytics.SummaryStore().refresh_store(EmployeeStore.open(source))
+elif task == 'open-store':
+    store = EmployeeStore.open(source)
+    X = [store.column(name) for name in store.names]
+else:
+    X = pd.read_csv(source)
+elapsed = time.perf_counter() - start
+print(json.dumps({'seconds': elapsed, 'rss_mb': peak_mb() - base}))
+'''
+
+
+def _run(task, source):
+    out = subprocess.run([sys.executable, '-c', _CHILD, task, source], capture_output=True, text=True,
+                         check=True, cwd=os.getcwd())
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--employees', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    from employee_store import EmployeeStore
+
+    df = synthetic_employees(args.employees)
+    df['left'] = np.random.default_rng(1).integers(0, 2, len(df))
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, 'workforce.csv')
+        store_path = os.path.join(tmp, 'workforce_store')
+        df.to_csv(csv_path, index=False)
+        start = time.perf_counter()
+        store = EmployeeStore.from_csv(csv_path, store_path)
+        print(f"{args.employees:,} employees: CSV {os.path.getsize(csv_path) / 2**20:.0f} MB, "
+              f"store {store.nbytes / 2**20:.0f} MB (import {time.perf_counter() - start:.1f}s)")
+
+        print(f"{'(time, peak RSS increase)':<30}{'CSV':>22}{'store':>22}")
+        for label, csv_task, store_task in [('load columns', 'read-csv', 'open-store'),
+                                            ('encode for scoring', 'encode-csv', 'encode-store'),
+                                            ('analytics aggregates', 'analytics-csv', 'analytics-store')]:
+            a, b = _run(csv_task, csv_path), _run(store_task, store_path)
+            print(f"{label:<30}{a['seconds'] * 1e3:>9.0f} ms {a['rss_mb']:>6.0f} MB"
+                  f"{b['seconds'] * 1e3:>9.0f} ms {b['rss_mb']:>6.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# Per-request encoding latency: the original get_dummies path vs FeatureEncoder.
+#
+#   python -m benchmarks.encoder
+import warnings
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from benchmarks.common import measure, sample_record, summarize, synthetic_employees
+from encoder import FeatureEncoder
+
+
+# What prediction_page used to do on every click (plus the scaling it was missing)
+def legacy_encode(record, dummy_columns, scaler):
+    input_df = pd.DataFrame([{
+        'satisfaction_level': record['satisfaction_level'],
+        'last_evaluation': record['last_evaluation'],
+        'number_project': record['number_project'],
+        'average_montly_hours': record['average_montly_hours'],
+        'time_spend_company': record['time_spend_company'],
+        'Work_accident': record['Work_accident'],
+        'promotion_last_5years': record['promotion_last_5years'],
+        'Departments ': record['department'],
+        'salary': record['salary'],
+    }])
+    input_df = pd.get_dummies(input_df, columns=['Departments ', 'salary'], drop_first=True)
+    for col in dummy_columns:
+        if col not in input_df.columns:
+            input_df[col] = 0
+    input_df = input_df[dummy_columns]
+    return scaler.transform(input_df)
+
+
+def main():
+    warnings.simplefilter('ignore')
+    dummy_columns = joblib.load('dummy_columns.pkl')
+    scaler = joblib.load('scaler.pkl')
+    encoder = FeatureEncoder(dummy_columns, scaler)
+    record = sample_record()
+    model = joblib.load('XGB.pkl')
+
+    print("Single row encoding")
+    before = summarize("get_dummies + loop + reindex + scaler", measure(
+        lambda: legacy_encode(record, dummy_columns, scaler)))
+    after = summarize("FeatureEncoder.encode_row", measure(lambda: encoder.encode_row(record)))
+    buffer = np.empty((1, encoder.n_features))
+    summarize("FeatureEncoder.encode_row (reused buffer)", measure(
+        lambda: encoder.encode_row(record, out=buffer)))
+    print(f"speedup (p50): {before['p50_us'] / after['p50_us']:.0f}x")
+
+    print("\nEnd to end (encode + predict_proba, XGB.pkl)")
+    summarize("legacy", measure(lambda: model.predict_proba(
+        legacy_encode(record, dummy_columns, scaler)), repeat=300))
+    summarize("FeatureEncoder", measure(lambda: model.predict_proba(
+        encoder.encode_row(record)), repeat=300))
+
+    df = synthetic_employees(100_000)
+    print("\nFrame encoding, 100k rows")
+    summarize("FeatureEncoder.encode_frame", measure(lambda: encoder.encode_frame(df),
+                                                     repeat=10, warmup=1))
+
+
+if __name__ == "__main__":
+    main()
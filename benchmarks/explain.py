@@ -0,0 +1,82 @@
+# TreeSHAP explanations: agreement with the native libraries and local
+# accuracy, single-row latency per member and for the whole ensemble (cold and
+# cached), and batch throughput for scored files. Exits 1 when the uncached
+# ensemble explanation misses the interactive latency budget.
+#
+#   python -m benchmarks.explain
+#   python -m benchmarks.explain --budget-ms 30 --rows 20000
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.common import measure, summarize, synthetic_employees
+from encoder import FeatureEncoder
+from ensemble import Ensemble
+from explain import EnsembleExplainer, TreeExplainer
+from prediction_cache import PredictionCache
+from scoring import explanation_columns
+
+
+def _check(ensemble, explainer, X):
+    for name, tree in explainer.explainers.items():
+        values = tree.shap_values(X)
+        raw = tree.expected_value + values.sum(axis=1)
+        output = raw if tree.link == 'mean' else 1.0 / (1.0 + np.exp(-raw))
+        error = np.abs(output - ensemble.members[name].predict_proba(X)[:, 1]).max()
+        line = f"  {name:<20} base + attributions vs predict_proba: max error {error:.1e}"
+        if tree.native:
+            tables = TreeExplainer(ensemble.members[name], native=False).shap_values(X)
+            line += f"; path tables vs native: max diff {np.abs(tables - values).max():.1e}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--budget-ms', type=float, default=50.0,
+                        help="p99 budget for one uncached ensemble explanation")
+    parser.add_argument('--rows', type=int, default=10_000, help="Batch size for the throughput run")
+    parser.add_argument('--repeat', type=int, default=300)
+    args = parser.parse_args()
+
+    ensemble = Ensemble.load()
+    start = time.perf_counter()
+    explainer = EnsembleExplainer.from_ensemble(ensemble)
+    print(f"Explainer built in {(time.perf_counter() - start) * 1e3:.0f} ms "
+          f"for {', '.join(explainer.names)}")
+    X = FeatureEncoder.load().encode_frame(synthetic_employees(max(args.rows, args.repeat)))
+
+    print("Correctness on 200 rows:")
+    _check(ensemble, explainer, X[:200])
+
+    print("Single-row latency (distinct rows):")
+    rows = iter(np.resize(np.arange(args.repeat), args.repeat * 4))
+    for name, tree in explainer.explainers.items():
+        summarize(f"  {name}", measure(lambda: tree.shap_values(X[next(rows)]), args.repeat, warmup=0))
+    rows = iter(range(args.repeat + 20))
+    cold = summarize("  ensemble, uncached", measure(lambda: explainer.explain_row(X[next(rows)]),
+                                                     args.repeat, warmup=20))
+
+    cache = PredictionCache(patterns=[])
+    context = ','.join(explainer.names)
+
+    def cached():
+        return cache.get_or_compute(X[0], lambda row: np.concatenate(explainer.explain(row)[:2], axis=None),
+                                    context)
+    summarize("  ensemble, cached", measure(cached, args.repeat))
+
+    start = time.perf_counter()
+    explanation_columns(explainer, X[:args.rows])
+    elapsed = time.perf_counter() - start
+    print(f"Batch: {args.rows:,} rows in {elapsed:.2f}s ({args.rows / elapsed:,.0f} rows/sec)")
+
+    p99_ms = cold['p99_us'] / 1e3
+    if p99_ms > args.budget_ms:
+        print(f"Explanation budget exceeded: p99 {p99_ms:.1f} ms > {args.budget_ms:.0f} ms", file=sys.stderr)
+        sys.exit(1)
+    print(f"Within budget: p99 {p99_ms:.1f} ms <= {args.budget_ms:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
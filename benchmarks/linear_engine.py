@@ -0,0 +1,77 @@
+# Logistic Regression member: sklearn (scaler.transform + predict_proba, as
+# the notebook scores it, or on the encoder's scaled matrix) vs the compiled
+# model (unfused float64, as Ensemble.compiled() uses it, and fused with the
+# scaler in float32). Parity, single-row latency, batch throughput, and
+# chunked end-to-end scoring of a Parquet file.
+#
+#   python -m benchmarks.linear_engine [--rows 1000000]
+import argparse
+import os
+import tempfile
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+import scoring
+from benchmarks.common import measure, synthetic_employees
+from encoder import FeatureEncoder
+from ensemble import MODEL_DIR, check_member
+from linear_engine import compile_linear
+
+MODEL_PATH = os.path.join(MODEL_DIR, 'Logistic Regression_model.pkl')
+
+
+def throughput(fn, X):
+    start = time.perf_counter()
+    fn(X)
+    return X.shape[0] / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--chunksize', type=int, default=scoring.DEFAULT_CHUNKSIZE)
+    args = parser.parse_args()
+
+    columns, scaler = joblib.load('dummy_columns.pkl'), joblib.load('scaler.pkl')
+    notebook = joblib.load(MODEL_PATH)   # keeps its feature names, so it is fed DataFrames
+    model = check_member(joblib.load(MODEL_PATH), columns, MODEL_PATH)
+    unfused, fused = compile_linear(model, dtype=np.float64), compile_linear(model, scaler)
+    df = synthetic_employees(args.rows)
+    raw = FeatureEncoder(columns).encode_frame(df)
+    raw_frame = pd.DataFrame(raw, columns=columns)
+    scaled = FeatureEncoder(columns, scaler).encode_frame(df)
+    raw32 = raw.astype(np.float32)
+
+    def notebook_path(X):
+        return notebook.predict_proba(pd.DataFrame(scaler.transform(X), columns=columns))
+
+    paths = [
+        ("sklearn, scaler.transform + DataFrame", notebook_path, raw_frame),
+        ("sklearn, scaled float64 matrix", model.predict_proba, scaled),
+        ("compiled, scaled float64 matrix", unfused.predict_proba, scaled),
+        ("compiled + fused scaler, raw float32", fused.predict_proba, raw32),
+    ]
+    expected = model.predict_proba(scaled)[:, 1]
+    print(f"{'path':<40}{'max |dp|':>10}{'p50/p99 us (1 row)':>22}{'rows/s':>15}")
+    for label, fn, X in paths:
+        diff = np.abs(fn(X)[:, 1] - expected).max()
+        row = X[:1]
+        p50, p99 = np.percentile(measure(lambda: fn(row), repeat=500), [50, 99])
+        print(f"{label:<40}{diff:>10.1e}{f'{p50:.1f} / {p99:.1f}':>22}{throughput(fn, X):>15,.0f}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, 'employees.parquet')
+        df.to_parquet(source, index=False)
+        scaled_encoder, raw_encoder = FeatureEncoder(columns, scaler), FeatureEncoder(columns)
+        for label, models, encoder in [("score_file, sklearn", [model], scaled_encoder),
+                                       ("score_file, fused float32", [fused], raw_encoder)]:
+            rows, elapsed = scoring.score_file(source, os.path.join(tmp, 'out.parquet'), models, encoder,
+                                               args.chunksize)
+            print(f"{label:<40}{rows / elapsed:>47,.0f}  ({args.chunksize:,}-row chunks)")
+
+
+if __name__ == "__main__":
+    main()
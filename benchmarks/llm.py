@@ -0,0 +1,64 @@
+# Time to first token and total latency of report generation, offline, against
+# the latency-injected stub backend.
+#
+#   python -m benchmarks.llm
+#   python -m benchmarks.llm --first-token-ms 800 --token-ms 20 --reports 10
+import argparse
+import time
+
+import numpy as np
+
+from llm import LLMClient, ResponseCache, StubBackend
+
+
+def _prompts(n):
+    return [f"Generate a retention report for employee #{i} (satisfaction {i % 100}%)" for i in range(n)]
+
+
+def _run(client, prompts, label):
+    ttft, total = [], []
+    for prompt in prompts:
+        start = time.perf_counter()
+        first = None
+        for _ in client.stream(prompt):
+            if first is None:
+                first = time.perf_counter() - start
+        ttft.append(first)
+        total.append(time.perf_counter() - start)
+    ttft, total = np.array(ttft) * 1e3, np.array(total) * 1e3
+    print(f"{label:<34} first text p50 {np.median(ttft):8.1f} ms   "
+          f"complete p50 {np.median(total):8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--first-token-ms', type=float, default=300.0)
+    parser.add_argument('--token-ms', type=float, default=5.0)
+    parser.add_argument('--words', type=int, default=120)
+    parser.add_argument('--reports', type=int, default=5)
+    args = parser.parse_args()
+
+    prompts = _prompts(args.reports)
+    backend = StubBackend(args.first_token_ms, args.token_ms, args.words)
+
+    # Blocking generation: nothing is shown until the whole response is in
+    uncached = LLMClient(backend)
+    total = []
+    for prompt in prompts:
+        start = time.perf_counter()
+        uncached.generate(prompt)
+        total.append(time.perf_counter() - start)
+    blocking = np.median(total) * 1e3
+    print(f"{'blocking (before)':<34} first text p50 {blocking:8.1f} ms   complete p50 {blocking:8.1f} ms")
+
+    client = LLMClient(backend, ResponseCache())
+    _run(client, prompts, "streaming, cold cache")
+    _run(client, prompts, "streaming, cached prompts")
+
+    flaky = LLMClient(StubBackend(args.first_token_ms, args.token_ms, args.words, fail_first=1),
+                      backoff=0.1)
+    _run(flaky, prompts[:1], "streaming, 1 failure then retry")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# Load test for serve.py against localhost.
+#
+#   python serve.py --port 8600 &
+#   python -m benchmarks.load_test --url http://127.0.0.1:8600 --concurrency 64 --requests 20000
+#
+# or let the script start the service in-process:
+#   python -m benchmarks.load_test --spawn
+#
+# --distinct N cycles through N employees, to exercise the prediction cache.
+import argparse
+import http.client
+import json
+import threading
+import time
+from urllib.parse import urlparse
+
+import numpy as np
+
+from benchmarks.common import synthetic_employees
+
+
+def _payloads(n):
+    df = synthetic_employees(n).rename(columns={'Departments ': 'department'})
+    return [json.dumps(row).encode() for row in df.to_dict(orient='records')]
+
+
+def _worker(host, port, path, bodies, latencies, errors):
+    conn = http.client.HTTPConnection(host, port)
+    for body in bodies:
+        start = time.perf_counter()
+        conn.request('POST', path, body, {'Content-Type': 'application/json'})
+        response = conn.getresponse()
+        response.read()
+        latencies.append(time.perf_counter() - start)
+        if response.status != 200:
+            errors.append(response.status)
+    conn.close()
+
+
+def run(url, concurrency, requests, path='/score', bulk_size=0, distinct=0):
+    parsed = urlparse(url)
+    bodies = _payloads(bulk_size or distinct or requests)
+    if distinct and not bulk_size:
+        bodies = [bodies[i % distinct] for i in range(requests)]
+    if bulk_size:
+        batch = b'{"employees": [' + b','.join(bodies) + b']}'
+        bodies = [batch] * max(1, requests // bulk_size)
+        path = '/score/bulk'
+
+    per_worker = [bodies[i::concurrency] for i in range(concurrency)]
+    latencies, errors = [], []
+    threads = [threading.Thread(target=_worker, args=(parsed.hostname, parsed.port, path, chunk,
+                                                      latencies, errors))
+               for chunk in per_worker if chunk]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    ms = np.array(latencies) * 1e3
+    rows = len(ms) * (bulk_size or 1)
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    print(f"{path}: {len(ms):,} requests ({rows:,} rows) over {concurrency} connections in {elapsed:.2f}s")
+    print(f"  {len(ms) / elapsed:,.0f} req/s   {rows / elapsed:,.0f} rows/s   errors {len(errors)}")
+    print(f"  latency p50 {p50:.2f} ms   p95 {p95:.2f} ms   p99 {p99:.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--url', default='http://127.0.0.1:8600')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--requests', type=int, default=10_000)
+    parser.add_argument('--bulk-size', type=int, default=0, help="Use /score/bulk with this many rows")
+    parser.add_argument('--distinct', type=int, default=0,
+                        help="Repeat this many distinct employees (0: every request is new)")
+    parser.add_argument('--spawn', action='store_true', help="Start serve.py in-process first")
+    args = parser.parse_args()
+
+    server = None
+    if args.spawn:
+        from serve import create_server
+        parsed = urlparse(args.url)
+        server = create_server(parsed.hostname, parsed.port, workers=max(32, args.concurrency))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    try:
+        run(args.url, args.concurrency, args.requests, bulk_size=args.bulk_size,
+            distinct=args.distinct)
+        conn = http.client.HTTPConnection(urlparse(args.url).hostname, urlparse(args.url).port)
+        conn.request('GET', '/metrics')
+        metrics = json.loads(conn.getresponse().read())
+        print(json.dumps({key: metrics.get(key) for key in ['micro_batching', 'cache']}, indent=2))
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# Drift monitoring over a long prediction log: the cost of logging one
+# assessment, and a drift report from the streaming sketches (cold, and after
+# new assessments) vs rescanning the raw log and recomputing the histograms.
+#
+#   python -m benchmarks.monitoring                     # 1,000,000 logged assessments
+#   python -m benchmarks.monitoring --records 5000000
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+import monitoring
+from benchmarks.common import measure, sample_record, summarize, synthetic_employees
+
+
+# Drift report without sketches: read every logged record and bin it again
+def _rescan(monitor):
+    with open(monitor.log_path, 'rb') as f:
+        f.seek(monitoring.LOG_HEADER_SIZE)
+        records = np.frombuffer(f.read(), dtype=monitoring.LOG_DTYPE)
+    sketch = monitoring.Sketch().update(records)
+    return {name: monitoring.population_stability_index(monitor.baseline.shares(name), sketch.shares(name))
+            for name in monitoring.FEATURES}
+
+
+def _timed(label, fn):
+    start = time.perf_counter()
+    result = fn()
+    print(f"{label:<50} {(time.perf_counter() - start) * 1e3:9.1f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--records', type=int, default=1_000_000)
+    parser.add_argument('--append', type=int, default=100)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        monitor = monitoring.DriftMonitor(tmp)
+        baseline = synthetic_employees(50_000, seed=1)
+        monitor.save_baseline(monitoring.Sketch().update(monitoring.frame_records(baseline, rng.random(len(baseline)))))
+
+        summarize("log one assessment", measure(lambda: monitor.record(sample_record(), 0.3, 0), repeat=2000))
+        workforce = synthetic_employees(args.records)
+        workforce['satisfaction_level'] *= 0.8   # a drifted population
+        probabilities = rng.random(args.records)
+        monitor.append(monitoring.frame_records(workforce, probabilities, (probabilities >= 0.5).astype(np.int8),
+                                                timestamp=time.time() - rng.random(args.records) * 86400 * 7))
+        print(f"{monitor._log_state()[1]:,} logged assessments, {os.path.getsize(monitor.log_path) / 2**20:.0f} MB log, "
+              f"sketches {(monitor.total.counts.nbytes + monitor.daily_counts.nbytes) / 1024:.0f} KB")
+
+        _timed("rescan the log + recompute histograms", lambda: _rescan(monitor))
+        _timed("sketches, cold (fold the whole log once)", lambda: monitor.refresh().report())
+        _timed("sketches, new process (saved sketches)", lambda: monitoring.DriftMonitor(tmp).refresh().report())
+        for _ in range(args.append):
+            monitor.record(sample_record(), 0.3, 0)
+        report = _timed(f"sketches, {args.append} new assessments", lambda: monitor.refresh().report())
+        _timed("sketches, last 7 days window", lambda: monitor.report(7))
+
+        psi = _rescan(monitor)
+        assert np.allclose([psi[name] for name in monitoring.FEATURES], report['psi'].to_numpy(), atol=1e-3)
+        print(f"PSI matches the rescan; satisfaction_level PSI {report.loc['satisfaction_level', 'psi']:.3f} "
+              f"({report.loc['satisfaction_level', 'status']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# Precomputed risk table: build time and size per member, agreement with live
+# inference, and single-employee latency of a table lookup vs live scoring
+# (encode + ensemble, native and compiled trees).
+#
+#   python -m benchmarks.risk_table                       # builds a small table in a temp dir
+#   python -m benchmarks.risk_table --members XGBoost LightGBM "Logistic Regression"
+#   python -m benchmarks.risk_table --dir models/risk_table   # an already built table
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+import risk_table
+from benchmarks.common import measure, summarize
+from encoder import FeatureEncoder
+from ensemble import Ensemble
+from whatif import INPUT_GRIDS
+
+
+def _report(directory):
+    table = risk_table.RiskTable.load(directory)
+    full = np.prod([float(len(grid)) for grid in INPUT_GRIDS.values()])
+    print(f"Full input grid: {full:,.0f} points")
+    for name, entry in table.meta['members'].items():
+        if name not in table.names:
+            continue
+        if entry['kind'] == 'linear':
+            size = sum(len(terms) for terms in entry['terms'].values())
+            print(f"  {name:<22} {size:>12,} terms  {size * 8 / 1024:8.1f} KB   built in {entry['build_seconds']:.2f}s")
+        else:
+            cells = int(np.prod(entry['shape']))
+            print(f"  {name:<22} {cells:>12,} cells  {cells * 2 / 2**20:8.1f} MB   built in "
+                  f"{entry['build_seconds']:.1f}s ({full / cells:,.0f}x smaller than the full grid)")
+    print(f"Table size on disk: {table.nbytes / 2**20:.1f} MB")
+    return table
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--members', nargs='+', default=['Gradient Boosting', 'Decision Tree', 'Logistic Regression'])
+    parser.add_argument('--dir', help="Benchmark an existing table instead of building one")
+    parser.add_argument('--repeat', type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = args.dir or tmp
+        if not args.dir:
+            start = time.perf_counter()
+            risk_table.build(args.members, directory, progress=None)
+            print(f"Built in {time.perf_counter() - start:.1f}s")
+        table = _report(directory)
+        names = table.names
+
+        errors, _, checked = risk_table.verify(table, samples=2000)
+        print("Max |lookup - live| over 2,000 random grid points: "
+              + ', '.join(f"{name} {error:.1e}" for name, error in zip(checked, errors)))
+
+        employees = risk_table._random_employees(args.repeat)
+        encoder = FeatureEncoder.load()
+        native = Ensemble.load(names)
+        compiled = native.compiled()
+        picks = iter(np.resize(np.arange(args.repeat), args.repeat * 4))
+
+        print(f"Single-employee member probabilities ({', '.join(names)}):")
+        summarize("  table lookup", measure(lambda: table.lookup(employees[next(picks)], names), args.repeat))
+        summarize("  live, compiled trees",
+                  measure(lambda: compiled.member_probabilities(encoder.encode_row(employees[next(picks)])),
+                          args.repeat))
+        summarize("  live, native models",
+                  measure(lambda: native.member_probabilities(encoder.encode_row(employees[next(picks)])),
+                          args.repeat // 4))
+        # Close the memory maps before the temporary directory is removed
+        table.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+# Performance suite with recorded baselines: single-row scoring (the dashboard
+# path), batch scoring throughput, app startup (fresh processes through
+# Streamlit's AppTest: first page, Prediction Dashboard, first assessment) and
+# the LLM client's overhead. Runs offline: the LLM is the stub backend and no
+# API key is needed.
+#
+# --record writes the results as the baseline; later runs compare against it
+# and exit 1 when any metric is worse than the baseline by more than
+# --tolerance (latency up, throughput down). Baselines are per machine.
+#
+#   python -m benchmarks.suite --record
+#   python -m benchmarks.suite
+#   python -m benchmarks.suite --only single_row batch --tolerance 0.5
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.common import measure, sample_record, synthetic_employees
+
+BASELINE_PATH = os.path.join('benchmarks', 'baseline.json')
+DEFAULT_TOLERANCE = 0.25
+OFFLINE_ENV = {'CHURN_LLM_BACKEND': 'stub', 'CHURN_WARMUP': '0', 'GEMINI_API_KEY': ''}
+
+_STARTUP_CHILD = r'''
+import json, sys, time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file('app.py', default_timeout=120)
+at.run()
+first_page = time.perf_counter() - start
+t = time.perf_counter()
+at.sidebar.radio[0].set_value('🔮 Prediction Dashboard').run()
+dashboard = time.perf_counter() - t
+t = time.perf_counter()
+[b for b in at.button if 'Assess' in b.label][0].click().run()
+assess = time.perf_counter() - t
+if at.exception:
+    sys.exit(f"App raised: {[e.value for e in at.exception]}")
+print(json.dumps({'first_page': first_page, 'dashboard': dashboard, 'assess': assess}))
+'''
+
+
+# Metric name -> {'value', 'unit', 'better': 'lower' | 'higher'}
+def _metric(results, name, value, unit, better='lower'):
+    results[name] = {'value': float(value), 'unit': unit, 'better': better}
+
+
+# Encode one dashboard record and score it with the compiled ensemble (no cache, no risk table)
+def single_row(results, args):
+    from encoder import FeatureEncoder
+    from ensemble import Ensemble
+
+    encoder = FeatureEncoder.load()
+    ensemble = Ensemble.load().compiled()
+    record = sample_record()
+    samples = measure(lambda: ensemble.combine(ensemble.member_probabilities(encoder.encode_row(record))),
+                      repeat=args.single_repeat)
+    _metric(results, 'single_row.p50_us', np.percentile(samples, 50), 'us')
+    _metric(results, 'single_row.p99_us', np.percentile(samples, 99), 'us')
+
+
+# scoring.score_frame over synthetic employees with the native ensemble (the Batch Upload path)
+def batch(results, args):
+    import scoring
+    from encoder import FeatureEncoder
+    from ensemble import Ensemble
+
+    encoder = FeatureEncoder.load()
+    ensemble = Ensemble.load()
+    df = synthetic_employees(args.batch_rows)
+    scoring.score_frame(df.head(1000), ensemble, encoder)
+    seconds = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        scoring.score_frame(df, ensemble, encoder)
+        seconds.append(time.perf_counter() - start)
+    _metric(results, 'batch.rows_per_s', args.batch_rows / np.median(seconds), 'rows/s', 'higher')
+
+
+def startup(results, args):
+    runs = []
+    for _ in range(args.repeat):
+        out = subprocess.run([sys.executable, '-c', _STARTUP_CHILD], capture_output=True, text=True,
+                             cwd=os.getcwd(), env={**os.environ, **OFFLINE_ENV})
+        if out.returncode:
+            raise RuntimeError(out.stderr.strip().splitlines()[-1])
+        runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    for key in runs[0]:
+        _metric(results, f"startup.{key}_ms", np.median([run[key] for run in runs]) * 1e3, 'ms')
+
+
+# Client-side cost of a report request (thread, queue, cache bookkeeping) against a zero-latency stub
+def llm_overhead(results, args):
+    from llm import LLMClient, ResponseCache, StubBackend
+
+    client = LLMClient(StubBackend(first_token_ms=0.0, token_ms=0.0), ResponseCache(), name='suite')
+    prompts = iter(range(10 ** 9))
+    samples = measure(lambda: client.generate(f"Retention report for employee #{next(prompts)}"), repeat=200)
+    _metric(results, 'llm.report_overhead_p50_us', np.percentile(samples, 50), 'us')
+
+
+CASES = {'single_row': single_row, 'batch': batch, 'startup': startup, 'llm': llm_overhead}
+
+
+def environment():
+    import sklearn
+    return {'python': platform.python_version(), 'machine': platform.machine(), 'cpus': os.cpu_count(),
+            'numpy': np.__version__, 'sklearn': sklearn.__version__}
+
+
+# Metrics worse than their baseline by more than `tolerance`: [(name, value, baseline, change)]
+def regressions(results, baseline, tolerance):
+    worse = []
+    for name, metric in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            continue
+        change = metric['value'] / reference['value'] - 1
+        if (change if metric['better'] == 'lower' else -change / (1 + change)) > tolerance:
+            worse.append((name, metric['value'], reference['value'], change))
+    return worse
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--only', nargs='+', choices=list(CASES), help="Cases to run (default: all)")
+    parser.add_argument('--record', action='store_true', help="Save the results as the new baseline")
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed relative slowdown before a metric counts as a regression")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs of the batch and startup cases (median)")
+    parser.add_argument('--single-repeat', type=int, default=2000)
+    parser.add_argument('--batch-rows', type=int, default=100_000)
+    args = parser.parse_args()
+    os.environ.update(OFFLINE_ENV)
+
+    results = {}
+    for name in args.only or CASES:
+        start = time.perf_counter()
+        CASES[name](results, args)
+        print(f"  {name} done in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            recorded = json.load(f)
+        baseline = recorded['metrics']
+        if recorded.get('environment') != environment():
+            print(f"Baseline was recorded on a different environment: {recorded.get('environment')}",
+                  file=sys.stderr)
+
+    print(f"{'metric':<34}{'value':>12}{'':<7}{'baseline':>12}{'change':>9}")
+    for name, metric in results.items():
+        reference = baseline.get(name)
+        recorded = f"{reference['value']:,.1f}" if reference else '-'
+        change = f"{metric['value'] / reference['value'] - 1:+.0%}" if reference else ''
+        print(f"{name:<34}{metric['value']:>12,.1f} {metric['unit']:<6}{recorded:>12}{change:>9}")
+
+    if args.record:
+        with open(args.baseline, 'w') as f:
+            json.dump({'recorded': time.strftime('%Y-%m-%dT%H:%M:%S'), 'environment': environment(),
+                       'metrics': {**baseline, **results}}, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return
+    worse = regressions(results, baseline, args.tolerance)
+    if worse:
+        for name, value, reference, change in worse:
+            print(f"Regression: {name} {value:,.1f} vs baseline {reference:,.1f} ({change:+.0%})", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# Training pipeline wall time by worker count, with a check that every worker
+# count produces the same models. Uses HR_Dataset.csv when present, otherwise
+# a labelled synthetic workforce of the same size. Exits 1 when the models
+# depend on the worker count.
+#
+#   python -m benchmarks.train
+#   python -m benchmarks.train --data HR_Dataset.csv --workers 1 2 4 8 --folds 5
+import argparse
+import os
+import sys
+
+import numpy as np
+
+import train
+from benchmarks.common import synthetic_employees
+from dataset import DATASET_PATH, TARGET, read_hr_dataset
+
+
+# Synthetic employees with a noisy churn rule (low satisfaction, over- or under-work, long tenure)
+def labelled_employees(n, seed=0):
+    df = synthetic_employees(n, seed)
+    rng = np.random.default_rng(seed + 1)
+    score = (2.5 * (df['satisfaction_level'] < 0.4) + 1.5 * (df['average_montly_hours'] > 250)
+             + 1.0 * (df['number_project'] <= 2) + 0.8 * (df['time_spend_company'] >= 5)
+             - 1.0 * (df['salary'] == 'high') + rng.normal(0, 1.0, n))
+    df[TARGET] = (score > 2.0).astype(int)
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--data', default=DATASET_PATH)
+    parser.add_argument('--rows', type=int, default=14_999, help="Synthetic rows when --data is missing")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--folds', type=int, default=train.DEFAULT_FOLDS)
+    parser.add_argument('--models', nargs='+', default=train.DEFAULT_MEMBERS, choices=list(train.CANDIDATES))
+    args = parser.parse_args()
+
+    if os.path.exists(args.data):
+        df, label = read_hr_dataset(args.data), args.data
+    else:
+        df, label = labelled_employees(args.rows), f"{args.rows:,} synthetic rows"
+    print(f"Data: {label}; {len(args.models)} models x (1 fit + {args.folds} folds); {os.cpu_count()} CPU cores")
+
+    X_test = None
+    reference = None
+    baseline = None
+    reproducible = True
+    print(f"{'workers':>8}{'prepare':>10}{'fit':>10}{'total':>10}{'speedup':>10}{'task sum':>11}{'longest':>10}")
+    for workers in args.workers:
+        models, _, metrics = train.train(df, args.models, args.folds, workers, progress=None)
+        if X_test is None:
+            X_test = train.prepare(df)[1]
+        probs = np.column_stack([model.predict_proba(train._inputs(name, X_test))[:, 1]
+                                 for name, model in sorted(models.items())])
+        if reference is None:
+            reference = probs
+        same = np.array_equal(probs, reference)
+        reproducible &= same
+
+        seconds = metrics['seconds']
+        baseline = baseline or seconds['fit']
+        task_sum = sum(member['task_seconds'] for member in metrics['members'].values())
+        longest = max(member['fit_seconds'] for member in metrics['members'].values())
+        print(f"{workers:>8}{seconds['prepare']:>9.1f}s{seconds['fit']:>9.1f}s{seconds['total']:>9.1f}s"
+              f"{baseline / seconds['fit']:>9.2f}x{task_sum:>10.1f}s{longest:>9.1f}s"
+              + ("" if same else "   models differ from the first run!"))
+    print("'task sum' is the serial work; 'longest' (the slowest final fit) bounds the wall time from below")
+    if not reproducible:
+        print("Training is not reproducible across worker counts", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+# Native predict_proba vs the compiled tree engine: parity, single-row
+# p50/p99 latency and batch throughput for every shipped tree model.
+#
+#   python -m benchmarks.tree_engine [--rows 100000]
+import argparse
+import time
+import warnings
+
+import joblib
+import numpy as np
+
+from benchmarks.common import measure, synthetic_employees
+from encoder import FeatureEncoder
+from tree_engine import compile_model
+
+TREE_MODELS = [
+    'XGB.pkl',
+    'models/XGBoost_model.pkl',
+    'models/LightGBM_model.pkl',
+    'models/Gradient Boosting_model.pkl',
+    'models/Decision Tree_model.pkl',
+]
+
+
+def throughput(fn, X):
+    start = time.perf_counter()
+    fn(X)
+    return X.shape[0] / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=100_000)
+    args = parser.parse_args()
+    warnings.simplefilter('ignore')
+
+    X = FeatureEncoder.load().encode_frame(synthetic_employees(args.rows))
+    row = X[:1]
+
+    print(f"{'model':<36}{'max |dp|':>10}{'native p50/p99 us':>22}{'compiled p50/p99 us':>22}"
+          f"{'native rows/s':>15}{'compiled rows/s':>17}")
+    for path in TREE_MODELS:
+        native = joblib.load(path)
+        compiled = compile_model(native)
+        diff = np.abs(native.predict_proba(X)[:, 1] - compiled.predict_positive(X)).max()
+
+        n_lat = measure(lambda: native.predict_proba(row), repeat=500)
+        c_lat = measure(lambda: compiled.predict_proba(row), repeat=500)
+        n_p50, n_p99 = np.percentile(n_lat, [50, 99])
+        c_p50, c_p99 = np.percentile(c_lat, [50, 99])
+        print(f"{path:<36}{diff:>10.1e}{f'{n_p50:.0f} / {n_p99:.0f}':>22}{f'{c_p50:.0f} / {c_p99:.0f}':>22}"
+              f"{throughput(native.predict_proba, X):>15,.0f}{throughput(compiled.predict_proba, X):>17,.0f}")
+
+
+if __name__ == "__main__":
+    main()
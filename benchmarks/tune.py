@@ -0,0 +1,60 @@
+# Hyperparameter search cost: successive halving vs cross-validating every
+# sampled configuration on the full folds, the best CV score each one finds,
+# early-stopped round counts, and a repeated search served from the trial store.
+#
+#   python -m benchmarks.tune
+#   python -m benchmarks.tune --models XGBoost LightGBM --trials 27 --workers 4
+import argparse
+import os
+import time
+
+import tune
+from benchmarks.train import labelled_employees
+from dataset import DATASET_PATH, read_hr_dataset
+
+
+def _run(df, args, eta, store):
+    start = time.perf_counter()
+    history, counts = tune.search(df, args.models, args.trials, eta, args.folds, args.workers,
+                                  store=store, progress=None)
+    return history, counts, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--data', default=DATASET_PATH)
+    parser.add_argument('--rows', type=int, default=14_999, help="Synthetic rows when --data is missing")
+    parser.add_argument('--models', nargs='+', default=['Decision Tree', 'LightGBM', 'XGBoost'],
+                        choices=list(tune.SEARCH_SPACES))
+    parser.add_argument('--trials', type=int, default=9)
+    parser.add_argument('--eta', type=int, default=tune.DEFAULT_ETA)
+    parser.add_argument('--folds', type=int, default=3)
+    parser.add_argument('--workers', type=int)
+    args = parser.parse_args()
+
+    if os.path.exists(args.data):
+        df, label = read_hr_dataset(args.data), args.data
+    else:
+        df, label = labelled_employees(args.rows), f"{args.rows:,} synthetic rows"
+    print(f"Data: {label}; {args.trials} configurations x {args.folds} folds per candidate")
+
+    store = tune.TrialStore(None)
+    halving, counts, halving_s = _run(df, args, args.eta, store)
+    _, cached, cached_s = _run(df, args, args.eta, store)
+    exhaustive, full_counts, full_s = _run(df, args, args.trials + 1, tune.TrialStore(None))
+
+    print(f"{'search':<28}{'trials':>8}{'wall':>10}")
+    print(f"{f'successive halving (eta={args.eta})':<28}{counts['run']:>8}{halving_s:>9.1f}s")
+    print(f"{'every config, full folds':<28}{full_counts['run']:>8}{full_s:>9.1f}s")
+    print(f"{'repeat from trial store':<28}{cached['run']:>8}{cached_s:>9.1f}s   ({cached['stored']} reused)")
+
+    print(f"{'candidate':<22}{'halving cv f1':>15}{'exhaustive cv f1':>18}{'rounds':>12}")
+    for name in args.models:
+        best = halving[name][-1]['ranked'][0]
+        full = exhaustive[name][-1]['ranked'][0]
+        rounds = f"{best['rounds']}/{tune.MAX_ROUNDS}" if best['rounds'] else '-'
+        print(f"{name:<22}{best['score']:>15.4f}{full['score']:>18.4f}{rounds:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# Incremental update vs full retrain: models trained on a history of synthetic
+# employees receive a new batch, either through update.py (new rows only) or by
+# re-running train.py over history + batch. Reports the time of both and each
+# model's F1 on a common holdout before and after.
+#
+#   python -m benchmarks.update
+#   python -m benchmarks.update --history 60000 --batch 5000 --rounds 100
+import argparse
+import tempfile
+import time
+
+import pandas as pd
+
+import train
+import update
+from benchmarks.train import labelled_employees
+from dataset import drop_duplicate_profiles, notebook_features
+from ensemble import available_members
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--history', type=int, default=15_000, help="Rows the current models were trained on")
+    parser.add_argument('--batch', type=int, default=3_000, help="New rows")
+    parser.add_argument('--rounds', type=int, default=update.DEFAULT_ROUNDS)
+    parser.add_argument('--models', nargs='+', default=train.DEFAULT_MEMBERS, choices=list(train.CANDIDATES))
+    args = parser.parse_args()
+
+    history = labelled_employees(args.history, seed=0)
+    batch = labelled_employees(args.batch, seed=7)
+    holdout = drop_duplicate_profiles(labelled_employees(3_000, seed=11))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        models, scaler, metrics = train.train(history, args.models, 1, 1, progress=None)
+        directory = train.write_bundle(models, scaler, metrics, tmp, 'current')
+
+        start = time.perf_counter()
+        entry = update.update(available_members(directory), batch, directory, holdout, args.rounds,
+                              tolerance=1.0)
+        incremental = time.perf_counter() - start
+
+        start = time.perf_counter()
+        full_models, full_scaler, full_metrics = train.train(pd.concat([history, batch], ignore_index=True),
+                                                             args.models, 1, 1, progress=None)
+        full = time.perf_counter() - start
+    X_holdout = update._scaled(notebook_features(holdout, train.TRAINING_COLUMNS), full_scaler,
+                               train.TRAINING_COLUMNS)
+
+    print(f"History {args.history:,} rows + batch {args.batch:,} rows; F1 on 3,000 holdout rows")
+    print(f"{'model':<22}{'current':>9}{'updated':>9}{'retrained':>11}{'update':>10}{'retrain':>10}")
+    for name in args.models:
+        report = entry['models'][name]
+        model = full_models[name]
+        retrained = train.evaluate(model, update._inputs(model, X_holdout), holdout['left'].to_numpy())['f1']
+        print(f"{name:<22}{report['before']['f1']:>9.4f}{report['after']['f1']:>9.4f}{retrained:>11.4f}"
+              f"{report['seconds']:>9.2f}s{full_metrics['members'][name]['fit_seconds']:>9.2f}s")
+    print(f"Total: incremental update {incremental:.2f}s (preparing the batch {entry['prepare_seconds']:.2f}s) "
+          f"vs full retrain {full:.2f}s ({full / incremental:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
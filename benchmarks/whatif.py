@@ -0,0 +1,102 @@
+# What-if sweeps: one batched matrix per sweep vs scoring each scenario on
+# its own (what re-running the dashboard once per guess amounts to), with the
+# batched risks checked against the per-scenario ones. With a risk table built
+# (python risk_table.py build) the sweeps and the change search are also timed
+# with its members looked up and only the rest scored live; the budget applies
+# to the path the dashboard takes. Exits 1 when a sweep or the change search
+# exceeds the budget.
+#
+#   python -m benchmarks.whatif
+#   python -m benchmarks.whatif --members XGBoost LightGBM --budget-ms 250
+import argparse
+import sys
+import time
+
+import numpy as np
+
+import whatif
+from benchmarks.common import sample_record
+from encoder import FeatureEncoder
+from ensemble import Ensemble
+from risk_table import RiskTable
+
+SWEEPS = [
+    ['average_montly_hours'],
+    ['salary', 'number_project'],
+    ['last_evaluation', 'satisfaction_level'],
+    ['average_montly_hours', 'satisfaction_level'],
+]
+
+
+def _timed(fn, repeat=3):
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def _table_column(table, elapsed):
+    return f"{'-':>14}" if table is None else f"{elapsed * 1e3:>11.0f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--members', nargs='+', help="Ensemble members (default: all)")
+    parser.add_argument('--budget-ms', type=float, default=500.0, help="Per-sweep / per-search budget")
+    parser.add_argument('--sample', type=int, default=100, help="Scenarios scored one at a time")
+    args = parser.parse_args()
+
+    models = Ensemble.load(args.members)
+    encoder = FeatureEncoder.load()
+    employee = sample_record()
+    table = RiskTable.load_if_present()
+    print(f"Members: {', '.join(models.names)}")
+    if table is not None:
+        print(f"Risk table members: {', '.join(name for name in models.names if name in table.names) or 'none'}")
+
+    # Per-scenario cost: encode one row and score it, as the dashboard does per click
+    grid = whatif.sweep(employee, SWEEPS[-1], models, encoder)
+    picks = np.random.default_rng(0).choice(len(grid), args.sample, replace=False)
+    start = time.perf_counter()
+    single = []
+    for i in picks:
+        record = {**employee, **grid.iloc[i][SWEEPS[-1]].to_dict()}
+        single.append(models.predict_proba(encoder.encode_row(record))[0, 1])
+    per_point = (time.perf_counter() - start) / args.sample
+    error = np.abs(np.array(single) - grid['risk'].to_numpy()[picks]).max()
+    print(f"One scenario at a time: {per_point * 1e3:.2f} ms each; batched risks match (max diff {error:.1e})")
+
+    slowest, table_error = 0.0, 0.0
+    print(f"{'sweep':<46}{'scenarios':>10}{'batched':>12}{'risk table':>14}{'one by one':>14}")
+    for inputs in SWEEPS:
+        grid, elapsed = _timed(lambda: whatif.sweep(employee, inputs, models, encoder))
+        looked_up, table_elapsed = (grid, elapsed) if table is None else _timed(
+            lambda: whatif.sweep(employee, inputs, models, encoder, table))
+        table_error = max(table_error, np.abs(looked_up['risk'] - grid['risk']).max())
+        slowest = max(slowest, table_elapsed)
+        print(f"{' x '.join(inputs):<46}{len(grid):>10,}{elapsed * 1e3:>9.0f} ms"
+              f"{_table_column(table, table_elapsed)}{len(grid) * per_point:>12.1f} s")
+    suggestion, elapsed = _timed(lambda: whatif.suggest_change(employee, models, encoder))
+    _, table_elapsed = (suggestion, elapsed) if table is None else _timed(
+        lambda: whatif.suggest_change(employee, models, encoder, table=table))
+    slowest = max(slowest, table_elapsed)
+    if suggestion is None:
+        print(f"change search: no feasible change ({elapsed * 1e3:.0f} ms)")
+    else:
+        changes = ', '.join(f"{name} {old} -> {new}" for name, (old, new) in suggestion['changes'].items())
+        print(f"{'change search':<46}{suggestion['evaluated']:>10,}{elapsed * 1e3:>9.0f} ms"
+              f"{_table_column(table, table_elapsed)}{suggestion['evaluated'] * per_point:>12.1f} s")
+        print(f"  suggestion: {changes} (risk {suggestion['risk']:.1%})")
+    if table is not None:
+        print(f"Risk table sweeps match the live ones (max diff {table_error:.1e})")
+
+    if slowest * 1e3 > args.budget_ms:
+        print(f"What-if budget exceeded: {slowest * 1e3:.0f} ms > {args.budget_ms:.0f} ms", file=sys.stderr)
+        sys.exit(1)
+    print(f"Within budget: slowest {slowest * 1e3:.0f} ms <= {args.budget_ms:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
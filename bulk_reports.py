@@ -0,0 +1,247 @@
+# Retention reports for every high-risk employee in a scored file.
+#
+# Takes the output of scoring.py, keeps rows at or above the risk threshold and
+# generates one Markdown report per employee, written to a zip bundle. Requests
+# run on a bounded thread pool behind a rate limiter; employees whose prompts
+# are identical share one LLM call. Every finished prompt is appended to a
+# checkpoint file, so an interrupted run picks up where it stopped.
+#
+# Usage:
+#   python bulk_reports.py employees_scored.csv -o reports.zip
+#   python bulk_reports.py employees_scored.csv --threshold 0.7 --concurrency 16 --rate 10
+#   python bulk_reports.py employees_scored.csv --backend stub    # offline, no API key
+import argparse
+import io
+import json
+import os
+import re
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+
+from encoder import DEPARTMENT_ALIASES
+from llm import GeminiBackend, LLMClient, ResponseCache, StubBackend
+from scoring import RISK_THRESHOLD, read_table
+
+DEFAULT_CONCURRENCY = 8
+DEFAULT_RATE = 5.0
+
+
+# Token bucket: at most `rate` acquisitions per second, in bursts of up to `burst`
+class RateLimiter:
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.rate:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+# Append-only JSON lines of finished prompts: {"key": ..., "text": ...}, the key
+# being the client's hash of the backend, model and prompt
+class Checkpoint:
+    def __init__(self, path):
+        self.path = path
+        self.done = {}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Partial last line from an interrupted run
+                        continue
+                    self.done[entry['key']] = entry['text']
+
+    def add(self, key, text):
+        with self._lock:
+            self.done[key] = text
+            if self.path:
+                with open(self.path, 'a') as f:
+                    f.write(json.dumps({'key': key, 'text': text}) + '\n')
+
+
+def employee_prompt(row):
+    department = next((row[col] for col in DEPARTMENT_ALIASES if col in row), 'N/A')
+    return f"""
+    Generate a concise employee retention report in Markdown with the following details:
+
+    Employee Information:
+    - Department: {department}
+    - Salary Level: {row.get('salary', 'N/A')}
+    - Satisfaction Level: {row['satisfaction_level'] * 100:.0f}%
+    - Last Evaluation: {row['last_evaluation'] * 100:.0f}%
+    - Projects: {row['number_project']}
+    - Average Monthly Hours: {row['average_montly_hours']}
+    - Years at Company: {row['time_spend_company']}
+    - Work Accident: {'Yes' if row['Work_accident'] else 'No'}
+    - Promoted in Last 5 Years: {'Yes' if row['promotion_last_5years'] else 'No'}
+
+    Prediction Results:
+    - Retention Risk: High
+    - Probability: {row['churn_probability'] * 100:.1f}%
+
+    Please provide:
+    1. Risk analysis summary
+    2. Key contributing factors
+    3. Recommended retention strategies
+    4. Development opportunities
+    5. Management suggestions
+    """
+
+
+def high_risk_rows(df, threshold=RISK_THRESHOLD):
+    if 'churn_probability' not in df.columns:
+        raise ValueError("Input has no churn_probability column; score it with scoring.py first")
+    return df[df['churn_probability'] >= threshold]
+
+
+def generate_reports(df, client, threshold=RISK_THRESHOLD, concurrency=DEFAULT_CONCURRENCY,
+                     rate=DEFAULT_RATE, checkpoint=None, progress=None):
+    start = time.perf_counter()
+    risky = high_risk_rows(df, threshold)
+    checkpoint = checkpoint or Checkpoint(None)
+
+    # One request per distinct prompt, keyed like the client's response cache
+    # (backend and model included), so a checkpoint written by another backend,
+    # e.g. the stub, is never resumed into this run's reports
+    keys = []
+    prompts = {}
+    for row in risky.to_dict(orient='records'):
+        prompt = employee_prompt(row)
+        key = client.key(prompt)
+        keys.append(key)
+        prompts.setdefault(key, prompt)
+    pending = [key for key in prompts if key not in checkpoint.done]
+
+    limiter = RateLimiter(rate, burst=max(1, concurrency))
+    failed = {}
+
+    def run(key):
+        limiter.acquire()
+        return client.generate(prompts[key])
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='report') as pool:
+        futures = {pool.submit(run, key): key for key in pending}
+        for i, future in enumerate(as_completed(futures), 1):
+            key = futures[future]
+            try:
+                checkpoint.add(key, future.result())
+            except Exception as e:
+                failed[key] = str(e)
+            if progress:
+                progress(i, len(pending))
+
+    # One report (or None) per high-risk row, in order; ids may repeat
+    reports = [checkpoint.done.get(key) for key in keys]
+    stats = {
+        'employees': len(df),
+        'high_risk': len(risky),
+        'unique_prompts': len(prompts),
+        'resumed': len(prompts) - len(pending),
+        'generated': len(pending) - len(failed),
+        'failed': len(failed),
+        'first_error': next(iter(failed.values()), None),
+        'elapsed_s': time.perf_counter() - start,
+    }
+    return reports, risky, stats
+
+
+# File name per row: the id with path separators, '..' and anything else but
+# letters, digits, '-', '_' and single dots replaced, suffixed with the row
+# number when it is empty or already taken
+def report_names(ids):
+    names, seen = [], set()
+    for row, employee in enumerate(ids):
+        name = re.sub(r'(?:[^\w.-]|\.{2,})+', '_', str(employee)).strip('.')
+        if not name or name in seen:
+            name = f"{name or 'row'}_{row}"
+        while name in seen:
+            name += '_'
+        seen.add(name)
+        names.append(name)
+    return names
+
+
+def write_bundle(path, reports, risky, id_column=None):
+    ids = risky[id_column] if id_column else risky.index
+    index = pd.DataFrame({
+        'employee': list(ids),
+        'churn_probability': risky['churn_probability'].to_numpy(),
+    })
+    index['report'] = [f"reports/{name}.md" if text else None for name, text in zip(report_names(ids), reports)]
+    with zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED) as bundle:
+        for entry, text in zip(index['report'], reports):
+            if text:
+                bundle.writestr(entry, text)
+        buffer = io.StringIO()
+        index.to_csv(buffer, index=False)
+        bundle.writestr('index.csv', buffer.getvalue())
+
+
+def make_client(backend, cache_path=None):
+    if backend == 'stub':
+        backend = StubBackend()
+    else:
+        import resources
+        if not resources.gemini_api_key():
+            raise SystemExit(f"Set {resources.API_KEY_ENV} (or use --backend stub)")
+        backend = GeminiBackend(resources.get('report_model'))
+    return LLMClient(backend, ResponseCache(store_path=cache_path), name='bulk_report')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate retention reports for high-risk employees.")
+    parser.add_argument('input', help="Scored CSV or Parquet file (output of scoring.py)")
+    parser.add_argument('-o', '--output', help="Zip bundle (default: <input>_reports.zip)")
+    parser.add_argument('--threshold', type=float, default=RISK_THRESHOLD)
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY, help="Requests in flight")
+    parser.add_argument('--rate', type=float, default=DEFAULT_RATE, help="Max requests per second (0: no limit)")
+    parser.add_argument('--checkpoint', help="Progress file (default: <output>.checkpoint.jsonl)")
+    parser.add_argument('--id-column', help="Column naming each report (default: row number)")
+    parser.add_argument('--backend', choices=['gemini', 'stub'], default='gemini')
+    parser.add_argument('--cache-path', help="SQLite response cache shared across runs")
+    args = parser.parse_args()
+
+    output = args.output or f"{os.path.splitext(args.input)[0]}_reports.zip"
+    checkpoint = Checkpoint(args.checkpoint or f"{output}.checkpoint.jsonl")
+    df = read_table(args.input)
+    # Checked before any request is spent on reports the bundle could not name
+    if args.id_column and args.id_column not in df.columns:
+        raise SystemExit(f"Input has no {args.id_column!r} column")
+    client = make_client(args.backend, args.cache_path)
+
+    def progress(done, total):
+        print(f"\r  {done:,}/{total:,} reports", end='', flush=True)
+
+    reports, risky, stats = generate_reports(df, client, args.threshold, args.concurrency, args.rate,
+                                             checkpoint, progress)
+    print()
+    write_bundle(output, reports, risky, args.id_column)
+    print(f"{stats['high_risk']:,} of {stats['employees']:,} employees at risk >= {args.threshold:g}: "
+          f"{stats['unique_prompts']:,} distinct prompts, {stats['resumed']:,} from checkpoint, "
+          f"{stats['generated']:,} generated, {stats['failed']:,} failed in {stats['elapsed_s']:.1f}s -> {output}")
+    if stats['failed']:
+        raise SystemExit(f"Some reports failed ({stats['first_error']}); run again to retry them")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+# Bounded conversation context for the Employee Service Chatbot.
+#
+# The prompt sent on each turn is a rolling summary of older turns followed by
+# a sliding window of the most recent ones, kept under a token budget. The
+# converted {'role', 'parts'} history is maintained incrementally (one message
+# appended per turn) instead of being rebuilt from the whole transcript. When
+# the window overflows, its oldest turns are folded into the summary with one
+# extra LLM call, made after the reply has been shown.
+import time
+
+from llm import estimate_tokens
+
+DEFAULT_TOKEN_BUDGET = 2000
+DEFAULT_WINDOW_TURNS = 6
+SUMMARY_WORDS = 120
+# Compaction trims the window down to this fraction of its limits, so the
+# summary call happens every few turns rather than on every one
+LOW_WATER = 0.7
+
+
+class ChatContext:
+    def __init__(self, client, token_budget=DEFAULT_TOKEN_BUDGET, window_turns=DEFAULT_WINDOW_TURNS,
+                 summary_words=SUMMARY_WORDS):
+        self.client = client
+        self.token_budget = token_budget
+        self.window_turns = window_turns
+        self.summary_words = summary_words
+        self.summary = ''
+        self.window = []        # recent messages, oldest first, always starting with a user message
+        self._tokens = []       # estimated tokens of each window message
+        self.summarized_turns = 0
+        self.turns = []         # per-turn prompt size and latency
+
+    def _append(self, role, text):
+        self.window.append({'role': role, 'parts': [text]})
+        self._tokens.append(estimate_tokens(text))
+
+    def _summary_messages(self):
+        if not self.summary:
+            return []
+        return [{'role': 'user', 'parts': [f"Summary of our conversation so far: {self.summary}"]},
+                {'role': 'model', 'parts': ["Understood, I'll keep that in mind."]}]
+
+    def prompt_tokens(self):
+        return sum(self._tokens) + (estimate_tokens(self.summary) + 20 if self.summary else 0)
+
+    def prompt(self):
+        return self._summary_messages() + self.window
+
+    def _over_budget(self, fraction=1.0):
+        turns = len(self.window) // 2
+        return turns > self.window_turns * fraction or self.prompt_tokens() > self.token_budget * fraction
+
+    # Fold the oldest turns into the summary until the window fits; returns the seconds spent
+    def compact(self):
+        if not self._over_budget():
+            return 0.0
+        evicted = []
+        # Always keep the latest turn, however long it is
+        while len(self.window) > 2 and self._over_budget(LOW_WATER):
+            evicted += self.window[:2]
+            del self.window[:2]
+            del self._tokens[:2]
+        if not evicted:
+            return 0.0
+
+        start = time.perf_counter()
+        transcript = '\n'.join(f"{'User' if m['role'] == 'user' else 'Assistant'}: {m['parts'][0]}"
+                               for m in evicted)
+        request = (f"Update this running summary of a conversation between an employee and an HR "
+                   f"assistant, in at most {self.summary_words} words. Keep names, facts, requests "
+                   f"and anything still unresolved.\n\nCurrent summary: {self.summary or '(none)'}"
+                   f"\n\nNew messages:\n{transcript}")
+        try:
+            summary = self.client.generate(request, use_cache=False)
+        except Exception:
+            # Keep the conversation going with a truncated extract instead
+            summary = f"{self.summary} {transcript}"
+        words = summary.split()
+        self.summary = ' '.join(words[-self.summary_words * 2:])
+        self.summarized_turns += len(evicted) // 2
+        return time.perf_counter() - start
+
+    # Yields the reply to `text` chunk by chunk; call compact() once it is displayed
+    def stream_reply(self, text):
+        self._append('user', text)
+        prompt = self.prompt()
+        turn = {'turn': len(self.turns) + 1, 'prompt_messages': len(prompt),
+                'prompt_tokens': self.prompt_tokens(), 'summarized_turns': self.summarized_turns}
+        start = time.perf_counter()
+        first = None
+        parts = []
+        completed = False
+        try:
+            for chunk in self.client.stream(prompt, use_cache=False):
+                if first is None:
+                    first = time.perf_counter() - start
+                parts.append(chunk)
+                yield chunk
+            completed = True
+        finally:
+            if not completed:
+                # Failed or abandoned (e.g. closed by a rerun): drop the
+                # unanswered question so the history still alternates
+                self.window.pop()
+                self._tokens.pop()
+        self._append('model', ''.join(parts))
+        turn.update({'ttft_s': first, 'total_s': time.perf_counter() - start})
+        self.turns.append(turn)
+
+    def reply(self, text):
+        reply = ''.join(self.stream_reply(text))
+        self.turns[-1]['summary_s'] = self.compact()
+        return reply
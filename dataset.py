@@ -0,0 +1,59 @@
+# HR dataset loading and the notebook's preprocessing steps
+# (dedup -> one-hot -> SMOTE -> stratified split), shared by the
+# training, verification and analytics tools.
+import joblib
+import numpy as np
+import pandas as pd
+
+from encoder import DEPARTMENT_ALIASES
+
+DATASET_PATH = 'HR_Dataset.csv'
+TARGET = 'left'
+RANDOM_STATE = 42
+TEST_SIZE = 0.3
+
+
+def read_hr_dataset(path=DATASET_PATH):
+    return pd.read_csv(path)
+
+
+# Same rule as the notebook: rows identical in everything but the target are duplicates
+def drop_duplicate_profiles(df):
+    return df.drop_duplicates(subset=[col for col in df.columns if col != TARGET])
+
+
+# The notebook's encoding: get_dummies on the raw frame, so dummies stay bool and
+# integer columns stay int64 (SMOTE casts its synthetic rows back to these dtypes)
+def notebook_features(df, dummy_columns=None):
+    dummy_columns = dummy_columns or joblib.load('dummy_columns.pkl')
+    department = next(col for col in DEPARTMENT_ALIASES if col in df.columns)
+    X = pd.get_dummies(df.drop(columns=[TARGET], errors='ignore'),
+                       columns=[department, 'salary'], drop_first=True)
+    X.columns = [col.replace(f"{department}_", "Departments _") for col in X.columns]
+    for col in dummy_columns:
+        if col not in X.columns:
+            X[col] = False
+    return X[dummy_columns]
+
+
+# Deduplicated, one-hot encoded and SMOTE-balanced features (a DataFrame) and target
+def notebook_resample(df, dummy_columns=None, random_state=RANDOM_STATE):
+    from imblearn.over_sampling import SMOTE
+
+    df = drop_duplicate_profiles(df)
+    X = notebook_features(df, dummy_columns)
+    y = df[TARGET].to_numpy()
+    return SMOTE(sampling_strategy='auto', random_state=random_state).fit_resample(X, y)
+
+
+# Reproduces the notebook's train/test split (unscaled features, SMOTE before the split)
+def notebook_split(df, dummy_columns=None, random_state=RANDOM_STATE):
+    from sklearn.model_selection import train_test_split
+
+    X, y = notebook_resample(df, dummy_columns, random_state)
+    X = X.to_numpy(dtype=np.float64)
+    return train_test_split(X, y, stratify=y, test_size=TEST_SIZE, random_state=random_state)
+
+
+def apply_scaler(X, scaler):
+    return np.asarray(X, dtype=np.float64) * scaler.scale_ + scaler.min_
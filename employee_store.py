@@ -0,0 +1,248 @@
+# Columnar, memory-mapped store for employee records.
+#
+# A store is a directory with one raw binary file per column and a meta.json
+# describing them. Numeric columns keep the smallest integer type that fits
+# (floats stay float64, so values round-trip exactly), and text columns
+# (department, salary) are stored as integer codes into a category list.
+# Reads are np.memmap views, so opening a store and slicing columns copies
+# nothing; appends write the new rows to the end of each column file and then
+# bump the row count in meta.json, so readers never see a half-written batch.
+#
+# Usage:
+#   python employee_store.py import HR_Dataset.csv hr_store
+#   python employee_store.py append hr_store new_hires.csv
+#   python employee_store.py info hr_store
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+META_FILE = 'meta.json'
+DEFAULT_CHUNKSIZE = 100_000
+_INT_TYPES = [np.int8, np.int16, np.int32, np.int64]
+_CODE_TYPES = [np.uint8, np.uint16, np.uint32]
+
+
+def _int_dtype(values):
+    lo, hi = (int(values.min()), int(values.max())) if len(values) else (0, 0)
+    for dtype in _INT_TYPES:
+        info = np.iinfo(dtype)
+        if info.min <= lo and hi <= info.max:
+            return np.dtype(dtype)
+    raise ValueError("Integer values out of int64 range")
+
+
+def _code_dtype(n_categories):
+    for dtype in _CODE_TYPES:
+        if n_categories <= np.iinfo(dtype).max + 1:
+            return np.dtype(dtype)
+    raise ValueError("Too many categories")
+
+
+class EmployeeStore:
+    def __init__(self, path, meta):
+        self.path = path
+        self.meta = meta
+        self._maps = {}
+
+    # ---- creating and appending -----------------------------------------
+
+    @classmethod
+    def create(cls, path, df):
+        os.makedirs(path, exist_ok=True)
+        if os.path.exists(os.path.join(path, META_FILE)):
+            raise FileExistsError(f"{path} already contains a store")
+        columns = []
+        for i, name in enumerate(df.columns):
+            series = df[name]
+            if pd.api.types.is_bool_dtype(series):
+                spec = {'dtype': 'bool'}
+            elif pd.api.types.is_integer_dtype(series):
+                spec = {'dtype': _int_dtype(series.to_numpy()).name}
+            elif pd.api.types.is_float_dtype(series):
+                spec = {'dtype': 'float64'}
+            else:
+                spec = {'dtype': 'uint8', 'categories': []}
+            columns.append({'name': name, 'file': f"col_{i:03d}.bin", **spec})
+        store = cls(path, {'version': 1, 'n_rows': 0, 'columns': columns})
+        store._write_meta()
+        store.append(df)
+        return store
+
+    @classmethod
+    def open(cls, path):
+        with open(os.path.join(path, META_FILE)) as f:
+            return cls(path, json.load(f))
+
+    @classmethod
+    def from_csv(cls, csv_path, path, chunksize=DEFAULT_CHUNKSIZE):
+        store = None
+        for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+            if store is None:
+                store = cls.create(path, chunk)
+            else:
+                store.append(chunk)
+        return store
+
+    def _write_meta(self):
+        tmp = os.path.join(self.path, f"{META_FILE}.tmp")
+        with open(tmp, 'w') as f:
+            json.dump(self.meta, f, indent=2)
+        os.replace(tmp, os.path.join(self.path, META_FILE))
+
+    def _file(self, spec):
+        return os.path.join(self.path, spec['file'])
+
+    # Rewrite a column file with a wider dtype
+    def _widen(self, spec, dtype):
+        old = self._raw(spec)
+        widened = np.array(old, dtype=dtype)
+        self._maps.pop(spec['name'], None)
+        del old
+        widened.tofile(self._file(spec))
+        spec['dtype'] = np.dtype(dtype).name
+        self._write_meta()
+
+    def _encode(self, spec, series):
+        if 'categories' in spec:
+            categories = spec['categories']
+            values = series.astype(str).to_numpy()
+            known = {c: i for i, c in enumerate(categories)}
+            for value in pd.unique(values):
+                if value not in known:
+                    known[value] = len(categories)
+                    categories.append(value)
+            dtype = _code_dtype(len(categories))
+            if dtype.itemsize > np.dtype(spec['dtype']).itemsize:
+                self._widen(spec, dtype)
+            codes = pd.Categorical(values, categories=categories).codes
+            return codes.astype(spec['dtype'])
+        if spec['dtype'] == 'bool':
+            return series.to_numpy(dtype=np.uint8)
+        if spec['dtype'] == 'float64':
+            return series.to_numpy(dtype=np.float64)
+        values = series.to_numpy()
+        if not np.all(values == np.round(values)):
+            raise ValueError(f"Column {spec['name']!r} is stored as integers; got fractional values")
+        needed = _int_dtype(values.astype(np.int64))
+        if needed.itemsize > np.dtype(spec['dtype']).itemsize:
+            self._widen(spec, needed)
+        return values.astype(spec['dtype'])
+
+    # Append rows (same columns as the store); visible to readers once meta.json is updated
+    def append(self, df):
+        names = [spec['name'] for spec in self.meta['columns']]
+        missing = [name for name in names if name not in df.columns]
+        if missing:
+            raise ValueError(f"Missing columns: {missing}")
+        n = self.meta['n_rows']
+        encoded = [self._encode(spec, df[spec['name']]) for spec in self.meta['columns']]
+        for spec, values in zip(self.meta['columns'], encoded):
+            path = self._file(spec)
+            with open(path, 'ab') as f:
+                # Drop bytes left behind by an interrupted append
+                f.truncate(n * self._dtype(spec).itemsize)
+                values.tofile(f)
+        self.meta['n_rows'] = n + len(df)
+        self._maps.clear()
+        self._write_meta()
+        return self
+
+    # ---- reading ----------------------------------------------------------
+
+    def __len__(self):
+        return self.meta['n_rows']
+
+    @property
+    def names(self):
+        return [spec['name'] for spec in self.meta['columns']]
+
+    def _spec(self, name):
+        for spec in self.meta['columns']:
+            if spec['name'] == name:
+                return spec
+        raise KeyError(f"No column {name!r} in {self.path}")
+
+    def _dtype(self, spec):
+        return np.dtype(np.uint8 if spec['dtype'] == 'bool' else spec['dtype'])
+
+    def _raw(self, spec):
+        name = spec['name']
+        if name not in self._maps:
+            n = self.meta['n_rows']
+            if n == 0:
+                self._maps[name] = np.empty(0, dtype=self._dtype(spec))
+            else:
+                self._maps[name] = np.memmap(self._file(spec), dtype=self._dtype(spec), mode='r', shape=(n,))
+        return self._maps[name]
+
+    # Memory-mapped values (codes for category columns), without copying
+    def column(self, name):
+        return self._raw(self._spec(name))
+
+    def categories(self, name):
+        return self._spec(name).get('categories')
+
+    def find(self, aliases):
+        for name in aliases:
+            if name in self.names:
+                return name
+        raise ValueError(f"Missing column, expected one of: {aliases}")
+
+    # Zero-copy {name: array} slices of `chunksize` rows: yields (first_row, columns)
+    def iter_chunks(self, columns=None, chunksize=DEFAULT_CHUNKSIZE):
+        arrays = {name: self.column(name) for name in (columns or self.names)}
+        for start in range(0, len(self), chunksize):
+            yield start, {name: values[start:start + chunksize] for name, values in arrays.items()}
+
+    # Decoded DataFrame of rows [start, stop) (category columns as pandas Categoricals)
+    def to_frame(self, columns=None, start=0, stop=None):
+        data = {}
+        for name in columns or self.names:
+            spec = self._spec(name)
+            values = self.column(name)[start:stop]
+            if 'categories' in spec:
+                data[name] = pd.Categorical.from_codes(values.astype(np.int64), spec['categories'])
+            elif spec['dtype'] == 'bool':
+                data[name] = values.astype(bool)
+            else:
+                data[name] = np.asarray(values)
+        return pd.DataFrame(data)
+
+    @property
+    def nbytes(self):
+        return sum(self._dtype(spec).itemsize for spec in self.meta['columns']) * len(self)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Columnar employee store.")
+    sub = parser.add_subparsers(dest='command', required=True)
+    create = sub.add_parser('import', help="Create a store from a CSV file")
+    create.add_argument('csv')
+    create.add_argument('store')
+    create.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE)
+    add = sub.add_parser('append', help="Append the rows of a CSV file")
+    add.add_argument('store')
+    add.add_argument('csv')
+    show = sub.add_parser('info')
+    show.add_argument('store')
+    args = parser.parse_args()
+
+    if args.command == 'import':
+        store = EmployeeStore.from_csv(args.csv, args.store, args.chunksize)
+    elif args.command == 'append':
+        store = EmployeeStore.open(args.store)
+        for chunk in pd.read_csv(args.csv, chunksize=DEFAULT_CHUNKSIZE):
+            store.append(chunk)
+    else:
+        store = EmployeeStore.open(args.store)
+    print(f"{args.store}: {len(store):,} rows, {store.nbytes / 2**20:.1f} MB")
+    for spec in store.meta['columns']:
+        extra = f"  {len(spec['categories'])} categories" if 'categories' in spec else ''
+        print(f"  {spec['name']!r:<26} {spec['dtype']:<8}{extra}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+# Precompiled feature encoder.
+#
+# Built once from dummy_columns.pkl and scaler.pkl, it writes the one-hot
+# layout and the MinMax transform straight into a NumPy row or matrix,
+# instead of get_dummies + column loop + reindex + scaler.transform.
+import joblib
+import numpy as np
+import pandas as pd
+
+NUMERIC_COLUMNS = [
+    'satisfaction_level',
+    'last_evaluation',
+    'number_project',
+    'average_montly_hours',
+    'time_spend_company',
+    'Work_accident',
+    'promotion_last_5years',
+]
+
+# Fixed category layout used in training (get_dummies with drop_first=True,
+# so 'IT' and 'high' are the base levels with no column of their own)
+DEPARTMENTS = ['IT', 'RandD', 'accounting', 'hr', 'management', 'marketing',
+               'product_mng', 'sales', 'support', 'technical']
+SALARIES = ['high', 'low', 'medium']
+
+# Column layout the models are trained on (the notebook's dummy_columns.pkl)
+TRAINING_COLUMNS = (NUMERIC_COLUMNS + [f"Departments _{c}" for c in DEPARTMENTS[1:]]
+                    + [f"salary_{c}" for c in SALARIES[1:]])
+
+# The HR dataset ships the department column with a trailing space
+DEPARTMENT_ALIASES = ['Departments ', 'Departments', 'department']
+SALARY_ALIASES = ['salary']
+
+
+# Input factor a training column belongs to ('department' / 'salary' for the dummies)
+def factor_name(column):
+    column = str(column)
+    if column.startswith('Departments'):
+        return 'department'
+    if column.startswith('salary'):
+        return 'salary'
+    return column
+
+
+def _find_column(df, aliases):
+    for name in aliases:
+        if name in df.columns:
+            return name
+    raise ValueError(f"Missing column, expected one of: {aliases}")
+
+
+class FeatureEncoder:
+    def __init__(self, dummy_columns, scaler=None):
+        self.columns = list(dummy_columns)
+        n = len(self.columns)
+        index = {col: i for i, col in enumerate(self.columns)}
+
+        if scaler is not None:
+            scale = np.asarray(scaler.scale_, dtype=np.float64)
+            offset = np.asarray(scaler.min_, dtype=np.float64)
+        else:
+            scale, offset = np.ones(n), np.zeros(n)
+
+        self.numeric_index = np.array([index[col] for col in NUMERIC_COLUMNS])
+        self.numeric_scale = scale[self.numeric_index]
+        self.numeric_offset = offset[self.numeric_index]
+
+        # Scaled value of every column when its raw value is 0 (the row template)
+        self.base = offset.copy()
+        # Scaled value of a one-hot column when it is set
+        self.hot = scale + offset
+
+        # Category -> column offset (-1 for the dropped base level)
+        self.department_offsets = {c: index.get(f"Departments _{c}", -1) for c in DEPARTMENTS}
+        self.salary_offsets = {c: index.get(f"salary_{c}", -1) for c in SALARIES}
+        self._department_lookup = np.array([self.department_offsets[c] for c in DEPARTMENTS])
+        self._salary_lookup = np.array([self.salary_offsets[c] for c in SALARIES])
+
+    @classmethod
+    def load(cls, columns_path='dummy_columns.pkl', scaler_path='scaler.pkl'):
+        scaler = joblib.load(scaler_path) if scaler_path else None
+        return cls(joblib.load(columns_path), scaler)
+
+    @property
+    def n_features(self):
+        return len(self.columns)
+
+    def _set_category(self, out, row, offsets, value, name):
+        try:
+            col = offsets[value]
+        except KeyError:
+            raise ValueError(f"Unknown {name} value: {value!r}") from None
+        if col >= 0:
+            out[row, col] = self.hot[col]
+
+    # Encode one employee into a (1, n_features) row; pass `out` to reuse a buffer
+    def encode_row(self, record, out=None):
+        if out is None:
+            out = np.empty((1, self.n_features), dtype=np.float64)
+        out[0] = self.base
+        values = np.fromiter((record[col] for col in NUMERIC_COLUMNS), dtype=np.float64,
+                             count=len(NUMERIC_COLUMNS))
+        out[0, self.numeric_index] = values * self.numeric_scale + self.numeric_offset
+        self._set_category(out, 0, self.department_offsets, record['department'], 'department')
+        self._set_category(out, 0, self.salary_offsets, record['salary'], 'salary')
+        return out
+
+    def _one_hot(self, out, values, categories, lookup, name):
+        codes = pd.Index(categories).get_indexer(values)
+        unknown = codes < 0
+        if unknown.any():
+            bad = sorted(set(pd.Series(values)[unknown].astype(str)))
+            raise ValueError(f"Unknown {name} values: {bad}")
+        self._set_codes(out, codes, lookup)
+
+    def _set_codes(self, out, codes, lookup):
+        cols = lookup[codes]
+        rows = np.flatnonzero(cols >= 0)
+        out[rows, cols[rows]] = self.hot[cols[rows]]
+
+    def _fill_numeric(self, out, columns):
+        out[:] = self.base
+        for j, col in enumerate(NUMERIC_COLUMNS):
+            out[:, self.numeric_index[j]] = (np.asarray(columns[col], dtype=np.float64)
+                                             * self.numeric_scale[j] + self.numeric_offset[j])
+
+    # Encode a raw employee frame into an (n_rows, n_features) matrix in one pass
+    def encode_frame(self, df, out=None, dtype=np.float64):
+        if out is None:
+            out = np.empty((len(df), self.n_features), dtype=dtype)
+        self._fill_numeric(out, df)
+        self._one_hot(out, df[_find_column(df, DEPARTMENT_ALIASES)].to_numpy(),
+                      DEPARTMENTS, self._department_lookup, 'department')
+        self._one_hot(out, df[_find_column(df, SALARY_ALIASES)].to_numpy(),
+                      SALARIES, self._salary_lookup, 'salary')
+        return out
+
+    # Encode columns whose department/salary are integer codes into the given
+    # category lists (e.g. EmployeeStore chunks), without decoding any strings
+    def encode_coded(self, columns, department_codes, department_categories,
+                     salary_codes, salary_categories, out=None, dtype=np.float64):
+        n = len(department_codes)
+        if out is None:
+            out = np.empty((n, self.n_features), dtype=dtype)
+        self._fill_numeric(out, columns)
+        for codes, categories, offsets, name in [
+                (department_codes, department_categories, self.department_offsets, 'department'),
+                (salary_codes, salary_categories, self.salary_offsets, 'salary')]:
+            # Unknown categories map to -2; only an error if a row actually uses one
+            lookup = np.array([offsets.get(c, -2) for c in categories])
+            codes = np.asarray(codes, dtype=np.intp)
+            if (lookup[codes] == -2).any():
+                unknown = [c for c in categories if c not in offsets]
+                raise ValueError(f"Unknown {name} values: {sorted(unknown)}")
+            self._set_codes(out, codes, lookup)
+        return out
@@ -0,0 +1,212 @@
+# Multi-model ensemble served from the models/ directory.
+#
+# Members are evaluated concurrently in a thread pool (XGBoost, LightGBM and
+# the sklearn/NumPy kernels release the GIL), combined by soft or hard voting
+# with optional per-model weights, and timed so slow members can be dropped
+# under a latency budget.
+import copy
+import glob
+import os
+import time
+import warnings
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import joblib
+import numpy as np
+
+from knn_index import KNNIndex
+from tree_engine import compile_or_native
+
+MODEL_DIR = 'models'
+MODEL_SUFFIX = '_model.pkl'
+RISK_THRESHOLD = 0.5
+LATENCY_WINDOW = 500
+
+# Members served from a compact index directory (inside model_dir) instead of
+# their pickle, once it has been built from the current pickle (see knn_index.py):
+# name -> (directory, load(directory), matches(directory, pickle path))
+INDEXED_MEMBERS = {'K-Nearest Neighbors': ('knn_index', KNNIndex.load, KNNIndex.matches)}
+
+
+# Member name -> pickle path, e.g. 'LightGBM' -> 'models/LightGBM_model.pkl'
+def available_members(model_dir=MODEL_DIR):
+    members = {}
+    for path in sorted(glob.glob(os.path.join(model_dir, f"*{MODEL_SUFFIX}"))):
+        name = os.path.basename(path)[:-len(MODEL_SUFFIX)]
+        members[name] = path
+    return members
+
+
+# Unpickled model, or None for a placeholder file with no pickle in it (e.g.
+# models/voting_model.pkl); any other load failure is raised with the path
+def load_model(path):
+    with open(path, 'rb') as f:
+        if not f.read(64).strip():
+            return None
+    try:
+        return joblib.load(path)
+    except Exception as exc:
+        raise RuntimeError(f"Could not load {path}: {exc}") from exc
+
+
+def _load_member(path, columns):
+    model = load_model(path)
+    if model is None or not hasattr(model, 'predict_proba'):
+        return None
+    return check_member(model, columns, path)
+
+
+# Per-member weight from the command line, e.g. 'XGBoost=2' -> ('XGBoost', 2.0)
+def member_weight(text):
+    name, sep, weight = text.rpartition('=')
+    if not sep or not name:
+        raise ValueError(f"Expected NAME=WEIGHT, got {text!r}")
+    return name, float(weight)
+
+
+# A loaded member ready to be fed encoded ndarrays (`source` names it in errors)
+def check_member(model, columns, source):
+    names = getattr(model, 'feature_names_in_', None)
+    if names is not None:
+        if list(names) != list(columns):
+            raise ValueError(f"{source} was trained on different columns than columns.pkl")
+        # Columns are checked once here; sklearn members are then fed the
+        # encoder's ndarray directly, without a per-call feature-name warning.
+        # The names are dropped from a shallow copy (the fitted arrays are
+        # shared), so the caller's model keeps its own column check
+        if 'feature_names_in_' in vars(model):
+            model = copy.copy(model)
+            del model.feature_names_in_
+    return model
+
+
+class Ensemble:
+    def __init__(self, members, weights=None, voting='soft', max_workers=None,
+                 threshold=RISK_THRESHOLD):
+        if not members:
+            raise ValueError("Ensemble needs at least one member")
+        if voting not in ('soft', 'hard'):
+            raise ValueError(f"voting must be 'soft' or 'hard', got {voting!r}")
+        self.members = dict(members)
+        weights = weights or {}
+        unknown = [name for name in weights if name not in self.members]
+        if unknown:
+            raise ValueError(f"Weights given for unknown members: {unknown}")
+        self.weights = np.array([float(weights.get(name, 1.0)) for name in self.members])
+        if (self.weights < 0).any() or not self.weights.sum() > 0:
+            raise ValueError("Member weights must be non-negative with a positive sum")
+        self.voting = voting
+        self.threshold = threshold
+        self.max_workers = max_workers or len(self.members)
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers) if len(self.members) > 1 else None
+        self.latency = {name: deque(maxlen=LATENCY_WINDOW) for name in self.members}
+
+    @classmethod
+    def load(cls, names=None, model_dir=MODEL_DIR, columns_path=None, use_indexes=True, **kwargs):
+        columns = joblib.load(columns_path or os.path.join(model_dir, 'columns.pkl'))
+        paths = available_members(model_dir)
+        if names is not None:
+            missing = [name for name in names if name not in paths]
+            if missing:
+                raise ValueError(f"Unknown ensemble members: {missing}")
+            paths = {name: paths[name] for name in names}
+        members = {}
+        for name, path in paths.items():
+            index_dir, load_index, index_matches = INDEXED_MEMBERS.get(name, (None, None, None))
+            if use_indexes and index_dir and os.path.isdir(os.path.join(model_dir, index_dir)):
+                index_dir = os.path.join(model_dir, index_dir)
+                if index_matches(index_dir, path):
+                    members[name] = load_index(index_dir)
+                    continue
+                warnings.warn(f"{index_dir} was built from another version of {path}; serving the "
+                              f"pickle until the index is rebuilt")
+            model = _load_member(path, columns)
+            if model is not None:
+                members[name] = model
+        ensemble = cls(members, **kwargs)
+        ensemble.columns = columns
+        return ensemble
+
+    @property
+    def names(self):
+        return list(self.members)
+
+    # `weights` overrides the current weight of the members it names (names
+    # outside `members` are ignored, like the current weights)
+    def _copy_with(self, members, voting=None, weights=None):
+        merged = {name: w for name, w in zip(self.members, self.weights) if name in members}
+        merged.update({name: w for name, w in (weights or {}).items() if name in members})
+        ensemble = Ensemble(members, merged, voting or self.voting, threshold=self.threshold)
+        ensemble.columns = getattr(self, 'columns', None)
+        return ensemble
+
+    def subset(self, names, voting=None, weights=None):
+        return self._copy_with({name: self.members[name] for name in names}, voting, weights)
+
+    # Same members with tree models swapped for the flattened-tree engine
+    def compiled(self):
+        return self._copy_with({name: compile_or_native(m) for name, m in self.members.items()})
+
+    def _run_member(self, name, X):
+        start = time.perf_counter()
+        prob = self.members[name].predict_proba(X)[:, 1]
+        self.latency[name].append(time.perf_counter() - start)
+        return prob
+
+    # Positive-class probability of every member (or of those in `names`), shape (n_rows, n_members)
+    def member_probabilities(self, X, names=None):
+        names = self.names if names is None else names
+        if self._pool is None or len(names) == 1:
+            return np.column_stack([self._run_member(name, X) for name in names])
+        futures = [self._pool.submit(self._run_member, name, X) for name in names]
+        return np.column_stack([f.result() for f in futures])
+
+    # Weighted mean probability and final label (soft: threshold the mean, hard: weighted majority)
+    def combine(self, probs):
+        avg_prob = probs @ self.weights / self.weights.sum()
+        if self.voting == 'soft':
+            labels = (avg_prob >= self.threshold).astype(np.int8)
+        else:
+            votes = (probs >= self.threshold) @ self.weights
+            labels = (votes * 2 > self.weights.sum()).astype(np.int8)
+        return avg_prob, labels
+
+    def score(self, X):
+        return self.combine(self.member_probabilities(X))
+
+    def predict_proba(self, X):
+        avg_prob, _ = self.score(X)
+        return np.column_stack([1.0 - avg_prob, avg_prob])
+
+    def predict(self, X):
+        return self.score(X)[1]
+
+    # Per-member latency in milliseconds over the recent window
+    def latency_summary(self):
+        summary = {}
+        for name, samples in self.latency.items():
+            if samples:
+                ms = np.array(samples) * 1e3
+                summary[name] = {'calls': len(ms), 'p50_ms': float(np.percentile(ms, 50)),
+                                 'p99_ms': float(np.percentile(ms, 99))}
+        return summary
+
+    def calibrate(self, X, repeat=20):
+        for _ in range(repeat):
+            self.member_probabilities(X)
+        return self.latency_summary()
+
+    # Members whose latency fits the budget (members run in parallel, so the
+    # slowest one bounds the ensemble); the fastest member is always kept
+    def names_within_budget(self, budget_ms, stat='p99_ms'):
+        summary = self.latency_summary()
+        if not summary:
+            raise ValueError("No latency samples yet; call calibrate() first")
+        keep = [name for name in self.members if summary.get(name, {}).get(stat, np.inf) <= budget_ms]
+        if not keep:
+            keep = [min(summary, key=lambda name: summary[name][stat])]
+        return keep
+
+    def within_budget(self, budget_ms, stat='p99_ms'):
+        return self.subset(self.names_within_budget(budget_ms, stat))
@@ -0,0 +1,129 @@
+# Timing spans and latency histograms for the app and the scoring service.
+#
+# `with span('predict.encode'):` times a block and records it in the histogram
+# of that name. Histograms have fixed log-spaced buckets (1 us to ~2 min, each
+# ~19% wide), so they take constant memory however many samples arrive, and
+# percentiles are read from the bucket counts (exact count, mean and max).
+# Names are dotted by area: load.<resource>, predict.*, batch.*, serve.*,
+# llm.<client>.*, monitor.*, render.<page>.
+#
+# The app shows them in a developer sidebar panel (CHURN_DEV_PANEL=1) and
+# serve.py under `spans` in /metrics. CHURN_INSTRUMENTATION=0 turns spans
+# into no-ops.
+import bisect
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+ENABLED_ENV = 'CHURN_INSTRUMENTATION'
+MIN_SECONDS = 1e-6
+BUCKETS_PER_DOUBLING = 4
+N_BUCKETS = 108
+# Upper bound of every bucket; the last one also takes anything slower
+BOUNDS = [MIN_SECONDS * 2 ** (i / BUCKETS_PER_DOUBLING) for i in range(1, N_BUCKETS + 1)]
+
+
+def enabled():
+    return os.environ.get(ENABLED_ENV, '1') != '0'
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * N_BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        bucket = min(bisect.bisect_left(BOUNDS, seconds), N_BUCKETS - 1)
+        with self._lock:
+            self.counts[bucket] += 1
+            self.count += 1
+            self.total += seconds
+            self.min = min(self.min, seconds)
+            self.max = max(self.max, seconds)
+
+    # Value below which a fraction q of the samples fall, interpolated inside
+    # its bucket and kept within the observed range
+    def quantile(self, q):
+        with self._lock:
+            counts, count, smallest, largest = list(self.counts), self.count, self.min, self.max
+        if not count:
+            return math.nan
+        rank = q * count
+        seen = 0
+        for bucket, n in enumerate(counts):
+            if n and seen + n >= rank:
+                lower = BOUNDS[bucket - 1] if bucket else 0.0
+                # The last bucket is open-ended: it reaches up to the largest sample
+                upper = max(BOUNDS[bucket], largest) if bucket == N_BUCKETS - 1 else BOUNDS[bucket]
+                value = lower + (upper - lower) * (rank - seen) / n
+                return min(max(value, smallest), largest)
+            seen += n
+        return largest
+
+    def summary(self):
+        p50, p95, p99 = (self.quantile(q) * 1e3 for q in (0.5, 0.95, 0.99))
+        return {'count': self.count, 'mean_ms': self.total / self.count * 1e3 if self.count else math.nan,
+                'p50_ms': p50, 'p95_ms': p95, 'p99_ms': p99, 'max_ms': self.max * 1e3,
+                'total_s': self.total}
+
+
+class Registry:
+    def __init__(self):
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name):
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(name, Histogram())
+        return histogram
+
+    def observe(self, name, seconds):
+        if enabled():
+            self.histogram(name).observe(seconds)
+
+    @contextmanager
+    def span(self, name):
+        if not enabled():
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.histogram(name).observe(time.perf_counter() - start)
+
+    # Decorator form of span()
+    def timed(self, name):
+        def decorator(fn):
+            def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return fn(*args, **kwargs)
+            wrapper.__name__, wrapper.__doc__ = fn.__name__, fn.__doc__
+            return wrapper
+        return decorator
+
+    # {name: summary} sorted by name
+    def snapshot(self):
+        with self._lock:
+            histograms = dict(self._histograms)
+        return {name: histograms[name].summary() for name in sorted(histograms)}
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+
+REGISTRY = Registry()
+span = REGISTRY.span
+timed = REGISTRY.timed
+observe = REGISTRY.observe
+snapshot = REGISTRY.snapshot
+reset = REGISTRY.reset
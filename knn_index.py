@@ -0,0 +1,255 @@
+# Compact, memory-mappable index for the K-Nearest Neighbors ensemble member.
+#
+# The sklearn pickle keeps all 14,000 SMOTE-resampled training rows as float64
+# and scans every one of them per query. Here the rows are partitioned by their
+# binary columns (department, salary, accident and promotion flags): inside a
+# partition those columns add the same constant to every squared distance, so
+# partitions are visited nearest-first and the search stops as soon as the k-th
+# best distance is below the next partition's constant. Only the continuous
+# columns are stored per row, as float32.
+#
+# Usage:
+#   python knn_index.py build                      # models/knn_index/ from the pickle
+#   python knn_index.py verify --data HR_Dataset.csv
+#   python knn_index.py verify --synthetic 50000
+import argparse
+import hashlib
+import json
+import os
+import time
+import warnings
+
+import joblib
+import numpy as np
+
+KNN_MODEL_PATH = 'models/K-Nearest Neighbors_model.pkl'
+KNN_INDEX_DIR = 'models/knn_index'
+_ARRAYS = ['points', 'labels', 'source_index', 'cell_patterns', 'cell_offsets']
+# Work arrays are limited to about this many float64 elements per block of query rows
+BLOCK_ELEMENTS = 2_000_000
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class KNNIndex:
+    def __init__(self, points, labels, source_index, cell_patterns, cell_offsets, meta):
+        self.points = points                # (n, n_numeric) float32, rows grouped by cell
+        self.labels = labels                # (n,) class index per row
+        self.source_index = source_index    # (n,) row position in the original training set
+        self.cell_patterns = cell_patterns  # (n_cells, n_binary) binary values of each cell
+        self.cell_offsets = cell_offsets    # (n_cells + 1,) row range of each cell
+        self.meta = meta
+        self.k = meta['n_neighbors']
+        self.numeric_columns = np.array(meta['numeric_columns'])
+        self.binary_columns = np.array(meta['binary_columns'])
+        self.classes_ = np.array(meta['classes'])
+        self._cell_sq = (cell_patterns.astype(np.float64) ** 2).sum(axis=1)
+        # Per query row, a cell search holds its differences to every point of
+        # the cell plus the candidate distances and positions
+        largest_cell = int(np.diff(cell_offsets).max()) if len(cell_offsets) > 1 else 0
+        self._block_rows = max(1, BLOCK_ELEMENTS // ((largest_cell + self.k) * (points.shape[1] + 3)))
+
+    @classmethod
+    def from_model(cls, model, source_path=None):
+        if model.effective_metric_ != 'euclidean' or model.weights != 'uniform':
+            raise TypeError("Only uniform-weight euclidean KNN models can be indexed")
+        X = np.asarray(model._fit_X, dtype=np.float64)
+        binary = np.all((X == 0) | (X == 1), axis=0)
+        numeric_columns = np.flatnonzero(~binary)
+        binary_columns = np.flatnonzero(binary)
+
+        patterns, cell_of_row = np.unique(X[:, binary_columns].astype(np.uint8), axis=0,
+                                          return_inverse=True)
+        cell_of_row = cell_of_row.ravel()
+        order = np.argsort(cell_of_row, kind='stable')
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(cell_of_row, minlength=len(patterns)))])
+
+        meta = {
+            'n_neighbors': int(model.n_neighbors),
+            'n_features': int(X.shape[1]),
+            'numeric_columns': numeric_columns.tolist(),
+            'binary_columns': binary_columns.tolist(),
+            'classes': model.classes_.tolist(),
+            'source': source_path,
+            'source_sha256': _file_sha256(source_path) if source_path else None,
+        }
+        return cls(X[order][:, numeric_columns].astype(np.float32),
+                   model._y[order].astype(np.uint8),
+                   order.astype(np.int32),
+                   patterns,
+                   offsets.astype(np.int64),
+                   meta)
+
+    def save(self, directory=KNN_INDEX_DIR):
+        os.makedirs(directory, exist_ok=True)
+        for name in _ARRAYS:
+            np.save(os.path.join(directory, f"{name}.npy"), getattr(self, name))
+        with open(os.path.join(directory, 'meta.json'), 'w') as f:
+            json.dump(self.meta, f, indent=2)
+
+    @classmethod
+    def load(cls, directory=KNN_INDEX_DIR, mmap=True):
+        mode = 'r' if mmap else None
+        arrays = [np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mode) for name in _ARRAYS]
+        with open(os.path.join(directory, 'meta.json')) as f:
+            meta = json.load(f)
+        return cls(*arrays, meta)
+
+    # Whether the index in `directory` was built from the pickle at `model_path`
+    # as it is now (a retrained or updated pickle leaves the index stale)
+    @staticmethod
+    def matches(directory, model_path):
+        with open(os.path.join(directory, 'meta.json')) as f:
+            built_from = json.load(f).get('source_sha256')
+        return built_from is not None and built_from == _file_sha256(model_path)
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in _ARRAYS)
+
+    # Squared distance contributed by the binary columns, per (query pattern, cell)
+    def _cell_distances(self, patterns):
+        cross = patterns @ self.cell_patterns.T.astype(np.float64)
+        return (patterns ** 2).sum(axis=1)[:, None] - 2 * cross + self._cell_sq[None, :]
+
+    def _search_group(self, q, cell_dist, k):
+        m = q.shape[0]
+        best_d = np.full((m, k), np.inf)
+        best_i = np.full((m, k), -1, dtype=np.int64)
+        for cell in np.argsort(cell_dist, kind='stable'):
+            bound = cell_dist[cell]
+            if np.all(best_d[:, -1] < bound):
+                break
+            lo, hi = self.cell_offsets[cell], self.cell_offsets[cell + 1]
+            diff = q[:, None, :] - self.points[lo:hi].astype(np.float64)[None, :, :]
+            d = np.einsum('ijk,ijk->ij', diff, diff) + bound
+            cand_d = np.hstack([best_d, d])
+            cand_i = np.hstack([best_i, np.broadcast_to(np.arange(lo, hi), d.shape)])
+            top = np.argpartition(cand_d, k - 1, axis=1)[:, :k]
+            top_d = np.take_along_axis(cand_d, top, axis=1)
+            order = np.argsort(top_d, axis=1, kind='stable')
+            best_d = np.take_along_axis(top_d, order, axis=1)
+            best_i = np.take_along_axis(np.take_along_axis(cand_i, top, axis=1), order, axis=1)
+        return best_d, best_i
+
+    # Squared distances and index row positions of the k nearest neighbours
+    def _neighbors(self, X, k):
+        X = np.asarray(X, dtype=np.float64).reshape(-1, self.meta['n_features'])
+        numeric = X[:, self.numeric_columns]
+        patterns, group = np.unique(X[:, self.binary_columns], axis=0, return_inverse=True)
+        group = group.ravel()
+        cell_dist = self._cell_distances(patterns)
+
+        dist = np.empty((X.shape[0], k))
+        rows = np.empty((X.shape[0], k), dtype=np.int64)
+        block_rows = max(1, self._block_rows * self.k // k)
+        for g in range(len(patterns)):
+            in_group = np.flatnonzero(group == g)
+            for start in range(0, len(in_group), block_rows):
+                members = in_group[start:start + block_rows]
+                d, i = self._search_group(numeric[members], cell_dist[g], k)
+                dist[members] = d
+                rows[members] = i
+        return dist, rows
+
+    # Exact k nearest neighbours: (distances, row positions in the original training set)
+    def kneighbors(self, X, n_neighbors=None):
+        dist, rows = self._neighbors(X, n_neighbors or self.k)
+        return np.sqrt(np.maximum(dist, 0.0)), np.asarray(self.source_index)[rows]
+
+    def predict_proba(self, X):
+        _, rows = self._neighbors(X, self.k)
+        labels = np.asarray(self.labels)[rows]
+        return np.stack([(labels == c).mean(axis=1) for c in range(len(self.classes_))], axis=1)
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+
+def build(model_path=KNN_MODEL_PATH, directory=KNN_INDEX_DIR):
+    index = KNNIndex.from_model(joblib.load(model_path), model_path)
+    index.save(directory)
+    return index
+
+
+def _rss_mb():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS'):
+                return int(line.split()[1]) / 1024
+    return float('nan')
+
+
+def _test_matrix(args):
+    if args.data:
+        from dataset import apply_scaler, notebook_split, read_hr_dataset
+        _, X_test, _, _ = notebook_split(read_hr_dataset(args.data))
+        return apply_scaler(X_test, joblib.load('scaler.pkl')), "notebook test split"
+    from benchmarks.common import synthetic_employees
+    from encoder import FeatureEncoder
+    return FeatureEncoder.load().encode_frame(synthetic_employees(args.synthetic)), \
+        f"{args.synthetic:,} synthetic rows"
+
+
+def verify(args):
+    X, label = _test_matrix(args)
+
+    rss = _rss_mb()
+    start = time.perf_counter()
+    model = joblib.load(KNN_MODEL_PATH)
+    pickle_load = time.perf_counter() - start
+    pickle_rss = _rss_mb() - rss
+    pickle_bytes = model._fit_X.nbytes + model._y.nbytes
+
+    rss = _rss_mb()
+    start = time.perf_counter()
+    index = KNNIndex.load()
+    index_load = time.perf_counter() - start
+    index_rss = _rss_mb() - rss
+
+    with warnings.catch_warnings():
+        # The pickle was fitted on a DataFrame; it is fed the same ndarray as the index
+        warnings.simplefilter('ignore', UserWarning)
+        start = time.perf_counter()
+        expected = model.predict_proba(X)
+        native_time = time.perf_counter() - start
+    start = time.perf_counter()
+    got = index.predict_proba(X)
+    index_time = time.perf_counter() - start
+
+    mismatched = int((expected.argmax(axis=1) != got.argmax(axis=1)).sum())
+    print(f"Checked on {label}")
+    print(f"  prediction mismatches: {mismatched} / {len(X)}"
+          f"   max |proba diff|: {np.abs(expected - got).max():.3f}")
+    print(f"  sklearn pickle: load {pickle_load * 1e3:7.1f} ms   +RSS after load {pickle_rss:5.1f} MB"
+          f"   arrays {pickle_bytes / 1024:6.0f} KB   {len(X) / native_time:>9,.0f} rows/s")
+    print(f"  knn_index:      load {index_load * 1e3:7.1f} ms   +RSS after load {index_rss:5.1f} MB"
+          f"   arrays {index.nbytes / 1024:6.0f} KB   {len(X) / index_time:>9,.0f} rows/s")
+    return mismatched
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or verify the compact KNN index.")
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('build')
+    check = sub.add_parser('verify')
+    check.add_argument('--data', help="HR_Dataset.csv, to check on the notebook's test split")
+    check.add_argument('--synthetic', type=int, default=50_000)
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        index = build()
+        print(f"Wrote {KNN_INDEX_DIR} ({index.nbytes / 1024:.0f} KB, "
+              f"{len(index.cell_patterns)} partitions)")
+    else:
+        raise SystemExit(1 if verify(args) else 0)
+
+
+if __name__ == "__main__":
+    main()
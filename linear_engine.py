@@ -0,0 +1,137 @@
+# Compiled Logistic Regression inference with the scaler folded in.
+#
+# The Logistic Regression member scores the MinMax-scaled training layout,
+# p = sigmoid(w . (x * scale + min) + b). Folding scaler.pkl into the model
+# gives one weight vector and bias over the unscaled layout (raw numeric
+# inputs, 0/1 one-hot columns):
+#   w' = w * scale,   b' = b + w . min
+# so a float32 matrix is scored with a single matrix-vector product, without
+# sklearn's per-call input validation or a separate scaling pass. Without a
+# scaler the model is compiled as is, over the scaled layout (what
+# Ensemble.compiled() uses for the dashboard).
+#
+# Bulk rescoring streams a CSV/Parquet file or employee store chunk by chunk
+# (bounded memory), after checking the fused model against sklearn on the
+# first rows:
+#   python linear_engine.py employees.csv -o scored.csv
+#   python linear_engine.py hr_store -o scored.parquet --chunksize 500000
+import argparse
+import os
+import sys
+
+import joblib
+import numpy as np
+from scipy.special import expit
+
+DEFAULT_CHECK_ROWS = 10_000
+# Largest |fused - sklearn| probability accepted on the check rows
+DEFAULT_TOLERANCE = 1e-4
+
+
+class CompiledLinear:
+    def __init__(self, weights, bias, dtype=np.float32, name=None):
+        self.dtype = np.dtype(dtype)
+        # Precision the inputs are scored in (scoring.py encodes straight into it)
+        self.input_dtype = self.dtype
+        self.weights = np.ascontiguousarray(weights, dtype=self.dtype)
+        self.bias = self.dtype.type(bias)
+        self.name = name
+        self.classes_ = np.array([0, 1])
+
+    # Weights of a binary LogisticRegression, with `scaler` (MinMaxScaler) folded in when given
+    @classmethod
+    def from_model(cls, model, scaler=None, dtype=np.float32):
+        coef = np.asarray(model.coef_, dtype=np.float64)
+        if coef.shape[0] != 1:
+            raise TypeError(f"Cannot compile a {coef.shape[0]}-class {type(model).__name__}")
+        weights, bias = coef[0], float(model.intercept_[0])
+        if scaler is not None:
+            bias += float(weights @ np.asarray(scaler.min_, dtype=np.float64))
+            weights = weights * np.asarray(scaler.scale_, dtype=np.float64)
+        return cls(weights, bias, dtype, name='logistic_regression')
+
+    @property
+    def n_features(self):
+        return len(self.weights)
+
+    def decision_function(self, X):
+        X = np.asarray(X, dtype=self.dtype)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        return X @ self.weights + self.bias
+
+    def predict_positive(self, X):
+        return expit(self.decision_function(X))
+
+    def predict_proba(self, X):
+        p = self.predict_positive(X)
+        return np.column_stack([1.0 - p, p])
+
+    def predict(self, X):
+        return (self.predict_positive(X) >= 0.5).astype(np.int64)
+
+
+def compile_linear(model, scaler=None, dtype=np.float32):
+    if type(model).__name__ != 'LogisticRegression':
+        raise TypeError(f"Cannot compile {type(model).__name__}")
+    return CompiledLinear.from_model(model, scaler, dtype)
+
+
+# Largest |fused - sklearn| probability and the number of differing labels on a
+# frame of raw employees (sklearn scores the scaled layout, the fused model the raw one)
+def check_fused(fused, model, scaler, columns, df):
+    from encoder import FeatureEncoder
+
+    expected = model.predict_proba(FeatureEncoder(columns, scaler).encode_frame(df))[:, 1]
+    got = fused.predict_positive(FeatureEncoder(columns).encode_frame(df, dtype=fused.dtype))
+    return float(np.abs(got - expected).max()), int(((got >= 0.5) != (expected >= 0.5)).sum())
+
+
+def _head(path, rows):
+    import scoring
+    from employee_store import EmployeeStore
+
+    if os.path.isdir(path):
+        store = EmployeeStore.open(path)
+        return store.to_frame(stop=min(rows, len(store)))
+    return next(scoring._iter_chunks(path, rows))
+
+
+def main():
+    import scoring
+    from encoder import FeatureEncoder
+    from ensemble import MODEL_DIR, check_member
+
+    parser = argparse.ArgumentParser(description="Bulk scoring with the fused scaler + Logistic Regression model.")
+    parser.add_argument('input', help="CSV or Parquet file (or employee_store.py directory) with employee records")
+    parser.add_argument('-o', '--output', help="Output file (default: <input>_scored.<ext>)")
+    parser.add_argument('--model', default=os.path.join(MODEL_DIR, 'Logistic Regression_model.pkl'))
+    parser.add_argument('--columns', default='dummy_columns.pkl')
+    parser.add_argument('--scaler', default='scaler.pkl')
+    parser.add_argument('--chunksize', type=int, default=scoring.DEFAULT_CHUNKSIZE)
+    parser.add_argument('--dtype', choices=['float32', 'float64'], default='float32')
+    parser.add_argument('--check-rows', type=int, default=DEFAULT_CHECK_ROWS,
+                        help="Rows scored with sklearn too before streaming (0 to skip)")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args()
+
+    root, ext = os.path.splitext(args.input.rstrip('/'))
+    output = args.output or f"{root}_scored{ext or '.csv'}"
+    columns = joblib.load(args.columns)
+    model = check_member(joblib.load(args.model), columns, args.model)
+    scaler = joblib.load(args.scaler)
+    fused = compile_linear(model, scaler, args.dtype)
+
+    if args.check_rows:
+        error, flipped = check_fused(fused, model, scaler, columns, _head(args.input, args.check_rows))
+        print(f"Fused model vs sklearn on the first {args.check_rows:,} rows: max |error| {error:.1e}, "
+              f"{flipped} labels differ")
+        if error > args.tolerance:
+            sys.exit(f"Fused model differs from {args.model} by {error:.1e} (> --tolerance {args.tolerance:g})")
+
+    rows, elapsed = scoring.score_file(args.input, output, [fused], FeatureEncoder(columns), args.chunksize)
+    print(f"Scored {rows:,} rows in {elapsed:.2f}s ({rows / max(elapsed, 1e-9):,.0f} rows/sec) -> {output}")
+
+
+if __name__ == "__main__":
+    main()
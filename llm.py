@@ -0,0 +1,255 @@
+# LLM access for the Report Generator and Chatbot.
+#
+# A backend turns a prompt (a string, or a list of {'role', 'parts'} chat
+# messages) into a stream of text chunks:
+#   GeminiBackend   google.generativeai GenerativeModel, streamed
+#   StubBackend     deterministic offline responses with injected latency, for
+#                   tests and time-to-first-token benchmarks
+# LLMClient wraps a backend with a per-request timeout, retries with backoff
+# (only before the first chunk arrives), and a ResponseCache keyed on the hash
+# of the backend, model and prompt, optionally persisted to SQLite. Time to
+# first chunk and total time are recorded as llm.<name>.first_chunk/.total
+# (llm.<name>.cached for cache hits, see instrumentation.py).
+#
+# Select the backend with CHURN_LLM_BACKEND=gemini|stub (see resources.py).
+import hashlib
+import json
+import queue
+import random
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import instrumentation
+
+DEFAULT_TIMEOUT = 60.0
+DEFAULT_RETRIES = 2
+DEFAULT_BACKOFF = 1.0
+# Rough token count: ~4 characters per token for English text
+CHARS_PER_TOKEN = 4
+_DONE = object()
+
+
+class LLMError(RuntimeError):
+    pass
+
+
+class GeminiBackend:
+    name = 'gemini'
+
+    def __init__(self, model):
+        self.model = model
+        self.model_name = getattr(model, 'model_name', '')
+
+    def stream(self, prompt, timeout=DEFAULT_TIMEOUT):
+        response = self.model.generate_content(prompt, stream=True,
+                                               request_options={'timeout': timeout})
+        for chunk in response:
+            text = chunk.text
+            if text:
+                yield text
+
+
+_STUB_SECTIONS = ['Risk analysis summary', 'Key contributing factors', 'Recommended retention strategies',
+                  'Development opportunities', 'Management suggestions']
+_STUB_WORDS = ['employee', 'retention', 'workload', 'recognition', 'career', 'growth', 'feedback',
+               'manager', 'compensation', 'balance', 'engagement', 'training', 'team', 'review',
+               'mentoring', 'promotion', 'flexibility', 'goals', 'support', 'satisfaction']
+
+
+# Offline backend: the same prompt always yields the same text, delivered after
+# first_token_ms (plus prefill_ms per 1k prompt tokens) and then one word every
+# token_ms. Reports come back as sections, chat prompts (message lists) as a
+# short reply. fail_first makes the first N calls raise, to exercise retries.
+class StubBackend:
+    name = 'stub'
+
+    def __init__(self, first_token_ms=300.0, token_ms=5.0, words=120, fail_first=0,
+                 model_name='stub', prefill_ms=0.0):
+        self.first_token = first_token_ms / 1e3
+        self.token = token_ms / 1e3
+        self.prefill = prefill_ms / 1e3
+        self.words = words
+        self.model_name = model_name
+        self._failures = fail_first
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def response_text(self, prompt):
+        rng = random.Random(prompt_hash(prompt))
+        if not isinstance(prompt, str):
+            return ' '.join(rng.choice(_STUB_WORDS) for _ in range(self.words)).capitalize() + '.'
+        per_section = max(1, self.words // len(_STUB_SECTIONS))
+        sections = []
+        for i, title in enumerate(_STUB_SECTIONS, 1):
+            body = ' '.join(rng.choice(_STUB_WORDS) for _ in range(per_section))
+            sections.append(f"### {i}. {title}\n{body.capitalize()}.")
+        return '\n\n'.join(sections)
+
+    def stream(self, prompt, timeout=DEFAULT_TIMEOUT):
+        with self._lock:
+            self.calls += 1
+            fail = self._failures > 0
+            self._failures -= int(fail)
+        time.sleep(self.first_token + self.prefill * estimate_tokens(prompt) / 1000)
+        if fail:
+            raise LLMError("Stub backend: injected failure")
+        words = self.response_text(prompt).split(' ')
+        for i, word in enumerate(words):
+            if i:
+                time.sleep(self.token)
+            yield word if i == len(words) - 1 else word + ' '
+
+
+def prompt_text(prompt):
+    if isinstance(prompt, str):
+        return prompt
+    return '\n'.join(part for message in prompt for part in message['parts'])
+
+
+def estimate_tokens(prompt):
+    return len(prompt_text(prompt)) // CHARS_PER_TOKEN + 1
+
+
+def prompt_hash(prompt, *parts):
+    text = prompt if isinstance(prompt, str) else json.dumps(prompt, sort_keys=True, default=str)
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode())
+        digest.update(b'\0')
+    digest.update(text.encode())
+    return digest.hexdigest()
+
+
+# LRU of full responses by prompt hash, with an optional SQLite store behind it
+class ResponseCache:
+    def __init__(self, max_entries=256, store_path=None):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._db = None
+        if store_path:
+            self._db = sqlite3.connect(store_path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS responses "
+                             "(key TEXT PRIMARY KEY, text TEXT, created REAL)")
+            self._db.commit()
+
+    def get(self, key):
+        with self._lock:
+            text = self._entries.get(key)
+            if text is None and self._db is not None:
+                row = self._db.execute("SELECT text FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    text = row[0]
+                    self._insert(key, text)
+            if text is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return text
+
+    def _insert(self, key, text):
+        self._entries[key] = text
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def put(self, key, text):
+        with self._lock:
+            self._insert(key, text)
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?)",
+                                 (key, text, time.time()))
+                self._db.commit()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0}
+
+
+class LLMClient:
+    def __init__(self, backend, cache=None, timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES,
+                 backoff=DEFAULT_BACKOFF, name='llm'):
+        self.backend = backend
+        self.name = name
+        self.cache = cache
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+
+    def key(self, prompt):
+        return prompt_hash(prompt, self.backend.name, self.backend.model_name)
+
+    # Runs the backend stream in a thread so both the first chunk and the whole
+    # response are bounded by the timeout
+    def _stream_once(self, prompt, deadline):
+        chunks = queue.Queue()
+
+        def produce():
+            try:
+                for chunk in self.backend.stream(prompt, timeout=self.timeout):
+                    chunks.put(chunk)
+                chunks.put(_DONE)
+            except Exception as e:
+                chunks.put(e)
+
+        threading.Thread(target=produce, name='llm-stream', daemon=True).start()
+        while True:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = chunks.get(timeout=max(remaining, 0.0))
+            except queue.Empty:
+                raise TimeoutError(f"No response within {self.timeout:g}s") from None
+            if item is _DONE:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+    # Yields the response text chunk by chunk. A `timing` dict passed in is
+    # filled with this request's time to first chunk, total time, attempts and
+    # whether it was cached (the client is shared, so it keeps no per-request state)
+    def stream(self, prompt, use_cache=True, timing=None):
+        timing = {} if timing is None else timing
+        start = time.perf_counter()
+        key = self.key(prompt)
+        if use_cache and self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                elapsed = time.perf_counter() - start
+                timing.update(ttft_s=elapsed, total_s=elapsed, cached=True, attempts=0)
+                instrumentation.observe(f"llm.{self.name}.cached", elapsed)
+                yield cached
+                return
+
+        for attempt in range(self.retries + 1):
+            parts = []
+            first = None
+            try:
+                for chunk in self._stream_once(prompt, time.perf_counter() + self.timeout):
+                    if first is None:
+                        first = time.perf_counter() - start
+                    parts.append(chunk)
+                    yield chunk
+                break
+            except Exception as e:
+                # Text already shown cannot be taken back, so only retry before the first chunk
+                if parts or attempt == self.retries:
+                    raise LLMError(f"{self.backend.name} request failed: {e}") from e
+                time.sleep(self.backoff * 2 ** attempt)
+
+        text = ''.join(parts)
+        timing.update(ttft_s=first, total_s=time.perf_counter() - start, cached=False, attempts=attempt + 1)
+        if first is not None:
+            instrumentation.observe(f"llm.{self.name}.first_chunk", first)
+        instrumentation.observe(f"llm.{self.name}.total", timing['total_s'])
+        if self.cache is not None and text:
+            self.cache.put(key, text)
+
+    def generate(self, prompt, use_cache=True, timing=None):
+        return ''.join(self.stream(prompt, use_cache, timing))
@@ -0,0 +1,443 @@
+# Drift monitoring of the employee profiles scored on the Prediction Dashboard.
+#
+# Every assessment is appended to an append-only log (<dir>/predictions.log:
+# fixed-size binary records of time, raw inputs, predicted probability and
+# label). Reports never rescan the log: a DriftMonitor folds only the records
+# appended since its last refresh into streaming sketches, fixed-bin
+# histograms of every input and of the probability (plus sums for means), so
+# memory stays constant however long the log grows. Sketches are kept for all
+# time and for each of the last WINDOW_DAYS days, and saved with the number of
+# log records they cover (<dir>/sketches.npz).
+#
+# Drift is measured against a training baseline sketch (<dir>/baseline.npz)
+# built from the HR dataset with the same bins: the population stability index
+# per feature (PSI >= 0.1 moderate, >= 0.25 significant) and, for ordered
+# features, the KS distance between the binned distributions.
+#
+# Usage:
+#   python monitoring.py baseline HR_Dataset.csv      # inputs + the default ensemble's probabilities
+#   python monitoring.py report --days 7
+import argparse
+import json
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from dataset import drop_duplicate_profiles, read_hr_dataset
+from encoder import DEPARTMENT_ALIASES, DEPARTMENTS, NUMERIC_COLUMNS, SALARIES
+from instrumentation import span
+
+MONITOR_DIR = 'monitoring'
+LOG_FILE = 'predictions.log'
+SKETCH_FILE = 'sketches.npz'
+BASELINE_FILE = 'baseline.npz'
+LOG_MAGIC = b'CHURNLOG1\n'
+# Magic plus random bytes identifying this log, so sketches of a replaced log are discarded
+LOG_HEADER_SIZE = 16
+LOG_DTYPE = np.dtype([
+    ('time', '<f8'),
+    ('satisfaction_level', '<f4'),
+    ('last_evaluation', '<f4'),
+    ('number_project', '<f4'),
+    ('average_montly_hours', '<f4'),
+    ('time_spend_company', '<f4'),
+    ('Work_accident', 'i1'),
+    ('promotion_last_5years', 'i1'),
+    ('department', 'i1'),
+    ('salary', 'i1'),
+    ('probability', '<f4'),
+    ('prediction', 'i1'),
+])
+# Records folded per read, so a long unread tail is still read in bounded memory
+CHUNK_RECORDS = 65_536
+WINDOW_DAYS = 30
+PSI_MODERATE = 0.1
+PSI_SIGNIFICANT = 0.25
+# Bin shares are floored at this before taking the PSI log ratio
+PSI_FLOOR = 1e-4
+# Fewer live records than this are reported as insufficient data
+MIN_SAMPLES = 30
+
+# Ordered features: bin edges (values outside fall into the end bins).
+# Integer inputs get one bin per value.
+ORDERED = {
+    'satisfaction_level': np.linspace(0, 1, 21),
+    'last_evaluation': np.linspace(0, 1, 21),
+    'number_project': np.arange(0.5, 11),
+    'average_montly_hours': np.arange(50, 410, 10),
+    'time_spend_company': np.arange(0.5, 21),
+    'probability': np.linspace(0, 1, 21),
+}
+# Categorical features: category names by code (any other code counts as 'other')
+CATEGORICAL = {
+    'department': DEPARTMENTS + ['other'],
+    'salary': SALARIES + ['other'],
+    'Work_accident': ['No', 'Yes'],
+    'promotion_last_5years': ['No', 'Yes'],
+}
+FEATURES = list(ORDERED) + list(CATEGORICAL)
+_SIZES = [len(ORDERED[name]) - 1 if name in ORDERED else len(CATEGORICAL[name]) for name in FEATURES]
+_OFFSETS = dict(zip(FEATURES, np.cumsum([0] + _SIZES)))
+N_BINS = sum(_SIZES)
+
+
+def _bins(name):
+    return slice(_OFFSETS[name], _OFFSETS[name] + _SIZES[FEATURES.index(name)])
+
+
+def bin_labels(name):
+    if name in CATEGORICAL:
+        return CATEGORICAL[name]
+    edges = ORDERED[name]
+    if edges[0] % 1 == 0.5:
+        return [f"{lo + 0.5:g}" for lo in edges[:-1]]
+    return [f"{lo:g}-{hi:g}" for lo, hi in zip(edges[:-1], edges[1:])]
+
+
+# Flat bin index of every record and feature, -1 where the value is missing (NaN probability)
+def _bin_indices(records):
+    columns = []
+    for name in FEATURES:
+        values = records[name]
+        if name in ORDERED:
+            edges = ORDERED[name]
+            index = np.clip(np.searchsorted(edges, values, side='right') - 1, 0, len(edges) - 2)
+            index = np.where(np.isnan(values), -1, index + _OFFSETS[name])
+        else:
+            size = len(CATEGORICAL[name])
+            codes = values.astype(np.int64)
+            index = np.where((codes >= 0) & (codes < size - 1), codes, size - 1) + _OFFSETS[name]
+        columns.append(index)
+    return np.column_stack(columns)
+
+
+def _ordered_values(records):
+    return np.column_stack([records[name].astype(np.float64) for name in ORDERED])
+
+
+# Add records to (n_groups, N_BINS) counts and (n_groups, len(ORDERED), 3)
+# moments in place, record i going to group[i]
+def _accumulate(counts, moments, group, index, values):
+    n_groups = len(counts)
+    flat = (group[:, None] * N_BINS + index)[index >= 0]
+    counts += np.bincount(flat, minlength=n_groups * N_BINS).reshape(n_groups, N_BINS)
+    for j in range(values.shape[1]):
+        valid = ~np.isnan(values[:, j])
+        g, v = group[valid], values[valid, j]
+        moments[:, j] += np.column_stack([np.bincount(g, minlength=n_groups),
+                                          np.bincount(g, weights=v, minlength=n_groups),
+                                          np.bincount(g, weights=v * v, minlength=n_groups)])
+
+
+# Bin counts plus (count, sum, sum of squares) of every ordered feature
+class Sketch:
+    def __init__(self, counts=None, moments=None):
+        self.counts = np.zeros(N_BINS, dtype=np.int64) if counts is None else counts
+        self.moments = np.zeros((len(ORDERED), 3)) if moments is None else moments
+
+    def update(self, records):
+        _accumulate(self.counts[None], self.moments[None], np.zeros(len(records), dtype=np.intp),
+                    _bin_indices(records), _ordered_values(records))
+        return self
+
+    def count(self, name):
+        return int(self.counts[_bins(name)].sum())
+
+    @property
+    def n(self):
+        return self.count(FEATURES[0])
+
+    def histogram(self, name):
+        return self.counts[_bins(name)]
+
+    def shares(self, name):
+        counts = self.histogram(name)
+        return counts / counts.sum() if counts.sum() else np.zeros(len(counts))
+
+    def mean(self, name):
+        n, total, _ = self.moments[list(ORDERED).index(name)]
+        return total / n if n else float('nan')
+
+    # Value below which a fraction q of the samples fall, interpolated inside its bin
+    def quantile(self, name, q):
+        counts, edges = self.histogram(name), ORDERED[name]
+        if not counts.sum():
+            return float('nan')
+        cumulative = np.cumsum(counts) / counts.sum()
+        bucket = int(np.searchsorted(cumulative, q))
+        below = cumulative[bucket - 1] if bucket else 0.0
+        inside = (q - below) / (cumulative[bucket] - below) if cumulative[bucket] > below else 0.0
+        return float(edges[bucket] + (edges[bucket + 1] - edges[bucket]) * inside)
+
+
+def population_stability_index(expected, actual):
+    expected, actual = np.maximum(expected, PSI_FLOOR), np.maximum(actual, PSI_FLOOR)
+    return float(((actual - expected) * np.log(actual / expected)).sum())
+
+
+# Largest gap between the two cumulative distributions, over the bin edges
+def ks_distance(expected, actual):
+    return float(np.abs(np.cumsum(expected) - np.cumsum(actual)).max())
+
+
+# KS distance above which the two samples differ at the 5% level
+def ks_critical(n, m):
+    return 1.358 * np.sqrt((n + m) / (n * m)) if n and m else float('nan')
+
+
+def drift_status(psi, n):
+    if n < MIN_SAMPLES:
+        return 'insufficient data'
+    if psi >= PSI_SIGNIFICANT:
+        return 'significant'
+    return 'moderate' if psi >= PSI_MODERATE else 'stable'
+
+
+# Log records for a frame of raw employees (HR_Dataset.csv or dashboard columns)
+def frame_records(df, probabilities=None, predictions=None, timestamp=None):
+    records = np.zeros(len(df), dtype=LOG_DTYPE)
+    records['time'] = time.time() if timestamp is None else timestamp
+    for name in NUMERIC_COLUMNS:
+        records[name] = np.asarray(df[name])
+    department = next(col for col in DEPARTMENT_ALIASES if col in df.columns)
+    records['department'] = pd.Index(DEPARTMENTS).get_indexer(df[department])
+    records['salary'] = pd.Index(SALARIES).get_indexer(df['salary'])
+    records['probability'] = np.nan if probabilities is None else probabilities
+    records['prediction'] = -1 if predictions is None else predictions
+    return records
+
+
+def _record(employee, probability, prediction):
+    record = np.zeros(1, dtype=LOG_DTYPE)
+    record['time'] = time.time()
+    for name in NUMERIC_COLUMNS:
+        record[name] = employee[name]
+    record['department'] = DEPARTMENTS.index(employee['department']) if employee['department'] in DEPARTMENTS else -1
+    record['salary'] = SALARIES.index(employee['salary']) if employee['salary'] in SALARIES else -1
+    record['probability'] = probability
+    record['prediction'] = prediction
+    return record
+
+
+# Baseline sketch of a training dataset; with an ensemble and encoder, its
+# probabilities on the dataset are sketched too (prediction drift)
+def build_baseline(df, ensemble=None, encoder=None):
+    df = drop_duplicate_profiles(df)
+    probabilities = predictions = None
+    if ensemble is not None:
+        probabilities, predictions = ensemble.score(encoder.encode_frame(df))
+    return Sketch().update(frame_records(df, probabilities, predictions))
+
+
+def _save_npz(path, **arrays):
+    tmp = f"{path}.tmp.npz"
+    np.savez(tmp, **arrays)
+    os.replace(tmp, path)
+
+
+class DriftMonitor:
+    def __init__(self, directory=MONITOR_DIR):
+        self.directory = directory
+        self.log_path = os.path.join(directory, LOG_FILE)
+        self.sketch_path = os.path.join(directory, SKETCH_FILE)
+        self.baseline_path = os.path.join(directory, BASELINE_FILE)
+        self._lock = threading.Lock()
+        self._reset()
+        self.log_id = None
+        self._sketch_mtime = None
+        self.baseline, self.baseline_info = self._load_baseline()
+        self.last_refresh = {}
+
+    def _reset(self):
+        self.records = 0
+        self.total = Sketch()
+        # Ring of daily sketches, slot = day % WINDOW_DAYS, with the day each slot holds
+        self.days = np.full(WINDOW_DAYS, -1, dtype=np.int64)
+        self.daily_counts = np.zeros((WINDOW_DAYS, N_BINS), dtype=np.int64)
+        self.daily_moments = np.zeros((WINDOW_DAYS, len(ORDERED), 3))
+
+    def _load_baseline(self):
+        if not os.path.exists(self.baseline_path):
+            return None, {}
+        with np.load(self.baseline_path) as data:
+            return Sketch(data['counts'], data['moments']), json.loads(str(data['info']))
+
+    def save_baseline(self, sketch, **info):
+        os.makedirs(self.directory, exist_ok=True)
+        info = {'built': time.strftime('%Y-%m-%dT%H:%M:%S'), 'rows': sketch.n, **info}
+        _save_npz(self.baseline_path, counts=sketch.counts, moments=sketch.moments, info=json.dumps(info))
+        self.baseline, self.baseline_info = sketch, info
+
+    # Append one dashboard assessment to the log
+    def record(self, employee, probability, prediction):
+        self.append(_record(employee, probability, prediction))
+
+    # Append LOG_DTYPE records in one write (appends of this size are not interleaved across processes)
+    def append(self, records):
+        with span('monitor.record'), self._lock:
+            if not os.path.exists(self.log_path):
+                self._create_log()
+            with open(self.log_path, 'ab') as f:
+                f.write(records.astype(LOG_DTYPE, copy=False).tobytes())
+
+    # The header is written before the log appears, so concurrent writers never append to a headerless file
+    def _create_log(self):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = f"{self.log_path}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(LOG_MAGIC + os.urandom(LOG_HEADER_SIZE - len(LOG_MAGIC)))
+        try:
+            os.link(tmp, self.log_path)
+        except FileExistsError:
+            pass
+        finally:
+            os.remove(tmp)
+
+    # (log id, whole records in the log); (None, 0) before the first assessment
+    def _log_state(self):
+        try:
+            with open(self.log_path, 'rb') as f:
+                header = f.read(LOG_HEADER_SIZE)
+                size = os.fstat(f.fileno()).st_size
+        except FileNotFoundError:
+            return None, 0
+        if len(header) < LOG_HEADER_SIZE or not header.startswith(LOG_MAGIC):
+            raise ValueError(f"{self.log_path} is not a prediction log")
+        return header.hex(), (size - LOG_HEADER_SIZE) // LOG_DTYPE.itemsize
+
+    # Records are binned once for the all-time sketch and their day's slot
+    def _fold(self, records):
+        index, values = _bin_indices(records), _ordered_values(records)
+        _accumulate(self.total.counts[None], self.total.moments[None], np.zeros(len(records), dtype=np.intp),
+                    index, values)
+        days = (records['time'] // 86400).astype(np.int64)
+        newest = max(int(days.max()), int(self.days.max()))
+        kept = np.zeros(len(records), dtype=bool)
+        for day in np.unique(days):
+            slot = day % WINDOW_DAYS
+            # Older than the window, or than the day the slot already holds
+            if day <= newest - WINDOW_DAYS or self.days[slot] > day:
+                continue
+            if self.days[slot] != day:
+                self.days[slot] = day
+                self.daily_counts[slot] = 0
+                self.daily_moments[slot] = 0
+            kept |= days == day
+        _accumulate(self.daily_counts, self.daily_moments, days[kept] % WINDOW_DAYS, index[kept], values[kept])
+
+    def _load_sketches(self, log_id):
+        with np.load(self.sketch_path) as data:
+            if str(data['log_id']) != log_id or int(data['records']) <= self.records:
+                return
+            self.records = int(data['records'])
+            self.total = Sketch(data['counts'], data['moments'])
+            self.days = data['days']
+            self.daily_counts, self.daily_moments = data['daily_counts'], data['daily_moments']
+
+    def _save_sketches(self):
+        _save_npz(self.sketch_path, log_id=self.log_id, records=self.records,
+                  counts=self.total.counts, moments=self.total.moments,
+                  days=self.days, daily_counts=self.daily_counts, daily_moments=self.daily_moments)
+        self._sketch_mtime = os.stat(self.sketch_path).st_mtime_ns
+
+    # Fold the records appended since the last refresh (by any process) into the sketches
+    def refresh(self):
+        with span('monitor.refresh'), self._lock:
+            start = time.perf_counter()
+            log_id, available = self._log_state()
+            if log_id != self.log_id or available < self.records:
+                self._reset()   # the log was replaced or truncated
+                self.log_id = log_id
+            if os.path.exists(self.sketch_path) and os.stat(self.sketch_path).st_mtime_ns != self._sketch_mtime:
+                self._load_sketches(log_id)
+                self._sketch_mtime = os.stat(self.sketch_path).st_mtime_ns
+                if self.records > available:
+                    self._reset()
+                    self.log_id = log_id
+            folded = available - self.records
+            for lo in range(self.records, available, CHUNK_RECORDS):
+                count = min(CHUNK_RECORDS, available - lo)
+                self._fold(np.fromfile(self.log_path, dtype=LOG_DTYPE, count=count,
+                                       offset=LOG_HEADER_SIZE + lo * LOG_DTYPE.itemsize))
+            self.records = available
+            if folded:
+                self._save_sketches()
+            self.last_refresh = {'folded': folded, 'records': available, 'seconds': time.perf_counter() - start}
+            return self
+
+    # All-time sketch, or the merge of the daily sketches of the last `days` days (today included)
+    def window(self, days=None):
+        if days is None:
+            return self.total
+        today = int(time.time() // 86400)
+        slots = (self.days > today - min(days, WINDOW_DAYS)) & (self.days >= 0)
+        return Sketch(self.daily_counts[slots].sum(axis=0), self.daily_moments[slots].sum(axis=0))
+
+    # Per-feature drift of the window against the baseline
+    def report(self, days=None):
+        live = self.window(days)
+        rows = []
+        for name in FEATURES:
+            n, reference = live.count(name), self.baseline.count(name) if self.baseline else 0
+            row = {'feature': name, 'records': n, 'psi': float('nan'), 'ks': float('nan'),
+                   'ks_critical': float('nan'), 'status': 'no baseline' if not reference else None,
+                   'training_mean': float('nan'), 'live_mean': float('nan'),
+                   'training_p50': float('nan'), 'live_p50': float('nan')}
+            if name in ORDERED:
+                row.update(live_mean=live.mean(name), live_p50=live.quantile(name, 0.5))
+            if reference:
+                expected, actual = self.baseline.shares(name), live.shares(name)
+                row['psi'] = population_stability_index(expected, actual) if n else float('nan')
+                row['status'] = drift_status(row['psi'], n)
+                if name in ORDERED:
+                    row.update(ks=ks_distance(expected, actual) if n else float('nan'),
+                               ks_critical=ks_critical(reference, n),
+                               training_mean=self.baseline.mean(name),
+                               training_p50=self.baseline.quantile(name, 0.5))
+            rows.append(row)
+        return pd.DataFrame(rows).set_index('feature')
+
+    # Bin shares of one feature, training vs live window
+    def distribution(self, name, days=None):
+        live = self.window(days)
+        training = self.baseline.shares(name) if self.baseline else np.zeros(len(bin_labels(name)))
+        return pd.DataFrame({'training': training, 'live': live.shares(name)},
+                            index=pd.Index(bin_labels(name), name=name))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drift monitoring of dashboard assessments.")
+    parser.add_argument('--dir', default=MONITOR_DIR, help="Directory of the prediction log and sketches")
+    commands = parser.add_subparsers(dest='command', required=True)
+    baseline = commands.add_parser('baseline', help="Build the training baseline from an HR dataset")
+    baseline.add_argument('data', help="CSV in HR_Dataset.csv format")
+    baseline.add_argument('--no-predictions', action='store_true', help="Sketch the inputs only")
+    report = commands.add_parser('report', help="Drift of the logged assessments against the baseline")
+    report.add_argument('--days', type=int, help=f"Last N days (at most {WINDOW_DAYS}; default: all time)")
+    args = parser.parse_args()
+
+    monitor = DriftMonitor(args.dir)
+    if args.command == 'baseline':
+        ensemble = encoder = None
+        if not args.no_predictions:
+            from encoder import FeatureEncoder
+            from ensemble import Ensemble
+            ensemble, encoder = Ensemble.load(), FeatureEncoder.load()
+        sketch = build_baseline(read_hr_dataset(args.data), ensemble, encoder)
+        monitor.save_baseline(sketch, source=args.data, members=ensemble.names if ensemble else [])
+        print(f"Baseline of {sketch.n:,} deduplicated rows from {args.data} saved to {monitor.baseline_path}")
+        return
+
+    monitor.refresh()
+    info = monitor.last_refresh
+    print(f"{info['records']:,} logged assessments ({info['folded']:,} folded in {info['seconds'] * 1e3:.1f} ms)")
+    if monitor.baseline is None:
+        print(f"No baseline at {monitor.baseline_path}; run `python monitoring.py baseline HR_Dataset.csv`")
+    print(monitor.report(args.days).round(3).to_string())
+
+
+if __name__ == "__main__":
+    main()
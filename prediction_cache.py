@@ -0,0 +1,164 @@
+# Bounded LRU/TTL cache in front of model inference.
+#
+# Keys are the encoded (scaled) feature vector rounded to a fixed precision,
+# plus a context string (e.g. the ensemble members) and a content hash of the
+# model artifacts. The artifact files are re-checked at most once per
+# CHECK_INTERVAL seconds; when any of them changes the hash changes, so older
+# entries are dropped. Entries can also be persisted to a local SQLite file so
+# they survive restarts and are shared between processes.
+import glob
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+ARTIFACT_PATTERNS = ['*.pkl', 'models/*.pkl', 'models/knn_index/*']
+QUANT_DECIMALS = 6
+CHECK_INTERVAL = 1.0
+
+
+def artifact_files(patterns=ARTIFACT_PATTERNS):
+    return sorted(path for pattern in patterns for path in glob.glob(pattern) if os.path.isfile(path))
+
+
+def _stat_fingerprint(paths):
+    stats = []
+    for path in paths:
+        st = os.stat(path)
+        stats.append((path, st.st_size, st.st_mtime_ns))
+    return tuple(stats)
+
+
+def artifact_hash(paths):
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(path.encode())
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+class PredictionCache:
+    def __init__(self, max_entries=100_000, ttl_seconds=None, store_path=None,
+                 patterns=ARTIFACT_PATTERNS):
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self.patterns = patterns
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._fingerprint = None
+        self._checked = 0.0
+        self.artifact_hash = None
+        self._refresh_artifacts(force=True)
+
+        self._db = None
+        if store_path:
+            self._db = sqlite3.connect(store_path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS predictions ("
+                             "artifact_hash TEXT, key BLOB, value BLOB, created REAL, "
+                             "PRIMARY KEY (artifact_hash, key))")
+            self._db.commit()
+
+    def _refresh_artifacts(self, force=False):
+        now = time.monotonic()
+        if not force and now - self._checked < CHECK_INTERVAL:
+            return
+        self._checked = now
+        paths = artifact_files(self.patterns)
+        fingerprint = _stat_fingerprint(paths)
+        if fingerprint == self._fingerprint:
+            return
+        new_hash = artifact_hash(paths)
+        self._fingerprint = fingerprint
+        if new_hash != self.artifact_hash:
+            if self.artifact_hash is not None:
+                self.invalidations += 1
+            self.artifact_hash = new_hash
+            self._entries.clear()
+
+    def key(self, row, context=''):
+        row = np.round(np.asarray(row, dtype=np.float64).ravel(), QUANT_DECIMALS) + 0.0
+        return context.encode() + b'|' + row.tobytes()
+
+    def _expired(self, created):
+        return self.ttl is not None and time.time() - created > self.ttl
+
+    def get(self, key):
+        with self._lock:
+            self._refresh_artifacts()
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, created = entry
+                if not self._expired(created):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            if self._db is not None:
+                row = self._db.execute("SELECT value, created FROM predictions "
+                                       "WHERE artifact_hash = ? AND key = ?",
+                                       (self.artifact_hash, key)).fetchone()
+                if row is not None and not self._expired(row[1]):
+                    value = np.frombuffer(row[0], dtype=np.float64).copy()
+                    self._insert(key, value, row[1])
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return value
+            self.misses += 1
+            return None
+
+    def _insert(self, key, value, created):
+        self._entries[key] = (value, created)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def put(self, key, value):
+        value = np.asarray(value, dtype=np.float64)
+        created = time.time()
+        with self._lock:
+            self._insert(key, value, created)
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO predictions VALUES (?, ?, ?, ?)",
+                                 (self.artifact_hash, key, value.tobytes(), created))
+                self._db.commit()
+
+    # Cached compute(row) for a single encoded row
+    def get_or_compute(self, row, compute, context=''):
+        key = self.key(row, context)
+        value = self.get(key)
+        if value is None:
+            value = np.asarray(compute(row), dtype=np.float64)
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM predictions")
+                self._db.commit()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'disk_hits': self.disk_hits,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+            'artifact_hash': self.artifact_hash,
+        }
@@ -0,0 +1,364 @@
+# Lazily loaded artifacts and heavy libraries.
+#
+# Every resource is registered with a loader and loaded once per process on
+# first use (from whichever page or thread asks first), with its load time
+# recorded. Pages declare what they need (PAGE_DEPENDENCIES in app.py), and the
+# rest can be pre-loaded by a background thread after the first page renders.
+# Resources built from the model artifacts are reloaded on their next use once
+# a served artifact bundle (artifacts.py) switches to a new version.
+#
+# Cold-start profile of every resource in a fresh process:
+#   python resources.py
+#   python resources.py --budget-ms 3000    # exit 1 when the total exceeds the budget
+import argparse
+import importlib
+import os
+import sys
+import threading
+import time
+
+import instrumentation
+
+CHATBOT_MODEL_NAME = 'gemini-2.0-flash'
+REPORT_MODEL_NAME = 'gemini-1.5-flash'
+API_KEY_ENV = 'GEMINI_API_KEY'
+WARMUP_ENV = 'CHURN_WARMUP'
+# Optional SQLite file for the prediction cache, and its entry lifetime in seconds
+CACHE_PATH_ENV = 'CHURN_CACHE_PATH'
+CACHE_TTL_ENV = 'CHURN_CACHE_TTL'
+# LLM backend ('gemini' or the offline 'stub') and an optional SQLite file for cached responses
+LLM_BACKEND_ENV = 'CHURN_LLM_BACKEND'
+LLM_CACHE_PATH_ENV = 'CHURN_LLM_CACHE_PATH'
+# Training bundle (train.py) or packed artifact bundle (artifacts.py) to serve
+# instead of models/ and the root pickles
+MODEL_BUNDLE_ENV = 'CHURN_MODEL_BUNDLE'
+# Seconds between checks of a packed bundle root for a new current version
+RELOAD_INTERVAL = 1.0
+# Show span histograms and load times in the app's sidebar
+DEV_PANEL_ENV = 'CHURN_DEV_PANEL'
+# Directory of the drift monitor's prediction log, sketches and training baseline
+MONITOR_DIR_ENV = 'CHURN_MONITOR_DIR'
+
+_loaders = {}
+_values = {}
+_timings = {}
+_locks = {}
+_registry_lock = threading.Lock()
+_active = threading.local()
+_warmup_thread = None
+# Reloadable resource -> bundle version it was loaded from
+_reloadable = set()
+_versions = {}
+_bundle_check = {'at': -RELOAD_INTERVAL, 'version': None}
+
+
+# reload: rebuild the resource when the served bundle version changes
+def register(name, kind='artifact', reload=False):
+    def decorator(fn):
+        _loaders[name] = (fn, kind)
+        if reload:
+            _reloadable.add(name)
+        return fn
+    return decorator
+
+
+def _lock_for(name):
+    with _registry_lock:
+        return _locks.setdefault(name, threading.Lock())
+
+
+def _current(name):
+    return name in _values and (name not in _reloadable or _versions.get(name) == bundle_version())
+
+
+def get(name):
+    if _current(name):
+        return _values[name]
+    if name not in _loaders:
+        raise KeyError(f"Unknown resource: {name}")
+    with _lock_for(name):
+        if not _current(name):
+            fn, kind = _loaders[name]
+            version = bundle_version()
+            # Time spent loading nested resources is reported under their own names
+            stack = _active.__dict__.setdefault('stack', [])
+            stack.append(0.0)
+            start = time.perf_counter()
+            try:
+                value = fn()
+            finally:
+                elapsed = time.perf_counter() - start
+                nested = stack.pop()
+                if stack:
+                    stack[-1] += elapsed
+            instrumentation.observe(f"load.{name}", elapsed - nested)
+            _timings[name] = {
+                'name': name,
+                'kind': kind,
+                'seconds': elapsed - nested,
+                'thread': threading.current_thread().name,
+                'reloads': _timings.get(name, {}).get('reloads', -1) + 1,
+            }
+            _values[name] = value
+            _versions[name] = version
+    return _values[name]
+
+
+def require(names):
+    return [get(name) for name in names]
+
+
+def is_loaded(name):
+    return name in _values
+
+
+def missing(names):
+    return [name for name in names if name not in _values]
+
+
+# Load the given resources in a daemon thread (once per process)
+def warm_up(names):
+    global _warmup_thread
+    if os.environ.get(WARMUP_ENV, '1') == '0':
+        return None
+    with _registry_lock:
+        if _warmup_thread is not None:
+            return _warmup_thread
+
+        def run():
+            for name in names:
+                try:
+                    get(name)
+                except Exception:
+                    # A page that needs it will load it again and surface the error
+                    pass
+
+        _warmup_thread = threading.Thread(target=run, name='resource-warmup', daemon=True)
+        _warmup_thread.start()
+    return _warmup_thread
+
+
+# Load timings in load order: [{'name', 'kind', 'seconds', 'thread', 'reloads'}, ...]
+def profile():
+    return list(_timings.values())
+
+
+def gemini_api_key():
+    return os.environ.get(API_KEY_ENV, '')
+
+
+def llm_backend():
+    return os.environ.get(LLM_BACKEND_ENV, 'gemini')
+
+
+# The stub backend works offline; Gemini needs an API key
+def llm_enabled():
+    return llm_backend() == 'stub' or bool(gemini_api_key())
+
+
+def dev_panel_enabled():
+    return os.environ.get(DEV_PANEL_ENV, '0') == '1'
+
+
+def model_bundle():
+    return os.environ.get(MODEL_BUNDLE_ENV) or None
+
+
+# The served bundle when it is a packed artifact bundle, else None
+def packed_bundle():
+    bundle = model_bundle()
+    if not bundle:
+        return None
+    from artifacts import is_packed
+    return bundle if is_packed(bundle) else None
+
+
+# Current version of a served packed bundle root, re-read at most once per RELOAD_INTERVAL
+def bundle_version():
+    now = time.monotonic()
+    if now - _bundle_check['at'] >= RELOAD_INTERVAL:
+        version = None
+        if model_bundle():
+            from artifacts import current_version
+            version = current_version(model_bundle())
+        _bundle_check.update(at=now, version=version)
+    return _bundle_check['version']
+
+
+def model_dir():
+    from ensemble import MODEL_DIR
+    return model_bundle() or MODEL_DIR
+
+
+# Path of a repo-root artifact (scaler.pkl, dummy_columns.pkl), inside the bundle when one is served
+def root_artifact(name):
+    bundle = model_bundle()
+    return os.path.join(bundle, name) if bundle else name
+
+
+# Files whose change invalidates cached predictions
+def artifact_patterns():
+    from prediction_cache import ARTIFACT_PATTERNS
+    bundle = model_bundle()
+    if not bundle:
+        return ARTIFACT_PATTERNS
+    if packed_bundle():
+        from artifacts import CURRENT_FILE, MANIFEST_FILE
+        return ARTIFACT_PATTERNS + [os.path.join(bundle, CURRENT_FILE), os.path.join(bundle, MANIFEST_FILE)]
+    return ARTIFACT_PATTERNS + [os.path.join(bundle, '*.pkl')]
+
+
+def _library(module):
+    register(f"lib:{module}", kind='library')(lambda: importlib.import_module(module))
+
+
+for _module in ['numpy', 'pandas', 'joblib', 'sklearn', 'xgboost', 'lightgbm']:
+    _library(_module)
+
+
+@register('lib:google.generativeai', kind='library')
+def _genai():
+    import google.generativeai as genai
+    # Configure genai for both chatbot and report generation
+    genai.configure(api_key=gemini_api_key())
+    return genai
+
+
+# Packed artifact bundle (None when pickles are served); checksums are verified on load
+@register('artifact_bundle', reload=True)
+def _artifact_bundle():
+    if not packed_bundle():
+        return None
+    from artifacts import ArtifactBundle
+    return ArtifactBundle.load(packed_bundle())
+
+
+@register('dummy_columns', reload=True)
+def _dummy_columns():
+    if get('artifact_bundle') is not None:
+        return get('artifact_bundle').columns
+    return get('lib:joblib').load(root_artifact('dummy_columns.pkl'))
+
+
+@register('encoder', reload=True)
+def _encoder():
+    if get('artifact_bundle') is not None:
+        return get('artifact_bundle').encoder()
+    from encoder import FeatureEncoder
+    return FeatureEncoder(get('dummy_columns'), get('lib:joblib').load(root_artifact('scaler.pkl')))
+
+
+@register('ensemble', reload=True)
+def _ensemble():
+    require(['lib:numpy', 'lib:sklearn', 'lib:xgboost', 'lib:lightgbm'])
+    if get('artifact_bundle') is not None:
+        return get('artifact_bundle').ensemble()
+    from ensemble import Ensemble
+    return Ensemble.load(model_dir=model_dir())
+
+
+@register('compiled_ensemble', reload=True)
+def _compiled_ensemble():
+    return get('ensemble').compiled()
+
+
+@register('prediction_cache')
+def _prediction_cache():
+    from prediction_cache import PredictionCache
+    ttl = os.environ.get(CACHE_TTL_ENV)
+    return PredictionCache(ttl_seconds=float(ttl) if ttl else None,
+                           store_path=os.environ.get(CACHE_PATH_ENV) or None,
+                           patterns=artifact_patterns())
+
+
+# Precomputed per-member probabilities over the dashboard's input grid (None until
+# `python risk_table.py build` has been run); a packed bundle's members are
+# matched by the hashes of the pickles they were packed from
+@register('risk_table', reload=True)
+def _risk_table():
+    from risk_table import RiskTable
+    bundle = get('artifact_bundle')
+    if bundle is not None:
+        return RiskTable.load_if_present(hashes=bundle.source_hashes())
+    return RiskTable.load_if_present(model_dir=model_dir())
+
+
+@register('explainer', reload=True)
+def _explainer():
+    from explain import EnsembleExplainer
+    return EnsembleExplainer.from_ensemble(get('ensemble'))
+
+
+# Attributions of recently explained rows (same keys and invalidation as predictions)
+@register('explanation_cache')
+def _explanation_cache():
+    from prediction_cache import PredictionCache
+    return PredictionCache(max_entries=10_000, patterns=artifact_patterns())
+
+
+# Log of dashboard assessments and its drift sketches (monitoring.py)
+@register('drift_monitor')
+def _drift_monitor():
+    from monitoring import MONITOR_DIR, DriftMonitor
+    return DriftMonitor(os.environ.get(MONITOR_DIR_ENV) or MONITOR_DIR)
+
+
+@register('chatbot_model', kind='client')
+def _chatbot_model():
+    return get('lib:google.generativeai').GenerativeModel(CHATBOT_MODEL_NAME)
+
+
+@register('report_model', kind='client')
+def _report_model():
+    return get('lib:google.generativeai').GenerativeModel(REPORT_MODEL_NAME)
+
+
+def _llm_client(name, model_resource, model_name, cached=True, stub_words=120):
+    import llm
+    if llm_backend() == 'stub':
+        backend = llm.StubBackend(model_name=model_name, words=stub_words)
+    else:
+        backend = llm.GeminiBackend(get(model_resource))
+    cache = None
+    if cached:
+        cache = llm.ResponseCache(store_path=os.environ.get(LLM_CACHE_PATH_ENV) or None)
+    return llm.LLMClient(backend, cache, name=name)
+
+
+@register('report_llm', kind='client')
+def _report_llm():
+    return _llm_client('report', 'report_model', REPORT_MODEL_NAME)
+
+
+# Conversations are never answered from the response cache
+@register('chat_llm', kind='client')
+def _chat_llm():
+    return _llm_client('chat', 'chatbot_model', CHATBOT_MODEL_NAME, cached=False, stub_words=40)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start profile of the app's resources.")
+    parser.add_argument('--budget-ms', type=float, help="Fail when the total load time exceeds this")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    importlib.import_module('streamlit')
+    streamlit_ms = (time.perf_counter() - start) * 1e3
+
+    for name in _loaders:
+        get(name)
+
+    print(f"{'resource':<28}{'kind':<10}{'ms':>10}")
+    print(f"{'streamlit':<28}{'library':<10}{streamlit_ms:>10.1f}")
+    for row in profile():
+        print(f"{row['name']:<28}{row['kind']:<10}{row['seconds'] * 1e3:>10.1f}")
+    total_ms = streamlit_ms + sum(row['seconds'] for row in profile()) * 1e3
+    print(f"{'total':<38}{total_ms:>10.1f}")
+
+    if args.budget_ms is not None and total_ms > args.budget_ms:
+        print(f"Startup budget exceeded: {total_ms:.0f} ms > {args.budget_ms:.0f} ms", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,334 @@
+# Precomputed churn-probability lookup table over the dashboard's input grid.
+#
+# Every Prediction Dashboard input is discrete (whatif.INPUT_GRIDS), so each
+# ensemble member's whole reachable output space can be scored offline. The
+# full grid has ~1.8 billion points, but a tree model only sees which side of
+# each split a value falls on: grid values that agree on every split of a
+# member are merged into one bin, which leaves 7-80 million cells per tree
+# member. These are scored in bulk and stored as uint16 probabilities in a
+# memory-mapped file per member. Logistic regression is linear in the encoded
+# columns, so it is stored exactly as one additive log-odds term per input
+# value. KNN cannot be compressed and is always scored live.
+#
+# Each member records the content hash of the artifacts it was built from
+# (its pickle, scaler.pkl, dummy_columns.pkl, columns.pkl); members whose
+# artifacts changed since are ignored on load (a packed bundle, artifacts.py,
+# supplies the hashes of the pickles its models were packed from). A lookup is
+# a handful of array reads; inputs off the grid, members missing from the table
+# and a missing table all fall back to live inference.
+#
+# Usage:
+#   python risk_table.py build                        # every tree and linear member
+#   python risk_table.py build --members "Gradient Boosting" "Logistic Regression"
+#   python risk_table.py info
+#   python risk_table.py verify --samples 2000
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from encoder import factor_name
+from ensemble import MODEL_DIR, Ensemble, available_members
+from prediction_cache import artifact_hash
+from tree_engine import tree_spec
+from whatif import INPUT_GRIDS
+
+TABLE_DIR = os.path.join(MODEL_DIR, 'risk_table')
+META_FILE = 'meta.json'
+ENCODER_ARTIFACTS = ['scaler.pkl', 'dummy_columns.pkl', os.path.join(MODEL_DIR, 'columns.pkl')]
+CHUNK_ROWS = 500_000
+# Probabilities are stored as round(p * SCALE) in uint16 (error <= 7.7e-6)
+SCALE = np.iinfo(np.uint16).max
+
+
+def _sigmoid(z):
+    return 1.0 / (1.0 + np.exp(-z))
+
+
+def member_hash(path):
+    return artifact_hash([path] + ENCODER_ARTIFACTS)
+
+
+# Encoded columns of every input value: input -> (column indices, (n_values, n_columns))
+def input_encodings(encoder):
+    base = {name: grid[0] for name, grid in INPUT_GRIDS.items()}
+    encodings = {}
+    for name, grid in INPUT_GRIDS.items():
+        X = encoder.encode_frame(pd.DataFrame({**{k: [v] * len(grid) for k, v in base.items()}, name: grid}))
+        columns = np.array([i for i, col in enumerate(encoder.columns) if factor_name(col) == name])
+        encodings[name] = (columns, X[:, columns])
+    return encodings
+
+
+# Input value -> bin, merging values that take the same branch at every split of the model
+def _tree_bins(model, encodings):
+    spec = tree_spec(model)
+    dtype = np.dtype(spec.get('input_dtype', np.float64))
+    splits = {}
+    for feature, threshold, left, right, *_ in spec['trees']:
+        internal = np.asarray(left) >= 0
+        for f, t in zip(np.asarray(feature)[internal], np.asarray(threshold)[internal]):
+            splits.setdefault(int(f), set()).add(float(t))
+    bins = {}
+    for name, (columns, values) in encodings.items():
+        outcomes = [np.zeros(len(values), dtype=bool)]
+        for j, column in enumerate(columns):
+            x = values[:, j].astype(dtype).astype(np.float64)
+            for t in sorted(splits.get(int(column), ())):
+                outcomes.append(x < t if spec.get('strict') else x <= t)
+        _, first, inverse = np.unique(np.array(outcomes).T, axis=0, return_index=True, return_inverse=True)
+        # Bins numbered in grid order; each is scored at its first value
+        order = np.argsort(first)
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(order))
+        bins[name] = (rank[inverse.ravel()], first[order])
+    return bins
+
+
+# progress(done, total) callback of one member's tree table build
+def _cell_progress(progress, name):
+    return lambda done, total: progress(f"  {name}: {done:,} / {total:,} cells")
+
+
+def _build_tree(model, encodings, path, progress=None):
+    bins = _tree_bins(model, encodings)
+    names = list(INPUT_GRIDS)
+    shape = tuple(len(bins[name][1]) for name in names)
+    cells = int(np.prod(shape))
+    # Written beside the old table and swapped in, so open readers are unaffected
+    tmp = path + '.tmp'
+    table = np.lib.format.open_memmap(tmp, mode='w+', dtype=np.uint16, shape=(cells,))
+    n_features = sum(len(columns) for columns, _ in encodings.values())
+    X = np.empty((min(CHUNK_ROWS, cells), n_features))
+    for start in range(0, cells, CHUNK_ROWS):
+        stop = min(start + CHUNK_ROWS, cells)
+        positions = np.unravel_index(np.arange(start, stop), shape)
+        for name, position in zip(names, positions):
+            columns, values = encodings[name]
+            X[:stop - start, columns] = values[bins[name][1][position]]
+        table[start:stop] = np.round(model.predict_proba(X[:stop - start])[:, 1] * SCALE)
+        if progress and (stop == cells or (start // CHUNK_ROWS) % 20 == 19):
+            progress(stop, cells)
+    table.flush()
+    del table
+    os.replace(tmp, path)
+    return {'kind': 'grid', 'file': os.path.basename(path), 'shape': list(shape),
+            'bins': {name: bins[name][0].tolist() for name in names}}
+
+
+def _build_linear(model, encodings):
+    coef = np.asarray(model.coef_, dtype=np.float64).ravel()
+    terms = {name: (values @ coef[columns]).tolist() for name, (columns, values) in encodings.items()}
+    return {'kind': 'linear', 'intercept': float(np.ravel(model.intercept_)[0]), 'terms': terms}
+
+
+def _member_kind(model):
+    if type(model).__name__ == 'LogisticRegression' and len(model.classes_) == 2:
+        return 'linear'
+    try:
+        tree_spec(model)
+        return 'grid'
+    except TypeError:
+        return None
+
+
+# Score every member's compressed grid into the table directory
+def build(names=None, directory=TABLE_DIR, model_dir=MODEL_DIR, progress=print):
+    from encoder import FeatureEncoder
+
+    paths = available_members(model_dir)
+    ensemble = Ensemble.load(names, model_dir, use_indexes=False)
+    encodings = input_encodings(FeatureEncoder.load())
+    os.makedirs(directory, exist_ok=True)
+    meta_path = os.path.join(directory, META_FILE)
+    meta = {'version': 1, 'grids': {name: grid.tolist() for name, grid in INPUT_GRIDS.items()},
+            'members': {}}
+    # Members built earlier on the same grids are kept unless rebuilt now
+    if os.path.exists(meta_path):
+        with open(meta_path) as f:
+            previous = json.load(f)
+        if previous.get('grids') == meta['grids']:
+            meta['members'] = previous['members']
+
+    for name, model in ensemble.members.items():
+        kind = _member_kind(model)
+        if kind is None:
+            if progress:
+                progress(f"{name}: not tabulated (scored live)")
+            continue
+        start = time.perf_counter()
+        if kind == 'linear':
+            entry = _build_linear(model, encodings)
+        else:
+            path = os.path.join(directory, f"{name.replace(' ', '_')}.npy")
+            entry = _build_tree(model, encodings, path, _cell_progress(progress, name) if progress else None)
+        entry['artifact_hash'] = member_hash(paths[name])
+        entry['build_seconds'] = time.perf_counter() - start
+        meta['members'][name] = entry
+        # Written after every member, so an interrupted build keeps the finished ones
+        with open(meta_path + '.tmp', 'w') as f:
+            json.dump(meta, f)
+        os.replace(meta_path + '.tmp', meta_path)
+        if progress:
+            progress(f"{name}: {kind} table in {entry['build_seconds']:.1f}s")
+    return RiskTable.load(directory, model_dir)
+
+
+class RiskTable:
+    # hashes: member -> artifact hash of the served model, instead of hashing model_dir's pickles
+    def __init__(self, directory, meta, model_dir=MODEL_DIR, check=True, hashes=None):
+        self.directory = directory
+        self.meta = meta
+        self.stale = []
+        if hashes is None:
+            hashes = {name: member_hash(path) for name, path in available_members(model_dir).items()
+                      if check and name in meta['members']}
+        self._index = {name: {value: i for i, value in enumerate(grid)} for name, grid in meta['grids'].items()}
+        self._grid_values = {name: pd.Index(grid) for name, grid in meta['grids'].items()}
+        self._grid = {}      # member -> (table, per-input arrays of grid index -> flat offset)
+        self._linear = {}    # member -> (intercept, per-input arrays of grid index -> log-odds term)
+        for name, entry in meta['members'].items():
+            if check and hashes.get(name) != entry['artifact_hash']:
+                self.stale.append(name)
+                continue
+            if entry['kind'] == 'linear':
+                self._linear[name] = (entry['intercept'], [np.array(entry['terms'][k]) for k in meta['grids']])
+            else:
+                table = np.load(os.path.join(directory, entry['file']), mmap_mode='r')
+                strides = np.cumprod([1] + entry['shape'][:0:-1])[::-1]
+                offsets = [np.array(entry['bins'][k], dtype=np.int64) * stride
+                           for k, stride in zip(meta['grids'], strides)]
+                self._grid[name] = (table, offsets)
+
+    @classmethod
+    def load(cls, directory=TABLE_DIR, model_dir=MODEL_DIR, check=True, hashes=None):
+        with open(os.path.join(directory, META_FILE)) as f:
+            return cls(directory, json.load(f), model_dir, check, hashes)
+
+    # The table in `directory`, or None when it has not been built
+    @classmethod
+    def load_if_present(cls, directory=TABLE_DIR, model_dir=MODEL_DIR, hashes=None):
+        if not os.path.exists(os.path.join(directory, META_FILE)):
+            return None
+        return cls.load(directory, model_dir, hashes=hashes)
+
+    @property
+    def names(self):
+        return list(self._grid) + list(self._linear)
+
+    @property
+    def nbytes(self):
+        return sum(table.nbytes for table, _ in self._grid.values())
+
+    # Drop the memory-mapped tables (e.g. before their directory is removed);
+    # their members are then scored live
+    def close(self):
+        self._grid.clear()
+
+    # Grid position of each input of an employee record, or None when any is off the grid
+    def grid_indices(self, employee):
+        try:
+            return [self._index[name][employee[name]] for name in self.meta['grids']]
+        except (KeyError, TypeError):
+            return None
+
+    # Churn probability of each member in `names`, or None unless the record is
+    # on the grid and every member is in the table (then use live inference)
+    def lookup(self, employee, names):
+        if any(name not in self._grid and name not in self._linear for name in names):
+            return None
+        position = self.grid_indices(employee)
+        if position is None:
+            return None
+        probs = np.empty(len(names))
+        for i, name in enumerate(names):
+            if name in self._grid:
+                table, offsets = self._grid[name]
+                probs[i] = table[sum(offset[p] for offset, p in zip(offsets, position))] / SCALE
+            else:
+                intercept, terms = self._linear[name]
+                probs[i] = _sigmoid(intercept + sum(term[p] for term, p in zip(terms, position)))
+        return probs
+
+    # Churn probability of each member in `names` for every row of a frame of
+    # employee records, shape (n_rows, len(names)), with NaN columns for members
+    # not in the table; None when any row is off the grid
+    def lookup_frame(self, frame, names):
+        positions = []
+        for name, values in self._grid_values.items():
+            position = values.get_indexer(frame[name])
+            if (position < 0).any():
+                return None
+            positions.append(position)
+        probs = np.full((len(frame), len(names)), np.nan)
+        for i, name in enumerate(names):
+            if name in self._grid:
+                table, offsets = self._grid[name]
+                probs[:, i] = table[sum(offset[p] for offset, p in zip(offsets, positions))] / SCALE
+            elif name in self._linear:
+                intercept, terms = self._linear[name]
+                probs[:, i] = _sigmoid(intercept + sum(term[p] for term, p in zip(terms, positions)))
+        return probs
+
+
+def _random_employees(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return [{name: grid[rng.integers(len(grid))].item() for name, grid in INPUT_GRIDS.items()}
+            for _ in range(n)]
+
+
+# Compare table lookups with live predictions on random grid points
+def verify(table, samples=2000):
+    from encoder import FeatureEncoder
+
+    encoder = FeatureEncoder.load()
+    ensemble = Ensemble.load(table.names, use_indexes=False)
+    employees = _random_employees(samples)
+    X = encoder.encode_frame(pd.DataFrame(employees))
+    live = ensemble.member_probabilities(X)
+    start = time.perf_counter()
+    looked_up = np.array([table.lookup(employee, ensemble.names) for employee in employees])
+    per_lookup = (time.perf_counter() - start) / samples
+    return np.abs(looked_up - live).max(axis=0), per_lookup, ensemble.names
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build, inspect or verify the precomputed risk table.")
+    sub = parser.add_subparsers(dest='command', required=True)
+    make = sub.add_parser('build')
+    make.add_argument('--members', nargs='+', help="Ensemble members (default: every one that can be tabulated)")
+    show = sub.add_parser('info')
+    check = sub.add_parser('verify')
+    check.add_argument('--samples', type=int, default=2000)
+    for command in (make, show, check):
+        command.add_argument('--dir', default=TABLE_DIR)
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        start = time.perf_counter()
+        table = build(args.members, args.dir)
+        print(f"Built {args.dir} in {time.perf_counter() - start:.1f}s")
+    else:
+        table = RiskTable.load(args.dir)
+    if args.command == 'verify':
+        errors, per_lookup, names = verify(table, args.samples)
+        for name, error in zip(names, errors):
+            print(f"  {name:<22} max |lookup - live| {error:.1e}")
+        print(f"  {per_lookup * 1e6:.1f} us per lookup ({len(names)} members)")
+        return
+    print(f"{args.dir}: {table.nbytes / 2**20:.1f} MB")
+    for name, entry in table.meta['members'].items():
+        state = ' (stale: artifacts changed, ignored)' if name in table.stale else ''
+        if entry['kind'] == 'linear':
+            print(f"  {name:<22} linear terms{state}")
+        else:
+            cells = int(np.prod(entry['shape']))
+            print(f"  {name:<22} {cells:>12,} cells  {cells * 2 / 2**20:8.1f} MB  "
+                  f"built in {entry['build_seconds']:.1f}s{state}")
+
+
+if __name__ == "__main__":
+    main()
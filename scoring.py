@@ -0,0 +1,213 @@
+# Batch scoring for the Prediction Dashboard and the command line.
+#
+# Usage:
+#   python scoring.py employees.csv -o scored.csv
+#   python scoring.py employees.parquet -o scored.parquet --chunksize 50000
+#   python scoring.py hr_store -o scored.parquet     # an employee_store.py directory
+#   python scoring.py employees.csv --explain         # add per-factor attributions
+#   python scoring.py employees.csv --members XGBoost LightGBM --weights XGBoost=2
+import argparse
+import io
+import os
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from employee_store import EmployeeStore
+from encoder import DEPARTMENT_ALIASES, NUMERIC_COLUMNS, SALARY_ALIASES, FeatureEncoder
+from ensemble import Ensemble, member_weight
+from explain import EnsembleExplainer
+from instrumentation import span
+from tree_engine import compile_or_native
+
+RISK_THRESHOLD = 0.5
+DEFAULT_CHUNKSIZE = 100_000
+
+
+# Load artifacts (same files the Streamlit app uses)
+def load_artifacts(model_paths=('XGB.pkl',), columns_path='dummy_columns.pkl',
+                   scaler_path='scaler.pkl'):
+    models = [joblib.load(path) for path in model_paths]
+    encoder = FeatureEncoder.load(columns_path, scaler_path)
+    return models, encoder
+
+
+# One predict_proba per model over the whole matrix; labels come from the probabilities
+def predict_matrix(models, X):
+    if isinstance(models, Ensemble):
+        return models.score(X)
+    probs = np.column_stack([model.predict_proba(X)[:, 1] for model in models])
+    votes = (probs >= RISK_THRESHOLD).sum(axis=1)
+    labels = (votes * 2 > len(models)).astype(np.int8)
+    return probs.mean(axis=1), labels
+
+
+# TreeSHAP columns for encoded rows: the churn probability points each input
+# factor adds (why_<factor>) and the factors raising the risk most
+def explanation_columns(explainer, X):
+    _, values, _ = explainer.explain(X)
+    grouped = explainer.by_factor(values)
+    columns = {f"why_{factor}": grouped[factor].to_numpy() for factor in grouped.columns}
+    columns['top_risk_factors'] = explainer.top_factors(values)
+    return columns
+
+
+# Models compiled for float32 (XGBoost trees, the fused Logistic Regression) are
+# encoded straight into float32; anything else, or explanations, gets float64
+def input_dtype(models, explainer=None):
+    members = models.members.values() if isinstance(models, Ensemble) else models
+    if explainer is None and all(getattr(m, 'input_dtype', None) == np.float32 for m in members):
+        return np.float32
+    return np.float64
+
+
+def score_frame(df, models, encoder, explainer=None):
+    with span('batch.encode'):
+        X = encoder.encode_frame(df, dtype=input_dtype(models, explainer))
+    with span('batch.inference'):
+        avg_prob, labels = predict_matrix(models, X)
+    scored = df.copy()
+    scored['churn_probability'] = avg_prob
+    scored['churn_prediction'] = labels
+    if explainer is not None:
+        with span('batch.explain'):
+            for name, values in explanation_columns(explainer, X).items():
+                scored[name] = values
+    return scored
+
+
+def read_table(source, name=None):
+    name = name or str(source)
+    if name.lower().endswith('.parquet'):
+        return pd.read_parquet(source)
+    return pd.read_csv(source)
+
+
+def to_bytes(df, fmt='csv'):
+    buffer = io.BytesIO()
+    if fmt == 'parquet':
+        df.to_parquet(buffer, index=False)
+    else:
+        df.to_csv(buffer, index=False)
+    return buffer.getvalue()
+
+
+# (first row, probabilities, labels, encoded rows) per chunk of an EmployeeStore,
+# encoded straight from its memory-mapped columns and category codes; the
+# encoded rows are a buffer reused by the next chunk
+def _iter_store_scores(store, models, encoder, chunksize, dtype=np.float64):
+    department, salary = store.find(DEPARTMENT_ALIASES), store.find(SALARY_ALIASES)
+    X = np.empty((max(1, min(chunksize, len(store))), encoder.n_features), dtype=dtype)
+    for start, columns in store.iter_chunks(NUMERIC_COLUMNS + [department, salary], chunksize):
+        n = len(columns[department])
+        with span('batch.encode'):
+            encoder.encode_coded(columns, columns[department], store.categories(department),
+                                 columns[salary], store.categories(salary), out=X[:n])
+        with span('batch.inference'):
+            probs, labels = predict_matrix(models, X[:n])
+        yield start, probs, labels, X[:n]
+
+
+# Score a whole EmployeeStore: (probabilities, labels)
+def score_store(store, models, encoder, chunksize=DEFAULT_CHUNKSIZE):
+    probs = np.empty(len(store))
+    labels = np.empty(len(store), dtype=np.int8)
+    for start, chunk_probs, chunk_labels, _ in _iter_store_scores(store, models, encoder, chunksize,
+                                                                  input_dtype(models)):
+        probs[start:start + len(chunk_probs)] = chunk_probs
+        labels[start:start + len(chunk_labels)] = chunk_labels
+    return probs, labels
+
+
+def _iter_chunks(path, chunksize):
+    if path.lower().endswith('.parquet'):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunksize)
+
+
+def _iter_scored(path, models, encoder, chunksize, explainer=None):
+    if os.path.isdir(path):
+        store = EmployeeStore.open(path)
+        for start, probs, labels, X in _iter_store_scores(store, models, encoder, chunksize,
+                                                          input_dtype(models, explainer)):
+            scored = store.to_frame(start=start, stop=start + len(probs))
+            scored['churn_probability'] = probs
+            scored['churn_prediction'] = labels
+            if explainer is not None:
+                for name, values in explanation_columns(explainer, X).items():
+                    scored[name] = values
+            yield scored
+    else:
+        for chunk in _iter_chunks(path, chunksize):
+            yield score_frame(chunk, models, encoder, explainer)
+
+
+# Score a file (or EmployeeStore directory) chunk by chunk, streaming results to the output file
+def score_file(input_path, output_path, models, encoder, chunksize=DEFAULT_CHUNKSIZE, explainer=None):
+    start = time.perf_counter()
+    total = 0
+    writer = None
+    try:
+        for i, scored in enumerate(_iter_scored(input_path, models, encoder, chunksize, explainer)):
+            if output_path.lower().endswith('.parquet'):
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+                table = pa.Table.from_pandas(scored, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(output_path, table.schema)
+                writer.write_table(table)
+            else:
+                scored.to_csv(output_path, mode='w' if i == 0 else 'a',
+                              header=i == 0, index=False)
+            total += len(scored)
+    finally:
+        if writer is not None:
+            writer.close()
+    elapsed = time.perf_counter() - start
+    return total, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score an employee file for churn risk.")
+    parser.add_argument('input', help="CSV or Parquet file (or employee_store.py directory) with employee records")
+    parser.add_argument('-o', '--output', help="Output file (default: <input>_scored.<ext>)")
+    parser.add_argument('--models', nargs='+', default=['XGB.pkl'], help="Model pickles to use")
+    parser.add_argument('--members', nargs='+',
+                        help="Score with an ensemble of models/ members instead (e.g. XGBoost LightGBM)")
+    parser.add_argument('--voting', choices=['soft', 'hard'], default='soft')
+    parser.add_argument('--weights', nargs='+', type=member_weight, default=[], metavar='NAME=WEIGHT',
+                        help="Ensemble member weights (default 1 each), e.g. XGBoost=2 'Decision Tree=0.5'")
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument('--engine', choices=['native', 'compiled'], default='native',
+                        help="Tree inference backend (native is faster for large batches)")
+    parser.add_argument('--explain', action='store_true',
+                        help="Add TreeSHAP attributions per input factor (tree models only)")
+    args = parser.parse_args()
+
+    root, ext = os.path.splitext(args.input.rstrip('/'))
+    output = args.output or f"{root}_scored{ext or '.csv'}"
+
+    models, encoder = load_artifacts(args.models)
+    explainer = None
+    if args.members:
+        models = Ensemble.load(args.members, voting=args.voting, weights=dict(args.weights))
+        if args.explain:
+            explainer = EnsembleExplainer.from_ensemble(models)
+        if args.engine == 'compiled':
+            models = models.compiled()
+    else:
+        if args.explain:
+            explainer = EnsembleExplainer(dict(zip(args.models, models)), columns=encoder.columns)
+        if args.engine == 'compiled':
+            models = [compile_or_native(model) for model in models]
+    rows, elapsed = score_file(args.input, output, models, encoder, args.chunksize, explainer)
+    print(f"Scored {rows:,} rows in {elapsed:.2f}s ({rows / max(elapsed, 1e-9):,.0f} rows/sec) -> {output}")
+
+
+if __name__ == "__main__":
+    main()
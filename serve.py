@@ -0,0 +1,463 @@
+# Standalone churn scoring service (no Streamlit), for calling the model from
+# other systems.
+#
+#   python serve.py --port 8600
+#
+#   POST /score        one employee as a JSON object
+#   POST /score/bulk   {"employees": [...]} (or a bare JSON list)
+#   GET  /health       liveness and loaded artifacts
+#   GET  /metrics      request counts, latency percentiles, micro-batch sizes,
+#                      prediction cache hit rate, span histograms (instrumentation.py)
+#
+# Concurrent /score requests are micro-batched: a single batcher thread takes
+# every row queued while the previous batch was being scored (up to
+# --max-batch, optionally waiting up to --max-wait-ms for more) and scores them
+# with one predict_proba call per model. Connections are served by a bounded
+# thread pool (--workers); a keep-alive connection idle for --keepalive-timeout
+# seconds is closed so it gives its worker back. Single-employee results are
+# cached on the encoded feature vector (--cache-size, 0 to disable; see
+# prediction_cache.py).
+#
+# With --bundle, the models and encoder come from a packed artifact bundle
+# (artifacts.py), and a new current version under its root is picked up within
+# --reload-interval seconds without a restart; requests in flight finish on the
+# models they started with.
+#
+#   python serve.py --bundle models/packed --models XGB
+#   python serve.py --bundle models/packed --members XGBoost LightGBM --weights XGBoost=2
+import argparse
+import json
+import math
+import os
+import queue
+import socket
+import threading
+import time
+from collections import deque, namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import numpy as np
+
+import instrumentation
+import scoring
+from artifacts import ArtifactBundle, current_version
+from encoder import NUMERIC_COLUMNS
+from ensemble import Ensemble, member_weight
+from prediction_cache import PredictionCache
+
+LATENCY_WINDOW = 10_000
+RELOAD_INTERVAL = 2.0
+# Seconds an idle keep-alive connection may hold a pool worker
+KEEPALIVE_TIMEOUT = 5.0
+# Employee fields accepted by the endpoints (department may also be sent as 'Departments')
+DEPARTMENT_KEYS = ['department', 'Departments', 'Departments ']
+
+
+class LatencyStats:
+    def __init__(self, window=LATENCY_WINDOW):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.errors = 0
+
+    def record(self, seconds, error=False):
+        with self._lock:
+            self._samples.append(seconds)
+            self.count += 1
+            self.errors += int(error)
+
+    def summary(self):
+        with self._lock:
+            samples = np.array(self._samples) * 1e3
+            count, errors = self.count, self.errors
+        summary = {'count': count, 'errors': errors}
+        if len(samples):
+            p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+            summary.update({'p50_ms': p50, 'p95_ms': p95, 'p99_ms': p99, 'max_ms': samples.max()})
+        return summary
+
+
+# Everything a request is served with, swapped as one object on reload so a
+# request never mixes the encoder of one bundle version with another's models
+Snapshot = namedtuple('Snapshot', ['models', 'encoder', 'description', 'version', 'cache_context'])
+
+
+class MicroBatcher:
+    def __init__(self, max_batch=256, max_wait_ms=0.0):
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1e3
+        self._queue = queue.Queue()
+        self.batches = 0
+        self.rows = 0
+        self.max_seen = 0
+        self._thread = threading.Thread(target=self._loop, name='micro-batcher', daemon=True)
+        self._thread.start()
+
+    @property
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    # Queue one encoded row to be scored by `models`; the future resolves to (probability, label)
+    def submit(self, row, models):
+        future = Future()
+        self._queue.put((row, models, future))
+        return future
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def _loop(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                try:
+                    if remaining > 0:
+                        item = self._queue.get(timeout=remaining)
+                    else:
+                        item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._queue.put(None)
+                    break
+                batch.append(item)
+            # Rows queued around a reload are scored by the models they were encoded for
+            groups = {}
+            for row, models, future in batch:
+                groups.setdefault(id(models), (models, []))[1].append((row, future))
+            for models, group in groups.values():
+                self._run(models, group)
+
+    def _run(self, models, batch):
+        X = np.stack([row for row, _ in batch])
+        try:
+            with instrumentation.span('serve.inference'):
+                probs, labels = scoring.predict_matrix(models, X)
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        self.batches += 1
+        self.rows += len(batch)
+        self.max_seen = max(self.max_seen, len(batch))
+        for i, (_, future) in enumerate(batch):
+            future.set_result((float(probs[i]), int(labels[i])))
+
+
+# Employee JSON -> the record FeatureEncoder.encode_row expects
+def _record(employee):
+    if not isinstance(employee, dict):
+        raise ValueError("Each employee must be a JSON object")
+    record = dict(employee)
+    for key in DEPARTMENT_KEYS:
+        if key in record:
+            record['department'] = record.pop(key)
+            break
+    missing = [key for key in NUMERIC_COLUMNS + ['department', 'salary'] if key not in record]
+    if missing:
+        raise ValueError(f"Missing fields: {missing}")
+    # null and NaN would reach the models as missing values (the compiled engines assume finite input)
+    for key in NUMERIC_COLUMNS:
+        try:
+            value = float(record[key])
+        except (TypeError, ValueError):
+            raise ValueError(f"{key} must be a number, got {record[key]!r}") from None
+        if not math.isfinite(value):
+            raise ValueError(f"{key} must be a finite number, got {record[key]!r}")
+        record[key] = value
+    return record
+
+
+# Models, encoder and bundle version of a packed bundle: the ensemble of
+# `members`, or the standalone models named like the given paths ('XGB.pkl' -> 'XGB')
+def load_bundle(path, model_paths=('XGB.pkl',), members=None, voting='soft', weights=None):
+    bundle = ArtifactBundle.load(path)
+    if members:
+        models = bundle.ensemble(members, voting=voting, weights=weights)
+        description = models.names
+    else:
+        description = [os.path.splitext(os.path.basename(p))[0] for p in model_paths]
+        models = [bundle.model(name) for name in description]
+    return models, bundle.encoder(), description, bundle.version
+
+
+class ScoringService:
+    def __init__(self, models, encoder, max_batch=256, max_wait_ms=0.0, description=None,
+                 cache=None, version=None):
+        self.cache = cache
+        self.batcher = MicroBatcher(max_batch, max_wait_ms)
+        self.started = time.time()
+        self.stats = {'/score': LatencyStats(), '/score/bulk': LatencyStats()}
+        self.reloads = 0
+        self.reload_errors = []
+        self._swap(models, encoder, description, version)
+
+    def _swap(self, models, encoder, description, version):
+        # The version keeps cached results of the previous models from being served
+        cache_context = ','.join((description or []) + ([version] if version else []))
+        self.snapshot = Snapshot(models, encoder, description, version, cache_context)
+
+    @property
+    def version(self):
+        return self.snapshot.version
+
+    @property
+    def description(self):
+        return self.snapshot.description
+
+    # Serve new models from now on (requests already running keep the old snapshot)
+    def reload(self, models, encoder, description=None, version=None):
+        self._swap(models, encoder, description, version)
+        self.reloads += 1
+
+    def score_one(self, employee):
+        snapshot = self.snapshot
+        with instrumentation.span('serve.encode'):
+            row = snapshot.encoder.encode_row(_record(employee))[0]
+        if self.cache is None:
+            prob, label = self.batcher.submit(row, snapshot.models).result()
+        else:
+            prob, label = self.cache.get_or_compute(
+                row, lambda r: self.batcher.submit(r, snapshot.models).result(), snapshot.cache_context)
+        return {'churn_probability': float(prob), 'churn_prediction': int(label)}
+
+    def score_bulk(self, employees):
+        if not isinstance(employees, list):
+            raise ValueError("Expected a list of employees")
+        if not employees:
+            return {'results': []}
+        snapshot = self.snapshot
+        models, encoder = snapshot.models, snapshot.encoder
+        X = np.empty((len(employees), encoder.n_features))
+        with instrumentation.span('serve.bulk_encode'):
+            for i, employee in enumerate(employees):
+                encoder.encode_row(_record(employee), out=X[i:i + 1])
+        with instrumentation.span('serve.bulk_inference'):
+            probs, labels = scoring.predict_matrix(models, X)
+        return {'results': [{'churn_probability': float(p), 'churn_prediction': int(l)}
+                            for p, l in zip(probs, labels)]}
+
+    def health(self):
+        snapshot = self.snapshot
+        return {'status': 'ok', 'models': snapshot.description, 'bundle_version': snapshot.version,
+                'uptime_s': round(time.time() - self.started, 1)}
+
+    def metrics(self):
+        batcher = self.batcher
+        return {
+            'endpoints': {path: stats.summary() for path, stats in self.stats.items()},
+            'micro_batching': {
+                'batches': batcher.batches,
+                'rows': batcher.rows,
+                'mean_batch_size': batcher.rows / batcher.batches if batcher.batches else 0.0,
+                'max_batch_size': batcher.max_seen,
+                'queue_depth': batcher.queue_depth,
+            },
+            'cache': self.cache.stats() if self.cache is not None else None,
+            'bundle': {'version': self.version, 'reloads': self.reloads,
+                       'reload_errors': self.reload_errors[-5:]},
+            'spans': instrumentation.snapshot(),
+        }
+
+
+# Daemon thread that reloads the service when the bundle root's current version
+# changes; a bundle that fails to load (e.g. a checksum mismatch) is skipped and
+# the old models keep serving
+class BundleWatcher:
+    def __init__(self, service, root, model_paths, members, voting, interval=RELOAD_INTERVAL, weights=None):
+        self.service = service
+        self.root = root
+        self._load = lambda: load_bundle(root, model_paths, members, voting, weights)
+        self.interval = interval
+        self._failed = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name='bundle-watcher', daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+
+    def check(self):
+        version = current_version(self.root)
+        if version is None or version in (self.service.version, self._failed):
+            return False
+        try:
+            models, encoder, description, version = self._load()
+        except Exception as e:
+            self._failed = version
+            self.service.reload_errors.append({'version': version, 'error': str(e)})
+            return False
+        self.service.reload(models, encoder, description, version)
+        return True
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+
+
+class ScoringHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out as separate writes; without this, keep-alive
+    # clients stall ~40 ms per response on delayed ACKs
+    disable_nagle_algorithm = True
+    service = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == '/health':
+            self._send(200, self.service.health())
+        elif self.path == '/metrics':
+            self._send(200, self.service.metrics())
+        else:
+            self._send(404, {'error': f"Unknown path {self.path}"})
+
+    def do_POST(self):
+        stats = self.service.stats.get(self.path)
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length)
+        if stats is None:
+            self._send(404, {'error': f"Unknown path {self.path}"})
+            return
+
+        start = time.perf_counter()
+        error = True
+        try:
+            payload = json.loads(body)
+            if self.path == '/score':
+                result = self.service.score_one(payload)
+            else:
+                if isinstance(payload, dict):
+                    payload = payload.get('employees')
+                result = self.service.score_bulk(payload)
+            error = False
+            self._send(200, result)
+        except (ValueError, KeyError, TypeError) as e:
+            self._send(400, {'error': str(e)})
+        except Exception as e:
+            self._send(500, {'error': str(e)})
+        finally:
+            stats.record(time.perf_counter() - start, error)
+
+
+# HTTPServer whose connections are handled by a bounded thread pool
+class PooledHTTPServer(HTTPServer):
+    request_queue_size = 256
+
+    def __init__(self, address, handler, workers):
+        super().__init__(address, handler)
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='http-worker')
+        self._connections = set()
+        self._connections_lock = threading.Lock()
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._handle, request, client_address)
+
+    def _handle(self, request, client_address):
+        with self._connections_lock:
+            self._connections.add(request)
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            with self._connections_lock:
+                self._connections.discard(request)
+            self.shutdown_request(request)
+
+    watcher = None
+
+    # Open connections are shut down so workers blocked reading them return and the pool can drain
+    def server_close(self):
+        super().server_close()
+        if self.watcher is not None:
+            self.watcher.close()
+        with self._connections_lock:
+            connections = list(self._connections)
+        for request in connections:
+            try:
+                request.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        self.pool.shutdown(wait=True, cancel_futures=True)
+
+
+def create_server(host='127.0.0.1', port=8600, model_paths=('XGB.pkl',), members=None,
+                  voting='soft', workers=32, max_batch=256, max_wait_ms=0.0,
+                  cache_size=100_000, cache_path=None, cache_ttl=None, bundle=None,
+                  reload_interval=RELOAD_INTERVAL, keepalive_timeout=KEEPALIVE_TIMEOUT, weights=None):
+    version = None
+    if bundle:
+        models, encoder, description, version = load_bundle(bundle, model_paths, members, voting, weights)
+    else:
+        models, encoder = scoring.load_artifacts(model_paths)
+        description = list(model_paths)
+        if members:
+            models = Ensemble.load(members, voting=voting, weights=weights)
+            description = models.names
+    cache = PredictionCache(cache_size, cache_ttl, cache_path) if cache_size else None
+    service = ScoringService(models, encoder, max_batch, max_wait_ms, description, cache, version)
+    handler = type('Handler', (ScoringHandler,), {'service': service, 'timeout': keepalive_timeout or None})
+    server = PooledHTTPServer((host, port), handler, workers)
+    if bundle and reload_interval > 0 and current_version(bundle) is not None:
+        server.watcher = BundleWatcher(service, bundle, model_paths, members, voting, reload_interval, weights)
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Churn scoring HTTP service.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8600)
+    parser.add_argument('--models', nargs='+', default=['XGB.pkl'], help="Model pickles to use")
+    parser.add_argument('--members', nargs='+', help="Serve an ensemble of models/ members instead")
+    parser.add_argument('--voting', choices=['soft', 'hard'], default='soft')
+    parser.add_argument('--weights', nargs='+', type=member_weight, default=[], metavar='NAME=WEIGHT',
+                        help="Ensemble member weights (default 1 each), e.g. XGBoost=2 'Decision Tree=0.5'")
+    parser.add_argument('--workers', type=int, default=32, help="Max concurrent connections")
+    parser.add_argument('--max-batch', type=int, default=256)
+    parser.add_argument('--max-wait-ms', type=float, default=0.0,
+                        help="Extra time to wait for a batch to fill (0: take what is queued)")
+    parser.add_argument('--cache-size', type=int, default=100_000,
+                        help="Max cached /score results (0 disables the cache)")
+    parser.add_argument('--cache-path', help="SQLite file to persist cached results in")
+    parser.add_argument('--cache-ttl', type=float, help="Seconds before a cached result expires")
+    parser.add_argument('--bundle', help="Packed artifact bundle root (or version) to serve from")
+    parser.add_argument('--reload-interval', type=float, default=RELOAD_INTERVAL,
+                        help="Seconds between checks for a new bundle version (0: never reload)")
+    parser.add_argument('--keepalive-timeout', type=float, default=KEEPALIVE_TIMEOUT,
+                        help="Seconds before an idle keep-alive connection is closed (0: never)")
+    args = parser.parse_args()
+
+    server = create_server(args.host, args.port, args.models, args.members, args.voting,
+                           args.workers, args.max_batch, args.max_wait_ms,
+                           args.cache_size, args.cache_path, args.cache_ttl,
+                           args.bundle, args.reload_interval, args.keepalive_timeout,
+                           dict(args.weights))
+    print(f"Serving churn scores on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
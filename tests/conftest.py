@@ -0,0 +1,23 @@
+# The modules load their artifacts by repo-relative path ('models/...',
+# 'scaler.pkl'), so tests run from the repo root with it on sys.path.
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+
+@pytest.fixture(scope='session')
+def employees():
+    from benchmarks.common import synthetic_employees
+    return synthetic_employees(2000, seed=1)
+
+
+# Employees encoded into the scaled training layout the members are fed
+@pytest.fixture(scope='session')
+def encoded(employees):
+    from encoder import FeatureEncoder
+    return FeatureEncoder.load().encode_frame(employees)
@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from analytics import SummaryStore, summarize_frame
+from benchmarks.train import labelled_employees
+from employee_store import EmployeeStore
+
+BLOCK = 500
+
+
+@pytest.fixture(scope='module')
+def hr():
+    return labelled_employees(2000, seed=3)
+
+
+def _csv(df):
+    return df.to_csv(index=False).encode()
+
+
+def _assert_same_totals(store, df):
+    expected = summarize_frame(df)
+    for name, table in expected.items():
+        np.testing.assert_allclose(store.totals[name], table, err_msg=name)
+
+
+def test_unknown_categories_are_dropped_from_every_table(hr):
+    df = hr.copy()
+    df.loc[:99, 'Departments '] = 'legal'
+    df.loc[100:149, 'salary'] = None
+    tables = summarize_frame(df)
+
+    count = tables['groups'][:, 0].sum()
+    left = tables['groups'][:, 1].sum()
+    assert count == len(df) - 150
+    for name, table in tables.items():
+        assert table[:, 0].sum() == count, name
+        assert table[:, 1].sum() == left, name
+    np.testing.assert_allclose(tables['satisfaction'], summarize_frame(df.iloc[150:])['satisfaction'])
+
+
+def test_refresh_after_append_matches_full_summary(hr):
+    store = SummaryStore().refresh(_csv(hr.iloc[:1200]), BLOCK)
+    assert store.last_refresh['parsed'] == 3
+
+    store.refresh(_csv(hr), BLOCK)
+    # The two full blocks are reused; the partial third block and the new ones are parsed
+    assert store.last_refresh['blocks'] == 4 and store.last_refresh['parsed'] == 2
+    _assert_same_totals(store, hr)
+
+
+def test_edit_reparses_only_its_block(hr):
+    store = SummaryStore().refresh(_csv(hr), BLOCK)
+    edited = hr.copy()
+    edited.loc[1234, 'left'] = 1 - edited.loc[1234, 'left']
+    edited.loc[1234, 'salary'] = 'high' if edited.loc[1234, 'salary'] != 'high' else 'low'
+
+    store.refresh(_csv(edited), BLOCK)
+    assert store.last_refresh['parsed'] == 1
+    _assert_same_totals(store, edited)
+
+    store.refresh(_csv(edited), BLOCK)
+    assert store.last_refresh['parsed'] == 0 and not store.last_refresh['changed']
+
+
+def test_saved_summary_is_reused(hr, tmp_path):
+    path = str(tmp_path / 'summary.npz')
+    SummaryStore().refresh(_csv(hr), BLOCK).save(path)
+    store = SummaryStore.load(path).refresh(_csv(hr), BLOCK)
+    assert store.last_refresh['parsed'] == 0
+    _assert_same_totals(store, hr)
+
+
+def test_store_refresh_matches_csv(hr, tmp_path):
+    employees = EmployeeStore.create(str(tmp_path / 'hr_store'), hr.iloc[:1200])
+    summary = SummaryStore().refresh_store(employees, BLOCK)
+    employees.append(hr.iloc[1200:])
+    summary.refresh_store(employees, BLOCK)
+    assert summary.last_refresh['parsed'] == 2
+    _assert_same_totals(summary, hr)
@@ -0,0 +1,95 @@
+import json
+import os
+import shutil
+import warnings
+
+import numpy as np
+import pytest
+
+import artifacts
+import resources
+from artifacts import ArtifactBundle
+from ensemble import Ensemble
+
+
+@pytest.fixture(scope='module')
+def root(tmp_path_factory):
+    root = str(tmp_path_factory.mktemp('packed'))
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        artifacts.pack(root=root, extras=['XGB.pkl'], version='v1')
+    return root
+
+
+def test_packed_models_match_the_pickles(root):
+    bundle = ArtifactBundle.load(root)
+    assert bundle.version == 'v1'
+    assert set(bundle.member_names) == set(Ensemble.load(use_indexes=False).names)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        errors = artifacts.verify(bundle, 1000)
+    assert set(errors) == {'encoder', 'XGB', *bundle.member_names}
+    assert max(errors.values()) < 1e-9
+
+
+def test_packed_ensemble_scores_like_the_pickles(root, employees):
+    bundle = ArtifactBundle.load(root)
+    X = bundle.encoder().encode_frame(employees)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        expected, expected_labels = Ensemble.load(use_indexes=False).score(X)
+    probs, labels = bundle.ensemble().score(X)
+    np.testing.assert_allclose(probs, expected, atol=1e-9)
+    np.testing.assert_array_equal(labels, expected_labels)
+
+
+def test_corrupted_file_fails_verification(root, tmp_path):
+    directory = tmp_path / 'v1'
+    shutil.copytree(os.path.join(root, 'v1'), directory)
+    path = directory / 'XGBoost.ubj'
+    data = bytearray(path.read_bytes())
+    data[len(data) // 2] ^= 0xFF
+    path.write_bytes(bytes(data))
+
+    with pytest.raises(ValueError, match="checksum mismatch for \\['XGBoost.ubj'\\]"):
+        ArtifactBundle.load(str(directory))
+    manifest = json.loads((directory / artifacts.MANIFEST_FILE).read_text())
+    assert artifacts.corrupted_files(str(directory), manifest) == ['XGBoost.ubj']
+    assert ArtifactBundle.load(str(directory), verify=False).version == 'v1'
+
+
+@pytest.fixture
+def served(monkeypatch, tmp_path, root):
+    served = str(tmp_path / 'served')
+    os.makedirs(served)
+    for version in ['v1', 'v2']:
+        shutil.copytree(os.path.join(root, 'v1'), os.path.join(served, version))
+    artifacts._set_current(served, 'v1')
+    monkeypatch.setenv(resources.MODEL_BUNDLE_ENV, served)
+    monkeypatch.setattr(resources, 'RELOAD_INTERVAL', 0.0)
+    for name in ['_values', '_versions', '_timings']:
+        monkeypatch.setattr(resources, name, {})
+    monkeypatch.setattr(resources, '_bundle_check', {'at': float('-inf'), 'version': None})
+    return served
+
+
+def test_current_switch_is_picked_up(served):
+    assert resources.bundle_version() == 'v1'
+    first = resources.get('artifact_bundle')
+    assert first.directory == os.path.join(served, 'v1')
+    encoder = resources.get('encoder')
+    assert resources.get('encoder') is encoder
+
+    artifacts._set_current(served, 'v2')
+    assert resources.bundle_version() == 'v2'
+    assert resources.get('artifact_bundle').directory == os.path.join(served, 'v2')
+    assert resources.get('encoder') is not encoder
+    reloads = {entry['name']: entry['reloads'] for entry in resources.profile()}
+    assert reloads['artifact_bundle'] == 1 and reloads['encoder'] == 1
+
+
+def test_prune_keeps_the_current_version(served):
+    assert artifacts.versions(served) == ['v1', 'v2']
+    assert artifacts.prune(served, keep=1) == []
+    assert artifacts.prune(served, keep=0) == ['v2']
+    assert artifacts.versions(served) == ['v1']
@@ -0,0 +1,87 @@
+import zipfile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.common import synthetic_employees
+from bulk_reports import Checkpoint, generate_reports, report_names, write_bundle
+from llm import LLMClient, StubBackend
+
+
+@pytest.fixture
+def scored():
+    df = synthetic_employees(40, seed=3)
+    df['churn_probability'] = np.linspace(0.0, 1.0, len(df))
+    return df
+
+
+def _client():
+    return LLMClient(StubBackend(first_token_ms=0, token_ms=0, words=12))
+
+
+def test_report_names_are_safe_and_unique():
+    names = report_names(['../../etc/passwd', 'a/b', 'alice', 'alice', '', None, '..', 'x..y', 'C:\\temp'])
+    assert len(set(names)) == len(names)
+    for name in names:
+        assert name and '/' not in name and '\\' not in name and '..' not in name
+        assert not name.startswith('.')
+    assert names[2] == 'alice'
+    assert names[3] == 'alice_3'
+    assert names[4] == 'row_4'
+
+
+def test_report_names_do_not_collide_with_suffixed_ids():
+    names = report_names(['a', 'a_1', 'a'])
+    assert len(set(names)) == 3
+
+
+def test_checkpoint_skips_partial_last_line(tmp_path):
+    path = tmp_path / 'run.checkpoint.jsonl'
+    checkpoint = Checkpoint(str(path))
+    checkpoint.add('k1', 'report one')
+    with open(path, 'a') as f:
+        f.write('{"key": "k2", "te')
+    assert Checkpoint(str(path)).done == {'k1': 'report one'}
+
+
+def test_resume_only_generates_missing_reports(scored, tmp_path):
+    path = str(tmp_path / 'run.checkpoint.jsonl')
+    first, _, stats = generate_reports(scored.iloc[:30], _client(), concurrency=4, rate=0,
+                                       checkpoint=Checkpoint(path))
+    assert stats['failed'] == 0 and stats['resumed'] == 0
+
+    client = _client()
+    reports, risky, stats = generate_reports(scored, client, concurrency=4, rate=0, checkpoint=Checkpoint(path))
+    assert stats['resumed'] == len(first)
+    assert stats['generated'] == stats['high_risk'] - len(first)
+    assert client.backend.calls == stats['generated']
+    assert reports[:len(first)] == first
+    assert all(reports) and len(reports) == len(risky)
+
+
+def test_bundle_names_reports_by_id_column(scored, tmp_path):
+    scored['employee_id'] = ['../x'] * len(scored)
+    reports, risky, _ = generate_reports(scored, _client(), rate=0)
+    path = tmp_path / 'reports.zip'
+    write_bundle(str(path), reports, risky, 'employee_id')
+    with zipfile.ZipFile(path) as bundle:
+        entries = bundle.namelist()
+        index = pd.read_csv(bundle.open('index.csv'))
+    reports_in_zip = [entry for entry in entries if entry.startswith('reports/')]
+    assert len(reports_in_zip) == len(risky)
+    assert all(entry.count('/') == 1 and '..' not in entry for entry in reports_in_zip)
+    assert list(index['report']) == reports_in_zip
+
+
+def test_checkpoint_is_not_resumed_across_backends(scored, tmp_path):
+    path = str(tmp_path / 'run.checkpoint.jsonl')
+    generate_reports(scored, _client(), rate=0, checkpoint=Checkpoint(path))
+
+    other = LLMClient(StubBackend(first_token_ms=0, token_ms=0, words=12, model_name='gemini-like'))
+    _, _, stats = generate_reports(scored, other, rate=0, checkpoint=Checkpoint(path))
+    assert stats['resumed'] == 0
+    assert other.backend.calls == stats['unique_prompts']
+    # Resuming with the same backend still works
+    _, _, stats = generate_reports(scored, other, rate=0, checkpoint=Checkpoint(path))
+    assert stats['resumed'] == stats['unique_prompts']
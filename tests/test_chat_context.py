@@ -0,0 +1,64 @@
+import pytest
+
+from chat_context import ChatContext
+
+
+class ScriptedClient:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.prompts = []
+
+    def stream(self, prompt, use_cache=True):
+        self.prompts.append([message['role'] for message in prompt])
+        yield 'Hello'
+        if self.fail:
+            raise RuntimeError("connection reset")
+        yield ' there'
+
+    def generate(self, prompt, use_cache=True):
+        return 'summary of earlier turns'
+
+
+def _alternates(roles):
+    return all(role == ('user' if i % 2 == 0 else 'model') for i, role in enumerate(roles))
+
+
+def test_reply_appends_a_full_turn():
+    context = ChatContext(ScriptedClient())
+    assert context.reply('hi') == 'Hello there'
+    assert [m['role'] for m in context.window] == ['user', 'model']
+    assert len(context._tokens) == len(context.window)
+
+
+def test_abandoned_stream_drops_the_question():
+    client = ScriptedClient()
+    context = ChatContext(client)
+    context.reply('first')
+    stream = context.stream_reply('second')
+    next(stream)
+    # What a Streamlit rerun does to a stream it stops consuming
+    stream.close()
+    assert [m['role'] for m in context.window] == ['user', 'model']
+    assert len(context._tokens) == 2
+
+    context.reply('third')
+    assert _alternates(client.prompts[-1])
+    assert _alternates([m['role'] for m in context.window])
+
+
+def test_failed_stream_drops_the_question():
+    context = ChatContext(ScriptedClient(fail=True))
+    with pytest.raises(RuntimeError):
+        context.reply('hi')
+    assert context.window == [] and context._tokens == []
+    assert context.turns == []
+
+
+def test_compaction_keeps_alternation():
+    client = ScriptedClient()
+    context = ChatContext(client, window_turns=2)
+    for i in range(6):
+        context.reply(f"question {i}")
+    assert context.summary and context.summarized_turns > 0
+    assert len(context.window) // 2 <= 2
+    assert _alternates([m['role'] for m in context.prompt()])
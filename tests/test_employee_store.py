@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.common import synthetic_employees
+from employee_store import EmployeeStore
+from encoder import FeatureEncoder
+from ensemble import Ensemble
+from scoring import score_frame, score_store
+
+
+def _decoded(store):
+    df = store.to_frame()
+    for name in df.columns:
+        if isinstance(df[name].dtype, pd.CategoricalDtype):
+            df[name] = df[name].astype(str)
+    return df
+
+
+def _assert_same_rows(store, expected):
+    pd.testing.assert_frame_equal(_decoded(store), expected.reset_index(drop=True), check_dtype=False)
+
+
+def test_append_widen_and_reopen(tmp_path):
+    path = str(tmp_path / 'store')
+    first = synthetic_employees(500, seed=1)
+    first['employee_id'] = np.arange(500)
+    store = EmployeeStore.create(path, first)
+    assert np.dtype(store._spec('employee_id')['dtype']) == np.int16
+    assert np.dtype(store._spec('salary')['dtype']) == np.uint8
+
+    # Larger ids and 300 new departments widen the id and code columns
+    second = synthetic_employees(400, seed=2)
+    second['employee_id'] = np.arange(100_000, 100_400)
+    second.loc[:299, 'Departments '] = [f"team_{i}" for i in range(300)]
+    store.append(second)
+    assert np.dtype(store._spec('employee_id')['dtype']) == np.int32
+    assert np.dtype(store._spec('Departments ')['dtype']) == np.uint16
+
+    expected = pd.concat([first, second])
+    _assert_same_rows(store, expected)
+    reopened = EmployeeStore.open(path)
+    assert len(reopened) == 900
+    _assert_same_rows(reopened, expected)
+    np.testing.assert_array_equal(reopened.column('satisfaction_level'), expected['satisfaction_level'])
+
+    chunks = list(reopened.iter_chunks(['employee_id'], chunksize=256))
+    assert [start for start, _ in chunks] == [0, 256, 512, 768]
+    np.testing.assert_array_equal(np.concatenate([c['employee_id'] for _, c in chunks]),
+                                  expected['employee_id'])
+
+
+def test_interrupted_append_is_invisible(tmp_path):
+    path = str(tmp_path / 'store')
+    df = synthetic_employees(100, seed=3)
+    store = EmployeeStore.create(path, df)
+    # Bytes written by an append that died before updating meta.json
+    with open(store._file(store._spec('number_project')), 'ab') as f:
+        f.write(b'\x07' * 50)
+    assert len(EmployeeStore.open(path)) == 100
+
+    more = synthetic_employees(20, seed=4)
+    EmployeeStore.open(path).append(more)
+    _assert_same_rows(EmployeeStore.open(path), pd.concat([df, more]))
+
+
+def test_append_rejects_bad_rows(tmp_path):
+    store = EmployeeStore.create(str(tmp_path / 'store'), synthetic_employees(10))
+    with pytest.raises(ValueError, match="Missing columns"):
+        store.append(synthetic_employees(5).drop(columns=['salary']))
+    bad = synthetic_employees(5)
+    bad['number_project'] = 2.5
+    with pytest.raises(ValueError, match="fractional"):
+        store.append(bad)
+    assert len(EmployeeStore.open(store.path)) == 10
+
+
+def test_scoring_a_store_matches_the_frame(tmp_path, employees):
+    store = EmployeeStore.create(str(tmp_path / 'store'), employees)
+    models = Ensemble.load(['Logistic Regression', 'Decision Tree'], use_indexes=False)
+    encoder = FeatureEncoder.load()
+    probs, labels = score_store(store, models, encoder, chunksize=300)
+    scored = score_frame(employees, models, encoder)
+    np.testing.assert_allclose(probs, scored['churn_probability'])
+    np.testing.assert_array_equal(labels, scored['churn_prediction'])
@@ -0,0 +1,94 @@
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+from encoder import DEPARTMENTS, SALARIES, FeatureEncoder
+
+
+@pytest.fixture(scope='module')
+def artifacts():
+    return joblib.load('dummy_columns.pkl'), joblib.load('scaler.pkl')
+
+
+# The path the encoder replaces: get_dummies, align to the training columns, scale
+def _reference(df, columns, scaler):
+    dummies = pd.get_dummies(df, columns=['Departments ', 'salary'])
+    aligned = dummies.reindex(columns=columns, fill_value=0).astype(np.float64)
+    return scaler.transform(aligned)
+
+
+def _record(row):
+    record = {key: value for key, value in row.items() if key != 'Departments '}
+    record['department'] = row['Departments ']
+    return record
+
+
+def test_encode_frame_matches_get_dummies(artifacts, employees):
+    columns, scaler = artifacts
+    expected = _reference(employees, columns, scaler)
+    np.testing.assert_allclose(FeatureEncoder(columns, scaler).encode_frame(employees), expected, atol=1e-12)
+    got32 = FeatureEncoder(columns, scaler).encode_frame(employees, dtype=np.float32)
+    assert got32.dtype == np.float32
+    np.testing.assert_allclose(got32, expected, atol=1e-6)
+
+
+def test_encode_frame_without_scaler_is_the_raw_layout(artifacts, employees):
+    columns, _ = artifacts
+    expected = pd.get_dummies(employees, columns=['Departments ', 'salary'])
+    expected = expected.reindex(columns=columns, fill_value=0).to_numpy(dtype=np.float64)
+    np.testing.assert_array_equal(FeatureEncoder(columns).encode_frame(employees), expected)
+
+
+def test_encode_row_matches_get_dummies(artifacts, employees):
+    columns, scaler = artifacts
+    encoder = FeatureEncoder(columns, scaler)
+    sample = employees.iloc[:50]
+    expected = _reference(sample, columns, scaler)
+    buffer = np.empty((1, encoder.n_features))
+    for i, row in enumerate(sample.to_dict(orient='records')):
+        np.testing.assert_allclose(encoder.encode_row(_record(row))[0], expected[i], atol=1e-12)
+        # A reused buffer is fully overwritten
+        np.testing.assert_allclose(encoder.encode_row(_record(row), out=buffer)[0], expected[i], atol=1e-12)
+
+
+def test_encode_coded_matches_encode_frame(artifacts, employees):
+    columns, scaler = artifacts
+    encoder = FeatureEncoder(columns, scaler)
+    # Category lists in another order than the encoder's, plus an unused extra one
+    departments = list(reversed(DEPARTMENTS)) + ['unused']
+    salaries = list(reversed(SALARIES))
+    department_codes = pd.Categorical(employees['Departments '], categories=departments).codes
+    salary_codes = pd.Categorical(employees['salary'], categories=salaries).codes
+    got = encoder.encode_coded(employees, department_codes, departments, salary_codes, salaries)
+    np.testing.assert_allclose(got, encoder.encode_frame(employees), atol=1e-12)
+
+
+def test_department_aliases(artifacts, employees):
+    encoder = FeatureEncoder(*artifacts)
+    renamed = employees.rename(columns={'Departments ': 'department'})
+    np.testing.assert_array_equal(encoder.encode_frame(renamed), encoder.encode_frame(employees))
+
+
+def test_unknown_categories_are_rejected(artifacts, employees):
+    encoder = FeatureEncoder(*artifacts)
+    bad = employees.iloc[:5].copy()
+    bad.loc[bad.index[2], 'Departments '] = 'legal'
+    with pytest.raises(ValueError, match='legal'):
+        encoder.encode_frame(bad)
+    bad = employees.iloc[:5].copy()
+    bad.loc[bad.index[0], 'salary'] = 'very high'
+    with pytest.raises(ValueError, match='very high'):
+        encoder.encode_frame(bad)
+
+    record = _record(employees.iloc[0].to_dict())
+    with pytest.raises(ValueError, match='department'):
+        encoder.encode_row({**record, 'department': 'legal'})
+    with pytest.raises(ValueError, match='salary'):
+        encoder.encode_row({**record, 'salary': None})
+
+    codes = np.zeros(3, dtype=np.int8)
+    with pytest.raises(ValueError, match='legal'):
+        encoder.encode_coded(employees.iloc[:3], codes, ['legal'], codes, ['low'])
+    with pytest.raises(ValueError, match='Missing column'):
+        encoder.encode_frame(employees.drop(columns=['salary']))
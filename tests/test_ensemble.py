@@ -0,0 +1,76 @@
+import shutil
+
+import joblib
+import numpy as np
+import pytest
+
+from ensemble import Ensemble, check_member, load_model, member_weight
+
+MEMBERS = ['Decision Tree', 'Logistic Regression']
+
+
+@pytest.fixture
+def model_dir(tmp_path):
+    for name in MEMBERS:
+        shutil.copy(f"models/{name}_model.pkl", tmp_path)
+    shutil.copy('models/columns.pkl', tmp_path)
+    shutil.copy('models/voting_model.pkl', tmp_path)
+    return tmp_path
+
+
+def test_placeholder_pickle_is_skipped(model_dir):
+    assert load_model(str(model_dir / 'voting_model.pkl')) is None
+    assert Ensemble.load(model_dir=str(model_dir)).names == MEMBERS
+
+
+def test_broken_pickle_is_raised(model_dir):
+    (model_dir / 'Decision Tree_model.pkl').write_bytes(b'\x80\x04truncated')
+    with pytest.raises(RuntimeError, match='Decision Tree_model.pkl'):
+        Ensemble.load(model_dir=str(model_dir))
+
+
+def test_check_member_keeps_the_callers_feature_names():
+    columns = joblib.load('models/columns.pkl')
+    model = joblib.load('models/Decision Tree_model.pkl')
+    member = check_member(model, columns, 'Decision Tree')
+    assert list(model.feature_names_in_) == list(columns)
+    assert not hasattr(member, 'feature_names_in_')
+    assert member.tree_ is model.tree_
+    with pytest.raises(ValueError):
+        check_member(model, list(reversed(columns)), 'Decision Tree')
+
+
+def test_weights_shift_the_soft_vote(model_dir, encoded):
+    equal = Ensemble.load(model_dir=str(model_dir))
+    weighted = Ensemble.load(model_dir=str(model_dir), weights={'Decision Tree': 3})
+    probs = equal.member_probabilities(encoded)
+    np.testing.assert_allclose(weighted.score(encoded)[0], probs @ [0.75, 0.25])
+    np.testing.assert_allclose(equal.score(encoded)[0], probs.mean(axis=1))
+    assert list(weighted.subset(['Decision Tree'], weights={'Logistic Regression': 2}).weights) == [3.0]
+
+
+def test_invalid_weights_are_rejected(model_dir):
+    with pytest.raises(ValueError):
+        Ensemble.load(model_dir=str(model_dir), weights={'XGBoost': 2})
+    with pytest.raises(ValueError):
+        Ensemble.load(model_dir=str(model_dir), weights={name: 0 for name in MEMBERS})
+    assert member_weight('Decision Tree=0.5') == ('Decision Tree', 0.5)
+    with pytest.raises(ValueError):
+        member_weight('XGBoost')
+
+
+def test_stale_knn_index_falls_back_to_the_pickle(model_dir):
+    from knn_index import KNNIndex, build
+
+    knn = model_dir / 'K-Nearest Neighbors_model.pkl'
+    shutil.copy('models/K-Nearest Neighbors_model.pkl', knn)
+    build(str(knn), str(model_dir / 'knn_index'))
+    assert isinstance(Ensemble.load(model_dir=str(model_dir)).members['K-Nearest Neighbors'], KNNIndex)
+
+    # A retrained pickle no longer matches the index built from the old one
+    model = joblib.load(knn)
+    joblib.dump(model.set_params(n_neighbors=7), knn)
+    with pytest.warns(UserWarning, match='knn_index'):
+        member = Ensemble.load(model_dir=str(model_dir)).members['K-Nearest Neighbors']
+    assert not isinstance(member, KNNIndex)
+    assert member.n_neighbors == 7
@@ -0,0 +1,145 @@
+import warnings
+from itertools import combinations
+from math import factorial
+
+import joblib
+import numpy as np
+import pytest
+from sklearn.ensemble import GradientBoostingClassifier
+from sklearn.tree import DecisionTreeClassifier
+
+from explain import EnsembleExplainer, TreeExplainer
+
+TREE_MODELS = {
+    'XGBoost': 'models/XGBoost_model.pkl',
+    'LightGBM': 'models/LightGBM_model.pkl',
+    'Gradient Boosting': 'models/Gradient Boosting_model.pkl',
+    'Decision Tree': 'models/Decision Tree_model.pkl',
+}
+
+
+def _load(path):
+    with warnings.catch_warnings():
+        # Pickles saved by older library versions
+        warnings.simplefilter('ignore')
+        return joblib.load(path)
+
+
+@pytest.fixture(scope='module')
+def members():
+    return {name: _load(path) for name, path in TREE_MODELS.items()}
+
+
+@pytest.fixture
+def rows(encoded):
+    return encoded[:300]
+
+
+# Raw output the attributions add up to: log-odds, or probability for a single tree
+def _margin(model, X):
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', UserWarning)
+        name = type(model).__name__
+        if name == 'XGBClassifier':
+            return model.predict(X, output_margin=True)
+        if name == 'LGBMClassifier':
+            return model.predict(X, raw_score=True)
+        if name == 'GradientBoostingClassifier':
+            return model.decision_function(X)
+        return model.predict_proba(X)[:, 1]
+
+
+# Path-dependent conditional expectation of one sklearn tree: features in
+# `known` follow x, the others split by training cover
+def _expectation(tree, values, x, known, node=0):
+    left, right = tree.children_left[node], tree.children_right[node]
+    if left < 0:
+        return values[node]
+    f = tree.feature[node]
+    if f in known:
+        child = left if x[f] <= tree.threshold[node] else right
+        return _expectation(tree, values, x, known, child)
+    cover = tree.weighted_n_node_samples
+    return (cover[left] * _expectation(tree, values, x, known, left)
+            + cover[right] * _expectation(tree, values, x, known, right)) / cover[node]
+
+
+# Shapley values by enumerating every coalition
+def _brute_force_shap(trees, x, n_features):
+    def game(known):
+        return sum(_expectation(tree, values, x, known) for tree, values in trees)
+
+    phi = np.zeros(n_features)
+    for i in range(n_features):
+        others = [f for f in range(n_features) if f != i]
+        for size in range(n_features):
+            weight = factorial(size) * factorial(n_features - size - 1) / factorial(n_features)
+            for coalition in combinations(others, size):
+                known = set(coalition)
+                phi[i] += weight * (game(known | {i}) - game(known))
+    return phi
+
+
+@pytest.fixture(scope='module')
+def small_data():
+    rng = np.random.default_rng(0)
+    X = rng.integers(0, 20, size=(400, 5)).astype(np.float32) / 4
+    y = ((X[:, 0] > 2) ^ (X[:, 1] + X[:, 2] > 5) | (rng.random(400) < 0.1)).astype(int)
+    return X, y
+
+
+def test_decision_tree_matches_brute_force(small_data):
+    X, y = small_data
+    model = DecisionTreeClassifier(max_depth=5, random_state=0).fit(X, y)
+    counts = model.tree_.value[:, 0, :]
+    trees = [(model.tree_, counts[:, 1] / counts.sum(axis=1))]
+    got = TreeExplainer(model).shap_values(X[:15])
+    expected = np.array([_brute_force_shap(trees, x, X.shape[1]) for x in X[:15]])
+    np.testing.assert_allclose(got, expected, atol=1e-9)
+
+
+def test_gradient_boosting_matches_brute_force(small_data):
+    X, y = small_data
+    model = GradientBoostingClassifier(n_estimators=6, max_depth=3, random_state=0).fit(X, y)
+    trees = [(est.tree_, est.tree_.value[:, 0, 0] * model.learning_rate) for est in model.estimators_[:, 0]]
+    got = TreeExplainer(model).shap_values(X[:15])
+    expected = np.array([_brute_force_shap(trees, x, X.shape[1]) for x in X[:15]])
+    np.testing.assert_allclose(got, expected, atol=1e-9)
+
+
+@pytest.mark.parametrize('name', ['XGBoost', 'LightGBM'])
+def test_path_tables_match_native_treeshap(members, rows, name):
+    native = TreeExplainer(members[name])
+    tables = TreeExplainer(members[name], native=False)
+    assert native.native and not tables.native
+    np.testing.assert_allclose(tables.shap_values(rows), native.shap_values(rows), atol=1e-4)
+
+
+@pytest.mark.parametrize('native', [True, False])
+@pytest.mark.parametrize('name', list(TREE_MODELS))
+def test_attributions_add_up_to_the_margin(members, rows, name, native):
+    explainer = TreeExplainer(members[name], native=native)
+    values = explainer.shap_values(rows)
+    assert values.shape == rows.shape
+    np.testing.assert_allclose(explainer.expected_value + values.sum(axis=1),
+                               _margin(members[name], rows), atol=1e-4)
+
+
+def test_row_blocks_match_one_block(members, rows, monkeypatch):
+    explainer = TreeExplainer(members['Gradient Boosting'])
+    whole = explainer.shap_values(rows)
+    monkeypatch.setattr('explain.BLOCK_ELEMENTS', explainer.work * 7)
+    np.testing.assert_allclose(explainer.shap_values(rows), whole, atol=1e-12)
+
+
+def test_ensemble_attributions_add_up_to_the_probability(members, rows):
+    weights = {'XGBoost': 2.0, 'Decision Tree': 0.5}
+    explainer = EnsembleExplainer(members, weights)
+    base, values, used = explainer.explain(rows)
+    assert used == list(TREE_MODELS)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', UserWarning)
+        probs = np.column_stack([members[name].predict_proba(rows)[:, 1] for name in used])
+    w = np.array([weights.get(name, 1.0) for name in used])
+    np.testing.assert_allclose(base + values.sum(axis=1), probs @ w / w.sum(), atol=1e-4)
@@ -0,0 +1,81 @@
+import math
+
+import numpy as np
+import pytest
+
+import instrumentation
+from instrumentation import BOUNDS, BUCKETS_PER_DOUBLING, Histogram, Registry
+
+# Relative width of one bucket: a quantile is never off by more than that
+BUCKET_RATIO = 2 ** (1 / BUCKETS_PER_DOUBLING)
+
+
+@pytest.mark.parametrize('samples', [
+    np.exp(np.random.default_rng(0).uniform(np.log(1e-5), np.log(2.0), 20_000)),
+    np.random.default_rng(1).normal(0.050, 0.005, 20_000),
+    np.random.default_rng(2).exponential(0.002, 20_000) + 1e-4,
+])
+def test_quantiles_are_within_one_bucket(samples):
+    histogram = Histogram()
+    for value in samples:
+        histogram.observe(float(value))
+    for q in [0.01, 0.25, 0.5, 0.9, 0.95, 0.99, 0.999]:
+        expected = np.quantile(samples, q)
+        assert expected / BUCKET_RATIO <= histogram.quantile(q) <= expected * BUCKET_RATIO, q
+
+    summary = histogram.summary()
+    assert summary['count'] == len(samples)
+    assert summary['mean_ms'] == pytest.approx(samples.mean() * 1e3)
+    assert summary['max_ms'] == pytest.approx(samples.max() * 1e3)
+    assert summary['total_s'] == pytest.approx(samples.sum())
+
+
+def test_quantiles_stay_within_the_observed_range():
+    histogram = Histogram()
+    assert math.isnan(histogram.quantile(0.5))
+    histogram.observe(0.0123)
+    assert histogram.quantile(0.0) == histogram.quantile(0.99) == 0.0123
+
+    # Slower than the last bucket bound
+    histogram.observe(BOUNDS[-1] * 10)
+    assert histogram.quantile(1.0) == BOUNDS[-1] * 10
+    assert histogram.counts[-1] == 1
+
+
+def test_span_and_timed_record_durations():
+    registry = Registry()
+    with registry.span('work'):
+        pass
+
+    @registry.timed('call')
+    def add(a, b):
+        """Adds."""
+        return a + b
+
+    assert add(1, 2) == 3 and add.__name__ == 'add' and add.__doc__ == "Adds."
+    registry.observe('work', 0.5)
+    snapshot = registry.snapshot()
+    assert list(snapshot) == ['call', 'work']
+    assert snapshot['call']['count'] == 1 and snapshot['work']['count'] == 2
+    assert snapshot['work']['max_ms'] == 500.0
+
+    with pytest.raises(KeyError):
+        with registry.span('failing'):
+            raise KeyError('x')
+    assert registry.snapshot()['failing']['count'] == 1
+    registry.reset()
+    assert registry.snapshot() == {}
+
+
+def test_disabled_instrumentation_is_a_no_op(monkeypatch):
+    monkeypatch.setenv(instrumentation.ENABLED_ENV, '0')
+    registry = Registry()
+    with registry.span('work'):
+        pass
+    registry.observe('work', 0.5)
+    assert registry.timed('call')(lambda: 'result')() == 'result'
+    assert registry.snapshot() == {}
+
+    monkeypatch.setenv(instrumentation.ENABLED_ENV, '1')
+    registry.observe('work', 0.5)
+    assert registry.snapshot()['work']['count'] == 1
@@ -0,0 +1,49 @@
+import warnings
+
+import joblib
+import numpy as np
+import pytest
+
+from benchmarks.common import synthetic_employees
+from encoder import FeatureEncoder
+from knn_index import KNN_MODEL_PATH, KNNIndex
+
+
+@pytest.fixture(scope='module')
+def model():
+    return joblib.load(KNN_MODEL_PATH)
+
+
+@pytest.fixture(scope='module')
+def index(model):
+    return KNNIndex.from_model(model, KNN_MODEL_PATH)
+
+
+def _sklearn_proba(model, X):
+    with warnings.catch_warnings():
+        # Fitted on a DataFrame, fed the encoder's ndarray like the index
+        warnings.simplefilter('ignore', UserWarning)
+        return model.predict_proba(X)
+
+
+def test_matches_sklearn(model, index, encoded):
+    np.testing.assert_array_equal(index.predict_proba(encoded), _sklearn_proba(model, encoded))
+
+
+def test_large_batch_in_one_cell_matches_sklearn(model, index):
+    df = synthetic_employees(12_000, seed=5)
+    df['Departments '], df['salary'] = 'sales', 'low'
+    df['Work_accident'], df['promotion_last_5years'] = 0, 0
+    X = FeatureEncoder.load().encode_frame(df)
+    # Every row searches the same cells, in many blocks
+    assert len(X) > 10 * index._block_rows
+    np.testing.assert_array_equal(index.predict_proba(X), _sklearn_proba(model, X))
+
+
+def test_kneighbors_matches_sklearn(model, index, encoded):
+    X = encoded[:200]
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', UserWarning)
+        expected_dist, _ = model.kneighbors(X, 8)
+    dist, _ = index.kneighbors(X, 8)
+    np.testing.assert_allclose(dist, expected_dist, atol=1e-5)
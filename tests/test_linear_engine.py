@@ -0,0 +1,35 @@
+import joblib
+import numpy as np
+import pytest
+
+from ensemble import check_member
+from linear_engine import DEFAULT_TOLERANCE, check_fused, compile_linear
+
+MODEL_PATH = 'models/Logistic Regression_model.pkl'
+
+
+@pytest.fixture(scope='module')
+def artifacts():
+    columns, scaler = joblib.load('dummy_columns.pkl'), joblib.load('scaler.pkl')
+    return check_member(joblib.load(MODEL_PATH), columns, MODEL_PATH), scaler, columns
+
+
+def test_unfused_matches_sklearn(artifacts, encoded):
+    model, _, _ = artifacts
+    compiled = compile_linear(model, dtype=np.float64)
+    np.testing.assert_allclose(compiled.predict_proba(encoded), model.predict_proba(encoded), atol=1e-12)
+    np.testing.assert_array_equal(compiled.predict(encoded), model.predict(encoded))
+
+
+def test_fused_float32_matches_sklearn(artifacts, employees):
+    model, scaler, columns = artifacts
+    fused = compile_linear(model, scaler)
+    assert fused.dtype == np.float32
+    max_diff, mismatched = check_fused(fused, model, scaler, columns, employees)
+    assert max_diff <= DEFAULT_TOLERANCE
+    assert mismatched == 0
+
+
+def test_rejects_non_linear_models():
+    with pytest.raises(TypeError):
+        compile_linear(joblib.load('models/Decision Tree_model.pkl'))
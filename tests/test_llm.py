@@ -0,0 +1,104 @@
+import pytest
+
+from llm import LLMClient, LLMError, ResponseCache, StubBackend
+
+PROMPT = "Write a retention report for employee 42."
+
+
+def _client(backend, **kwargs):
+    kwargs.setdefault('backoff', 0.0)
+    return LLMClient(backend, **kwargs)
+
+
+# Sends some text, then fails mid-response
+class PartialBackend:
+    name = 'partial'
+    model_name = 'partial'
+
+    def __init__(self):
+        self.calls = 0
+
+    def stream(self, prompt, timeout=None):
+        self.calls += 1
+        yield 'Risk analysis '
+        raise ConnectionError("connection reset")
+
+
+def test_timeout_before_first_chunk():
+    client = _client(StubBackend(first_token_ms=500), timeout=0.05, retries=0)
+    with pytest.raises(LLMError, match="No response within"):
+        client.generate(PROMPT)
+
+
+def test_retries_failures_before_first_chunk():
+    backend = StubBackend(first_token_ms=0, token_ms=0, fail_first=2)
+    timing = {}
+    text = _client(backend, retries=2).generate(PROMPT, timing=timing)
+    assert text == backend.response_text(PROMPT)
+    assert backend.calls == 3
+    assert timing['attempts'] == 3 and timing['cached'] is False
+
+
+def test_gives_up_after_the_last_retry():
+    backend = StubBackend(first_token_ms=0, token_ms=0, fail_first=3)
+    with pytest.raises(LLMError, match="injected failure"):
+        _client(backend, retries=2).generate(PROMPT)
+    assert backend.calls == 3
+
+
+def test_no_retry_after_partial_output():
+    backend = PartialBackend()
+    client = _client(backend, retries=3, cache=ResponseCache())
+    chunks = []
+    with pytest.raises(LLMError, match="connection reset"):
+        for chunk in client.stream(PROMPT):
+            chunks.append(chunk)
+    assert chunks == ['Risk analysis ']
+    assert backend.calls == 1
+    # An incomplete response is never cached
+    assert client.cache.stats()['entries'] == 0
+
+
+def test_cache_hit_skips_the_backend():
+    backend = StubBackend(first_token_ms=0, token_ms=0)
+    client = _client(backend, cache=ResponseCache())
+    first = client.generate(PROMPT)
+    timing = {}
+    assert client.generate(PROMPT, timing=timing) == first
+    assert backend.calls == 1
+    assert timing['cached'] is True and timing['attempts'] == 0
+    assert client.cache.stats()['hits'] == 1
+
+    # use_cache=False always goes to the backend
+    assert client.generate(PROMPT, use_cache=False) == first
+    assert backend.calls == 2
+
+
+def test_cache_is_keyed_on_the_model():
+    cache = ResponseCache()
+    flash = StubBackend(first_token_ms=0, token_ms=0, model_name='flash')
+    pro = StubBackend(first_token_ms=0, token_ms=0, model_name='pro')
+    _client(flash, cache=cache).generate(PROMPT)
+    _client(pro, cache=cache).generate(PROMPT)
+    assert pro.calls == 1
+    assert cache.stats()['entries'] == 2
+
+
+def test_lru_evicts_oldest_entry():
+    cache = ResponseCache(max_entries=2)
+    for key in ['a', 'b', 'c']:
+        cache.put(key, key.upper())
+    assert cache.get('a') is None
+    assert cache.get('c') == 'C'
+
+
+def test_sqlite_cache_survives_restart(tmp_path):
+    store = str(tmp_path / 'responses.sqlite')
+    backend = StubBackend(first_token_ms=0, token_ms=0)
+    text = _client(backend, cache=ResponseCache(store_path=store)).generate(PROMPT)
+
+    restarted = StubBackend(first_token_ms=0, token_ms=0)
+    cache = ResponseCache(store_path=store)
+    assert _client(restarted, cache=cache).generate(PROMPT) == text
+    assert restarted.calls == 0
+    assert cache.stats()['hits'] == 1
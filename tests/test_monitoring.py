@@ -0,0 +1,121 @@
+import time
+
+import numpy as np
+import pytest
+
+import monitoring
+from benchmarks.common import synthetic_employees
+from monitoring import DriftMonitor, Sketch, frame_records, ks_distance, population_stability_index
+
+DAY = 86400
+
+
+def _records(n, seed=0, timestamp=None, **shift):
+    df = synthetic_employees(n, seed)
+    for name, delta in shift.items():
+        df[name] = (df[name] + delta).clip(0, 1)
+    probabilities = np.random.default_rng(seed).random(n)
+    return frame_records(df, probabilities, (probabilities >= 0.5).astype(np.int8), timestamp)
+
+
+def _assert_same_sketch(sketch, expected):
+    np.testing.assert_array_equal(sketch.counts, expected.counts)
+    np.testing.assert_allclose(sketch.moments, expected.moments)
+
+
+def test_sketches_fold_only_new_records(tmp_path, monkeypatch):
+    monkeypatch.setattr(monitoring, 'CHUNK_RECORDS', 300)
+    monitor = DriftMonitor(str(tmp_path))
+    batches = [_records(n, seed) for seed, n in enumerate([1000, 1, 250])]
+    monitor.append(batches[0])
+    assert monitor.refresh().last_refresh['folded'] == 1000
+    monitor.append(batches[1])
+    monitor.append(batches[2])
+    assert monitor.refresh().last_refresh['folded'] == 251
+    assert monitor.refresh().last_refresh['folded'] == 0
+    everything = np.concatenate(batches)
+    _assert_same_sketch(monitor.total, Sketch().update(everything))
+    assert monitor.total.n == 1251
+
+    # A restarted process picks the saved sketches up and only reads what was appended since
+    monitor.append(_records(40, seed=9))
+    restarted = DriftMonitor(str(tmp_path)).refresh()
+    assert restarted.last_refresh['folded'] == 40 and restarted.last_refresh['records'] == 1291
+    _assert_same_sketch(restarted.total, Sketch().update(np.concatenate([everything, _records(40, seed=9)])))
+
+
+def test_replaced_log_discards_sketches(tmp_path):
+    monitor = DriftMonitor(str(tmp_path))
+    monitor.append(_records(500))
+    monitor.refresh()
+    (tmp_path / monitoring.LOG_FILE).unlink()
+    DriftMonitor(str(tmp_path)).append(_records(20, seed=1))
+    monitor.refresh()
+    assert monitor.total.n == 20
+    _assert_same_sketch(monitor.total, Sketch().update(_records(20, seed=1)))
+
+
+def test_daily_window(tmp_path):
+    monitor = DriftMonitor(str(tmp_path))
+    now = time.time()
+    monitor.append(_records(100, seed=1, timestamp=now - 40 * DAY))
+    monitor.append(_records(200, seed=2, timestamp=now - 3 * DAY))
+    monitor.append(_records(300, seed=3, timestamp=now))
+    monitor.refresh()
+    assert monitor.window().n == 600
+    assert monitor.window(1).n == 300
+    assert monitor.window(7).n == 500
+    assert monitor.window(monitoring.WINDOW_DAYS).n == 500
+
+
+def test_unknown_categories_are_binned_as_other():
+    df = synthetic_employees(10)
+    df.loc[:2, 'Departments '] = 'legal'
+    sketch = Sketch().update(frame_records(df))
+    assert sketch.histogram('department')[-1] == 3
+    assert sketch.count('probability') == 0
+
+
+@pytest.fixture
+def baseline_monitor(tmp_path):
+    monitor = DriftMonitor(str(tmp_path))
+    monitor.save_baseline(Sketch().update(_records(5000, seed=0)), source='test')
+    return monitor
+
+
+def test_identical_distribution_is_stable(baseline_monitor):
+    baseline_monitor.append(_records(5000, seed=0))
+    report = baseline_monitor.refresh().report()
+    assert (report['psi'] < 1e-12).all()
+    ordered = report.loc[list(monitoring.ORDERED)]
+    assert (ordered['ks'] == 0).all()
+    assert (report['status'] == 'stable').all()
+    np.testing.assert_allclose(ordered['live_mean'], ordered['training_mean'])
+
+
+def test_shifted_distribution_is_flagged(baseline_monitor):
+    baseline_monitor.append(_records(2000, seed=1, satisfaction_level=-0.3))
+    report = baseline_monitor.refresh().report()
+    shifted = report.loc['satisfaction_level']
+    assert shifted['status'] == 'significant'
+    assert shifted['ks'] > shifted['ks_critical']
+    assert shifted['live_mean'] < shifted['training_mean'] - 0.2
+    # A fresh sample of an unchanged input does not drift
+    assert report.loc['last_evaluation', 'status'] == 'stable'
+    assert report.loc['last_evaluation', 'ks'] < report.loc['last_evaluation', 'ks_critical']
+
+
+def test_too_few_records_are_not_judged(baseline_monitor):
+    baseline_monitor.append(_records(monitoring.MIN_SAMPLES - 1, seed=2, satisfaction_level=-0.3))
+    assert (baseline_monitor.refresh().report()['status'] == 'insufficient data').all()
+
+
+def test_psi_and_ks_on_known_shares():
+    expected = np.array([0.25, 0.25, 0.25, 0.25])
+    actual = np.array([0.1, 0.2, 0.3, 0.4])
+    assert population_stability_index(expected, expected) == 0
+    assert population_stability_index(expected, actual) == pytest.approx(
+        sum((a - e) * np.log(a / e) for e, a in zip(expected, actual)))
+    assert ks_distance(expected, actual) == pytest.approx(0.2)
+    # Empty bins are floored, so the index stays finite
+    assert np.isfinite(population_stability_index(expected, np.array([0.5, 0.5, 0.0, 0.0])))
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+import prediction_cache
+from prediction_cache import PredictionCache
+
+
+@pytest.fixture
+def model_file(tmp_path, monkeypatch):
+    # Re-check the artifacts on every lookup
+    monkeypatch.setattr(prediction_cache, 'CHECK_INTERVAL', 0.0)
+    path = tmp_path / 'model.pkl'
+    path.write_bytes(b'version 1')
+    return path
+
+
+def _cache(model_file, **kwargs):
+    return PredictionCache(patterns=[str(model_file.parent / '*.pkl')], **kwargs)
+
+
+def test_hit_on_quantized_row(model_file):
+    cache = _cache(model_file)
+    calls = []
+
+    def compute(row):
+        calls.append(row)
+        return [0.25, 0.75]
+
+    cache.get_or_compute(np.array([0.1, 0.2]), compute)
+    value = cache.get_or_compute(np.array([0.1 + 1e-9, 0.2]), compute)
+    assert len(calls) == 1
+    np.testing.assert_array_equal(value, [0.25, 0.75])
+    assert cache.stats()['hits'] == 1
+
+
+def test_context_separates_entries(model_file):
+    cache = _cache(model_file)
+    row = np.array([0.1, 0.2])
+    cache.put(cache.key(row, 'XGBoost'), [0.9])
+    assert cache.get(cache.key(row, 'LightGBM')) is None
+
+
+def test_changed_artifact_invalidates(model_file):
+    cache = _cache(model_file)
+    key = cache.key(np.array([0.1, 0.2]))
+    cache.put(key, [0.5])
+    old_hash = cache.artifact_hash
+
+    model_file.write_bytes(b'version 2, retrained')
+    assert cache.get(key) is None
+    assert cache.artifact_hash != old_hash
+    assert cache.stats()['invalidations'] == 1
+
+
+def test_persisted_entries_are_keyed_on_the_artifacts(model_file, tmp_path):
+    store = str(tmp_path / 'cache.sqlite')
+    key = _cache(model_file, store_path=store).key(np.array([0.3]))
+    _cache(model_file, store_path=store).put(key, [0.4])
+
+    restarted = _cache(model_file, store_path=store)
+    np.testing.assert_array_equal(restarted.get(key), [0.4])
+    assert restarted.stats()['disk_hits'] == 1
+
+    model_file.write_bytes(b'version 2, retrained')
+    assert _cache(model_file, store_path=store).get(key) is None
+
+
+def test_ttl_expires_entries(model_file, monkeypatch):
+    cache = _cache(model_file, ttl_seconds=10)
+    key = cache.key(np.array([0.1]))
+    cache.put(key, [0.5])
+    now = prediction_cache.time.time()
+    monkeypatch.setattr(prediction_cache.time, 'time', lambda: now + 11)
+    assert cache.get(key) is None
+
+
+def test_lru_eviction(model_file):
+    cache = _cache(model_file, max_entries=2)
+    keys = [cache.key(np.array([float(i)])) for i in range(3)]
+    for key in keys:
+        cache.put(key, [0.5])
+    assert cache.get(keys[0]) is None
+    assert cache.stats()['evictions'] == 1
@@ -0,0 +1,133 @@
+import shutil
+import warnings
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+import risk_table
+import whatif
+from encoder import FeatureEncoder
+from ensemble import Ensemble
+from risk_table import SCALE, RiskTable
+from whatif import INPUT_GRIDS
+
+MEMBERS = ['Decision Tree', 'XGBoost', 'Logistic Regression']
+# Every few values of each input, so the tables build in seconds
+SMALL_GRIDS = {name: grid[::step] for (name, grid), step in zip(INPUT_GRIDS.items(), [20, 10, 3, 10, 5, 1, 1, 1, 1])}
+
+
+@pytest.fixture(scope='module')
+def model_dir(tmp_path_factory):
+    directory = tmp_path_factory.mktemp('models')
+    for name in MEMBERS:
+        shutil.copy(f"models/{name}_model.pkl", directory)
+    shutil.copy('models/columns.pkl', directory)
+    return directory
+
+
+def _build(names, directory, model_dir):
+    with pytest.MonkeyPatch.context() as patch, warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        patch.setattr(risk_table, 'INPUT_GRIDS', SMALL_GRIDS)
+        risk_table.build(names, str(directory), str(model_dir), progress=None)
+    return directory
+
+
+@pytest.fixture(scope='module')
+def table_dir(model_dir, tmp_path_factory):
+    return _build(MEMBERS, tmp_path_factory.mktemp('risk_table'), model_dir)
+
+
+def _employees(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return [{name: grid[rng.integers(len(grid))].item() for name, grid in SMALL_GRIDS.items()}
+            for _ in range(n)]
+
+
+def _live(employees, model_dir):
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        ensemble = Ensemble.load(MEMBERS, str(model_dir), use_indexes=False)
+        return ensemble.member_probabilities(FeatureEncoder.load().encode_frame(pd.DataFrame(employees)))
+
+
+def test_lookup_matches_live_scoring(table_dir, model_dir):
+    table = RiskTable.load(str(table_dir), str(model_dir))
+    assert table.stale == [] and sorted(table.names) == sorted(MEMBERS)
+    employees = _employees(3000)
+    looked_up = np.array([table.lookup(employee, MEMBERS) for employee in employees])
+    # uint16 rounding, plus the float32 trees' own rounding
+    np.testing.assert_allclose(looked_up, _live(employees, model_dir), atol=0.5 / SCALE + 1e-6)
+
+
+def test_off_grid_and_unknown_members_fall_back(table_dir, model_dir):
+    table = RiskTable.load(str(table_dir), str(model_dir))
+    employee = _employees(1)[0]
+    assert table.lookup(employee, MEMBERS) is not None
+    assert table.lookup({**employee, 'satisfaction_level': 0.37}, MEMBERS) is None
+    assert table.lookup({**employee, 'department': 'legal'}, MEMBERS) is None
+    assert table.lookup(employee, ['XGBoost', 'K-Nearest Neighbors']) is None
+
+
+def test_changed_pickle_marks_member_stale(model_dir, tmp_path):
+    models = tmp_path / 'models'
+    shutil.copytree(model_dir, models)
+    names = ['Decision Tree', 'Logistic Regression']
+    directory = str(_build(names, tmp_path / 'risk_table', models))
+    # Same model, different bytes: a retrained pickle as far as the table can tell
+    path = models / 'Decision Tree_model.pkl'
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        joblib.dump(joblib.load(path), path, compress=3)
+
+    table = RiskTable.load(directory, str(models))
+    assert table.stale == ['Decision Tree']
+    assert table.names == ['Logistic Regression']
+    employee = _employees(1)[0]
+    assert table.lookup(employee, names) is None
+    assert table.lookup(employee, ['Logistic Regression']) is not None
+
+    # A bundle's recorded hashes take the place of hashing model_dir
+    hashes = {name: entry['artifact_hash'] for name, entry in table.meta['members'].items()}
+    assert RiskTable.load(directory, str(models), hashes=hashes).stale == []
+
+
+def test_lookup_frame_matches_lookup(table_dir, model_dir):
+    table = RiskTable.load(str(table_dir), str(model_dir))
+    employees = _employees(500, seed=1)
+    names = MEMBERS + ['K-Nearest Neighbors']
+    probs = table.lookup_frame(pd.DataFrame(employees), names)
+    np.testing.assert_array_equal(probs[:, :3], [table.lookup(employee, MEMBERS) for employee in employees])
+    # Members outside the table are left for live scoring
+    assert np.isnan(probs[:, 3]).all()
+    off_grid = pd.DataFrame(employees + [{**employees[0], 'satisfaction_level': 0.37}])
+    assert table.lookup_frame(off_grid, MEMBERS) is None
+
+
+def test_what_if_scores_only_uncovered_members_live(model_dir, tmp_path, monkeypatch):
+    # XGBoost is left out of the table and scored live
+    table = RiskTable.load(str(_build(['Decision Tree', 'Logistic Regression'], tmp_path, model_dir)), str(model_dir))
+    monkeypatch.setattr(whatif, 'INPUT_GRIDS', SMALL_GRIDS)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        models = Ensemble.load(MEMBERS, str(model_dir), use_indexes=False)
+    encoder = FeatureEncoder.load()
+    calls = []
+    member_probabilities = models.member_probabilities
+    monkeypatch.setattr(models, 'member_probabilities',
+                        lambda X, names=None: calls.append(names) or member_probabilities(X, names))
+
+    employee = _employees(1, seed=2)[0]
+    inputs = ['satisfaction_level', 'average_montly_hours']
+    looked_up = whatif.sweep(employee, inputs, models, encoder, table)
+    assert calls == [['XGBoost']]
+    live = whatif.sweep(employee, inputs, models, encoder)
+    assert len(looked_up) == len(SMALL_GRIDS['satisfaction_level']) * len(SMALL_GRIDS['average_montly_hours'])
+    np.testing.assert_allclose(looked_up['risk'], live['risk'], atol=0.5 / SCALE + 1e-6)
+
+    suggestion = whatif.suggest_change(employee, models, encoder, table=table)
+    expected = whatif.suggest_change(employee, models, encoder)
+    assert suggestion is not None and suggestion['changes'] == expected['changes']
+    assert suggestion['risk'] == pytest.approx(expected['risk'], abs=0.5 / SCALE + 1e-6)
@@ -0,0 +1,141 @@
+import http.client
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+import artifacts
+from benchmarks.common import sample_record, synthetic_employees
+from serve import BundleWatcher, MicroBatcher, create_server
+
+
+def _employees(n):
+    df = synthetic_employees(n, seed=4).rename(columns={'Departments ': 'department'})
+    return df.to_dict(orient='records')
+
+
+def _post(port, path, payload):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    body = payload if isinstance(payload, str) else json.dumps(payload)
+    connection.request('POST', path, body, {'Content-Type': 'application/json'})
+    response = connection.getresponse()
+    result = response.status, json.loads(response.read())
+    connection.close()
+    return result
+
+
+def _get(port, path):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    connection.request('GET', path)
+    response = connection.getresponse()
+    result = response.status, json.loads(response.read())
+    connection.close()
+    return result
+
+
+@pytest.fixture
+def run_server():
+    servers = []
+
+    def start(**kwargs):
+        server = create_server('127.0.0.1', 0, **kwargs)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server, server.server_address[1]
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def port(run_server):
+    return run_server(cache_size=0)[1]
+
+
+@pytest.mark.parametrize('change', [
+    lambda r: r.pop('salary'),
+    lambda r: r.pop('satisfaction_level'),
+    lambda r: r.update(satisfaction_level=None),
+    lambda r: r.update(last_evaluation='high'),
+    lambda r: r.update(average_montly_hours=float('inf')),
+])
+def test_invalid_employee_is_a_400(port, change):
+    record = sample_record()
+    change(record)
+    status, body = _post(port, '/score', record)
+    assert status == 400 and 'error' in body
+    status, body = _post(port, '/score/bulk', {'employees': [sample_record(), record]})
+    assert status == 400 and 'error' in body
+
+
+def test_nan_literal_is_a_400(port):
+    record = json.dumps(sample_record()).replace('0.38', 'NaN')
+    assert _post(port, '/score', record)[0] == 400
+
+
+def test_malformed_bodies_are_400s(port):
+    assert _post(port, '/score', '{not json')[0] == 400
+    assert _post(port, '/score/bulk', {'employees': 'nope'})[0] == 400
+    assert _post(port, '/score', ['not', 'an', 'object'])[0] == 400
+
+
+def test_empty_bulk_request(port):
+    assert _post(port, '/score/bulk', {'employees': []}) == (200, {'results': []})
+
+
+def test_micro_batched_results_match_bulk(port):
+    employees = _employees(64)
+    status, bulk = _post(port, '/score/bulk', employees)
+    assert status == 200
+    # Concurrent requests share micro-batches
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        single = list(pool.map(lambda e: _post(port, '/score', e), employees))
+    assert all(status == 200 for status, _ in single)
+    np.testing.assert_allclose([r['churn_probability'] for _, r in single],
+                               [r['churn_probability'] for r in bulk['results']], rtol=0, atol=1e-9)
+    assert [r['churn_prediction'] for _, r in single] == [r['churn_prediction'] for r in bulk['results']]
+    assert _get(port, '/metrics')[1]['micro_batching']['rows'] == len(employees)
+
+
+def test_batcher_scores_rows_with_the_models_they_were_queued_for():
+    class Constant:
+        def __init__(self, p):
+            self.p = p
+
+        def predict_proba(self, X):
+            return np.tile([1 - self.p, self.p], (len(X), 1))
+
+    batcher = MicroBatcher(max_batch=64, max_wait_ms=50)
+    old, new = [Constant(0.2)], [Constant(0.9)]
+    futures = [batcher.submit(np.zeros(3), old if i % 2 else new) for i in range(20)]
+    results = [future.result(timeout=10)[0] for future in futures]
+    batcher.close()
+    assert results == [0.2 if i % 2 else 0.9 for i in range(20)]
+
+
+def test_reload_swaps_to_the_new_bundle(run_server, tmp_path):
+    root = str(tmp_path / 'packed')
+    artifacts.pack(root=root, extras=['XGB.pkl'], version='v1')
+    # No watcher thread: the reload is triggered below
+    server, port = run_server(bundle=root, reload_interval=0)
+    service = server.RequestHandlerClass.service
+    assert _get(port, '/health')[1]['bundle_version'] == 'v1'
+    before = _post(port, '/score', sample_record())[1]
+
+    artifacts.pack(root=root, extras=['XGB.pkl'], version='v2')
+    old = service.snapshot
+    watcher = BundleWatcher(service, root, ('XGB.pkl',), None, 'soft', interval=3600)
+    try:
+        assert watcher.check()
+        assert not watcher.check()
+    finally:
+        watcher.close()
+    assert service.snapshot is not old and service.snapshot.version == 'v2'
+    assert service.snapshot.cache_context != old.cache_context
+    assert _get(port, '/health')[1]['bundle_version'] == 'v2'
+    assert _post(port, '/score', sample_record())[1] == before
+    assert _get(port, '/metrics')[1]['bundle']['reloads'] == 1
@@ -0,0 +1,76 @@
+import json
+import os
+import warnings
+
+import numpy as np
+import pytest
+
+import train
+from benchmarks.train import labelled_employees
+from encoder import TRAINING_COLUMNS, FeatureEncoder
+from ensemble import Ensemble
+
+NAMES = ['Logistic Regression', 'Decision Tree', 'XGBoost']
+
+
+@pytest.fixture(scope='module')
+def hr():
+    return labelled_employees(1500, seed=5)
+
+
+@pytest.fixture(scope='module')
+def trained(hr):
+    return train.train(hr, NAMES, folds=3, workers=1, progress=None)
+
+
+def test_metrics_cover_every_member_and_fold(trained):
+    models, scaler, metrics = trained
+    assert list(models) == NAMES
+    assert metrics['folds'] == 3
+    for name in NAMES:
+        member = metrics['members'][name]
+        assert set(member['test']) == {'accuracy', 'precision', 'recall', 'f1', 'roc_auc'}
+        assert set(member['cv']['f1']) == {'mean', 'std'}
+        # The synthetic target is learnable
+        assert member['test']['roc_auc'] > 0.65
+    assert list(scaler.feature_names_in_) == list(TRAINING_COLUMNS)
+
+
+def test_worker_count_does_not_change_the_models(hr, trained):
+    models, _, metrics = trained
+    parallel, _, parallel_metrics = train.train(hr, NAMES, folds=3, workers=2, progress=None)
+    X = FeatureEncoder(TRAINING_COLUMNS).encode_frame(hr)
+    for name in NAMES:
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', UserWarning)
+            np.testing.assert_array_equal(parallel[name].predict_proba(X), models[name].predict_proba(X))
+        assert parallel_metrics['members'][name]['cv'] == metrics['members'][name]['cv']
+
+
+def test_no_cross_validation_with_one_fold(hr):
+    _, _, metrics = train.train(hr, ['Decision Tree'], folds=1, workers=1, progress=None)
+    assert metrics['folds'] == 0 and metrics['members']['Decision Tree']['cv'] == {}
+
+
+def test_unknown_candidate(hr):
+    with pytest.raises(ValueError, match="Unknown candidates"):
+        train.train(hr, ['Decision Tree', 'SVM'], progress=None)
+
+
+def test_bundle_is_served_like_models_dir(hr, trained, tmp_path):
+    models, scaler, metrics = trained
+    directory = train.write_bundle(models, scaler, metrics, root=str(tmp_path), version='v1')
+    with open(os.path.join(directory, train.METRICS_FILE)) as f:
+        assert json.load(f)['version'] == 'v1'
+    with pytest.raises(FileExistsError):
+        train.write_bundle(models, scaler, metrics, root=str(tmp_path), version='v1')
+
+    ensemble = Ensemble.load(model_dir=directory)
+    assert sorted(ensemble.names) == sorted(NAMES)
+    encoder = FeatureEncoder.load(os.path.join(directory, 'dummy_columns.pkl'),
+                                  os.path.join(directory, 'scaler.pkl'))
+    probs, _ = ensemble.score(encoder.encode_frame(hr))
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', UserWarning)
+        expected = np.mean([models[name].predict_proba(encoder.encode_frame(hr))[:, 1] for name in NAMES], axis=0)
+    np.testing.assert_allclose(probs, expected, atol=1e-6)
@@ -0,0 +1,49 @@
+import warnings
+
+import joblib
+import numpy as np
+import pytest
+
+from tree_engine import compile_model, compile_or_native
+
+TREE_MODELS = [
+    'XGB.pkl',
+    'models/XGBoost_model.pkl',
+    'models/LightGBM_model.pkl',
+    'models/Gradient Boosting_model.pkl',
+    'models/Decision Tree_model.pkl',
+]
+
+
+def _native(path):
+    with warnings.catch_warnings():
+        # Pickles saved by older library versions
+        warnings.simplefilter('ignore')
+        return joblib.load(path)
+
+
+@pytest.mark.parametrize('path', TREE_MODELS)
+def test_compiled_matches_native(path, encoded):
+    native = _native(path)
+    compiled = compile_model(native)
+    with warnings.catch_warnings():
+        # Fitted on a DataFrame, fed the encoder's ndarray like the ensemble does
+        warnings.simplefilter('ignore', UserWarning)
+        expected = native.predict_proba(encoded)
+    got = compiled.predict_proba(encoded)
+    assert got.shape == expected.shape
+    np.testing.assert_allclose(got[:, 1], expected[:, 1], atol=1e-5)
+    np.testing.assert_array_equal(compiled.predict(encoded), (expected[:, 1] >= 0.5).astype(int))
+
+
+@pytest.mark.parametrize('path', TREE_MODELS)
+def test_single_row_matches_batch(path, encoded):
+    compiled = compile_model(_native(path))
+    batch = compiled.predict_positive(encoded[:20])
+    rows = np.array([compiled.predict_positive(encoded[i:i + 1])[0] for i in range(20)])
+    np.testing.assert_allclose(rows, batch, rtol=0, atol=1e-12)
+
+
+def test_unsupported_model_stays_native():
+    model = _native('models/K-Nearest Neighbors_model.pkl')
+    assert compile_or_native(model) is model
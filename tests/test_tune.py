@@ -0,0 +1,76 @@
+import sqlite3
+
+import pytest
+
+import tune
+from benchmarks.train import labelled_employees
+
+SEARCH = {'names': ['Decision Tree', 'XGBoost'], 'n_trials': 4, 'eta': 2, 'folds': 2, 'workers': 1,
+          'progress': None}
+# 4 configurations on 1/4 of the rows, the best 2 on 1/2, the best 1 on all of them, 2 folds each
+TRIALS_PER_CANDIDATE = (4 + 2 + 1) * 2
+
+
+@pytest.fixture(scope='module')
+def hr():
+    return labelled_employees(800, seed=7)
+
+
+def test_rung_fractions():
+    assert tune.rung_fractions(9, 3) == [1 / 9, 1 / 3, 1]
+    assert tune.rung_fractions(4, 2) == [1 / 4, 1 / 2, 1]
+    assert tune.rung_fractions(1, 3) == [1]
+
+
+def test_sample_configs_are_seeded_and_distinct():
+    configs = tune.sample_configs('Decision Tree', 10)
+    assert configs[0] == {}
+    assert len({tuple(sorted(c.items())) for c in configs}) == 10
+    assert tune.sample_configs('Decision Tree', 10) == configs
+    # Never more than the space holds (plus the defaults)
+    assert len(tune.sample_configs('K-Nearest Neighbors', 50)) == 10
+
+
+def test_successive_halving_keeps_the_best(hr):
+    history, counts = tune.search(hr, store=tune.TrialStore(None), **SEARCH)
+    assert counts['run'] == 2 * TRIALS_PER_CANDIDATE and counts['stored'] == 0
+    for name, rungs in history.items():
+        assert [rung['fraction'] for rung in rungs] == [1 / 4, 1 / 2, 1]
+        assert [len(rung['ranked']) for rung in rungs] == [4, 2, 1]
+        for rung, following in zip(rungs, rungs[1:]):
+            scores = [entry['score'] for entry in rung['ranked']]
+            assert scores == sorted(scores, reverse=True)
+            survivors = [entry['config'] for entry in rung['ranked'][:len(following['ranked'])]]
+            assert sorted(map(str, survivors)) == sorted(str(entry['config']) for entry in following['ranked'])
+
+    best = tune.best_params(history)
+    assert best['Decision Tree'] == history['Decision Tree'][-1]['ranked'][0]['config']
+    # Early-stopped boosters carry their round count
+    assert 1 <= best['XGBoost']['n_estimators'] <= tune.MAX_ROUNDS
+
+
+def test_resume_runs_only_missing_trials(hr, tmp_path):
+    path = str(tmp_path / 'trials.sqlite')
+    history, counts = tune.search(hr, store=tune.TrialStore(path), **SEARCH)
+    assert len(tune.TrialStore(path)) == counts['run'] == 2 * TRIALS_PER_CANDIDATE
+
+    resumed, counts = tune.search(hr, store=tune.TrialStore(path), **SEARCH)
+    assert counts['run'] == 0 and counts['stored'] == 2 * TRIALS_PER_CANDIDATE
+    assert resumed == history
+
+    # An interrupted search: the last trials of one candidate were never stored
+    with sqlite3.connect(path) as db:
+        keys = [row[0] for row in db.execute(
+            "SELECT key FROM trials WHERE candidate = 'Decision Tree' ORDER BY created DESC LIMIT 3")]
+        db.executemany("DELETE FROM trials WHERE key = ?", [(key,) for key in keys])
+    resumed, counts = tune.search(hr, store=tune.TrialStore(path), **SEARCH)
+    assert counts['run'] == 3
+    assert resumed == history
+
+
+def test_changed_data_does_not_reuse_trials(hr, tmp_path):
+    store = tune.TrialStore(str(tmp_path / 'trials.sqlite'))
+    options = {**SEARCH, 'names': ['Decision Tree']}
+    tune.search(hr, store=store, **options)
+    _, counts = tune.search(labelled_employees(800, seed=8), store=store, **options)
+    assert counts['stored'] == 0 and counts['run'] == TRIALS_PER_CANDIDATE
@@ -0,0 +1,81 @@
+import json
+import os
+import shutil
+
+import pytest
+
+import update
+from benchmarks.train import labelled_employees
+from dataset import TARGET, drop_duplicate_profiles
+from ensemble import available_members
+from knn_index import KNNIndex, build
+
+MEMBERS = ['Decision Tree', 'Logistic Regression', 'K-Nearest Neighbors']
+
+
+@pytest.fixture
+def model_dir(tmp_path):
+    for name in MEMBERS:
+        shutil.copy(f"models/{name}_model.pkl", tmp_path)
+    build(str(tmp_path / 'K-Nearest Neighbors_model.pkl'), str(tmp_path / 'knn_index'))
+    return str(tmp_path)
+
+
+def _contents(paths):
+    contents = {}
+    for path in paths:
+        with open(path, 'rb') as f:
+            contents[path] = f.read()
+    return contents
+
+
+def _log(model_dir):
+    with open(os.path.join(model_dir, update.UPDATES_LOG)) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_rejected_update_keeps_the_models(model_dir):
+    paths = available_members(model_dir)
+    before = _contents(paths.values())
+    # No update can gain a whole point of F1, so every one is rejected
+    entry = update.update(paths, labelled_employees(600, seed=7), model_dir, rounds=5, tolerance=-1.0)
+
+    assert set(entry['models']) == set(MEMBERS)
+    for report in entry['models'].values():
+        assert not report['accepted'] and not report['swapped']
+    assert _contents(paths.values()) == before
+    assert KNNIndex.matches(os.path.join(model_dir, 'knn_index'), paths['K-Nearest Neighbors'])
+    assert _log(model_dir)[-1]['models']['Decision Tree']['swapped'] is False
+
+
+def test_poisoned_batch_is_rejected(model_dir):
+    paths = available_members(model_dir)
+    before = _contents([paths['Decision Tree']])
+    batch = labelled_employees(2000, seed=7)
+    batch[TARGET] = 1 - batch[TARGET]
+    holdout = drop_duplicate_profiles(labelled_employees(1000, seed=11))
+
+    entry = update.update({'Decision Tree': paths['Decision Tree']}, batch, model_dir, holdout)
+    report = entry['models']['Decision Tree']
+    assert report['after']['f1'] < report['before']['f1'] - update.DEFAULT_TOLERANCE
+    assert not report['swapped']
+    assert _contents([paths['Decision Tree']]) == before
+
+
+def test_accepted_update_swaps_and_rebuilds_the_index(model_dir):
+    paths = available_members(model_dir)
+    before = _contents(paths.values())
+    entry = update.update(paths, labelled_employees(600, seed=7), model_dir, rounds=5, tolerance=1.0)
+
+    assert all(report['swapped'] for report in entry['models'].values())
+    after = _contents(paths.values())
+    assert all(after[path] != before[path] for path in paths.values())
+    assert KNNIndex.matches(os.path.join(model_dir, 'knn_index'), paths['K-Nearest Neighbors'])
+
+
+def test_dry_run_writes_nothing(model_dir):
+    paths = available_members(model_dir)
+    before = _contents(paths.values())
+    update.update(paths, labelled_employees(600, seed=7), model_dir, rounds=5, tolerance=1.0, dry_run=True)
+    assert _contents(paths.values()) == before
+    assert not os.path.exists(os.path.join(model_dir, update.UPDATES_LOG))
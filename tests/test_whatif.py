@@ -0,0 +1,106 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from encoder import FeatureEncoder
+from ensemble import Ensemble
+from scoring import predict_matrix
+from whatif import ACTIONS, INPUT_GRIDS, grid_index, suggest_change, sweep
+
+EMPLOYEE = {'satisfaction_level': 0.4, 'last_evaluation': 0.55, 'number_project': 2,
+            'average_montly_hours': 150, 'time_spend_company': 3, 'Work_accident': 0,
+            'promotion_last_5years': 0, 'department': 'sales', 'salary': 'low'}
+
+
+# Churn risk falls as satisfaction (the first encoded column, scaled to 0-1) rises
+class SatisfactionModel:
+    def predict_proba(self, X):
+        p = 1.0 - np.asarray(X)[:, 0]
+        return np.column_stack([1.0 - p, p])
+
+
+@pytest.fixture(scope='module')
+def encoder():
+    return FeatureEncoder.load()
+
+
+@pytest.fixture(scope='module')
+def models():
+    with warnings.catch_warnings():
+        # Pickles saved by older library versions
+        warnings.simplefilter('ignore')
+        return Ensemble.load(['Logistic Regression', 'Decision Tree', 'XGBoost'], use_indexes=False)
+
+
+def _risk(employees, models, encoder):
+    return predict_matrix(models, encoder.encode_frame(pd.DataFrame(employees)))
+
+
+def test_grid_index_snaps_to_nearest_value():
+    assert grid_index('satisfaction_level', 0.404) == 40
+    assert grid_index('average_montly_hours', 154) == grid_index('average_montly_hours', 150)
+    assert grid_index('salary', 'medium') == 1
+
+
+def test_sweep_scores_every_scenario(models, encoder):
+    inputs = ['average_montly_hours', 'salary']
+    grid = sweep(EMPLOYEE, inputs, models, encoder)
+    assert len(grid) == len(INPUT_GRIDS['average_montly_hours']) * len(INPUT_GRIDS['salary'])
+    assert list(grid.columns) == inputs + ['risk']
+    # First input varies slowest
+    np.testing.assert_array_equal(grid['salary'][:3], INPUT_GRIDS['salary'])
+
+    scenarios = [{**EMPLOYEE, **row} for row in grid[inputs].to_dict('records')]
+    expected, _ = _risk(scenarios, models, encoder)
+    np.testing.assert_allclose(grid['risk'], expected)
+
+
+def test_one_input_sweep_keeps_the_rest_fixed(models, encoder):
+    grid = sweep(EMPLOYEE, ['satisfaction_level'], models, encoder)
+    np.testing.assert_array_equal(grid['satisfaction_level'], INPUT_GRIDS['satisfaction_level'])
+    current = grid.loc[grid_index('satisfaction_level', EMPLOYEE['satisfaction_level']), 'risk']
+    assert current == pytest.approx(_risk([EMPLOYEE], models, encoder)[0][0])
+
+
+def test_suggests_the_smallest_sufficient_change(encoder):
+    result = suggest_change(EMPLOYEE, [SatisfactionModel()], encoder, actions={'satisfaction_level': 'up'})
+    # The first satisfaction level up the grid that the model scores as low risk
+    (old, new), = result['changes'].values()
+    assert old == 0.4 and new > 0.4
+    assert result['risk'] < 0.5
+    below = [v for v in INPUT_GRIDS['satisfaction_level'] if v > 0.4 and _risk(
+        [{**EMPLOYEE, 'satisfaction_level': v}], [SatisfactionModel()], encoder)[1][0] == 0]
+    assert new == below[0]
+    assert result['cost'] == pytest.approx(
+        (grid_index('satisfaction_level', new) - 40) / (len(INPUT_GRIDS['satisfaction_level']) - 1))
+
+
+def test_suggestion_respects_actions_and_is_low_risk(models, encoder):
+    result = suggest_change(EMPLOYEE, models, encoder)
+    assert result is not None and 1 <= len(result['changes']) <= 2
+    changed = dict(EMPLOYEE)
+    for name, (old, new) in result['changes'].items():
+        assert name in ACTIONS and old == EMPLOYEE[name]
+        if ACTIONS[name] == 'up':
+            assert grid_index(name, new) > grid_index(name, old)
+        changed[name] = new
+    risk, labels = _risk([changed], models, encoder)
+    assert labels[0] == 0
+    assert result['risk'] == pytest.approx(risk[0])
+
+    # No single change that is cheaper also works
+    for name, direction in ACTIONS.items():
+        current = grid_index(name, EMPLOYEE[name])
+        for i, value in enumerate(INPUT_GRIDS[name]):
+            cost = abs(i - current) / (len(INPUT_GRIDS[name]) - 1)
+            if i == current or (direction == 'up' and i < current) or cost >= result['cost']:
+                continue
+            assert _risk([{**EMPLOYEE, name: value}], models, encoder)[1][0] == 1
+
+
+def test_no_suggestion_when_nothing_helps(encoder):
+    # Only satisfaction moves this model's risk
+    assert suggest_change(EMPLOYEE, [SatisfactionModel()], encoder, actions={'salary': 'up'}) is None
+    assert suggest_change(EMPLOYEE, [SatisfactionModel()], encoder, max_changes=0) is None
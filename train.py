@@ -0,0 +1,305 @@
+# Reproducible training pipeline for the ensemble members (the notebook's
+# model comparison, as a script).
+#
+# dedup -> one-hot -> SMOTE -> stratified split -> MinMax (fitted on the
+# training split) -> fit and k-fold cross-validate every candidate. Each final
+# fit and each CV fold is a separate task on a process pool, so candidates
+# train in parallel across cores. Estimators are seeded and single-threaded,
+# so a run gives the same models whatever the worker count.
+#
+# The result is a versioned bundle laid out like models/ (member pickles,
+# columns.pkl, dummy_columns.pkl, scaler.pkl, metrics.json). The app serves it
+# with CHURN_MODEL_BUNDLE=<bundle dir>, or --install copies it over the served
+# artifacts. The copy is not atomic as a set, so --install is for when nothing
+# is serving them; to swap a bundle under a running app or serve.py, pack it
+# (python artifacts.py pack --source <bundle dir>) and serve models/packed,
+# whose CURRENT pointer switches every file at once.
+#
+# Usage:
+#   python train.py HR_Dataset.csv
+#   python train.py HR_Dataset.csv --workers 4 --folds 5 --models XGBoost LightGBM
+#   python train.py HR_Dataset.csv --install        # also replace models/, scaler.pkl, dummy_columns.pkl
+#   python train.py HR_Dataset.csv --install --replace-xgb   # and XGB.pkl
+import argparse
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import joblib
+import numpy as np
+import pandas as pd
+from lightgbm import LGBMClassifier
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score, roc_auc_score
+from sklearn.model_selection import StratifiedKFold, train_test_split
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.preprocessing import MinMaxScaler
+from sklearn.tree import DecisionTreeClassifier
+from xgboost import XGBClassifier
+
+from dataset import DATASET_PATH, RANDOM_STATE, TEST_SIZE, notebook_resample, read_hr_dataset
+from encoder import TRAINING_COLUMNS
+from ensemble import MODEL_DIR, MODEL_SUFFIX
+from prediction_cache import artifact_hash
+
+BUNDLE_ROOT = os.path.join(MODEL_DIR, 'bundles')
+METRICS_FILE = 'metrics.json'
+DEFAULT_FOLDS = 5
+
+# Candidate -> (estimator class, fixed parameters), as in the notebook's
+# comparison cell. Seeded candidates get the run's random_state, and every
+# estimator runs on one thread: the parallelism is across tasks.
+CANDIDATES = {
+    'Logistic Regression': (LogisticRegression, {'random_state': None}),
+    'K-Nearest Neighbors': (KNeighborsClassifier, {'n_jobs': 1}),
+    'Decision Tree': (DecisionTreeClassifier, {'random_state': None}),
+    'Random Forest': (RandomForestClassifier, {'random_state': None, 'n_jobs': 1}),
+    'Gradient Boosting': (GradientBoostingClassifier, {'random_state': None}),
+    'LightGBM': (LGBMClassifier, {'random_state': None, 'n_jobs': 1, 'verbose': -1}),
+    'XGBoost': (XGBClassifier, {'random_state': None, 'n_jobs': 1, 'eval_metric': 'logloss'}),
+}
+# LightGBM rewrites column names with spaces ('Departments _RandD' -> 'Departments__RandD'),
+# so it is fitted on plain arrays, as the served pickle was
+ARRAY_INPUT = {'LightGBM'}
+# The members the app serves from models/ (Random Forest is trained on request)
+DEFAULT_MEMBERS = ['Logistic Regression', 'K-Nearest Neighbors', 'Decision Tree',
+                   'Gradient Boosting', 'LightGBM', 'XGBoost']
+
+# Data shared with the pool's worker processes (set once per process)
+_data = {}
+
+
+def make_model(name, random_state=RANDOM_STATE, **params):
+    cls, fixed = CANDIDATES[name]
+    kwargs = dict(fixed)
+    if 'random_state' in kwargs:
+        kwargs['random_state'] = random_state
+    kwargs.update(params)
+    return cls(**kwargs)
+
+
+def evaluate(model, X, y):
+    labels = model.predict(X)
+    proba = model.predict_proba(X)[:, 1]
+    return {
+        'accuracy': float(accuracy_score(y, labels)),
+        'precision': float(precision_score(y, labels, zero_division=0)),
+        'recall': float(recall_score(y, labels)),
+        'f1': float(f1_score(y, labels)),
+        'roc_auc': float(roc_auc_score(y, proba)),
+    }
+
+
+# Deduplicated, SMOTE-balanced split with the MinMax scaler fitted on the training part
+def prepare(df, random_state=RANDOM_STATE):
+    X, y = notebook_resample(df, TRAINING_COLUMNS, random_state)
+    X = X.astype(np.float64)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, stratify=y, test_size=TEST_SIZE,
+                                                        random_state=random_state)
+    scaler = MinMaxScaler().fit(X_train)
+    # Models are fitted on frames so they record the column names the app checks
+    X_train = pd.DataFrame(scaler.transform(X_train), columns=TRAINING_COLUMNS)
+    X_test = pd.DataFrame(scaler.transform(X_test), columns=TRAINING_COLUMNS)
+    return X_train, X_test, y_train, y_test, scaler
+
+
+def _init_worker(data):
+    _data.update(data)
+
+
+def _inputs(name, X):
+    return X.to_numpy() if name in ARRAY_INPUT else X
+
+
+# One task: the final fit on the whole training split (fold None), evaluated on
+# the test split, or one CV fold. Returns the fitted model only for final fits.
+def _run_task(task):
+    name, fold = task
+    start = time.perf_counter()
+    X, y = _data['X_train'], _data['y_train']
+    model = make_model(name, _data['random_state'], **_data['params'].get(name, {}))
+    if fold is None:
+        model.fit(_inputs(name, X), y)
+        scores = evaluate(model, _inputs(name, _data['X_test']), _data['y_test'])
+    else:
+        train, test = _data['folds'][fold]
+        model.fit(_inputs(name, X.iloc[train]), y[train])
+        scores = evaluate(model, _inputs(name, X.iloc[test]), y[test])
+        model = None
+    return name, fold, scores, model, time.perf_counter() - start
+
+
+# Run `fn` over the tasks on a process pool (in-process for one worker), yielding
+# results as they finish; queued tasks are cancelled if the caller stops early
+def iter_tasks(tasks, data, workers, fn=_run_task):
+    if workers <= 1:
+        _init_worker(data)
+        for task in tasks:
+            yield fn(task)
+        return
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(data,))
+    try:
+        for future in as_completed([pool.submit(fn, task) for task in tasks]):
+            yield future.result()
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def run_tasks(tasks, data, workers, fn=_run_task):
+    return list(iter_tasks(tasks, data, workers, fn))
+
+
+# Fit and cross-validate `names` on the dataset frame, with optional
+# {name: hyperparameters}; returns the models, the scaler and a metrics dict
+def train(df, names=None, folds=DEFAULT_FOLDS, workers=None, random_state=RANDOM_STATE, progress=print,
+          params=None):
+    names = list(names or DEFAULT_MEMBERS)
+    unknown = [name for name in names if name not in CANDIDATES]
+    if unknown:
+        raise ValueError(f"Unknown candidates: {unknown}")
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+
+    X_train, X_test, y_train, y_test, scaler = prepare(df, random_state)
+    splits = list(StratifiedKFold(folds, shuffle=True, random_state=random_state).split(X_train, y_train)) \
+        if folds > 1 else []
+    prepared = time.perf_counter() - start
+    if progress:
+        progress(f"Prepared {len(X_train):,} training / {len(X_test):,} test rows in {prepared:.1f}s")
+
+    # Final fits first: they are the longest tasks, so they start before the folds
+    tasks = [(name, None) for name in names] + [(name, k) for name in names for k in range(len(splits))]
+    data = {'X_train': X_train, 'y_train': y_train, 'X_test': X_test, 'y_test': y_test,
+            'folds': splits, 'random_state': random_state, 'params': params or {}}
+    fit_start = time.perf_counter()
+    results = run_tasks(tasks, data, workers)
+    fit_seconds = time.perf_counter() - fit_start
+
+    models, members = {}, {name: {'cv': {}, 'test': None, 'task_seconds': 0.0} for name in names}
+    fold_scores = {name: [] for name in names}
+    for name, fold, scores, model, seconds in results:
+        members[name]['task_seconds'] += seconds
+        if fold is None:
+            models[name] = model
+            members[name]['test'] = scores
+            members[name]['fit_seconds'] = seconds
+        else:
+            fold_scores[name].append(scores)
+    for name in names:
+        if fold_scores[name]:
+            frame = pd.DataFrame(fold_scores[name])
+            members[name]['cv'] = {metric: {'mean': float(frame[metric].mean()), 'std': float(frame[metric].std())}
+                                   for metric in frame.columns}
+        members[name]['params'] = {key: value for key, value in models[name].get_params().items()
+                                   if isinstance(value, (int, float, str, bool, type(None)))}
+
+    metrics = {
+        'random_state': random_state,
+        'test_size': TEST_SIZE,
+        'folds': len(splits),
+        'workers': workers,
+        'rows': {'input': len(df), 'train': len(X_train), 'test': len(X_test)},
+        'seconds': {'prepare': prepared, 'fit': fit_seconds, 'total': time.perf_counter() - start},
+        'members': members,
+    }
+    return models, scaler, metrics
+
+
+def write_bundle(models, scaler, metrics, root=BUNDLE_ROOT, version=None):
+    version = version or time.strftime('%Y%m%d-%H%M%S')
+    directory = os.path.join(root, version)
+    if os.path.exists(directory):
+        raise FileExistsError(f"Bundle {directory} already exists")
+    tmp = f"{directory}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    for name, model in models.items():
+        joblib.dump(model, os.path.join(tmp, f"{name}{MODEL_SUFFIX}"))
+    joblib.dump(list(TRAINING_COLUMNS), os.path.join(tmp, 'columns.pkl'))
+    joblib.dump(list(TRAINING_COLUMNS), os.path.join(tmp, 'dummy_columns.pkl'))
+    joblib.dump(scaler, os.path.join(tmp, 'scaler.pkl'))
+    with open(os.path.join(tmp, METRICS_FILE), 'w') as f:
+        json.dump({'version': version, **metrics}, f, indent=2)
+    # A bundle directory only appears once it is complete
+    os.replace(tmp, directory)
+    return directory
+
+
+def _copy_atomic(source, target):
+    tmp = f"{target}.tmp"
+    shutil.copyfile(source, tmp)
+    os.replace(tmp, target)
+
+
+# Copy a bundle over the served artifacts (models/, scaler.pkl, dummy_columns.pkl,
+# and with replace_xgb XGB.pkl, the single-model scoring default). Each file is
+# replaced atomically but the set is not: a reader in between can load new
+# models with the old scaler, so only install while nothing is serving
+def install(directory, model_dir=MODEL_DIR, replace_xgb=False):
+    installed = []
+    for entry in sorted(os.listdir(directory)):
+        if entry.endswith(MODEL_SUFFIX) or entry == 'columns.pkl':
+            _copy_atomic(os.path.join(directory, entry), os.path.join(model_dir, entry))
+            installed.append(entry)
+    for entry in ['scaler.pkl', 'dummy_columns.pkl']:
+        _copy_atomic(os.path.join(directory, entry), entry)
+    xgboost = os.path.join(directory, f"XGBoost{MODEL_SUFFIX}")
+    if replace_xgb and os.path.exists(xgboost):
+        _copy_atomic(xgboost, 'XGB.pkl')
+        installed.append('XGB.pkl')
+    # The KNN index is derived from the pickle, so it is rebuilt with it
+    knn = f"K-Nearest Neighbors{MODEL_SUFFIX}"
+    if knn in installed and os.path.isdir(os.path.join(model_dir, 'knn_index')):
+        import knn_index
+        knn_index.build(os.path.join(model_dir, knn), os.path.join(model_dir, 'knn_index'))
+    return installed
+
+
+def comparison_table(metrics):
+    rows = {}
+    for name, member in metrics['members'].items():
+        row = {f"test {metric}": value for metric, value in member['test'].items()}
+        if member['cv']:
+            row['cv f1'] = member['cv']['f1']['mean']
+            row['cv f1 std'] = member['cv']['f1']['std']
+        row['fit s'] = member['fit_seconds']
+        rows[name] = row
+    return pd.DataFrame(rows).T.sort_values('test f1', ascending=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the ensemble members into a versioned bundle.")
+    parser.add_argument('data', nargs='?', default=DATASET_PATH)
+    parser.add_argument('--models', nargs='+', default=DEFAULT_MEMBERS, choices=list(CANDIDATES))
+    parser.add_argument('--folds', type=int, default=DEFAULT_FOLDS, help="CV folds (1 skips cross-validation)")
+    parser.add_argument('--workers', type=int, help="Worker processes (default: one per core)")
+    parser.add_argument('--random-state', type=int, default=RANDOM_STATE)
+    parser.add_argument('--out', default=BUNDLE_ROOT, help="Directory the bundle is created in")
+    parser.add_argument('--version', help="Bundle name (default: a timestamp)")
+    parser.add_argument('--install', action='store_true',
+                        help="Also copy the bundle over the served artifacts (only while nothing is serving them)")
+    parser.add_argument('--replace-xgb', action='store_true', help="With --install, also replace XGB.pkl")
+    args = parser.parse_args()
+
+    models, scaler, metrics = train(read_hr_dataset(args.data), args.models, args.folds, args.workers,
+                                    args.random_state)
+    metrics['data'] = {'path': args.data, 'hash': artifact_hash([args.data])}
+    directory = write_bundle(models, scaler, metrics, args.out, args.version)
+
+    with pd.option_context('display.float_format', '{:.4f}'.format, 'display.width', 200,
+                           'display.max_columns', None):
+        print(comparison_table(metrics))
+    seconds = metrics['seconds']
+    print(f"{len(models)} models, {metrics['folds']} folds on {metrics['workers']} workers: "
+          f"prepare {seconds['prepare']:.1f}s, fit {seconds['fit']:.1f}s, total {seconds['total']:.1f}s")
+    print(f"Bundle: {directory}  (serve it with CHURN_MODEL_BUNDLE={directory})")
+    if args.install:
+        installed = install(directory, replace_xgb=args.replace_xgb)
+        print(f"Installed {', '.join(installed)}, plus scaler.pkl and dummy_columns.pkl")
+
+
+if __name__ == "__main__":
+    main()
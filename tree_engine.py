@@ -0,0 +1,239 @@
+# Compiled tree-ensemble inference.
+#
+# Flattens the trees of the shipped XGBoost / LightGBM / GradientBoosting /
+# DecisionTree pickles into contiguous NumPy node arrays and evaluates rows by
+# walking every (row, tree) pair one level at a time. Leaves point back at
+# themselves, so at most max_depth vectorized steps reach every leaf.
+#
+# Single rows are several times faster than the native predictors (no Python
+# wrapper / DMatrix overhead); for large batches the multithreaded native
+# libraries stay faster, so batch scoring keeps using them.
+#
+# Inputs must be finite (FeatureEncoder never produces NaN).
+import json
+
+import joblib
+import numpy as np
+
+DEFAULT_BLOCK_ROWS = 4096
+
+
+def _sigmoid(z):
+    return 1.0 / (1.0 + np.exp(-z))
+
+
+def _logit(p):
+    return float(np.log(p / (1.0 - p)))
+
+
+class CompiledTrees:
+    # trees: list of (feature, threshold, left, right, value[, cover]) arrays, one tuple
+    #   per tree, with children indices local to the tree and -1 for leaves
+    # strict: split goes left on x < threshold (XGBoost) instead of x <= threshold
+    # input_dtype: precision the native library compares features in
+    # link: 'sigmoid' (sum leaf margins) or 'mean' (average leaf probabilities)
+    def __init__(self, trees, base_margin=0.0, strict=False, input_dtype=np.float64,
+                 link='sigmoid', name=None):
+        self.strict = strict
+        self.input_dtype = np.dtype(input_dtype)
+        self.link = link
+        self.base_margin = float(base_margin)
+        self.name = name
+        self.classes_ = np.array([0, 1])
+
+        sizes = np.array([len(t[0]) for t in trees])
+        starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+        self.roots = starts.astype(np.int32)
+        self.n_trees = len(trees)
+
+        feature, threshold, left, right, value, depth = [], [], [], [], [], []
+        for start, (f, t, l, r, v, *_) in zip(starts, trees):
+            l = np.asarray(l, dtype=np.int64)
+            r = np.asarray(r, dtype=np.int64)
+            leaf = l < 0
+            own = np.arange(len(l)) + start
+            feature.append(np.where(leaf, 0, f))
+            threshold.append(np.where(leaf, 0.0, t))
+            left.append(np.where(leaf, own, l + start))
+            right.append(np.where(leaf, own, r + start))
+            value.append(np.where(leaf, v, 0.0))
+            depth.append(_tree_depth(l, r))
+
+        self.feature = np.concatenate(feature).astype(np.intp)
+        self.threshold = np.concatenate(threshold).astype(np.float64)
+        self.left = np.concatenate(left).astype(np.int32)
+        self.right = np.concatenate(right).astype(np.int32)
+        self.value = np.concatenate(value).astype(np.float64)
+        self.max_depth = max(depth) if depth else 0
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in (self.feature, self.threshold, self.left, self.right, self.value))
+
+    # Leaf index reached in every tree, shape (n_rows, n_trees)
+    def apply(self, X):
+        X = np.ascontiguousarray(X, dtype=self.input_dtype)
+        n_rows, n_features = X.shape
+        flat = X.ravel()
+        row_base = (np.arange(n_rows, dtype=np.intp) * n_features)[:, None]
+        node = np.broadcast_to(self.roots, (n_rows, self.n_trees)).copy()
+        for step in range(self.max_depth):
+            x = flat[row_base + self.feature[node]]
+            thr = self.threshold[node]
+            go_left = x < thr if self.strict else x <= thr
+            nxt = np.where(go_left, self.left[node], self.right[node])
+            # Every walk has reached a leaf once nothing moves
+            if step % 4 == 3 and np.array_equal(nxt, node):
+                break
+            node = nxt
+        return node
+
+    def _predict_block(self, X):
+        leaf_values = self.value[self.apply(X)]
+        if self.link == 'mean':
+            return leaf_values.mean(axis=1)
+        return _sigmoid(leaf_values.sum(axis=1) + self.base_margin)
+
+    # Positive-class probability; large batches are walked in row blocks to bound memory
+    def predict_positive(self, X, block_rows=DEFAULT_BLOCK_ROWS):
+        X = np.asarray(X)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[0] <= block_rows:
+            return self._predict_block(X)
+        out = np.empty(X.shape[0])
+        for start in range(0, X.shape[0], block_rows):
+            out[start:start + block_rows] = self._predict_block(X[start:start + block_rows])
+        return out
+
+    def predict_proba(self, X):
+        p = self.predict_positive(X)
+        return np.column_stack([1.0 - p, p])
+
+    def predict(self, X):
+        return (self.predict_positive(X) >= 0.5).astype(np.int64)
+
+
+def _tree_depth(left, right):
+    depth = np.zeros(len(left), dtype=np.int64)
+    for node in range(len(left)):
+        if left[node] >= 0:
+            depth[left[node]] = depth[node] + 1
+            depth[right[node]] = depth[node] + 1
+    return int(depth.max())
+
+
+# Each *_spec returns the CompiledTrees arguments for a model; trees carry node
+# covers (training weight reaching each node), which explain.py uses
+def _xgboost_spec(model):
+    booster = model.get_booster()
+    learner = json.loads(booster.save_raw('json'))['learner']
+    if learner['objective']['name'] != 'binary:logistic':
+        raise TypeError(f"Unsupported XGBoost objective: {learner['objective']['name']}")
+    trees = []
+    for tree in learner['gradient_booster']['model']['trees']:
+        left = np.array(tree['left_children'])
+        # Leaf values live in split_conditions for leaf nodes
+        split = np.array(tree['split_conditions'], dtype=np.float32)
+        trees.append((np.array(tree['split_indices']), split, left,
+                      np.array(tree['right_children']), split, np.array(tree['sum_hessian'])))
+    # '5E-1', or '[5E-1]' (one per target) since XGBoost 3
+    base_score = float(np.ravel(json.loads(learner['learner_model_param']['base_score']))[0])
+    return {'trees': trees, 'base_margin': _logit(base_score), 'strict': True,
+            'input_dtype': np.float32, 'name': 'xgboost'}
+
+
+def _lightgbm_spec(model):
+    dump = model.booster_.dump_model()
+    if not dump['objective'].startswith('binary'):
+        raise TypeError(f"Unsupported LightGBM objective: {dump['objective']}")
+    trees = []
+    for info in dump['tree_info']:
+        feature, threshold, left, right, value, cover = [], [], [], [], [], []
+
+        # Pre-order walk of the nested dump into flat arrays
+        def visit(node):
+            i = len(feature)
+            feature.append(node.get('split_feature', 0))
+            threshold.append(node.get('threshold', 0.0))
+            left.append(-1)
+            right.append(-1)
+            value.append(node.get('leaf_value', 0.0))
+            cover.append(node.get('internal_count', node.get('leaf_count', 0)))
+            if 'leaf_value' not in node:
+                if node['decision_type'] != '<=':
+                    raise TypeError("Categorical LightGBM splits are not supported")
+                left[i] = visit(node['left_child'])
+                right[i] = visit(node['right_child'])
+            return i
+
+        visit(info['tree_structure'])
+        trees.append((feature, threshold, left, right, value, cover))
+    return {'trees': trees, 'name': 'lightgbm'}
+
+
+def _sklearn_tree_arrays(tree, value):
+    return (tree.feature, tree.threshold, tree.children_left, tree.children_right, value,
+            tree.weighted_n_node_samples)
+
+
+def _decision_tree_spec(model):
+    tree = model.tree_
+    counts = tree.value[:, 0, :]
+    positive = counts[:, 1] / counts.sum(axis=1)
+    return {'trees': [_sklearn_tree_arrays(tree, positive)], 'input_dtype': np.float32,
+            'link': 'mean', 'name': 'decision_tree'}
+
+
+def _gradient_boosting_spec(model):
+    if model.estimators_.shape[1] != 1:
+        raise TypeError("Only binary GradientBoostingClassifier models are supported")
+    prior = getattr(model.init_, 'class_prior_', None)
+    if prior is None:
+        raise TypeError("Only the default prior init estimator is supported")
+    trees = [_sklearn_tree_arrays(est.tree_, est.tree_.value[:, 0, 0] * model.learning_rate)
+             for est in model.estimators_[:, 0]]
+    return {'trees': trees, 'base_margin': _logit(prior[1]), 'input_dtype': np.float32,
+            'name': 'gradient_boosting'}
+
+
+_SPECS = {
+    'XGBClassifier': _xgboost_spec,
+    'LGBMClassifier': _lightgbm_spec,
+    'LightGBMBooster': _lightgbm_spec,
+    'DecisionTreeClassifier': _decision_tree_spec,
+    'GradientBoostingClassifier': _gradient_boosting_spec,
+}
+
+
+# Flattened trees and link of a supported model, as CompiledTrees keyword arguments
+def tree_spec(model):
+    spec = _SPECS.get(type(model).__name__)
+    if spec is None:
+        raise TypeError(f"Cannot compile {type(model).__name__}")
+    return spec(model)
+
+
+def compile_model(model):
+    return CompiledTrees(**tree_spec(model))
+
+
+# Compiled engine where supported (Logistic Regression through linear_engine.py,
+# unfused and in float64), the native model otherwise
+def compile_or_native(model):
+    from linear_engine import compile_linear
+
+    for compile_fn in (compile_model, lambda m: compile_linear(m, dtype=np.float64)):
+        try:
+            return compile_fn(model)
+        except TypeError:
+            pass
+    return model
+
+
+def load_compiled(paths):
+    return [compile_or_native(joblib.load(path)) for path in paths]
@@ -0,0 +1,328 @@
+# Hyperparameter search for the ensemble members on top of train.py.
+#
+# Successive halving per candidate: a seeded sample of configurations (the
+# library defaults first) is cross-validated on a fraction of each fold's
+# training rows, the best 1/eta move on to eta times more rows, and so on up
+# to the full folds. Every (configuration, fold, fraction) trial is a task on
+# train.py's process pool. XGBoost and LightGBM get a large round budget and
+# early-stop on a validation slice of the fold; the final model is trained
+# with the mean best round count.
+#
+# Finished trials are stored in SQLite, keyed by the prepared data and the
+# trial, so an interrupted or repeated search only runs what is missing. The
+# best configuration of every candidate is refitted on the full training
+# split and written as a train.py bundle (models/bundles/<version>/), which
+# the app serves directly (or --install copies over models/ while nothing is
+# serving, see train.install).
+#
+# Usage:
+#   python tune.py HR_Dataset.csv
+#   python tune.py HR_Dataset.csv --models XGBoost LightGBM --trials 27 --eta 3 --workers 8
+#   python tune.py HR_Dataset.csv --metric roc_auc --install
+import argparse
+import hashlib
+import inspect
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+
+import lightgbm
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import StratifiedKFold, train_test_split
+
+import train
+from dataset import DATASET_PATH, RANDOM_STATE, read_hr_dataset
+from prediction_cache import artifact_hash
+
+TRIALS_PATH = os.path.join(train.BUNDLE_ROOT, 'trials.sqlite')
+DEFAULT_TRIALS = 16
+DEFAULT_ETA = 3
+DEFAULT_METRIC = 'f1'
+MAX_ROUNDS = 2000
+EARLY_STOPPING_ROUNDS = 50
+# Share of a fold's training rows held out to early-stop the boosters on
+EARLY_STOPPING_FRACTION = 0.1
+
+# Candidate -> parameter -> values to sample from
+SEARCH_SPACES = {
+    'Logistic Regression': {
+        'C': [0.01, 0.03, 0.1, 0.3, 1.0, 3.0, 10.0, 30.0, 100.0],
+        'max_iter': [1000],
+    },
+    # Uniform euclidean only: that is what models/knn_index can serve
+    'K-Nearest Neighbors': {
+        'n_neighbors': [1, 3, 5, 7, 9, 11, 15, 21, 31],
+    },
+    'Decision Tree': {
+        'criterion': ['gini', 'entropy'],
+        'max_depth': [None, 4, 6, 8, 10, 12, 16, 24],
+        'min_samples_leaf': [1, 2, 4, 8, 16, 32],
+    },
+    'Random Forest': {
+        'n_estimators': [100, 200, 400],
+        'max_depth': [None, 8, 12, 16, 24],
+        'min_samples_leaf': [1, 2, 4, 8],
+        'max_features': ['sqrt', 0.5, 0.8],
+    },
+    'Gradient Boosting': {
+        'n_estimators': [100, 200, 300, 500],
+        'learning_rate': [0.03, 0.05, 0.1, 0.2],
+        'max_depth': [2, 3, 4, 5, 6],
+        'subsample': [0.7, 0.85, 1.0],
+    },
+    'LightGBM': {
+        'learning_rate': [0.02, 0.05, 0.1, 0.2],
+        'num_leaves': [7, 15, 31, 63, 127],
+        'min_child_samples': [5, 10, 20, 40, 80],
+        'subsample': [0.7, 0.85, 1.0],
+        'subsample_freq': [1],
+        'colsample_bytree': [0.6, 0.8, 1.0],
+        'reg_lambda': [0.0, 1.0, 5.0],
+    },
+    'XGBoost': {
+        'learning_rate': [0.02, 0.05, 0.1, 0.3],
+        'max_depth': [3, 4, 5, 6, 8, 10],
+        'min_child_weight': [1, 3, 5, 10],
+        'subsample': [0.7, 0.85, 1.0],
+        'colsample_bytree': [0.6, 0.8, 1.0],
+        'reg_lambda': [0.5, 1.0, 5.0],
+    },
+}
+# Boosters whose round count is found by early stopping instead of searched
+EARLY_STOPPING = {'LightGBM', 'XGBoost'}
+
+
+# Trial results by key, in memory and in an SQLite file
+class TrialStore:
+    def __init__(self, path=TRIALS_PATH):
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS trials "
+                             "(key TEXT PRIMARY KEY, candidate TEXT, result TEXT, created REAL)")
+            self._db.commit()
+        self._results = {}
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._results and self._db is not None:
+                row = self._db.execute("SELECT result FROM trials WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    self._results[key] = json.loads(row[0])
+            return self._results.get(key)
+
+    def put(self, key, candidate, result):
+        with self._lock:
+            self._results[key] = result
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO trials VALUES (?, ?, ?, ?)",
+                                 (key, candidate, json.dumps(result), time.time()))
+                self._db.commit()
+
+    def __len__(self):
+        if self._db is None:
+            return len(self._results)
+        return self._db.execute("SELECT COUNT(*) FROM trials").fetchone()[0]
+
+
+# Seeded configurations of a candidate: the library defaults ({}) first, then distinct samples
+def sample_configs(name, n, random_state=RANDOM_STATE):
+    space = SEARCH_SPACES[name]
+    rng = np.random.default_rng([random_state, sum(name.encode())])
+    configs, seen = [{}], {'{}'}
+    total = math.prod(len(values) for values in space.values())
+    while len(configs) < min(n, total + 1):
+        config = {param: values[rng.integers(len(values))] for param, values in space.items()}
+        key = json.dumps(config, sort_keys=True)
+        if key not in seen:
+            seen.add(key)
+            configs.append(config)
+    return configs
+
+
+# Fractions of the fold training rows per rung, e.g. [1/9, 1/3, 1] for eta=3 and 3 rungs
+def rung_fractions(n_configs, eta):
+    rungs = max(1, int(math.floor(math.log(max(n_configs, 1), eta))) + 1)
+    return [eta ** (k - rungs + 1) for k in range(rungs)]
+
+
+def _fingerprint(X, y, folds, random_state):
+    digest = hashlib.sha256()
+    digest.update(np.ascontiguousarray(X.to_numpy()).tobytes())
+    digest.update(np.ascontiguousarray(y).tobytes())
+    digest.update(f"{folds}:{random_state}:{MAX_ROUNDS}:{EARLY_STOPPING_ROUNDS}".encode())
+    return digest.hexdigest()[:16]
+
+
+def trial_key(data_key, name, config, fold, fraction):
+    payload = json.dumps([data_key, name, config, fold, round(fraction, 6)], sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+# lightgbm >= 4.7 takes validation data as eval_X / eval_y and deprecates eval_set
+def _lightgbm_validation(X, y):
+    if 'eval_X' in inspect.signature(lightgbm.LGBMClassifier.fit).parameters:
+        return {'eval_X': (X,), 'eval_y': (y,)}
+    return {'eval_set': [(X, y)]}
+
+
+# Fit with a large round budget, early-stopped on a slice of `rows`; returns the best round count
+def _early_stopping_fit(name, model, X, y, rows, random_state):
+    fit_rows, stop_rows = train_test_split(rows, test_size=EARLY_STOPPING_FRACTION, stratify=y[rows],
+                                           random_state=random_state)
+    inputs = train._inputs(name, X.iloc[fit_rows]), y[fit_rows]
+    validation = train._inputs(name, X.iloc[stop_rows]), y[stop_rows]
+    if name == 'XGBoost':
+        model.set_params(n_estimators=MAX_ROUNDS, early_stopping_rounds=EARLY_STOPPING_ROUNDS)
+        model.fit(*inputs, eval_set=[validation], verbose=False)
+        return int(model.best_iteration) + 1
+    model.set_params(n_estimators=MAX_ROUNDS)
+    model.fit(*inputs, **_lightgbm_validation(*validation),
+              callbacks=[lightgbm.early_stopping(EARLY_STOPPING_ROUNDS, verbose=False)])
+    return int(model.best_iteration_)
+
+
+# One trial (runs in a pool worker): fit a configuration on `fraction` of a
+# fold's training rows and score it on the fold
+def _run_trial(task):
+    key, name, config, fold, fraction = task
+    start = time.perf_counter()
+    data = train._data
+    X, y = data['X_train'], data['y_train']
+    rows, held_out = data['folds'][fold]
+    if fraction < 1:
+        rows, _ = train_test_split(rows, train_size=fraction, stratify=y[rows],
+                                   random_state=data['random_state'])
+    model = train.make_model(name, data['random_state'], **config)
+    rounds = None
+    if name in EARLY_STOPPING:
+        rounds = _early_stopping_fit(name, model, X, y, rows, data['random_state'])
+    else:
+        model.fit(train._inputs(name, X.iloc[rows]), y[rows])
+    scores = train.evaluate(model, train._inputs(name, X.iloc[held_out]), y[held_out])
+    return key, name, {'scores': scores, 'rounds': rounds, 'seconds': time.perf_counter() - start}
+
+
+# Successive halving over every candidate at once (each rung is one batch of
+# pool tasks); returns {name: [rung summaries]} with the surviving configs
+def search(df, names, n_trials=DEFAULT_TRIALS, eta=DEFAULT_ETA, folds=train.DEFAULT_FOLDS, workers=None,
+           metric=DEFAULT_METRIC, store=None, random_state=RANDOM_STATE, progress=print):
+    workers = workers or os.cpu_count() or 1
+    store = store if store is not None else TrialStore(None)
+    X_train, _, y_train, _, _ = train.prepare(df, random_state)
+    splits = list(StratifiedKFold(folds, shuffle=True, random_state=random_state).split(X_train, y_train))
+    data = {'X_train': X_train, 'y_train': y_train, 'folds': splits, 'random_state': random_state,
+            'params': {}}
+    data_key = _fingerprint(X_train, y_train, folds, random_state)
+
+    alive = {name: sample_configs(name, n_trials, random_state) for name in names}
+    fractions = {name: rung_fractions(len(alive[name]), eta) for name in names}
+    history = {name: [] for name in names}
+    counts = {'run': 0, 'stored': 0, 'seconds': 0.0}
+    for rung in range(max(len(f) for f in fractions.values())):
+        tasks, plan = [], {}
+        for name in names:
+            if rung >= len(fractions[name]):
+                continue
+            fraction = fractions[name][rung]
+            plan[name] = [(config, [trial_key(data_key, name, config, k, fraction) for k in range(folds)])
+                          for config in alive[name]]
+            for config, keys in plan[name]:
+                tasks += [(key, name, config, k, fraction) for k, key in enumerate(keys)
+                          if store.get(key) is None]
+        counts['stored'] += sum(len(keys) for entries in plan.values() for _, keys in entries) - len(tasks)
+        start = time.perf_counter()
+        for key, name, result in train.iter_tasks(tasks, data, workers, _run_trial):
+            store.put(key, name, result)
+            counts['run'] += 1
+        counts['seconds'] += time.perf_counter() - start
+        if progress:
+            progress(f"Rung {rung + 1}: {len(tasks)} trials run, "
+                     f"{sum(len(e) * folds for e in plan.values()) - len(tasks)} from the store "
+                     f"in {time.perf_counter() - start:.1f}s")
+
+        for name, entries in plan.items():
+            ranked = []
+            for config, keys in entries:
+                results = [store.get(key) for key in keys]
+                score = float(np.mean([r['scores'][metric] for r in results]))
+                rounds = [r['rounds'] for r in results if r['rounds'] is not None]
+                ranked.append({'config': config, 'score': score,
+                               'rounds': int(round(np.mean(rounds))) if rounds else None})
+            ranked.sort(key=lambda entry: -entry['score'])
+            history[name].append({'fraction': fractions[name][rung], 'ranked': ranked})
+            keep = max(1, math.ceil(len(ranked) / eta))
+            alive[name] = [entry['config'] for entry in ranked[:keep]]
+    return history, counts
+
+
+# Winning configuration of each candidate, ready for train.make_model
+def best_params(history):
+    best = {}
+    for name, rungs in history.items():
+        entry = rungs[-1]['ranked'][0]
+        params = dict(entry['config'])
+        if entry['rounds'] is not None:
+            params['n_estimators'] = entry['rounds']
+        best[name] = params
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Successive-halving hyperparameter search into a train.py bundle.")
+    parser.add_argument('data', nargs='?', default=DATASET_PATH)
+    parser.add_argument('--models', nargs='+', default=train.DEFAULT_MEMBERS, choices=list(SEARCH_SPACES))
+    parser.add_argument('--trials', type=int, default=DEFAULT_TRIALS, help="Configurations sampled per candidate")
+    parser.add_argument('--eta', type=int, default=DEFAULT_ETA, help="Keep 1/eta of the configurations per rung")
+    parser.add_argument('--folds', type=int, default=train.DEFAULT_FOLDS)
+    parser.add_argument('--metric', default=DEFAULT_METRIC,
+                        choices=['f1', 'roc_auc', 'accuracy', 'precision', 'recall'])
+    parser.add_argument('--workers', type=int, help="Worker processes (default: one per core)")
+    parser.add_argument('--random-state', type=int, default=RANDOM_STATE)
+    parser.add_argument('--store', default=TRIALS_PATH, help="SQLite file of finished trials ('' to disable)")
+    parser.add_argument('--out', default=train.BUNDLE_ROOT)
+    parser.add_argument('--version')
+    parser.add_argument('--install', action='store_true',
+                        help="Also copy the bundle over the served artifacts (only while nothing is serving them)")
+    parser.add_argument('--replace-xgb', action='store_true', help="With --install, also replace XGB.pkl")
+    args = parser.parse_args()
+
+    df = read_hr_dataset(args.data)
+    start = time.perf_counter()
+    history, counts = search(df, args.models, args.trials, args.eta, args.folds, args.workers, args.metric,
+                             TrialStore(args.store or None), args.random_state)
+    searched = time.perf_counter() - start
+    params = best_params(history)
+    models, scaler, metrics = train.train(df, args.models, 1, args.workers, args.random_state, progress=None,
+                                          params=params)
+    metrics['data'] = {'path': args.data, 'hash': artifact_hash([args.data])}
+    metrics['search'] = {
+        'metric': args.metric, 'trials': args.trials, 'eta': args.eta, 'folds': args.folds,
+        'trials_run': counts['run'], 'trials_stored': counts['stored'], 'seconds': searched,
+        'best': {name: {'params': params[name], 'cv': history[name][-1]['ranked'][0]['score']}
+                 for name in args.models},
+    }
+    directory = train.write_bundle(models, scaler, metrics, args.out, args.version)
+
+    rows = {name: {f"cv {args.metric}": history[name][-1]['ranked'][0]['score'],
+                   f"test {args.metric}": metrics['members'][name]['test'][args.metric],
+                   'params': json.dumps(params[name])}
+            for name in args.models}
+    with pd.option_context('display.float_format', '{:.4f}'.format, 'display.width', 240,
+                           'display.max_columns', None, 'display.max_colwidth', 120):
+        print(pd.DataFrame(rows).T.sort_values(f"cv {args.metric}", ascending=False))
+    print(f"{counts['run']} trials run, {counts['stored']} reused from the store; search {searched:.1f}s")
+    print(f"Bundle: {directory}  (serve it with CHURN_MODEL_BUNDLE={directory})")
+    if args.install:
+        installed = train.install(directory, replace_xgb=args.replace_xgb)
+        print(f"Installed {', '.join(installed)}, plus scaler.pkl and dummy_columns.pkl")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+# Incremental update of the trained models with a new batch of HR records.
+#
+# Instead of re-running the whole pipeline over the full history, each model is
+# updated from its current state using the new rows only:
+#   XGBoost / LightGBM / Gradient Boosting  continue boosting for --rounds more trees (--shrinkage)
+#   K-Nearest Neighbors                     appends the rows to its fitted set
+#   Decision Tree                           keeps its splits and refreshes node class counts
+#   Logistic Regression                     a few L-BFGS steps from the current coefficients
+# The batch is deduplicated and split into update rows and a holdout (or
+# --holdout gives one); only the update rows are SMOTE-resampled, and they are
+# scaled with the scaler next to each pickle (a bundle's own, else the one at
+# the repo root) so every model keeps its input space. An
+# updated model replaces its pickle (atomically) only when its holdout metric
+# stays within --tolerance of the current model's; every run is appended to
+# <model dir>/updates.jsonl.
+#
+# Usage:
+#   python update.py march.csv                        # models/ (scaler.pkl, dummy_columns.pkl at the root)
+#   python update.py march.csv --dir models/bundles/20250301-120000 --rounds 100
+#   python update.py march.csv --pickles XGB.pkl --holdout validation.csv --metric roc_auc
+#   python update.py march.csv --dry-run              # report only
+import argparse
+import json
+import os
+import shutil
+import time
+import warnings
+
+import joblib
+import numpy as np
+import pandas as pd
+from lightgbm import LGBMClassifier
+from sklearn.ensemble import GradientBoostingClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import train_test_split
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.tree import DecisionTreeClassifier
+from xgboost import XGBClassifier
+
+import train
+from dataset import RANDOM_STATE, TARGET, drop_duplicate_profiles, notebook_features, read_hr_dataset
+from ensemble import MODEL_DIR, available_members, load_model
+from prediction_cache import artifact_hash
+
+DEFAULT_ROUNDS = 50
+# Trees added on a small batch overfit it at the model's learning rate, so
+# XGBoost/LightGBM train them at this fraction of it (sklearn's Gradient
+# Boosting applies one rate to every stage, so it keeps its own)
+DEFAULT_SHRINKAGE = 0.1
+DEFAULT_TOLERANCE = 0.005
+DEFAULT_METRIC = 'f1'
+HOLDOUT_FRACTION = 0.2
+LINEAR_ITERATIONS = 10
+UPDATES_LOG = 'updates.jsonl'
+# SMOTE needs more minority rows than neighbours
+SMOTE_NEIGHBORS = 5
+
+
+# Scaler and column list that belong with a model directory (a bundle keeps its
+# own; models/ uses the pickles at the repo root)
+def encoder_artifacts(model_dir):
+    if os.path.exists(os.path.join(model_dir, 'scaler.pkl')):
+        return os.path.join(model_dir, 'scaler.pkl'), os.path.join(model_dir, 'dummy_columns.pkl')
+    return 'scaler.pkl', 'dummy_columns.pkl'
+
+
+def _resample(df, columns, random_state):
+    from imblearn.over_sampling import SMOTE
+
+    X = notebook_features(df, columns)
+    y = df[TARGET].to_numpy()
+    minority = np.bincount(y, minlength=2).min()
+    if minority <= SMOTE_NEIGHBORS:
+        return X, y
+    return SMOTE(sampling_strategy='auto', random_state=random_state).fit_resample(X, y)
+
+
+def _scaled(X, scaler, columns):
+    return pd.DataFrame(scaler.transform(X.astype(np.float64)), columns=columns)
+
+
+# Update rows (deduplicated, SMOTE-resampled, scaled) and holdout rows (scaled only)
+def prepare_batch(df, scaler, columns, holdout=None, random_state=RANDOM_STATE):
+    df = drop_duplicate_profiles(df)
+    if holdout is None:
+        df, holdout = train_test_split(df, test_size=HOLDOUT_FRACTION, stratify=df[TARGET],
+                                       random_state=random_state)
+    X, y = _resample(df, columns, random_state)
+    holdout = drop_duplicate_profiles(holdout)
+    X_holdout, y_holdout = notebook_features(holdout, columns), holdout[TARGET].to_numpy()
+    return _scaled(X, scaler, columns), y, _scaled(X_holdout, scaler, columns), y_holdout
+
+
+# Models fitted on plain arrays (no recorded column names) are fed arrays
+def _inputs(model, X):
+    return X if hasattr(model, 'feature_names_in_') else X.to_numpy()
+
+
+def _update_xgboost(model, X, y, rounds, shrinkage):
+    params = model.get_params()
+    rate = params['learning_rate'] or 0.3  # XGBoost's default eta
+    updated = XGBClassifier(**{**params, 'n_estimators': rounds, 'learning_rate': rate * shrinkage})
+    updated.fit(_inputs(model, X), y, xgb_model=model.get_booster())
+    # The saved model keeps its own rate, so repeated updates do not compound the shrinkage
+    return updated.set_params(learning_rate=params['learning_rate'])
+
+
+def _update_lightgbm(model, X, y, rounds, shrinkage):
+    params = model.get_params()
+    updated = LGBMClassifier(**{**params, 'n_estimators': rounds,
+                                'learning_rate': params['learning_rate'] * shrinkage})
+    updated.fit(_inputs(model, X), y, init_model=model.booster_)
+    return updated.set_params(learning_rate=params['learning_rate'])
+
+
+def _update_gradient_boosting(model, X, y, rounds, shrinkage):
+    warm_start = model.warm_start
+    model.set_params(warm_start=True, n_estimators=model.n_estimators_ + rounds)
+    model.fit(_inputs(model, X), y)
+    # The saved model keeps its own settings, so a later fit() retrains it from scratch as before
+    return model.set_params(warm_start=warm_start)
+
+
+def _update_knn(model, X, y, rounds, shrinkage):
+    history = pd.DataFrame(model._fit_X, columns=X.columns)
+    labels = np.concatenate([model.classes_[model._y], y])
+    return model.fit(_inputs(model, pd.concat([history, X], ignore_index=True)), labels)
+
+
+# Splits are kept; every node's class fractions and weight absorb the new rows
+def _update_decision_tree(model, X, y, rounds, shrinkage):
+    tree = model.tree_
+    paths = model.decision_path(_inputs(model, X))
+    counts = np.stack([np.asarray(paths[y == c].sum(axis=0)).ravel() for c in model.classes_], axis=1)
+    old = tree.value[:, 0, :] * tree.weighted_n_node_samples[:, None]
+    total = old + counts
+    tree.value[:, 0, :] = total / total.sum(axis=1, keepdims=True)
+    tree.weighted_n_node_samples[:] = total.sum(axis=1)
+    return model
+
+
+def _update_logistic(model, X, y, rounds, shrinkage):
+    params = model.get_params()
+    model.set_params(warm_start=True, max_iter=LINEAR_ITERATIONS)
+    with warnings.catch_warnings():
+        # Stopping after a few iterations is the point: it is a step, not a refit
+        warnings.simplefilter('ignore')
+        model.fit(_inputs(model, X), y)
+    return model.set_params(warm_start=params['warm_start'], max_iter=params['max_iter'])
+
+
+# Estimator class -> in-place or continued update
+UPDATERS = [
+    (XGBClassifier, _update_xgboost),
+    (LGBMClassifier, _update_lightgbm),
+    (GradientBoostingClassifier, _update_gradient_boosting),
+    (KNeighborsClassifier, _update_knn),
+    (DecisionTreeClassifier, _update_decision_tree),
+    (LogisticRegression, _update_logistic),
+]
+
+
+def updater_for(model):
+    return next((fn for cls, fn in UPDATERS if isinstance(model, cls)), None)
+
+
+def _dump_atomic(model, path):
+    tmp = f"{path}.tmp"
+    joblib.dump(model, tmp)
+    os.replace(tmp, path)
+
+
+def _rebuild_knn_index(model_dir, model_path):
+    import knn_index
+
+    directory = os.path.join(model_dir, 'knn_index')
+    if not os.path.isdir(directory):
+        return
+    tmp, old = f"{directory}.tmp", f"{directory}.old"
+    shutil.rmtree(tmp, ignore_errors=True)
+    knn_index.build(model_path, tmp)
+    os.replace(directory, old)
+    os.replace(tmp, directory)
+    shutil.rmtree(old)
+
+
+# Update every model in `paths` ({name: pickle}) with the batch and swap in the
+# ones whose holdout metric holds (unless dry_run); returns the run's log entry.
+# Each pickle is fed the batch encoded with the scaler and columns next to it.
+def update(paths, batch, model_dir=MODEL_DIR, holdout=None, rounds=DEFAULT_ROUNDS, metric=DEFAULT_METRIC,
+           tolerance=DEFAULT_TOLERANCE, dry_run=False, random_state=RANDOM_STATE, shrinkage=DEFAULT_SHRINKAGE):
+    batches, prepared = {}, 0.0
+    update_rows = holdout_rows = 0
+    reports = {}
+    for name, path in paths.items():
+        model = load_model(path)
+        updater = updater_for(model)
+        if updater is None:
+            continue
+        artifacts = encoder_artifacts(os.path.dirname(path) or '.')
+        if artifacts not in batches:
+            scaler, columns = joblib.load(artifacts[0]), joblib.load(artifacts[1])
+            start = time.perf_counter()
+            batches[artifacts] = prepare_batch(batch, scaler, columns, holdout, random_state)
+            prepared += time.perf_counter() - start
+        X, y, X_holdout, y_holdout = batches[artifacts]
+        # The split and resampling do not depend on the scaler, so every encoding has these counts
+        update_rows, holdout_rows = len(X), len(X_holdout)
+        before = train.evaluate(model, _inputs(model, X_holdout), y_holdout)
+        start = time.perf_counter()
+        updated = updater(model, X, y, rounds, shrinkage)
+        seconds = time.perf_counter() - start
+        after = train.evaluate(updated, _inputs(updated, X_holdout), y_holdout)
+        accepted = after[metric] >= before[metric] - tolerance
+        if accepted and not dry_run:
+            _dump_atomic(updated, path)
+            if isinstance(updated, KNeighborsClassifier):
+                _rebuild_knn_index(model_dir, path)
+        reports[name] = {'path': path, 'scaler': artifacts[0], 'before': before, 'after': after,
+                         'seconds': seconds, 'accepted': bool(accepted), 'swapped': bool(accepted and not dry_run)}
+
+    entry = {'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'rows': len(batch), 'update_rows': update_rows,
+             'holdout_rows': holdout_rows, 'rounds': rounds, 'shrinkage': shrinkage, 'metric': metric,
+             'tolerance': tolerance, 'prepare_seconds': prepared, 'dry_run': dry_run, 'models': reports}
+    if not dry_run:
+        with open(os.path.join(model_dir, UPDATES_LOG), 'a') as f:
+            f.write(json.dumps(entry) + '\n')
+    return entry
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Update the trained models with a new batch of HR records.")
+    parser.add_argument('data', help="CSV of new records in HR_Dataset.csv format (with 'left')")
+    parser.add_argument('--dir', default=MODEL_DIR, help="Model directory or train.py bundle")
+    parser.add_argument('--members', nargs='+', help="Members of --dir to update (default: all)")
+    parser.add_argument('--pickles', nargs='*', default=[], help="Extra model pickles to update, e.g. XGB.pkl")
+    parser.add_argument('--holdout', help="CSV to validate on (default: a 20%% split of the batch)")
+    parser.add_argument('--rounds', type=int, default=DEFAULT_ROUNDS, help="Trees added to boosted models")
+    parser.add_argument('--shrinkage', type=float, default=DEFAULT_SHRINKAGE,
+                        help="Learning-rate factor for the trees added to XGBoost/LightGBM")
+    parser.add_argument('--metric', default=DEFAULT_METRIC,
+                        choices=['f1', 'roc_auc', 'accuracy', 'precision', 'recall'])
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="Largest holdout metric drop that still swaps the model in")
+    parser.add_argument('--dry-run', action='store_true')
+    args = parser.parse_args()
+
+    paths = available_members(args.dir)
+    if args.members:
+        paths = {name: paths[name] for name in args.members}
+    paths.update({os.path.basename(path): path for path in args.pickles})
+    holdout = read_hr_dataset(args.holdout) if args.holdout else None
+    batch = read_hr_dataset(args.data)
+    entry = update(paths, batch, args.dir, holdout, args.rounds, args.metric, args.tolerance, args.dry_run,
+                   shrinkage=args.shrinkage)
+
+    print(f"Batch {args.data} ({artifact_hash([args.data])}): {entry['update_rows']:,} update rows after SMOTE, "
+          f"{entry['holdout_rows']:,} holdout rows")
+    print(f"{'model':<22}{'before':>9}{'after':>9}{'update':>10}  result")
+    for name, report in entry['models'].items():
+        result = 'swapped' if report['swapped'] else ('accepted (dry run)' if report['accepted'] else 'kept')
+        print(f"{name:<22}{report['before'][args.metric]:>9.4f}{report['after'][args.metric]:>9.4f}"
+              f"{report['seconds']:>9.2f}s  {result}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+# What-if sweeps over the Prediction Dashboard inputs.
+#
+# Every sidebar input has a small discrete grid (the values its widget can
+# take). A sweep varies one or two inputs over their whole grid with the rest
+# of the employee fixed, and scores all scenarios as one encoded matrix with a
+# single predict_proba per model. The change search does the same for every
+# combination of up to two actionable inputs (raise salary, promote, adjust
+# hours or projects, improve satisfaction) and returns the smallest change
+# whose prediction drops to low risk.
+#
+# Given a risk table (risk_table.py), the members it covers are looked up for
+# all scenarios at once and only the rest (KNN) are scored live; the native
+# models stay faster than the compiled engine at these batch sizes.
+#
+# Usage:
+#   python whatif.py                                  # sample employee, default ensemble
+#   python whatif.py --sweep average_montly_hours satisfaction_level
+import argparse
+import time
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+from encoder import DEPARTMENTS
+from ensemble import Ensemble
+from scoring import predict_matrix
+
+# Input -> every value its sidebar widget can produce, in increasing order
+INPUT_GRIDS = {
+    'satisfaction_level': np.round(np.arange(101) * 0.01, 2),
+    'last_evaluation': np.round(np.arange(21) * 0.05, 2),
+    'number_project': np.arange(1, 11),
+    'average_montly_hours': np.arange(50, 401, 10),
+    'time_spend_company': np.arange(1, 21),
+    'Work_accident': np.array([0, 1]),
+    'promotion_last_5years': np.array([0, 1]),
+    'department': np.array(DEPARTMENTS),
+    'salary': np.array(['low', 'medium', 'high']),
+}
+
+# Inputs HR can act on, and the direction a change may take ('up' = later in the grid)
+ACTIONS = {
+    'satisfaction_level': 'up',
+    'number_project': 'any',
+    'average_montly_hours': 'any',
+    'promotion_last_5years': 'up',
+    'salary': 'up',
+}
+
+
+# Position of an employee's value in an input grid (nearest value for numbers)
+def grid_index(name, value):
+    grid = INPUT_GRIDS[name]
+    if grid.dtype.kind in 'iuf':
+        return int(np.abs(grid - float(value)).argmin())
+    return int(np.flatnonzero(grid == value)[0])
+
+
+def _scenarios(employee, changes):
+    n = len(next(iter(changes.values()))) if changes else 1
+    frame = pd.DataFrame({name: np.repeat(np.asarray([value]), n) for name, value in employee.items()})
+    for name, indices in changes.items():
+        frame[name] = INPUT_GRIDS[name][indices]
+    return frame
+
+
+def _score(frame, models, encoder, table=None):
+    probs = table.lookup_frame(frame, models.names) if table is not None and isinstance(models, Ensemble) else None
+    if probs is None:
+        return predict_matrix(models, encoder.encode_frame(frame))
+    live = [i for i, name in enumerate(models.names) if name not in table.names]
+    if live:
+        probs[:, live] = models.member_probabilities(encoder.encode_frame(frame), [models.names[i] for i in live])
+    return models.combine(probs)
+
+
+# Grid of scenarios varying `inputs` (one or two names) over their full grids,
+# with columns for those inputs and the predicted 'risk'
+def sweep(employee, inputs, models, encoder, table=None):
+    axes = np.meshgrid(*[np.arange(len(INPUT_GRIDS[name])) for name in inputs], indexing='ij')
+    frame = _scenarios(employee, {name: axis.ravel() for name, axis in zip(inputs, axes)})
+    grid = frame[list(inputs)].copy()
+    grid['risk'], _ = _score(frame, models, encoder, table)
+    return grid
+
+
+# Smallest change of at most `max_changes` actionable inputs that makes the
+# prediction low risk: {'changes': {input: (current, new)}, 'risk', 'cost'},
+# or None. The cost of a change is the fraction of the input's grid it moves
+# across, summed over the changed inputs; ties go to the lower risk.
+def suggest_change(employee, models, encoder, max_changes=2, actions=ACTIONS, table=None):
+    options = {}
+    for name, direction in actions.items():
+        current = grid_index(name, employee[name])
+        indices = np.arange(len(INPUT_GRIDS[name]))
+        allowed = indices > current if direction == 'up' else indices != current
+        options[name] = (indices[allowed], current)
+
+    # Every combination of changed inputs, all scored as one matrix
+    blocks, costs = [], []
+    for k in range(1, max_changes + 1):
+        for names in combinations(options, k):
+            axes = np.meshgrid(*[options[name][0] for name in names], indexing='ij')
+            changes = {name: axis.ravel() for name, axis in zip(names, axes)}
+            cost = sum(np.abs(changes[name] - options[name][1]) / (len(INPUT_GRIDS[name]) - 1)
+                       for name in names)
+            blocks.append(_scenarios(employee, changes))
+            costs.append(cost)
+    if not blocks:
+        return None
+    frame = pd.concat(blocks, ignore_index=True)
+    cost = np.concatenate(costs)
+    risk, labels = _score(frame, models, encoder, table)
+
+    feasible = np.flatnonzero(labels == 0)
+    if len(feasible) == 0:
+        return None
+    best = feasible[np.lexsort((risk[feasible], cost[feasible]))[0]]
+    row = frame.iloc[best]
+    changes = {name: (employee[name], row[name]) for name in actions
+               if grid_index(name, row[name]) != grid_index(name, employee[name])}
+    return {'changes': changes, 'risk': float(risk[best]), 'cost': float(cost[best]),
+            'evaluated': len(frame)}
+
+
+def main():
+    from encoder import FeatureEncoder
+    from risk_table import RiskTable
+
+    parser = argparse.ArgumentParser(description="What-if sweep and suggested change for a sample employee.")
+    parser.add_argument('--sweep', nargs='+', default=['average_montly_hours', 'satisfaction_level'],
+                        choices=list(INPUT_GRIDS), help="One or two inputs to vary")
+    parser.add_argument('--members', nargs='+', help="Ensemble members (default: all)")
+    args = parser.parse_args()
+
+    employee = {'satisfaction_level': 0.4, 'last_evaluation': 0.55, 'number_project': 2,
+                'average_montly_hours': 150, 'time_spend_company': 3, 'Work_accident': 0,
+                'promotion_last_5years': 0, 'department': 'sales', 'salary': 'low'}
+    models = Ensemble.load(args.members)
+    encoder = FeatureEncoder.load()
+    table = RiskTable.load_if_present()
+    if table is not None:
+        print(f"Risk table members: {', '.join(name for name in models.names if name in table.names) or 'none'}")
+
+    start = time.perf_counter()
+    grid = sweep(employee, args.sweep, models, encoder, table)
+    print(f"Swept {len(grid):,} scenarios in {(time.perf_counter() - start) * 1e3:.0f} ms; "
+          f"risk {grid['risk'].min():.1%} to {grid['risk'].max():.1%}")
+    start = time.perf_counter()
+    suggestion = suggest_change(employee, models, encoder, table=table)
+    elapsed = (time.perf_counter() - start) * 1e3
+    if suggestion is None:
+        print(f"No change of up to two actionable inputs lowers the risk ({elapsed:.0f} ms)")
+        return
+    changes = ', '.join(f"{name} {old} -> {new}" for name, (old, new) in suggestion['changes'].items())
+    print(f"Suggested change: {changes} (risk {suggestion['risk']:.1%}; "
+          f"{suggestion['evaluated']:,} scenarios in {elapsed:.0f} ms)")
+
+
+if __name__ == "__main__":
+    main()